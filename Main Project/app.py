@@ -10,13 +10,28 @@ from dotenv import load_dotenv
 import os
 from flask_mail import Mail, Message
 from routes.SystemTesting.Clock_in_and_out_reminders.config import init_attendance_scheduler
+from routes.Auth.utils import init_db
+from routes.Auth.metrics import init_metrics
+from routes.Auth.sql_trace import init_sql_trace
+from routes.Auth.payroll_jobs import init_payroll_jobs
+from routes.Auth.outbox import init_outbox
 
 app = Flask(__name__)
 app.secret_key = "123456"
 app.config['WTF_CSRF_SECRET_KEY'] = 'anothersecretkey'  # Use a different key for CSRF protection
 app.config['WTF_CSRF_ENABLED'] = True
 
-init_attendance_scheduler(app)
+# Process-pool workers (password hashing, payslips) import this file as __mp_main__: they get the app
+# object but must not start the scheduler and the background threads
+IS_POOL_WORKER = __name__ == '__mp_main__'
+
+if not IS_POOL_WORKER:
+    init_attendance_scheduler(app)
+init_metrics(app)  # before init_db: its teardown then runs after the request's commit
+init_sql_trace(app)
+init_db(app)
+if not IS_POOL_WORKER:
+    init_payroll_jobs(app)
 csrf.init_app(app)
 load_dotenv()
 print("EMAIL_USER:", os.getenv("EMAIL_USER"))  # Debugging
@@ -24,15 +39,18 @@ print("EMAIL_PASSWORD:", os.getenv("EMAIL_PASSWORD"))  # Debugging (DO NOT DO IN
 
 app.config['DOCUMENT_REPOSITORY'] = os.path.join(app.root_path, 'static', 'DocumentRepository')
 app.config['MAX_CONTENT_LENGTH'] = 10 * 1024 * 1024
-app.config['MAIL_SERVER'] = 'smtp.gmail.com'
-app.config['MAIL_PORT'] = 587
-app.config['MAIL_USE_TLS'] = True
+# MAIL_SERVER / MAIL_PORT / MAIL_USE_TLS can point at a local SMTP stand-in for testing the outbox
+app.config['MAIL_SERVER'] = os.getenv('MAIL_SERVER', 'smtp.gmail.com')
+app.config['MAIL_PORT'] = int(os.getenv('MAIL_PORT', 587))
+app.config['MAIL_USE_TLS'] = os.getenv('MAIL_USE_TLS', '1') == '1'
 app.config['MAIL_USE_SSL'] = False
 app.config['MAIL_USERNAME'] = os.getenv("EMAIL_USER")
 app.config['MAIL_PASSWORD'] = os.getenv("EMAIL_PASSWORD")  # Can be app password or normal password
 app.config['MAIL_DEFAULT_SENDER'] = os.getenv("EMAIL_USER")
 
 mail = Mail(app)
+if not IS_POOL_WORKER:
+    init_outbox(app, mail)
 # Register blueprints
 app.register_blueprint(login_bp, url_prefix='/')
 app.register_blueprint(employee_bp, url_prefix='/')
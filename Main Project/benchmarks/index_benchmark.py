@@ -0,0 +1,239 @@
+"""
+Index pack benchmark: latency of the hot queries from routes/ with and without migrations/0003_hot_path_indexes.sql.
+- Builds a scratch schema (index_bench) with the columns those queries touch, seeds it with generate_series
+  at realistic volumes, times every query, applies the index pack, times them again and prints both.
+- Never touches the application tables; the scratch schema is dropped at the end (unless --keep).
+- Run from "Main Project" with: python benchmarks/index_benchmark.py [--employees 3000] [--days 365] [--repeat 30]
+"""
+
+import argparse
+import os
+import random
+import re
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import routes.Login  # noqa: E402,F401  (loads routes.Auth in the same order as the app)
+from routes.Auth.inbox import SCHEMA_SQL as INBOX_SCHEMA_SQL  # noqa: E402
+from routes.Auth.migrations import MIGRATIONS_DIR, split_sql  # noqa: E402
+from routes.Auth.payroll_jobs import SCHEMA_SQL as PAYROLL_SCHEMA_SQL  # noqa: E402
+from routes.Auth.utils import _connect  # noqa: E402
+
+BENCH_SCHEMA = 'index_bench'
+INDEX_PACK = os.path.join(MIGRATIONS_DIR, '0003_hot_path_indexes.sql')
+START_DATE = date(2024, 1, 1)
+
+# Only the columns the benchmarked queries use, plus the primary keys DatabaseSetup.sql defines
+TABLES_SQL = [
+    "CREATE TABLE employees (employee_id integer PRIMARY KEY, email varchar(100), team_id integer, account_status varchar(20))",
+    "CREATE TABLE admins (admin_id integer PRIMARY KEY, email varchar(100), role_id integer)",
+    """CREATE TABLE attendance_logs (log_id serial PRIMARY KEY, employee_id integer, date date,
+        clock_in_time time, clock_out_time time, status varchar(20), hours_worked numeric(5,2))""",
+    """CREATE TABLE messages (message_id serial PRIMARY KEY, sender_id integer, sender_role varchar(50),
+        receiver_id integer, receiver_role varchar(50), subject varchar(255), body text,
+        is_read boolean DEFAULT false, "timestamp" timestamp without time zone)""",
+    """CREATE TABLE payroll (payroll_id serial PRIMARY KEY, employee_id integer, month date,
+        base_salary numeric(10,2), net_salary numeric(10,2))""",
+    """CREATE TABLE two_factor_verifications (verification_id serial PRIMARY KEY, admin_id integer, employee_id integer,
+        verification_code varchar(10), is_verified boolean DEFAULT false, verification_timestamp timestamp without time zone,
+        purpose varchar(20))""",
+    """CREATE TABLE audit_trail_admin (audit_id serial PRIMARY KEY, action varchar(255), details text,
+        "timestamp" timestamp without time zone, category varchar(100), role_id integer)""",
+]
+
+
+def seed_sql(employees, admins, days, messages_per_employee, audits_per_day):
+    return [
+        f"""INSERT INTO employees SELECT g, 'employee' || g || '@example.com', 1 + g % 100, 'Activated'
+            FROM generate_series(1, {employees}) g""",
+        f"""INSERT INTO admins SELECT g, 'admin' || g || '@example.com', 1 + g % 4 FROM generate_series(1, {admins}) g""",
+        f"""INSERT INTO attendance_logs (employee_id, date, clock_in_time, clock_out_time, status, hours_worked)
+            SELECT e, DATE '{START_DATE}' + d, TIME '08:00' + (random() * 3600) * INTERVAL '1 second',
+                   TIME '17:00' + (random() * 3600) * INTERVAL '1 second', 'Present', 8 + random()
+            FROM generate_series(1, {employees}) e, generate_series(0, {days - 1}) d
+            WHERE extract(isodow FROM DATE '{START_DATE}' + d) < 6""",
+        f"""INSERT INTO messages (sender_id, sender_role, receiver_id, receiver_role, subject, body, is_read, "timestamp")
+            SELECT 1 + (random() * {admins - 1})::int, 'admin', 1 + g % {employees}, 'employee', 'Subject ' || g,
+                   repeat('message body ', 10), random() < 0.9,
+                   TIMESTAMP '{START_DATE}' + random() * INTERVAL '{days} days'
+            FROM generate_series(1, {employees * messages_per_employee}) g""",
+        f"""INSERT INTO payroll (employee_id, month, base_salary, net_salary)
+            SELECT e, DATE '{START_DATE}' + (m || ' months')::interval, 3000, 2700
+            FROM generate_series(1, {employees}) e, generate_series(0, {max(1, days // 30) - 1}) m""",
+        f"""INSERT INTO two_factor_verifications (admin_id, employee_id, verification_code, is_verified, verification_timestamp, purpose)
+            SELECT CASE WHEN g % 2 = 0 THEN 1 + g % {admins} END, CASE WHEN g % 2 = 1 THEN 1 + g % {employees} END,
+                   lpad((g % 1000000)::text, 6, '0'), random() < 0.95,
+                   TIMESTAMP '{START_DATE}' + random() * INTERVAL '{days} days', 'login'
+            FROM generate_series(1, {employees * 20}) g""",
+        f"""INSERT INTO audit_trail_admin (action, details, "timestamp", category, role_id)
+            SELECT 'action_' || g % 50, 'details ' || g, TIMESTAMP '{START_DATE}' + random() * INTERVAL '{days} days',
+                   'category_' || g % 10, 1 + g % 4
+            FROM generate_series(1, {days * audits_per_day}) g""",
+    ]
+
+
+# (name, SQL, parameter factory) - copied from the routes they come from
+def hot_queries(employees, admins, days):
+    def some_day():
+        return START_DATE + timedelta(days=random.randrange(days))
+
+    def some_range(length):
+        start = START_DATE + timedelta(days=random.randrange(max(1, days - length)))
+        return start, start + timedelta(days=length)
+
+    return [
+        ("attendance today (clock in/out)",
+         "SELECT * FROM attendance_logs WHERE employee_id = %s AND date = %s",
+         lambda: (random.randint(1, employees), some_day())),
+        ("attendance employee month",
+         "SELECT date, hours_worked FROM attendance_logs WHERE employee_id = %s AND date BETWEEN %s AND %s",
+         lambda: (random.randint(1, employees),) + some_range(30)),
+        ("clocked in on a day (dashboard)",
+         "SELECT COUNT(*) FROM attendance_logs WHERE date = %s AND clock_in_time IS NOT NULL",
+         lambda: (some_day(),)),
+        ("attendance trend (reports, 7 days)",
+         "SELECT date, COUNT(*) FROM attendance_logs WHERE date BETWEEN %s AND %s GROUP BY date ORDER BY date",
+         lambda: some_range(7)),
+        ("unread messages preview",
+         """SELECT message_id, sender_id, sender_role, body, "timestamp" FROM messages
+            WHERE receiver_id = %s AND is_read = FALSE ORDER BY "timestamp" DESC LIMIT 5""",
+         lambda: (random.randint(1, employees),)),
+        ("inbox first page",
+         """SELECT message_id, sender_id, sender_role, body, "timestamp", is_read FROM messages
+            WHERE receiver_id = ANY(%s) ORDER BY "timestamp" DESC, message_id DESC LIMIT 51""",
+         lambda: ([random.randint(1, employees)],)),
+        ("team members",
+         "SELECT employee_id, email FROM employees WHERE team_id = %s",
+         lambda: (random.randint(1, 100),)),
+        ("admin by email",
+         "SELECT admin_id, 'admin' FROM admins WHERE email = %s",
+         lambda: (f"admin{random.randint(1, admins)}@example.com",)),
+        ("payroll for employee and month",
+         "SELECT payroll_id FROM payroll WHERE employee_id = %s AND month = %s",
+         lambda: (random.randint(1, employees), START_DATE)),
+        ("latest admin 2FA code",
+         """SELECT verification_code, verification_timestamp FROM two_factor_verifications
+            WHERE admin_id = %s AND is_verified = FALSE ORDER BY verification_timestamp DESC LIMIT 1""",
+         lambda: (random.randint(1, admins),)),
+        ("audit trail for a week",
+         """SELECT audit_id, action, "timestamp" FROM audit_trail_admin
+            WHERE "timestamp" BETWEEN %s AND %s ORDER BY "timestamp" DESC""",
+         lambda: some_range(7)),
+    ]
+
+
+def index_pack_statements():
+    with open(INDEX_PACK) as f:
+        statements = split_sql(f.read())
+    # The indexes that live in earlier migrations
+    statements += [sql for sql in INBOX_SCHEMA_SQL + PAYROLL_SCHEMA_SQL if re.match(r'\s*CREATE (UNIQUE )?INDEX', sql)]
+    return statements
+
+
+# ANALYZE only the scratch tables, a bare ANALYZE would walk the whole database
+def analyze(cur):
+    cur.execute("SELECT tablename FROM pg_tables WHERE schemaname = %s", (BENCH_SCHEMA,))
+    for (table,) in cur.fetchall():
+        cur.execute(f"ANALYZE {BENCH_SCHEMA}.{table}")
+
+
+def plan_summary(cur, sql, params):
+    cur.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+    plan = cur.fetchone()[0][0]['Plan']
+    nodes = []
+
+    def walk(node):
+        if 'Scan' in node['Node Type']:
+            nodes.append(node['Node Type'].replace(' Scan', '').replace('Index Only', 'IndexOnly'))
+        for child in node.get('Plans', []):
+            walk(child)
+    walk(plan)
+    return '+'.join(nodes) or plan['Node Type']
+
+
+def time_queries(cur, queries, repeat):
+    results = {}
+    for name, sql, make_params in queries:
+        cur.execute(sql, make_params())  # warm up
+        cur.fetchall()
+        timings = []
+        for _ in range(repeat):
+            params = make_params()
+            started = time.perf_counter()
+            cur.execute(sql, params)
+            cur.fetchall()
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        results[name] = {
+            'p50': statistics.median(timings),
+            'p95': timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+            'plan': plan_summary(cur, sql, make_params()),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the hot-path index pack")
+    parser.add_argument('--employees', type=int, default=3000)
+    parser.add_argument('--admins', type=int, default=50)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--messages-per-employee', type=int, default=100)
+    parser.add_argument('--audits-per-day', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=30)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--keep', action='store_true', help=f"keep the {BENCH_SCHEMA} schema afterwards")
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    conn = _connect()
+    conn.autocommit = True
+    cur = conn.cursor()
+    try:
+        print(f"🛠️  Building {BENCH_SCHEMA} ...")
+        cur.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE")
+        cur.execute(f"CREATE SCHEMA {BENCH_SCHEMA}")
+        cur.execute(f"SET search_path = {BENCH_SCHEMA}")
+        cur.execute("SELECT setseed(%s)", (args.seed / 1000,))
+        for sql in TABLES_SQL:
+            cur.execute(sql)
+        started = time.monotonic()
+        for sql in seed_sql(args.employees, args.admins, args.days, args.messages_per_employee, args.audits_per_day):
+            cur.execute(sql)
+        analyze(cur)
+        cur.execute("""
+            SELECT relname, n_live_tup FROM pg_stat_user_tables WHERE schemaname = %s ORDER BY relname
+        """, (BENCH_SCHEMA,))
+        sizes = ', '.join(f"{name}={rows:,}" for name, rows in cur.fetchall())
+        print(f"🌱 Seeded in {time.monotonic() - started:.1f}s: {sizes}")
+
+        queries = hot_queries(args.employees, args.admins, args.days)
+        before = time_queries(cur, queries, args.repeat)
+
+        started = time.monotonic()
+        for sql in index_pack_statements():
+            cur.execute(sql)
+        analyze(cur)
+        print(f"📇 Index pack built in {time.monotonic() - started:.1f}s")
+        after = time_queries(cur, queries, args.repeat)
+
+        print()
+        print(f"{'query':<36} {'p50 before':>11} {'p50 after':>10} {'p95 before':>11} {'p95 after':>10} {'speedup':>8}  plan")
+        for name, _, _ in queries:
+            b, a = before[name], after[name]
+            speedup = b['p50'] / a['p50'] if a['p50'] else float('inf')
+            print(f"{name:<36} {b['p50']:>9.2f}ms {a['p50']:>8.2f}ms {b['p95']:>9.2f}ms {a['p95']:>8.2f}ms "
+                  f"{speedup:>7.1f}x  {b['plan']} -> {a['plan']}")
+    finally:
+        if not args.keep:
+            cur.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE")
+        cur.close()
+        conn.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
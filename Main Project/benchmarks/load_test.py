@@ -0,0 +1,385 @@
+"""
+Load test: how many concurrent users one box carries, scenario by scenario.
+- Drives the real Flask app against a local database seeded with synthetic data (python seed_data.py), either
+  in-process through the Flask test client (default) or over HTTP against a running server (--url).
+  In-process, the app's own pool settings apply (DB_POOL_MAX_SIZE in .env), so the numbers include waiting
+  for a connection.
+- Scenarios:
+    clock-storm  every user clocks in at once ("9:00"), takes a short break and clocks out
+                 (/clock_in, /break start + end, /clock_out); uses employees without attendance today
+    polling      N open tabs polling /validate_token, /api/employee_status and /messages/unread-count
+    admin        admins refreshing /dashboard_data, /generate_reports and /reportingandanalytics_data
+    payroll      POST /process-payroll/all, then polls the job until it finishes
+- Prints throughput, p50/p95/p99 latency and error rate per request, and compares them with the stored
+  baseline (benchmarks/load_baseline.json, written with --save-baseline). Exits with 1 on a regression.
+- Signs in as the first super admin and as the employees it uses (their current sessions end), so only
+  run it against a development database.
+- Run from "Main Project" with:
+    python benchmarks/load_test.py [--scenarios clock-storm,polling,admin,payroll] [--users 200]
+        [--tabs 100] [--duration 30] [--url http://localhost:5000] [--save-baseline]
+"""
+
+import argparse
+from datetime import date, timedelta
+import json
+import math
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as flask_app  # noqa: E402  (in-process mode, and loads routes.Auth in the same order as the app)
+from routes.Auth.token import generate_admin_token, generate_token  # noqa: E402
+from routes.Auth.utils import db_session  # noqa: E402
+
+SCENARIOS = ['clock-storm', 'polling', 'admin', 'payroll']
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'load_baseline.json')
+PAYROLL_DONE = {'completed', 'completed_with_errors', 'failed'}
+
+
+# ======================== Clients ========================
+
+class InProcessClient:
+    """Flask test client: the whole app and database, no HTTP server."""
+
+    def __init__(self):
+        self.client = flask_app.app.test_client()
+
+    def request(self, method, path, token=None, body=None):
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        response = self.client.open(path, method=method, headers=headers, json=body)
+        try:
+            return response.status_code, response.get_json(silent=True)
+        finally:
+            response.close()
+
+
+class HttpClient:
+    """One keep-alive HTTP session per virtual user."""
+
+    def __init__(self, base_url):
+        import requests
+        self.base_url = base_url.rstrip('/')
+        self.session = requests.Session()
+
+    def request(self, method, path, token=None, body=None):
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        response = self.session.request(method, self.base_url + path, headers=headers, json=body, timeout=60)
+        try:
+            payload = response.json()
+        except ValueError:
+            payload = None
+        return response.status_code, payload
+
+
+# ======================== Measurements ========================
+
+class Recorder:
+    """Latencies and errors per request name, shared by the virtual users of a scenario."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+        self.errors = {}
+        self.statuses = {}
+        self.started = self.finished = None
+
+    def call(self, client, name, method, path, token=None, body=None, ok=(200, 201, 202)):
+        started = time.perf_counter()
+        try:
+            status, payload = client.request(method, path, token, body)
+        except Exception as e:
+            status, payload = type(e).__name__, None
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.samples.setdefault(name, []).append(elapsed)
+            statuses = self.statuses.setdefault(name, {})
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+            if status not in ok:
+                self.errors[name] = self.errors.get(name, 0) + 1
+        return status, payload
+
+    def add_sample(self, name, seconds):
+        with self._lock:
+            self.samples.setdefault(name, []).append(seconds)
+            self.statuses.setdefault(name, {})
+
+    def summary(self):
+        wall = (self.finished or time.perf_counter()) - self.started
+        results = {}
+        for name, samples in sorted(self.samples.items()):
+            samples = sorted(samples)
+            errors = self.errors.get(name, 0)
+            results[name] = {
+                'requests': len(samples),
+                'throughput': round(len(samples) / wall, 2) if wall else 0.0,
+                'p50_ms': round(percentile(samples, 50) * 1000, 1),
+                'p95_ms': round(percentile(samples, 95) * 1000, 1),
+                'p99_ms': round(percentile(samples, 99) * 1000, 1),
+                'max_ms': round(samples[-1] * 1000, 1),
+                'error_rate': round(errors / len(samples), 4),
+                'statuses': self.statuses[name],
+            }
+        return {'wall_seconds': round(wall, 2), 'requests': results}
+
+
+def percentile(sorted_samples, pct):
+    if not sorted_samples:
+        return 0.0
+    # Nearest rank
+    index = max(0, math.ceil(pct / 100.0 * len(sorted_samples)) - 1)
+    return sorted_samples[index]
+
+
+def run_users(count, target):
+    """Run target(user_index) on `count` threads and wait for all of them."""
+    threads = [threading.Thread(target=target, args=(i,), name=f'load-user-{i}', daemon=True) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+# ======================== Sessions ========================
+
+def employee_sessions(count, without_attendance_today=False):
+    """Tokens for `count` employees, made their current session (like a login)."""
+    condition = """
+        AND NOT EXISTS (SELECT 1 FROM attendance_logs a
+                        WHERE a.employee_id = e.employee_id AND a.date = CURRENT_DATE AND a.clock_in_time IS NOT NULL)
+    """ if without_attendance_today else ""
+    with db_session() as conn, conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT e.employee_id FROM employees e
+            WHERE e.account_status IS DISTINCT FROM 'Deactivated' AND e.account_status IS DISTINCT FROM 'Terminated'
+            {condition}
+            ORDER BY e.employee_id LIMIT %s
+        """, (count,))
+        employee_ids = [row[0] for row in cur.fetchall()]
+    sessions = []
+    for employee_id in employee_ids:
+        token, jti, _ = generate_token(employee_id)
+        sessions.append((employee_id, token, jti))
+    with db_session() as conn, conn.cursor() as cur:
+        cur.execute("""
+            UPDATE employees e SET current_jti = s.jti
+            FROM unnest(%s::int[], %s::text[]) AS s(employee_id, jti)
+            WHERE e.employee_id = s.employee_id
+        """, ([s[0] for s in sessions], [s[2] for s in sessions]))
+    return [(employee_id, token) for employee_id, token, _ in sessions]
+
+
+def admin_session():
+    """Token of the first super admin (no 2FA prompt, every permission)."""
+    with db_session() as conn, conn.cursor() as cur:
+        cur.execute("SELECT super_admin_id, role_id FROM super_admins ORDER BY super_admin_id LIMIT 1")
+        row = cur.fetchone()
+    if row is None:
+        raise SystemExit("❌ No super admin found, create one first (see seeds/)")
+    return generate_admin_token(row[0], 'super_admin', row[1], is_super_admin=True)
+
+
+# ======================== Scenarios ========================
+
+def clock_storm(args, make_client, recorder):
+    sessions = employee_sessions(args.users, without_attendance_today=True)
+    if len(sessions) < args.users:
+        print(f"⚠️  Only {len(sessions)} employees have not clocked in today (asked for {args.users})")
+    if not sessions:
+        return
+    clients = [make_client() for _ in sessions]
+    start = threading.Barrier(len(sessions))
+
+    def user(i):
+        client, (_, token) = clients[i], sessions[i]
+        start.wait()
+        recorder.call(client, 'POST /clock_in', 'POST', '/clock_in', token, {})
+        recorder.call(client, 'POST /break (start)', 'POST', '/break', token, {'action': 'start', 'break_type': 'short'})
+        recorder.call(client, 'POST /break (end)', 'POST', '/break', token, {'action': 'end'})
+        recorder.call(client, 'POST /clock_out', 'POST', '/clock_out', token, {})
+
+    recorder.started = time.perf_counter()
+    run_users(len(sessions), user)
+    recorder.finished = time.perf_counter()
+
+
+def polling(args, make_client, recorder):
+    sessions = employee_sessions(args.tabs)
+    if not sessions:
+        print("⚠️  No employees to poll as")
+        return
+    admin_token = admin_session()
+    clients = [make_client() for _ in range(args.tabs)]
+    deadline = time.perf_counter() + args.duration
+
+    def tab(i):
+        client, (_, token) = clients[i], sessions[i % len(sessions)]
+        while time.perf_counter() < deadline:
+            recorder.call(client, 'GET /validate_token', 'GET', '/validate_token', token)
+            recorder.call(client, 'GET /api/employee_status', 'GET', '/api/employee_status', token)
+            recorder.call(client, 'GET /messages/unread-count', 'GET', '/messages/unread-count', admin_token)
+            time.sleep(args.think_time)
+
+    recorder.started = time.perf_counter()
+    run_users(args.tabs, tab)
+    recorder.finished = time.perf_counter()
+
+
+def admin(args, make_client, recorder):
+    token = admin_session()
+    end = date.today()
+    start = end - timedelta(days=30)
+    reports = f'/generate_reports?report_type=all&start_date={start}&end_date={end}'
+    clients = [make_client() for _ in range(args.admins)]
+    deadline = time.perf_counter() + args.duration
+
+    def admin_user(i):
+        client = clients[i]
+        while time.perf_counter() < deadline:
+            recorder.call(client, 'GET /dashboard_data', 'GET', '/dashboard_data', token)
+            recorder.call(client, 'GET /generate_reports', 'GET', reports, token)
+            recorder.call(client, 'GET /reportingandanalytics_data', 'GET', '/reportingandanalytics_data', token)
+            time.sleep(args.think_time)
+
+    recorder.started = time.perf_counter()
+    run_users(args.admins, admin_user)
+    recorder.finished = time.perf_counter()
+
+
+def payroll(args, make_client, recorder):
+    token = admin_session()
+    client = make_client()
+    recorder.started = time.perf_counter()
+    status, payload = recorder.call(client, 'POST /process-payroll/all', 'POST', '/process-payroll/all',
+                                    token, {'month': args.month} if args.month else {})
+    job_id = (payload or {}).get('job_id')
+    if job_id is None:
+        print(f"❌ Payroll job was not queued: {status} {payload}")
+        recorder.finished = time.perf_counter()
+        return
+    queued = time.perf_counter()
+    job = {}
+    while time.perf_counter() - queued < args.payroll_timeout:
+        _, job = recorder.call(client, 'GET /process-payroll/jobs/<id>', 'GET', f'/process-payroll/jobs/{job_id}', token)
+        if (job or {}).get('status') in PAYROLL_DONE:
+            break
+        time.sleep(0.5)
+    job_seconds = time.perf_counter() - queued
+    recorder.add_sample('payroll job (queued to finished)', job_seconds)
+    recorder.finished = time.perf_counter()
+    job = job or {}
+    processed = job.get('processed_employees') or 0
+    print(f"   payroll job {job_id}: {job.get('status', 'unknown')}, {processed} employees in {job_seconds:.1f}s"
+          + (f" ({processed / job_seconds:.0f}/s)" if job_seconds and processed else "")
+          + (f", {job.get('failed_employees')} failed" if job.get('failed_employees') else ""))
+
+
+SCENARIO_FUNCTIONS = {'clock-storm': clock_storm, 'polling': polling, 'admin': admin, 'payroll': payroll}
+
+
+# ======================== Report and baseline ========================
+
+def print_results(name, summary):
+    print(f"\n📊 {name} ({summary['wall_seconds']}s)")
+    print(f"   {'request':<38} {'count':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for request_name, r in summary['requests'].items():
+        print(f"   {request_name:<38} {r['requests']:>7} {r['throughput']:>8} {r['p50_ms']:>8} {r['p95_ms']:>8} "
+              f"{r['p99_ms']:>8} {r['error_rate'] * 100:>6.1f}%")
+        if r['error_rate']:
+            print(f"   {'':<38} statuses: {r['statuses']}")
+
+
+def compare(results, baseline, tolerance):
+    """Regressions against the baseline: slower p95/p99, lower throughput or more errors."""
+    regressions = []
+    for scenario, summary in results.items():
+        for request_name, current in summary['requests'].items():
+            before = baseline.get(scenario, {}).get('requests', {}).get(request_name)
+            if before is None:
+                continue
+            for key in ('p95_ms', 'p99_ms'):
+                if before[key] and current[key] > before[key] * (1 + tolerance):
+                    regressions.append(f"{scenario} {request_name}: {key} {before[key]} -> {current[key]}")
+            # Throughput only means something for the closed-loop scenarios that run for --duration
+            if scenario in ('polling', 'admin') and before['throughput'] and \
+                    current['throughput'] < before['throughput'] * (1 - tolerance):
+                regressions.append(f"{scenario} {request_name}: req/s {before['throughput']} -> {current['throughput']}")
+            if current['error_rate'] > before['error_rate'] + 0.01:
+                regressions.append(f"{scenario} {request_name}: errors {before['error_rate']:.1%} -> {current['error_rate']:.1%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test scenarios")
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help="comma separated: " + ", ".join(SCENARIOS))
+    parser.add_argument('--url', help="test a running server instead of the app in this process")
+    parser.add_argument('--users', type=int, default=200, help="employees in the clock-in storm")
+    parser.add_argument('--tabs', type=int, default=100, help="open tabs polling")
+    parser.add_argument('--admins', type=int, default=5, help="admins on the dashboard and reports")
+    parser.add_argument('--duration', type=float, default=30, help="seconds for polling and admin")
+    parser.add_argument('--think-time', type=float, default=1.0, help="seconds between a user's rounds")
+    parser.add_argument('--month', help="payroll month YYYY-MM (default: current)")
+    parser.add_argument('--payroll-timeout', type=float, default=600)
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--save-baseline', action='store_true', help="store these results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="allowed slowdown before it counts as a regression")
+    parser.add_argument('--output', help="also write the results as JSON to this file")
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in scenarios if name not in SCENARIO_FUNCTIONS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+
+    make_client = (lambda: HttpClient(args.url)) if args.url else InProcessClient
+    print(f"🚀 Load test against {args.url or 'the app in this process'}: {', '.join(scenarios)}")
+
+    results = {}
+    for name in scenarios:
+        recorder = Recorder()
+        recorder.started = time.perf_counter()
+        SCENARIO_FUNCTIONS[name](args, make_client, recorder)
+        summary = recorder.summary()
+        summary['settings'] = {'users': args.users, 'tabs': args.tabs, 'admins': args.admins,
+                               'duration': args.duration, 'think_time': args.think_time,
+                               'transport': 'http' if args.url else 'in-process'}
+        results[name] = summary
+        print_results(name, summary)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2)
+        print(f"\n💾 Saved baseline for {', '.join(results)} to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("\nNo baseline yet, store one with --save-baseline")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    for name in results:
+        if name in baseline and baseline[name].get('settings') != results[name]['settings']:
+            print(f"⚠️  {name}: baseline was recorded with {baseline[name].get('settings')}")
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) against the baseline (tolerance {args.tolerance:.0%}):")
+        for line in regressions:
+            print(f"   {line}")
+        return 1
+    print(f"\n✅ Within {args.tolerance:.0%} of the baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,240 @@
+"""
+Search benchmark: the old ILIKE/CAST search queries against the routes/Auth/search.py queries with the
+trigram indexes from migrations/0006_search_indexes.sql, on 100k+ rows per table.
+- Builds a scratch schema (search_bench), seeds employees, payroll and tickets with generate_series,
+  times the old queries, builds the indexes, times the new ones and prints both with the plans.
+- Needs the pg_trgm extension (CREATE EXTENSION pg_trgm, or run python migrate.py first).
+- Never touches the application tables; the scratch schema is dropped at the end (unless --keep).
+- Run from "Main Project" with: python benchmarks/search_benchmark.py [--employees 100000] [--repeat 20]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import routes.Login  # noqa: E402,F401  (loads routes.Auth in the same order as the app)
+from routes.Auth import search  # noqa: E402
+from routes.Auth.migrations import MIGRATIONS_DIR, split_sql  # noqa: E402
+from routes.Auth.utils import _connect  # noqa: E402
+
+BENCH_SCHEMA = 'search_bench'
+SEARCH_INDEXES = os.path.join(MIGRATIONS_DIR, '0006_search_indexes.sql')
+
+FIRST_NAMES = ['James', 'Mary', 'Ahmad', 'Siti', 'Wei', 'Priya', 'Carlos', 'Aisha', 'Kenji', 'Olga', 'Tunde', 'Lena']
+LAST_NAMES = ['Tan', 'Smith', 'Abdullah', 'Kumar', 'Garcia', 'Chen', 'Okafor', 'Ivanova', 'Sato', 'Muller']
+DEPARTMENTS = ['Engineering', 'Finance', 'Human Resources', 'Sales', 'Marketing', 'Operations', 'Support']
+WORDS = ['laptop', 'printer', 'payroll', 'leave', 'vpn', 'password', 'access', 'badge', 'monitor', 'email',
+         'overtime', 'shift', 'expense', 'training', 'desk', 'software', 'license', 'network', 'phone', 'chair']
+
+TABLES_SQL = [
+    """CREATE TABLE employees (employee_id integer PRIMARY KEY, first_name varchar(100), last_name varchar(100),
+        email varchar(100), phone_number varchar(20), department varchar(100))""",
+    """CREATE TABLE payroll (payroll_id serial PRIMARY KEY, employee_id integer, month date,
+        net_salary numeric(10,2), payment_status varchar(20))""",
+    "CREATE UNIQUE INDEX payroll_employee_month_key ON payroll (employee_id, month)",
+    """CREATE TABLE tickets (ticket_id serial PRIMARY KEY, employee_id integer, category varchar(255),
+        subject varchar(255), description text, priority varchar(50), status varchar(50),
+        created_at timestamp without time zone)""",
+]
+
+
+def array_sql(values):
+    return "ARRAY[" + ", ".join("'" + value.replace("'", "''") + "'" for value in values) + "]"
+
+
+def seed_sql(employees, months, tickets):
+    first, last, departments, words = map(array_sql, (FIRST_NAMES, LAST_NAMES, DEPARTMENTS, WORDS))
+    return [
+        f"""INSERT INTO employees
+            SELECT g, ({first})[1 + g % {len(FIRST_NAMES)}], ({last})[1 + (g / 7) % {len(LAST_NAMES)}] || g,
+                   'user' || g || '@example.com', '01' || lpad(g::text, 8, '0'), ({departments})[1 + g % {len(DEPARTMENTS)}]
+            FROM generate_series(1, {employees}) g""",
+        f"""INSERT INTO payroll (employee_id, month, net_salary, payment_status)
+            SELECT e, DATE '2024-01-01' + (m || ' months')::interval, 2000 + (e * 37 + m * 11) % 3000,
+                   CASE WHEN random() < 0.8 THEN 'Paid' ELSE 'Pending' END
+            FROM generate_series(1, {employees}) e, generate_series(0, {months - 1}) m""",
+        f"""INSERT INTO tickets (employee_id, category, subject, description, priority, status, created_at)
+            SELECT 1 + g % {employees}, ({words})[1 + g % {len(WORDS)}],
+                   initcap(({words})[1 + (g * 7) % {len(WORDS)}]) || ' issue #' || g,
+                   'The ' || ({words})[1 + (g * 3) % {len(WORDS)}] || ' and the ' || ({words})[1 + (g * 5) % {len(WORDS)}]
+                       || ' stopped working on floor ' || g % 20,
+                   (ARRAY['Low', 'Medium', 'High', 'Critical'])[1 + g % 4],
+                   (ARRAY['Open', 'Pending', 'Resolved', 'Closed'])[1 + g % 4],
+                   TIMESTAMP '2024-01-01' + random() * INTERVAL '365 days'
+            FROM generate_series(1, {tickets}) g""",
+    ]
+
+
+def old_queries(employees):
+    """(name, SQL, parameter factory) as the routes ran them before the search module."""
+    return [
+        ("employee search by name",
+         """SELECT e.employee_id FROM employees e
+            WHERE e.first_name ILIKE %s OR e.last_name ILIKE %s OR e.email ILIKE %s OR e.department ILIKE %s""",
+         lambda term: (f"%{term}%",) * 4, lambda: random.choice(LAST_NAMES) + str(random.randint(1, employees))),
+        ("payroll search by email",
+         """SELECT p.payroll_id FROM payroll p LEFT JOIN employees e ON p.employee_id = e.employee_id
+            WHERE (CAST(p.payroll_id AS TEXT) ILIKE %s OR CAST(p.employee_id AS TEXT) ILIKE %s OR
+                   CAST(p.month AS TEXT) ILIKE %s OR CAST(p.net_salary AS TEXT) ILIKE %s OR
+                   p.payment_status ILIKE %s OR e.email ILIKE %s)
+            ORDER BY p.payroll_id DESC LIMIT 100""",
+         lambda term: (f"%{term}%",) * 6, lambda: f"user{random.randint(1, employees)}@"),
+        ("payroll search by id",
+         """SELECT p.payroll_id FROM payroll p LEFT JOIN employees e ON p.employee_id = e.employee_id
+            WHERE (CAST(p.payroll_id AS TEXT) ILIKE %s OR CAST(p.employee_id AS TEXT) ILIKE %s OR
+                   CAST(p.month AS TEXT) ILIKE %s OR CAST(p.net_salary AS TEXT) ILIKE %s OR
+                   p.payment_status ILIKE %s OR e.email ILIKE %s)
+            ORDER BY p.payroll_id DESC LIMIT 100""",
+         lambda term: (f"%{term}%",) * 6, lambda: str(random.randint(1, employees))),
+        ("ticket search by text",
+         """SELECT t.ticket_id FROM tickets t LEFT JOIN employees e ON t.employee_id = e.employee_id
+            WHERE CAST(t.ticket_id AS TEXT) ILIKE %s OR e.first_name ILIKE %s OR e.last_name ILIKE %s OR
+                  t.category ILIKE %s OR t.subject ILIKE %s OR t.description ILIKE %s OR
+                  t.priority ILIKE %s OR t.status ILIKE %s
+            ORDER BY t.created_at DESC""",
+         lambda term: (f"%{term}%",) * 8, lambda: f"issue #{random.randint(1, employees)}"),
+    ]
+
+
+def new_queries(employees):
+    """The same searches built with routes/Auth/search.py, as the routes run them now."""
+    def employee(term):
+        terms = search.SearchTerms(term)
+        where_sql, params = search.employee_search(terms)
+        rank = search.rank_expression(search.employee_document(), terms, params)
+        return f"SELECT e.employee_id FROM employees e WHERE {where_sql} ORDER BY {rank} DESC, e.employee_id LIMIT 100", params
+
+    def payroll(term):
+        terms = search.SearchTerms(term)
+        where_sql, params = search.payroll_search(terms)
+        rank = search.rank_expression(search.employee_document(), terms, params) if terms.integer is None else "0"
+        return (f"""SELECT p.payroll_id FROM payroll p LEFT JOIN employees e ON p.employee_id = e.employee_id
+                    WHERE {where_sql} ORDER BY {rank} DESC, p.payroll_id DESC LIMIT 100""", params)
+
+    def ticket(term):
+        terms = search.SearchTerms(term)
+        where_sql, params = search.ticket_search(terms)
+        rank = search.rank_expression(search.ticket_document(), terms, params)
+        return (f"""SELECT t.ticket_id FROM tickets t LEFT JOIN employees e ON t.employee_id = e.employee_id
+                    WHERE {where_sql} ORDER BY {rank} DESC, t.created_at DESC LIMIT 100""", params)
+
+    old = {name: make_term for name, _, _, make_term in old_queries(employees)}
+    return [
+        ("employee search by name", employee, old["employee search by name"]),
+        ("payroll search by email", payroll, old["payroll search by email"]),
+        ("payroll search by id", payroll, old["payroll search by id"]),
+        ("ticket search by text", ticket, old["ticket search by text"]),
+    ]
+
+
+def analyze(cur):
+    cur.execute("SELECT tablename FROM pg_tables WHERE schemaname = %s", (BENCH_SCHEMA,))
+    for (table,) in cur.fetchall():
+        cur.execute(f"ANALYZE {BENCH_SCHEMA}.{table}")
+
+
+def plan_summary(cur, sql, params):
+    cur.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+    nodes = []
+
+    def walk(node):
+        if 'Scan' in node['Node Type']:
+            nodes.append(node['Node Type'].replace(' Scan', ''))
+        for child in node.get('Plans', []):
+            walk(child)
+    walk(cur.fetchone()[0][0]['Plan'])
+    return '+'.join(nodes)
+
+
+def time_query(cur, build, make_term, repeat):
+    """build(term) -> (sql, params); returns p50, p95, average rows and the plan of the last run."""
+    timings, rows = [], []
+    sql, params = build(make_term())
+    cur.execute(sql, params)  # warm up
+    cur.fetchall()
+    for _ in range(repeat):
+        sql, params = build(make_term())
+        started = time.perf_counter()
+        cur.execute(sql, params)
+        rows.append(len(cur.fetchall()))
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        'p50': statistics.median(timings),
+        'p95': timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+        'rows': statistics.mean(rows),
+        'plan': plan_summary(cur, sql, params),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the search indexes")
+    parser.add_argument('--employees', type=int, default=100000)
+    parser.add_argument('--months', type=int, default=3, help="payroll rows per employee")
+    parser.add_argument('--tickets', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--keep', action='store_true', help=f"keep the {BENCH_SCHEMA} schema afterwards")
+    args = parser.parse_args()
+
+    conn = _connect()
+    conn.autocommit = True
+    cur = conn.cursor()
+    cur.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+    if cur.fetchone() is None:
+        print("❌ pg_trgm is not installed: run python migrate.py (or CREATE EXTENSION pg_trgm) first")
+        return 1
+    try:
+        print(f"🛠️  Building {BENCH_SCHEMA} ...")
+        cur.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE")
+        cur.execute(f"CREATE SCHEMA {BENCH_SCHEMA}")
+        # public stays on the path for the pg_trgm functions and operator classes
+        cur.execute(f"SET search_path = {BENCH_SCHEMA}, public")
+        cur.execute("SELECT setseed(%s)", (args.seed / 1000,))
+        for sql in TABLES_SQL:
+            cur.execute(sql)
+        started = time.monotonic()
+        for sql in seed_sql(args.employees, args.months, args.tickets):
+            cur.execute(sql)
+        analyze(cur)
+        cur.execute("SELECT relname, n_live_tup FROM pg_stat_user_tables WHERE schemaname = %s ORDER BY relname",
+                    (BENCH_SCHEMA,))
+        print(f"🌱 Seeded in {time.monotonic() - started:.1f}s: " + ', '.join(f"{name}={rows:,}" for name, rows in cur.fetchall()))
+
+        random.seed(args.seed)
+        before = {name: time_query(cur, lambda term, sql=sql, params=params: (sql, params(term)), make_term, args.repeat)
+                  for name, sql, params, make_term in old_queries(args.employees)}
+
+        started = time.monotonic()
+        with open(SEARCH_INDEXES) as f:
+            for sql in split_sql(f.read()):
+                if not sql.upper().startswith('CREATE EXTENSION'):
+                    cur.execute(sql)
+        analyze(cur)
+        print(f"📇 Search indexes built in {time.monotonic() - started:.1f}s")
+
+        random.seed(args.seed)
+        after = {name: time_query(cur, build, make_term, args.repeat) for name, build, make_term in new_queries(args.employees)}
+
+        print()
+        print(f"{'search':<26} {'p50 before':>11} {'p50 after':>10} {'p95 before':>11} {'p95 after':>10} {'speedup':>8} {'rows':>11}  plan")
+        for name in before:
+            b, a = before[name], after[name]
+            speedup = b['p50'] / a['p50'] if a['p50'] else float('inf')
+            print(f"{name:<26} {b['p50']:>9.2f}ms {a['p50']:>8.2f}ms {b['p95']:>9.2f}ms {a['p95']:>8.2f}ms "
+                  f"{speedup:>7.1f}x {b['rows']:>5.0f}/{a['rows']:<5.0f}  {b['plan']} -> {a['plan']}")
+    finally:
+        if not args.keep:
+            cur.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE")
+        cur.close()
+        conn.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
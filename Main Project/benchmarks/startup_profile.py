@@ -0,0 +1,164 @@
+"""
+Startup profile: what a cold `import app` costs, and which imports the time goes to.
+- Runs `python -X importtime -c "import app"` in fresh interpreters, so the numbers are what every worker
+  fork and every test run pays. Reports the median of --runs.
+- profile  prints the cold import time, the time per top-level package and the slowest modules (cumulative
+           and self time) with the project module that imported each of them
+- check    exits with 1 when the median cold import is over the budget (--budget-ms, STARTUP_BUDGET_MS)
+           or when one of HEAVY_MODULES is imported at startup again; those belong inside the export/PDF
+           code paths that use them
+- The outbox sender is switched off for the measurement (OUTBOX_SENDER=0); nothing needs the database.
+- Run from "Main Project" with:
+    python benchmarks/startup_profile.py profile [--runs 5] [--top 25]
+    python benchmarks/startup_profile.py check [--budget-ms 1000] [--runs 5]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STARTUP_BUDGET_MS = float(os.getenv('STARTUP_BUDGET_MS', 1000))
+# Loaded lazily by the routes that need them; importing one of these at startup is a regression
+HEAVY_MODULES = ('pandas', 'numpy', 'openpyxl', 'reportlab', 'fpdf', 'user_agents', 'requests',
+                 'pymysql', 'sqlite3', 'mailbox', 'turtle', 'tkinter')
+FIRST_PARTY = ('app', 'extensions', 'routes')
+
+
+class ImportEntry:
+    def __init__(self, name, depth, self_us, cumulative_us):
+        self.name = name
+        self.depth = depth
+        self.self_us = self_us
+        self.cumulative_us = cumulative_us
+        self.parent = None
+
+
+def parse_importtime(stderr):
+    """
+    ImportEntry objects from -X importtime output. A module is printed after everything it imported,
+    indented one level less, which is how each entry finds its parent.
+    """
+    entries = []
+    waiting = {}  # depth -> entries whose parent has not been printed yet
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        entry = ImportEntry(name.strip(), depth, int(self_us), int(cumulative_us))
+        for child in waiting.pop(depth + 1, []):
+            child.parent = entry
+        waiting.setdefault(depth, []).append(entry)
+        entries.append(entry)
+    return entries
+
+
+def _root(entry):
+    while entry.parent is not None:
+        entry = entry.parent
+    return entry
+
+
+def imported_by(entry):
+    """The project module whose import pulled this one in (None for project modules themselves)."""
+    if entry.name.split('.')[0] in FIRST_PARTY:
+        return None
+    parent = entry.parent
+    while parent is not None and parent.name.split('.')[0] not in FIRST_PARTY:
+        parent = parent.parent
+    return parent.name if parent is not None else None
+
+
+def measure(runs):
+    """[(app import ms, entries)] for `runs` cold imports."""
+    env = dict(os.environ, OUTBOX_SENDER='0', PYTHONDONTWRITEBYTECODE='1')
+    results = []
+    for _ in range(runs):
+        completed = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', 'import app'],
+            cwd=PROJECT_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+        )
+        entries = parse_importtime(completed.stderr)
+        app_entry = next((e for e in entries if e.name == 'app' and e.depth == 0), None)
+        if completed.returncode != 0 or app_entry is None:
+            sys.stderr.write(completed.stderr[-4000:])
+            raise SystemExit("❌ `import app` failed, see the output above")
+        # Leave out the interpreter's own startup imports (site, encodings, ...)
+        results.append((app_entry.cumulative_us / 1000, [e for e in entries if _root(e) is app_entry]))
+    return results
+
+
+def median_run(results):
+    ordered = sorted(results, key=lambda r: r[0])
+    return ordered[len(ordered) // 2]
+
+
+def heavy_imports(entries):
+    return [e for e in entries if e.name in HEAVY_MODULES]
+
+
+def print_profile(results, top):
+    timings = [ms for ms, _ in results]
+    total_ms, entries = median_run(results)
+    print(f"Cold import of app: median {statistics.median(timings):.0f} ms "
+          f"(min {min(timings):.0f}, max {max(timings):.0f}, {len(timings)} runs)")
+    print("The self time of app is its module body: creating the app, registering blueprints, compiling routes")
+
+    packages = {}
+    for entry in entries:
+        package = entry.name.split('.')[0]
+        packages[package] = packages.get(package, 0) + entry.self_us
+    print(f"\n{'package':<32}{'self ms':>10}{'share':>8}")
+    for package, self_us in sorted(packages.items(), key=lambda p: -p[1])[:top]:
+        print(f"{package:<32}{self_us / 1000:>10.1f}{self_us / 1000 / total_ms:>8.0%}")
+
+    print(f"\n{'module':<56}{'cumul ms':>10}{'self ms':>10}  imported by")
+    for entry in sorted(entries, key=lambda e: -e.cumulative_us)[:top]:
+        print(f"{entry.name[:55]:<56}{entry.cumulative_us / 1000:>10.1f}{entry.self_us / 1000:>10.1f}  "
+              f"{imported_by(entry) or ''}")
+
+    heavy = heavy_imports(entries)
+    if heavy:
+        print("\n⚠️  Heavy modules imported at startup:")
+        for entry in heavy:
+            print(f"  {entry.name} ({entry.cumulative_us / 1000:.0f} ms) via {imported_by(entry)}")
+
+
+def check(results, budget_ms):
+    median_ms = statistics.median(ms for ms, _ in results)
+    _, entries = median_run(results)
+    failed = False
+    if median_ms > budget_ms:
+        print(f"❌ Cold import of app takes {median_ms:.0f} ms, budget {budget_ms:.0f} ms "
+              f"(run: python benchmarks/startup_profile.py profile)")
+        failed = True
+    for entry in heavy_imports(entries):
+        print(f"❌ {entry.name} is imported at startup ({entry.cumulative_us / 1000:.0f} ms) via {imported_by(entry)}; "
+              f"import it inside the function that uses it")
+        failed = True
+    if failed:
+        return 1
+    print(f"✅ Cold import of app: {median_ms:.0f} ms (budget {budget_ms:.0f} ms), no heavy modules at startup")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup import profile")
+    parser.add_argument('command', choices=['profile', 'check'])
+    parser.add_argument('--runs', type=int, default=5, help="cold imports to measure (median is reported)")
+    parser.add_argument('--top', type=int, default=25, help="rows per table in the profile")
+    parser.add_argument('--budget-ms', type=float, default=STARTUP_BUDGET_MS, help="cold import budget for check")
+    args = parser.parse_args()
+
+    results = measure(max(1, args.runs))
+    if args.command == 'check':
+        return check(results, args.budget_ms)
+    print_profile(results, args.top)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,46 @@
+"""
+Apply the versioned schema migrations in ./migrations (see routes/Auth/migrations.py).
+- Run after "Database Setup/DatabaseSetup.sql" and again after every update.
+- Run with:
+    python migrate.py status
+    python migrate.py up [--target 3] [--dry-run]
+"""
+
+import argparse
+import logging
+import sys
+
+import routes.Login  # noqa: F401  (loads routes.Auth in the same order as the app)
+from routes.Auth.migrations import MigrationError, migrate, migration_status
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Schema migrations")
+    parser.add_argument('command', nargs='?', default='up', choices=['up', 'status'])
+    parser.add_argument('--target', type=int, help="stop after this version")
+    parser.add_argument('--dry-run', action='store_true', help="only list what would be applied")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    if args.command == 'status':
+        for migration, applied_at, changed in migration_status():
+            state = f"applied {applied_at:%Y-%m-%d %H:%M}" if applied_at else "pending"
+            if changed:
+                state += " (file changed since)"
+            print(f"{migration.version:04d}  {migration.name:<30} {state}")
+        return 0
+
+    try:
+        applied = migrate(target=args.target, dry_run=args.dry_run)
+    except MigrationError as e:
+        print(f"❌ {e}")
+        return 1
+    if not applied:
+        print("✅ Database is up to date")
+    for migration in applied:
+        print(f"{'Would apply' if args.dry_run else '✅ Applied'} {migration.version:04d}_{migration.name}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
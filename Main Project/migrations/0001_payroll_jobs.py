@@ -0,0 +1,7 @@
+"""Background payroll job tables and the payroll (employee_id, month) unique index (routes/Auth/payroll_jobs.py)."""
+
+from routes.Auth.payroll_jobs import install_payroll_job_schema
+
+
+def upgrade(cur):
+    install_payroll_job_schema(cur)
@@ -0,0 +1,7 @@
+"""Inbox indexes, unread counter table and its triggers on messages (routes/Auth/inbox.py)."""
+
+from routes.Auth.inbox import install_inbox_schema
+
+
+def upgrade(cur):
+    install_inbox_schema(cur)
@@ -0,0 +1,37 @@
+-- migrate: no-transaction
+--
+-- Indexes for the predicates the routes actually filter and sort on. Built CONCURRENTLY so a live
+-- database keeps taking writes. Measure them with: python benchmarks/index_benchmark.py
+--
+-- Already covered elsewhere:
+--   blacklisted_tokens(jti)                      primary key
+--   employees(email), super_admins(email)        unique constraints
+--   messages(receiver_id, is_read, "timestamp")  0002_message_inbox (composite + partial unread index)
+--   payroll(employee_id, month)                  0001_payroll_jobs (unique index used by the upserts)
+
+-- Clock-in/out, "today's log" and per-employee ranges: WHERE employee_id = %s AND date = %s / BETWEEN
+CREATE INDEX CONCURRENTLY IF NOT EXISTS attendance_logs_employee_id_date_idx
+    ON attendance_logs (employee_id, date);
+
+-- Dashboard and reports, missing clock-in/out sweeps: WHERE date = %s / date BETWEEN %s AND %s
+CREATE INDEX CONCURRENTLY IF NOT EXISTS attendance_logs_date_idx
+    ON attendance_logs (date);
+
+-- Team membership lookups: WHERE team_id = %s
+CREATE INDEX CONCURRENTLY IF NOT EXISTS employees_team_id_idx
+    ON employees (team_id);
+
+-- Login, message recipients, employee/admin cross lookups: WHERE email = %s (not unique on admins)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS admins_email_idx
+    ON admins (email);
+
+-- Latest 2FA / reset code: WHERE admin_id = %s [AND is_verified = FALSE] ORDER BY verification_timestamp DESC
+CREATE INDEX CONCURRENTLY IF NOT EXISTS two_factor_verifications_admin_id_ts_idx
+    ON two_factor_verifications (admin_id, verification_timestamp DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS two_factor_verifications_employee_id_ts_idx
+    ON two_factor_verifications (employee_id, verification_timestamp DESC);
+
+-- Audit reports: WHERE "timestamp" BETWEEN %s AND %s ORDER BY "timestamp" DESC
+CREATE INDEX CONCURRENTLY IF NOT EXISTS audit_trail_admin_timestamp_idx
+    ON audit_trail_admin ("timestamp" DESC);
@@ -0,0 +1,7 @@
+"""Daily/team/employee attendance rollup tables and their triggers on attendance_logs (routes/Auth/attendance_rollups.py)."""
+
+from routes.Auth.attendance_rollups import install_attendance_rollup_schema
+
+
+def upgrade(cur):
+    install_attendance_rollup_schema(cur)
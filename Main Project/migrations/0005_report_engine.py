@@ -0,0 +1,7 @@
+"""Report snapshot cache and the per-day change counters on its source tables (routes/Auth/reports.py)."""
+
+from routes.Auth.reports import install_report_schema
+
+
+def upgrade(cur):
+    install_report_schema(cur)
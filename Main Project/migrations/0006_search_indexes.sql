@@ -0,0 +1,22 @@
+-- migrate: no-transaction
+--
+-- Trigram indexes for the search endpoints (routes/Auth/search.py). The indexed expressions are the
+-- "search documents" built by employee_document() / ticket_document() and must match them exactly,
+-- otherwise the planner can't use the index. Measure with: python benchmarks/search_benchmark.py
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Employee management search, and the employee part of payroll and ticket search
+CREATE INDEX CONCURRENTLY IF NOT EXISTS employees_search_trgm_idx
+    ON employees USING gin ((coalesce(first_name, '') || ' ' || coalesce(last_name, '') || ' ' || coalesce(email, '') || ' ' || coalesce(department, '')) gin_trgm_ops);
+
+-- Ticket search
+CREATE INDEX CONCURRENTLY IF NOT EXISTS tickets_search_trgm_idx
+    ON tickets USING gin ((coalesce(subject, '') || ' ' || coalesce(description, '') || ' ' || coalesce(category, '') || ' ' || coalesce(priority, '') || ' ' || coalesce(status, '')) gin_trgm_ops);
+
+-- Payroll search by month (month = first day of the month) and the ticket list order
+CREATE INDEX CONCURRENTLY IF NOT EXISTS payroll_month_idx
+    ON payroll (month);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS tickets_created_at_idx
+    ON tickets (created_at DESC);
@@ -0,0 +1,7 @@
+"""Audience columns, indexes and legacy trigger on announcements, one read receipt per employee (routes/Auth/announcements.py)."""
+
+from routes.Auth.announcements import install_announcement_schema
+
+
+def upgrade(cur):
+    install_announcement_schema(cur)
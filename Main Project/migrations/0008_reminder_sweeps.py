@@ -0,0 +1,7 @@
+"""Delivery claims and per-sweep metrics for the clock-in/clock-out reminder sweeps (Clock_in_and_out_reminders/config.py)."""
+
+from routes.SystemTesting.Clock_in_and_out_reminders.config import install_reminder_schema
+
+
+def upgrade(cur):
+    install_reminder_schema(cur)
@@ -0,0 +1,7 @@
+"""email_outbox table and its claim/status indexes (routes/Auth/outbox.py)."""
+
+from routes.Auth.outbox import install_outbox_schema
+
+
+def upgrade(cur):
+    install_outbox_schema(cur)
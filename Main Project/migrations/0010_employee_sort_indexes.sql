@@ -0,0 +1,28 @@
+-- migrate: no-transaction
+--
+-- Indexes for the employee management grid's server-side sorts (EMPLOYEE_SORTS in
+-- routes/Admin/employeemanagement.py). Each page is ORDER BY <expression>, employee_id LIMIT n with a
+-- keyset condition on the same pair, so every expression gets an (expression, employee_id) index; a
+-- backward scan serves order=desc. The expressions must match EMPLOYEE_SORTS exactly.
+-- sort=employee_id uses the primary key.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS employees_sort_first_name_idx
+    ON employees ((COALESCE(first_name, '')), employee_id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS employees_sort_last_name_idx
+    ON employees ((COALESCE(last_name, '')), employee_id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS employees_sort_email_idx
+    ON employees ((COALESCE(email, '')), employee_id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS employees_sort_department_idx
+    ON employees ((COALESCE(department, '')), employee_id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS employees_sort_account_status_idx
+    ON employees ((COALESCE(account_status, '')), employee_id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS employees_sort_status_idx
+    ON employees ((COALESCE(status, '')), employee_id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS employees_sort_date_hired_idx
+    ON employees ((COALESCE(date_hired, DATE '0001-01-01')), employee_id);
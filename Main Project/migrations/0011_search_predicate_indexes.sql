@@ -0,0 +1,18 @@
+-- migrate: no-transaction
+--
+-- The rest of the search predicates in routes/Auth/search.py, so no branch of a search's OR forces a
+-- sequential scan (0006 has the search documents and payroll.month):
+--   payroll search:  payroll_id (primary key), employee_id (0001 unique index), net_salary, payment_status ILIKE
+--   ticket search:   ticket_id (primary key), search document (0006), employee_id
+
+-- Payroll search by amount: net_salary = %s
+CREATE INDEX CONCURRENTLY IF NOT EXISTS payroll_net_salary_idx
+    ON payroll (net_salary);
+
+-- Payroll search text against the status ("pend" finds Pending): payment_status ILIKE '%term%', and the ?status= filter
+CREATE INDEX CONCURRENTLY IF NOT EXISTS payroll_payment_status_trgm_idx
+    ON payroll USING gin (payment_status gin_trgm_ops);
+
+-- Ticket search on the employee's name/email: employee_id = ANY(ARRAY(SELECT employee_id FROM employees ...))
+CREATE INDEX CONCURRENTLY IF NOT EXISTS tickets_employee_id_idx
+    ON tickets (employee_id);
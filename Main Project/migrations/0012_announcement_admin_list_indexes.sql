@@ -0,0 +1,13 @@
+-- migrate: no-transaction
+--
+-- The paged admin announcement list (ADMIN_LIST_SQL in routes/Auth/announcements.py):
+--   page:   ORDER BY created_at DESC, announcement_id DESC LIMIT/OFFSET
+--   reads:  read receipts of the announcements on the page
+
+-- Newest-first page of announcements without sorting the table
+CREATE INDEX CONCURRENTLY IF NOT EXISTS announcements_created_at_idx
+    ON announcements (created_at DESC, announcement_id DESC);
+
+-- Read counts per announcement (the unique index leads with employee_id)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS announcement_reads_announcement_id_idx
+    ON announcement_reads (announcement_id);
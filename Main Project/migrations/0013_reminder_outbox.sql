@@ -0,0 +1,6 @@
+-- Reminder sweeps queue their emails in email_outbox (0009) instead of sending them on the scheduler thread:
+-- each delivery links to its outbox row, and a sweep records how many emails it queued.
+
+ALTER TABLE reminder_deliveries ADD COLUMN IF NOT EXISTS outbox_id bigint;
+
+ALTER TABLE reminder_sweeps ADD COLUMN IF NOT EXISTS emails_queued integer NOT NULL DEFAULT 0;
@@ -0,0 +1,53 @@
+"""
+Inspect and drain the email outbox (see routes/Auth/outbox.py).
+- The app sends queued emails in the background; use this to look at the queue, send what is due without
+  the app running, or requeue dead letters.
+- Run with:
+    python outbox.py status
+    python outbox.py drain
+    python outbox.py retry [--id 12 --id 13]
+- To test without a real mailbox, point the app at a local SMTP stand-in:
+    python -m aiosmtpd -n -l localhost:1025
+    MAIL_SERVER=localhost MAIL_PORT=1025 MAIL_USE_TLS=0 python app.py
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+os.environ.setdefault('OUTBOX_SENDER', '0')  # this process drains on the main thread instead
+import app  # noqa: E402,F401  (app.py hands the sender its flask_mail instance via init_outbox)
+from routes.Auth.outbox import drain_outbox, get_outbox_status, retry_dead_letters  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Email outbox")
+    parser.add_argument('command', choices=['status', 'drain', 'retry'])
+    parser.add_argument('--id', dest='ids', type=int, action='append', help="dead letter to requeue (default: all)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    if args.command == 'drain':
+        processed = drain_outbox()
+        print(f"✅ Processed {processed} queued email(s)")
+        return 0
+
+    if args.command == 'retry':
+        requeued = retry_dead_letters(args.ids)
+        print(f"✅ Requeued {requeued} dead-lettered email(s), run: python outbox.py drain")
+        return 0
+
+    status = get_outbox_status()
+    counts = status['counts']
+    print("📧 " + ", ".join(f"{name}: {count}" for name, count in counts.items()))
+    if status['oldest_pending_seconds'] is not None:
+        print(f"⏳ Oldest waiting email queued {status['oldest_pending_seconds']}s ago")
+    for row in status['dead_letters']:
+        print(f"❌ #{row['outbox_id']} {row['kind']} to {', '.join(row['recipients'])}: "
+              f"{row['attempts']} attempt(s), {row['last_error']}")
+    return 1 if counts['dead'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,42 @@
+"""
+Maintain the attendance rollup tables (see routes/Auth/attendance_rollups.py).
+- The triggers keep them current; use this after bulk loads done with triggers disabled, or to verify them.
+- Run with:
+    python rollups.py rebuild [--start 2024-01-01] [--end 2024-12-31]
+    python rollups.py check [--start 2024-01-01] [--end 2024-12-31]
+"""
+
+import argparse
+from datetime import date
+import logging
+import sys
+
+import routes.Login  # noqa: F401  (loads routes.Auth in the same order as the app)
+from routes.Auth.attendance_rollups import check_attendance_rollups, rebuild_attendance_rollups
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Attendance rollups")
+    parser.add_argument('command', choices=['rebuild', 'check'])
+    parser.add_argument('--start', type=date.fromisoformat, help="first day (default: all history)")
+    parser.add_argument('--end', type=date.fromisoformat, help="last day (default: all history)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    if args.command == 'rebuild':
+        days = rebuild_attendance_rollups(args.start, args.end)
+        print(f"✅ Rebuilt attendance rollups for {days} day(s)")
+        return 0
+
+    mismatches = check_attendance_rollups(args.start, args.end)
+    for day, rollup, actual in mismatches:
+        print(f"❌ {day}: rollup (headcount, logs, hours)={rollup} attendance_logs={actual}")
+    if mismatches:
+        print(f"{len(mismatches)} day(s) out of date, run: python rollups.py rebuild --start ... --end ...")
+        return 1
+    print("✅ Attendance rollups match attendance_logs")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -9,6 +9,7 @@ import bcrypt
 from flask import Blueprint, Response, render_template, jsonify, request, send_file, url_for
 import psycopg2
 from routes.Auth.audit import log_audit, log_incident
+from routes.Auth.events import publish_new_message
 from routes.Auth.token import token_required_with_roles_and_2fa,token_required_with_roles,get_admin_from_token
 from routes.Auth.utils import get_db_connection
 from . import admin_bp
@@ -158,6 +159,7 @@ def verify_overtime(admin_id, role, role_id):
                 "Your overtime request has been approved. Please check your records.",
                 False
             ))
+            publish_new_message(employee_id)
             conn.commit()
 
         cur.close()
@@ -212,6 +214,7 @@ def disapprove_overtime(admin_id, role, role_id):
                 f"Your overtime request has been rejected." + (f" Reason: {rejection_reason}" if rejection_reason else ""),
                 False
             ))
+            publish_new_message(employee_id)
             conn.commit()
 
         cur.close()
@@ -686,6 +689,7 @@ def manage_leave(admin_id, role, role_id, request_id, action):
                 f"Your {leave_type} leave request for {total_days} days has been approved.",
                 False
             ))
+            publish_new_message(employee_id)
 
         elif action == "reject":
             if verification_status is False or verification_status == 'false' or verification_status == 0:
@@ -722,6 +726,7 @@ def manage_leave(admin_id, role, role_id, request_id, action):
                 body,
                 False
             ))
+            publish_new_message(employee_id)
 
         else:
             print(f"[DEBUG] Invalid action: {action}", file=sys.stderr)
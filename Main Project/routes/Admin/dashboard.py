@@ -2,10 +2,14 @@ from datetime import datetime, timedelta
 import logging
 import os
 import bcrypt
-from flask import Blueprint, Response, render_template, jsonify, request, send_file, url_for
+from flask import Blueprint, Response, g, render_template, jsonify, request, send_file, url_for
 import psycopg2
+from routes.Auth.attendance_rollups import get_attendance_trend, get_clocked_in_count
 from routes.Auth.audit import log_audit, log_incident
-from routes.Auth.token import get_admin_from_token, token_required_with_roles, token_required_with_roles_and_2fa
+from routes.Auth.events import ADMINS_CHANNEL, event_stream_response, inbox_channel, publish_new_message, user_channel
+from routes.Auth.inbox import get_alias_ids, get_inbox_page, get_unread_count, page_size
+from routes.Auth.outbox import enqueue_email
+from routes.Auth.token import get_admin_from_token, token_required_with_roles, token_required_with_roles_and_2fa, verify_admin_token
 from routes.Auth.two_authentication import require_2fa_admin
 from routes.Auth.utils import get_db_connection
 from . import admin_bp
@@ -18,8 +22,6 @@ from extensions import csrf
 @admin_bp.route("/api/admin/reply_to_contact_request", methods=["POST"])
 @token_required_with_roles(required_actions=["reply_contact_request"])
 def reply_to_contact_request(admin_id, role, role_id):
-    from flask_mail import Message
-    from app import mail
     """
     Allows an admin or super_admin to reply to a user's contact request.
     Requires: request_id (int), message (str)
@@ -75,26 +77,20 @@ def reply_to_contact_request(admin_id, role, role_id):
             f"Replied to contact request {request_id} (user email: {user_email})"
         )
 
-        # Send reply email to user
+        # Queue the reply email to the user (sent by the outbox in the background)
         sender_email = os.getenv("EMAIL_USER")
         if not sender_email:
             logging.error("EMAIL_USER is not set in environment variables!")
-        logging.debug(f"Sending reply email from {sender_email} to {user_email}")
+        logging.debug(f"Queueing reply email from {sender_email} to {user_email}")
 
-        msg = Message(
-            subject=subject,
-            sender=sender_email,
-            recipients=[user_email],
-            body=message
-        )
         try:
-            mail.send(msg)
-            logging.info(f"Reply email sent to {user_email} for contact request {request_id}")
+            enqueue_email("contact_reply", user_email, subject, message, sender=sender_email)
+            logging.info(f"Reply email queued for {user_email} for contact request {request_id}")
         except Exception as mail_error:
-            logging.error(f"Failed to send reply email: {mail_error}")
+            logging.error(f"Failed to queue reply email: {mail_error}")
             log_incident(
                 admin_id, role,
-                f"Failed to send reply email for contact request {request_id}: {mail_error}",
+                f"Failed to queue reply email for contact request {request_id}: {mail_error}",
                 severity="Medium"
             )
 
@@ -332,43 +328,30 @@ def get_unread_messages(admin_id, role, role_id):
         elif error:
             log_incident(admin_id, role, "Unauthorized token on unread-count", severity="Medium")
             return jsonify({'error': 'Unauthorized'}), 401
-        # get email for current user
-        email = fetch_user_email_by_id_role(user_id, user_role)
+        # every id this person receives messages under (admin, employee, super_admin with the same email)
+        receiver_ids = get_alias_ids(user_id, user_role)
     except Exception as e:
         logging.debug(f"Token decoding failed: {str(e)}")
         log_incident(admin_id, role, f"Token decoding failed: {str(e)}", severity="Medium")
         return jsonify({"error": "Invalid or expired token", "details": str(e)}), 401
 
-    # find all user_ids/roles that match this email (admin, employee, super_admin)
-    id_roles = fetch_user_by_email(email)
-    if not id_roles:
-        return jsonify({'unread_count': 0, 'messages': [], 'requests': []})
-
     conn = get_db_connection()
     cur = conn.cursor()
     try:
-        # Fetch unread messages for all roles
-        messages = []
-        for uid, urole in id_roles:
-            cur.execute("""
-                SELECT message_id, sender_id, sender_role, body, timestamp
-                FROM messages
-                WHERE receiver_id = %s AND is_read = FALSE
-                ORDER BY timestamp DESC
-                LIMIT 5
-            """, (uid, ))
-            rows = cur.fetchall()
-            messages.extend([
-                {
-                    'type': 'message',
-                    'message_id': row[0],
-                    'sender_id': row[1],
-                    'sender_role': row[2],
-                    'content': row[3],
-                    'timestamp': row[4].isoformat()
-                }
-                for row in rows
-            ])
+        # Unread messages for all roles: maintained counter + newest 5 in one query
+        unread_messages = get_unread_count(receiver_ids)
+        rows, _ = get_inbox_page(receiver_ids, 5, unread_only=True)
+        messages = [
+            {
+                'type': 'message',
+                'message_id': row[0],
+                'sender_id': row[1],
+                'sender_role': row[2],
+                'content': row[3],
+                'timestamp': row[4].isoformat()
+            }
+            for row in rows
+        ]
         # Contact requests (pending only)
         cur.execute("""
             SELECT id, first_name, last_name, email, message, created_at
@@ -390,7 +373,7 @@ def get_unread_messages(admin_id, role, role_id):
             }
             for req_row in req_rows
         ]
-        total = len(messages) + len(requests)
+        total = unread_messages + len(requests)
         log_audit(admin_id, role, "get_unread_messages", f"Fetched unread messages and contact requests for {user_id} (all roles)")
     except Exception as e:
         logging.error(f"Failed to fetch unread messages/contact requests: {e}")
@@ -401,6 +384,7 @@ def get_unread_messages(admin_id, role, role_id):
         conn.close()
     return jsonify({
         'unread_count': total,
+        'unread_messages': unread_messages,
         'messages': messages,
         'requests': requests
     })
@@ -443,47 +427,34 @@ def get_message_inbox(admin_id, role, role_id):
     token = auth_header.split("Bearer ")[1].strip()
     try:
         user_id, user_role, error = get_admin_from_token(token)
-        email = fetch_user_email_by_id_role(user_id, user_role)
+        receiver_ids = get_alias_ids(user_id, user_role)
     except Exception as e:
         logging.debug(f"Token decoding failed: {str(e)}")
         log_incident(admin_id, role, f"Token decoding failed: {str(e)}", severity="Medium")
         return jsonify({"error": "Invalid or expired token", "details": str(e)}), 401
 
-    id_roles = fetch_user_by_email(email)
-    if not id_roles:
-        return jsonify([])
-
-    conn = get_db_connection()
-    cur = conn.cursor()
     try:
-        messages = []
-        for uid, urole in id_roles:
-            cur.execute("""
-                SELECT message_id, sender_id, sender_role, body, timestamp, is_read
-                FROM messages
-                WHERE receiver_id = %s 
-                ORDER BY timestamp DESC
-            """, (uid,))
-            rows = cur.fetchall()
-            messages += [
-                {
-                    "message_id": row[0],
-                    "sender_id": row[1],
-                    "sender_role": row[2],
-                    "content": row[3],
-                    "timestamp": row[4],
-                    "is_read": row[5]
-                } for row in rows
-            ]
-        log_audit(admin_id, role, "get_message_inbox", f"Fetched inbox for user {admin_id} (all roles)")
-        return jsonify(messages)
+        limit = page_size(request.args.get('limit'))
+        unread_only = request.args.get('unread') in ('1', 'true')
+        rows, next_cursor = get_inbox_page(receiver_ids, limit, request.args.get('cursor'), unread_only)
+        messages = [
+            {
+                "message_id": row[0],
+                "sender_id": row[1],
+                "sender_role": row[2],
+                "content": row[3],
+                "timestamp": row[4],
+                "is_read": row[5]
+            } for row in rows
+        ]
+        if not request.args.get('cursor'):
+            log_audit(admin_id, role, "get_message_inbox", f"Fetched inbox for user {admin_id} (all roles)")
+        return jsonify({'messages': messages, 'next_cursor': next_cursor})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         log_incident(admin_id, role, f"Failed to fetch inbox: {str(e)}", severity="Medium")
         return jsonify({'error': 'Database query failed'}), 500
-    finally:
-        cur.close()
-        conn.close()
-        logging.debug("Database connection closed.")
 
 # ========== SEND MESSAGE ==========
 
@@ -514,6 +485,7 @@ def send_message(admin_id, role, role_id):
                 data.get('subject'), data['body']
             )
             cur.execute(query, values)
+            publish_new_message(recv_id)
         conn.commit()
         # AUDIT: log successful message send
         log_audit(
@@ -613,22 +585,10 @@ def dashboard(admin_id, role, role_id):
             cursor.execute("SELECT COUNT(*) FROM employees;")
             total_employees = cursor.fetchone()[0]
 
+            # Daily rollups: one row per day instead of counting attendance_logs
             today = datetime.now().date()
-            cursor.execute("""
-                SELECT COUNT(DISTINCT employee_id)
-                FROM attendance_logs
-                WHERE date = %s AND clock_in_time IS NOT NULL;
-            """, (today,))
-            clockin_users = cursor.fetchone()[0]
-
-            cursor.execute("""
-                SELECT date, COUNT(DISTINCT employee_id)
-                FROM attendance_logs
-                WHERE date >= %s
-                GROUP BY date
-                ORDER BY date ASC;
-            """, (today - timedelta(days=6),))
-            trend_rows = cursor.fetchall()
+            clockin_users = get_clocked_in_count(today)
+            trend_rows = get_attendance_trend(today - timedelta(days=6))
             attendance_data = {
                 "dates": [row[0].strftime('%Y-%m-%d') for row in trend_rows],
                 "counts": [row[1] for row in trend_rows]
@@ -683,8 +643,19 @@ def dashboard(admin_id, role, role_id):
         return jsonify({'error': 'Internal server error'}), 500
     
 @admin_bp.route('/check_jti', methods=['GET'])
-def check_jti():
+@verify_admin_token
+def check_jti(admin_id, role, role_id):
+    # verify_admin_token answers 403 {'error': 'session_conflict'} when another login replaced this session
     return jsonify({'msg': 'ok'}), 200
 
 
+# Route for the admin push channel (session conflicts, permission changes, new messages)
+@admin_bp.route('/events', methods=['GET'])
+@verify_admin_token
+def admin_events(admin_id, role, role_id):
+    channels = {user_channel('super_admin' if role == 'super_admin' else 'admin', admin_id), ADMINS_CHANNEL}
+    channels.update(inbox_channel(receiver_id) for receiver_id in get_alias_ids(admin_id, role))
+    return event_stream_response(channels, g.jti)
+
+
 # Dashboard (End)
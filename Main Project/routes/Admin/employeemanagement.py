@@ -1,14 +1,22 @@
 import base64
 from datetime import date, datetime, timedelta
+import json
 import logging
 import os
 import traceback
-import bcrypt
 from flask import Blueprint, Response, flash, redirect, render_template, jsonify, request, send_file, url_for
 import psycopg2
 from routes.Auth.audit import log_audit, log_incident
+from routes.Auth.images import (
+    DEFAULT_PROFILE_IMAGE, THUMBNAIL_DEFAULT_SIZE, THUMBNAIL_SIZES, get_thumbnail_path, send_thumbnail, thumbnail_url,
+)
+from routes.Auth.password_hashing import hash_password
+from routes.Auth.permissions import invalidate_admin_permissions
+from routes.Auth.events import publish_account_deactivated
+from routes.Auth.session_cache import invalidate_admin_sessions, invalidate_employee_sessions
+from routes.Auth.search import SearchTerms, employee_document, employee_search, rank_expression, search_limit
 from routes.Auth.token import token_required_with_roles, token_required_with_roles_and_2fa
-from routes.Auth.utils import get_db_connection
+from routes.Auth.utils import db_session, get_db_connection
 from . import admin_bp
 from extensions import csrf
 from PIL import Image
@@ -23,133 +31,272 @@ def employeemanagement_page():
     # Just serve the HTML shell; no data fetching here
     return render_template('Admin/EmployeeManagement.html')
 
+# route for serving cached profile thumbnails (list endpoints link here instead of inlining the image).
+# No token check: <img> tags can't send the Authorization header, the URL carries the image's content hash instead
+# so it can only be built by someone who was given it by an authorized endpoint. The hash is checked against the
+# owner's current picture on every request, so the URL stops working once the picture is replaced or deleted.
+@admin_bp.route('/thumbnails/<any(employee, admin, super_admin):kind>/<int:owner_id>/<string:digest>.jpg', methods=['GET'])
+def profile_thumbnail(kind, owner_id, digest):
+    size = request.args.get('size', THUMBNAIL_DEFAULT_SIZE, type=int)
+    if size not in THUMBNAIL_SIZES or len(digest) != 32 or digest.strip('0123456789abcdef'):
+        return jsonify({"error": "Invalid thumbnail request"}), 400
+    try:
+        path = get_thumbnail_path(kind, owner_id, digest, size)
+    except Exception as e:
+        logging.error(f"[THUMBNAILS] Could not render thumbnail for {kind} {owner_id}: {e}", exc_info=True)
+        return send_file(DEFAULT_PROFILE_IMAGE, mimetype='image/png')
+    if path is None:
+        return jsonify({"error": "Thumbnail not found"}), 404
+    return send_thumbnail(path, digest, size)
+
+# ---------------- Employee listing ----------------
+# The grid asks for one page at a time (keyset pagination on (sort column, employee_id)), sorted in SQL,
+# and only for the columns it shows (?fields=). The rarely viewed columns (address, education, hobbies, ...)
+# come from /employeemanagement_data/<employee_id> when a detail is opened.
+
+EMPLOYEE_PAGE_SIZE = 40
+EMPLOYEE_MAX_PAGE_SIZE = 200
+
+# field -> (SQL expression, join it needs)
+EMPLOYEE_FIELDS = {
+    "employee_id": ("e.employee_id", None),
+    "first_name": ("e.first_name", None),
+    "last_name": ("e.last_name", None),
+    "email": ("e.email", None),
+    "phone_number": ("e.phone_number", None),
+    "department": ("e.department", None),
+    "salary": ("e.salary", None),
+    "status": ("e.status", None),
+    "date_hired": ("e.date_hired", None),
+    "date_terminated": ("e.date_terminated", None),
+    "profile_image": ("md5(e.profile)", None),
+    "created": ("e.created", None),
+    "account_status": ("e.account_status", None),
+    "address1": ("e.address1", None),
+    "city": ("e.city", None),
+    "address2": ("e.address2", None),
+    "education": ("e.education", None),
+    "team": ("t.team_name", "team"),
+    "skills": ("e.skills", None),
+    "certification": ("e.certification", None),
+    "language": ("e.language", None),
+    "hobbies": ("e.hobbies", None),
+    "date_of_birth": ("e.date_of_birth", None),
+    "gender": ("e.gender", None),
+    "teamrole": ("r.role_name", "role"),
+    "shift_name": ("s.shift_name", "shift"),
+    "shift_start_time": ("s.start_time", "shift"),
+    "shift_end_time": ("s.end_time", "shift"),
+    "is_rotating": ("s.is_rotating", "shift"),
+    "location": ("s.location", "shift"),
+    "team_id": ("e.team_id", None),
+    "role_id": ("e.role_id", None),
+}
+
+# What the EmployeeManagement grid shows
+EMPLOYEE_GRID_FIELDS = ("employee_id", "profile_image", "account_status", "first_name", "last_name", "status", "email")
+
+EMPLOYEE_JOINS = {
+    "team": "LEFT JOIN teams t ON t.team_id = e.team_id",
+    "role": "LEFT JOIN roles r ON r.role_id = e.role_id",
+    # Latest shift of each employee on the page only (was a DISTINCT ON over all of employee_shifts)
+    "shift": """LEFT JOIN LATERAL (
+        SELECT sh.shift_name, sh.start_time, sh.end_time, es.is_rotating, es.location
+        FROM employee_shifts es
+        JOIN shifts sh ON sh.shift_id = es.shift_id
+        WHERE es.employee_id = e.employee_id
+        ORDER BY es.shift_date DESC
+        LIMIT 1
+    ) s ON TRUE""",
+}
+
+# ?sort= -> expression (NULLs folded so the keyset comparison never sees them); each one has an
+# (expression, employee_id) index in migrations/0010_employee_sort_indexes.sql, keep the two identical
+EMPLOYEE_SORTS = {
+    "employee_id": "e.employee_id",
+    "first_name": "COALESCE(e.first_name, '')",
+    "last_name": "COALESCE(e.last_name, '')",
+    "email": "COALESCE(e.email, '')",
+    "department": "COALESCE(e.department, '')",
+    "account_status": "COALESCE(e.account_status, '')",
+    "status": "COALESCE(e.status, '')",
+    "date_hired": "COALESCE(e.date_hired, DATE '0001-01-01')",
+}
+
+
+def _employee_fields(raw):
+    """?fields= -> ordered list of known fields (employee_id always included); raises ValueError for unknown ones."""
+    if not raw:
+        return list(EMPLOYEE_GRID_FIELDS)
+    if raw == "all":
+        return list(EMPLOYEE_FIELDS)
+    fields = ["employee_id"]
+    for field in raw.split(","):
+        field = field.strip()
+        if field not in EMPLOYEE_FIELDS:
+            raise ValueError(f"Unknown field: {field}")
+        if field not in fields:
+            fields.append(field)
+    return fields
+
+
+def _employee_select(fields):
+    columns = ", ".join(f"{EMPLOYEE_FIELDS[field][0]} AS {field}" for field in fields)
+    joins = []
+    for field in fields:
+        join = EMPLOYEE_FIELDS[field][1]
+        if join and EMPLOYEE_JOINS[join] not in joins:
+            joins.append(EMPLOYEE_JOINS[join])
+    return columns, " ".join(joins)
+
+
+def _employee_row(fields, row):
+    employee = dict(zip(fields, row))
+    if "profile_image" in employee:
+        employee["profile_image"] = thumbnail_url('employee', employee["employee_id"], employee["profile_image"])
+    for field in ("shift_start_time", "shift_end_time"):
+        if employee.get(field):
+            employee[field] = employee[field].strftime('%H:%M:%S')
+    return employee
+
+
+def _encode_employee_cursor(sort, order, value, employee_id):
+    if isinstance(value, (date, datetime)):
+        value = value.isoformat()
+    raw = json.dumps([sort, order, value, employee_id])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def _decode_employee_cursor(cursor, sort, order):
+    try:
+        cursor_sort, cursor_order, value, employee_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if (cursor_sort, cursor_order) != (sort, order):
+        raise ValueError("Cursor belongs to a different sort order")
+    return value, int(employee_id)
+
+
 # route for rendering employee management API (NO PASSWORD, JOIN TEAMS)
 @admin_bp.route('/employeemanagement_data', methods=['GET'])
 @token_required_with_roles_and_2fa(required_actions=["employeemanagement_data"])
 def employeemanagement_data(admin_id, role, role_id):
-    import base64
-    import psycopg2
-    import traceback
-
-    connection = None
+    """
+    Query parameters:
+      limit (or per_page)  page size, default 40, max 200
+      cursor               next_cursor of the previous page
+      sort / order         one of EMPLOYEE_SORTS, asc|desc (default employee_id asc; relevance when searching,
+                           best match first, paged on (score, employee_id))
+      fields               comma separated EMPLOYEE_FIELDS, or "all" (default: the grid columns)
+      query                search text (routes/Auth/search.py)
+    Returns {"employees": [...], "next_cursor": str|None, "total": int}.
+    """
     try:
-        print(f"[DEBUG] employeemanagement_data called by admin_id={admin_id}, role={role}, role_id={role_id}")
-        connection = get_db_connection()
-        cursor = connection.cursor()
-
-        search_query = request.args.get('query', '').strip()
-        print(f"[DEBUG] Search query: '{search_query}'")
-
-        base_query = """
-    SELECT 
-        e.employee_id, e.first_name, e.last_name, e.email, e.phone_number, e.department, e.salary, e.status, 
-        e.date_hired, e.date_terminated, e.profile, e.created, e.account_status, 
-        e.address1, e.city, e.address2, 
-        e.education, t.team_name, e.skills, e.certification, 
-        e.language, e.hobbies, e.date_of_birth, e.gender, r.role_name,
-        s.shift_name, s.start_time, s.end_time, s.is_rotating, s.location,
-        e.team_id, e.role_id  -- <<-- ADD THESE
-    FROM employees e
-    LEFT JOIN teams t ON t.team_id = e.team_id
-    LEFT JOIN roles r ON r.role_id = e.role_id
-    LEFT JOIN (
-        SELECT DISTINCT ON (es.employee_id)
-            es.employee_id, es.shift_id, sh.shift_name, sh.start_time, sh.end_time, 
-            es.is_rotating, es.location
-        FROM employee_shifts es
-        JOIN shifts sh ON sh.shift_id = es.shift_id
-        ORDER BY es.employee_id, es.shift_date DESC
-    ) s ON s.employee_id = e.employee_id
-"""
-
-        if search_query:
-            if search_query.isdigit():
-                query = base_query + " WHERE e.employee_id = %s OR e.phone_number = %s"
-                print(f"[DEBUG] Executing SQL for digit query: {query} with params: ({int(search_query)}, {search_query})")
-                cursor.execute(query, (int(search_query), search_query))
-            else:
-                query = base_query + """
-                    WHERE 
-                        e.first_name ILIKE %s OR 
-                        e.last_name ILIKE %s OR 
-                        e.email ILIKE %s OR 
-                        e.department ILIKE %s
-                """
-                params = tuple(f"%{search_query}%" for _ in range(4))
-                print(f"[DEBUG] Executing SQL for text query: {query} with params: {params}")
-                cursor.execute(query, params)
+        args = request.args
+        search_query = args.get('query', '').strip()
+        try:
+            fields = _employee_fields(args.get('fields', '').strip())
+            limit = max(1, min(args.get('limit', args.get('per_page', EMPLOYEE_PAGE_SIZE), type=int) or EMPLOYEE_PAGE_SIZE,
+                               EMPLOYEE_MAX_PAGE_SIZE))
+            order = args.get('order', 'asc').lower()
+            if order not in ('asc', 'desc'):
+                raise ValueError("order must be asc or desc")
+            sort = args.get('sort') or ('relevance' if search_query else 'employee_id')
+            if sort not in EMPLOYEE_SORTS and not (sort == 'relevance' and search_query):
+                raise ValueError(f"Unknown sort: {sort}")
+            cursor_value = None
+            if args.get('cursor'):
+                cursor_value = _decode_employee_cursor(args.get('cursor'), sort, order)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        where, where_params = [], []
+        terms = SearchTerms(search_query)
+        if terms:
+            where_sql, search_params = employee_search(terms)
+            where.append(where_sql)
+            where_params.extend(search_params)
+        count_sql = f"SELECT COUNT(*) FROM employees e {'WHERE ' + where[0] if where else ''}"
+        count_params = list(where_params)
+
+        select_params = []
+        if sort == 'relevance':
+            # Best matches first; word_similarity() is a real, so the cursor's score is compared as one
+            sort_sql = rank_expression(employee_document(), terms, select_params)
+            sort_direction, id_direction = "DESC", "ASC"
+            if cursor_value is not None:
+                score, last_id = cursor_value
+                rank_params = []
+                rank_sql = rank_expression(employee_document(), terms, rank_params)
+                where.append(f"({rank_sql} < %s::real OR ({rank_sql} = %s::real AND e.employee_id > %s))")
+                where_params.extend(rank_params + [score] + rank_params + [score, last_id])
         else:
-            print(f"[DEBUG] Executing SQL for all employees: {base_query}")
-            cursor.execute(base_query)
-
-        total_employees = cursor.fetchall()
-        print(f"[DEBUG] Number of employees fetched: {len(total_employees)}")
-
-        employees_with_images = []
-        for idx, emp in enumerate(total_employees):
-            print(f"[DEBUG] Processing employee #{idx+1} (employee_id={emp[0]})")
-            profile_image = emp[10]
-            profile_image_base64 = (
-                f"data:image/jpeg;base64,{base64.b64encode(profile_image).decode('utf-8')}"
-                if profile_image else None
-            )
-            employee_data = {
-                "employee_id": emp[0],
-                "first_name": emp[1],
-                "last_name": emp[2],
-                "email": emp[3],
-                "phone_number": emp[4],
-                "department": emp[5],
-                "salary": emp[6],
-                "status": emp[7],
-                "date_hired": emp[8],
-                "date_terminated": emp[9],
-                "profile_image": profile_image_base64,
-                "created": emp[11],
-                "account_status": emp[12],
-                "address1": emp[13],
-                "city": emp[14],
-                "address2": emp[15],
-                "education": emp[16],
-                "team": emp[17],
-                "skills": emp[18],
-                "certification": emp[19],
-                "language": emp[20],
-                "hobbies": emp[21],
-                "date_of_birth": emp[22],
-                "gender": emp[23],
-                "teamrole": emp[24],
-                "shift_name": emp[25],
-                "shift_start_time": emp[26].strftime('%H:%M:%S') if emp[26] else None,
-                "shift_end_time": emp[27].strftime('%H:%M:%S') if emp[27] else None,
-                "is_rotating": emp[28],
-                "location": emp[29],
-                "team_id": emp[30],   
-                "role_id": emp[31]
-            }
-            employees_with_images.append(employee_data)
+            sort_sql = EMPLOYEE_SORTS[sort]
+            sort_direction = id_direction = "DESC" if order == 'desc' else "ASC"
+            if cursor_value is not None:
+                where.append(f"({sort_sql}, e.employee_id) {'<' if order == 'desc' else '>'} (%s, %s)")
+                where_params.extend(cursor_value)
+
+        columns, joins = _employee_select(fields)
+        with db_session() as conn, conn.cursor() as cursor:
+            # Pick the page first, then join teams/roles/latest shift for those rows only
+            cursor.execute(f"""
+                WITH page AS (
+                    SELECT e.employee_id, {sort_sql} AS sort_value
+                    FROM employees e
+                    {'WHERE ' + ' AND '.join(where) if where else ''}
+                    ORDER BY sort_value {sort_direction}, e.employee_id {id_direction}
+                    LIMIT %s
+                )
+                SELECT {columns}, page.sort_value
+                FROM page
+                JOIN employees e ON e.employee_id = page.employee_id
+                {joins}
+                ORDER BY page.sort_value {sort_direction}, page.employee_id {id_direction}
+            """, select_params + where_params + [limit + 1])
+            rows = cursor.fetchall()
+            cursor.execute(count_sql, count_params)
+            total = cursor.fetchone()[0]
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = _encode_employee_cursor(sort, order, rows[-1][-1], rows[-1][0])
+        employees = [_employee_row(fields, row[:len(fields)]) for row in rows]
 
-        print(f"[DEBUG] Finished processing all employees. Total processed: {len(employees_with_images)}")
         log_audit(admin_id, role, "Employee management datas", f"Visit employeee management page")
-        print("[DEBUG] Audit log written for employeemanagement_data fetch.")
-
-        return jsonify({"employees": employees_with_images})
+        return jsonify({"employees": employees, "next_cursor": next_cursor, "total": total})
 
     except psycopg2.Error as e:
         log_incident(admin_id, role, f"Database error in employeemanagement_data: {str(e)}", severity="High")
-        print("[ERROR] Database error occurred:", e)
-        traceback.print_exc()
+        logging.error(f"[EMPLOYEE LIST] Database error: {e}", exc_info=True)
         return jsonify({"error": "Database error"}), 500
     except Exception as ex:
         log_incident(admin_id, role, f"Unexpected error in employeemanagement_data: {str(ex)}", severity="High")
-        print("[ERROR] Unexpected error:", ex)
-        traceback.print_exc()
+        logging.error(f"[EMPLOYEE LIST] Unexpected error: {ex}", exc_info=True)
         return jsonify({"error": "Unexpected server error"}), 500
-    finally:
-        if connection:
-            cursor.close()
-            connection.close()
-        print("[DEBUG] Database connection closed in employeemanagement_data.")
+
+# route for the columns the list leaves out (opened from the grid's Detail button)
+@admin_bp.route('/employeemanagement_data/<int:employee_id>', methods=['GET'])
+@token_required_with_roles_and_2fa(required_actions=["employeemanagement_data"])
+def employeemanagement_detail(admin_id, role, role_id, employee_id):
+    try:
+        fields = _employee_fields(request.args.get('fields', 'all').strip())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    columns, joins = _employee_select(fields)
+    try:
+        with db_session() as conn, conn.cursor() as cursor:
+            cursor.execute(f"SELECT {columns} FROM employees e {joins} WHERE e.employee_id = %s", (employee_id,))
+            row = cursor.fetchone()
+    except psycopg2.Error as e:
+        log_incident(admin_id, role, f"Database error in employeemanagement_detail: {str(e)}", severity="High")
+        logging.error(f"[EMPLOYEE DETAIL] Database error: {e}", exc_info=True)
+        return jsonify({"error": "Database error"}), 500
+    if row is None:
+        return jsonify({"error": "Employee not found"}), 404
+    log_audit(admin_id, role, "employeemanagement_detail", f"Viewed details of employee {employee_id}")
+    return jsonify({"employee": _employee_row(fields, row)})
 
 # route for deleting employee from database
 @csrf.exempt
@@ -248,6 +395,8 @@ def delete_employee(admin_id, role, role_id, employee_id):
                 logging.info(f"[DELETE_EMPLOYEE] Deleting from admins table where admin_id = {target_admin_id}")
                 cursor.execute("DELETE FROM admins WHERE admin_id = %s", (target_admin_id,))
                 connection.commit()
+                invalidate_admin_sessions(target_admin_id)
+                invalidate_admin_permissions(target_admin_id)
             else:
                 logging.info(f"[DELETE_EMPLOYEE] Employee with email {employee_email} is not an admin.")
         else:
@@ -267,6 +416,8 @@ def delete_employee(admin_id, role, role_id, employee_id):
         logging.info("[DELETE_EMPLOYEE] Deleting from employees table.")
         cursor.execute("DELETE FROM employees WHERE employee_id = %s;", (employee_id,))
         connection.commit()
+        invalidate_employee_sessions(employee_id)
+        publish_account_deactivated(employee_id, 'Deleted')
         logging.info(f"[DELETE_EMPLOYEE] Deleted employee from employees table with ID {employee_id}.")
 
         log_audit(admin_id, role, "delete_employee", f"Deleted employee with ID {employee_id} (and from admins if applicable)")
@@ -302,7 +453,6 @@ def delete_employee(admin_id, role, role_id, employee_id):
 @token_required_with_roles_and_2fa(required_actions=["add_employee"])
 def add_employee(admin_id, role, role_id):
     import psycopg2
-    import bcrypt
     import logging
     
     logging.info(f"[ADD_EMPLOYEE] Request initiated by admin_id={admin_id}, role={role}")
@@ -352,8 +502,8 @@ def add_employee(admin_id, role, role_id):
     
     # Get hashed password only if provided
     if password:
-        # Offload password hashing to a background thread if possible
-        hashed_password = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(12)).decode("utf-8")
+        # Hashed on the password hashing pool
+        hashed_password = hash_password(password)
         emp_data["password"] = hashed_password
         logging.debug("[ADD_EMPLOYEE] Password hashed")
     
@@ -1839,6 +1989,8 @@ def handle_admin_synchronization(cursor, new_role_id, employee_email, emp_data,
                 set_clause_admin = ", ".join([f"{col} = %s" for col in admin_columns])
                 update_admin_sql = f"UPDATE admins SET {set_clause_admin} WHERE admin_id = %s"
                 cursor.execute(update_admin_sql, admin_values + [admin_id_result])
+                invalidate_admin_sessions(admin_id_result)
+                invalidate_admin_permissions(admin_id_result)
                 logging.info(f"[UPDATE_EMPLOYEE] Updated admin record (admin_id={admin_id_result})")
         else:
             # Create new admin
@@ -1857,6 +2009,8 @@ def handle_admin_synchronization(cursor, new_role_id, employee_email, emp_data,
         if admin_result:
             admin_id_to_remove = admin_result[0]
             cursor.execute("DELETE FROM admins WHERE admin_id = %s", (admin_id_to_remove,))
+            invalidate_admin_sessions(admin_id_to_remove)
+            invalidate_admin_permissions(admin_id_to_remove)
             logging.info(f"[UPDATE_EMPLOYEE] Removed admin record (admin_id={admin_id_to_remove}) - role no longer admin")
     
     return admin_id_result
@@ -1965,7 +2119,6 @@ def ensure_team_membership_consistency(cursor, employee_id, team_id, role_id, em
 @token_required_with_roles_and_2fa(required_actions=["update_employee"])
 def update_employee(admin_id, role, role_id, employee_id):
     import psycopg2
-    import bcrypt
     import base64
     import logging
     from datetime import date, datetime
@@ -2105,7 +2258,7 @@ def update_employee(admin_id, role, role_id, employee_id):
             elif col == "password":
                 pwd = request.form.get("password")
                 if pwd and pwd.strip():  # Only process non-empty passwords
-                    emp_data[col] = bcrypt.hashpw(pwd.encode("utf-8"), bcrypt.gensalt(12)).decode("utf-8")
+                    emp_data[col] = hash_password(pwd)
                     form_has_data = True
                     logging.debug("[UPDATE_EMPLOYEE] New password hashed")
             elif col in request.form:
@@ -2241,6 +2394,8 @@ def terminate_employee(admin_id, role, role_id,employee_id):
             (employee_id,)
         )
         connection.commit()
+        invalidate_employee_sessions(employee_id)
+        publish_account_deactivated(employee_id, 'Terminated')
         logging.info(f"[TERMINATE_EMPLOYEE] Employee ID {employee_id} marked as Terminated.")
 
         # Audit: log successful termination
@@ -2282,6 +2437,7 @@ def activate_employee(admin_id, role,role_id ,employee_id):
             (employee_id,)
         )
         connection.commit()
+        invalidate_employee_sessions(employee_id)
         logging.info(f"[ACTIVATE_EMPLOYEE] Employee ID {employee_id} activated.")
 
         # Audit: log successful activation
@@ -2323,6 +2479,8 @@ def deactivate_employee(admin_id, role, role_id,employee_id):
             (employee_id,)
         )
         connection.commit()
+        invalidate_employee_sessions(employee_id)
+        publish_account_deactivated(employee_id, 'Deactivated')
         logging.info(f"[DEACTIVATE_EMPLOYEE] Employee ID {employee_id} deactivated.")
 
         # Audit: log successful deactivation
@@ -4,6 +4,8 @@ import os
 import bcrypt
 from flask import Blueprint, Response, render_template, jsonify, request, send_file, url_for
 import psycopg2
+from routes.Auth.announcements import Audience, admin_page_args, get_admin_announcements
+from routes.Auth.announcements import create_announcement as store_announcement
 from routes.Auth.audit import log_audit, log_incident
 from routes.Auth.token import token_required_with_roles
 from routes.Auth.utils import get_db_connection
@@ -337,62 +339,9 @@ def notification_and_communication_data(admin_id, role, role_id):
         rows = cur.fetchall()
         return [dict(zip(columns, row)) for row in rows]
 
-    # Announcements with team read counts
-    queryAnnouncement = """
-        WITH team_members_count AS (
-            SELECT team_id, COUNT(DISTINCT employee_id) AS total_members
-            FROM team_members
-            GROUP BY team_id
-        ),
-        announcement_reads_count AS (
-            SELECT announcement_id, team_id, COUNT(DISTINCT employee_id) AS read_count
-            FROM announcement_reads
-            WHERE team_id IS NOT NULL
-            GROUP BY announcement_id, team_id
-        )
-        SELECT 
-            e.email, 
-            a.title, 
-            a.team_id, 
-            a.message, 
-            a.employee_id, 
-            a.created_at,
-            CASE 
-                WHEN a.team_id IS NULL THEN
-                    -- For individual employee announcements
-                    COALESCE(TO_CHAR(ar.read_at, 'YYYY-MM-DD HH24:MI:SS'), 'Unread')
-                ELSE
-                    -- For team announcements
-                    CASE 
-                        WHEN arc.read_count IS NULL OR arc.read_count = 0 THEN 'Unread by all team members'
-                        WHEN arc.read_count = tmc.total_members THEN 'Read by all team members'
-                        ELSE 'Read by ' || COALESCE(arc.read_count, 0) || ' of ' || COALESCE(tmc.total_members, 0) || ' members'
-                    END
-            END AS status,
-            t.team_name, 
-            a.announcement_id
-        FROM 
-            announcements a
-        LEFT JOIN 
-            employees e ON e.employee_id = a.employee_id
-        LEFT JOIN 
-            teams t ON t.team_id = a.team_id
-        -- For individual announcements
-        LEFT JOIN 
-            announcement_reads ar ON (
-                a.employee_id IS NOT NULL AND 
-                ar.employee_id = a.employee_id AND 
-                ar.announcement_id = a.announcement_id
-            )
-        -- For team member counts
-        LEFT JOIN
-            team_members_count tmc ON tmc.team_id = a.team_id
-        -- For team announcement read counts
-        LEFT JOIN
-            announcement_reads_count arc ON arc.announcement_id = a.announcement_id AND arc.team_id = a.team_id
-    """
-    cur.execute(queryAnnouncement)
-    announcements_data = fetch_and_process(cur)
+    # First page of announcements with their audience and read counts (the rest: /notificationsandcommunication_data/announcements)
+    page, limit = admin_page_args(request.args.get('announcement_page'), request.args.get('announcement_limit'))
+    announcements_data, announcements_total = get_admin_announcements(page, limit)
 
     # Alerts with similar read count logic
     queryAlerts = """
@@ -529,11 +478,24 @@ def notification_and_communication_data(admin_id, role, role_id):
 
     return jsonify({
         "announcements": announcements_data,
+        "announcements_total": announcements_total,
         "alerts": alerts_data,
         "meetings": meetings_data,
         "feedback_requests": feedback_data
     })
 
+# Route for one page of the announcements table (?page=, ?limit=)
+@admin_bp.route('/notificationsandcommunication_data/announcements', methods=['GET'])
+@token_required_with_roles(required_actions=["notification_and_communication_data"])
+def notification_and_communication_announcements(admin_id, role, role_id):
+    page, limit = admin_page_args(request.args.get('page'), request.args.get('limit'))
+    try:
+        announcements, total = get_admin_announcements(page, limit)
+    except Exception as e:
+        logging.error(f"[ANNOUNCEMENTS] Could not load page {page}: {e}", exc_info=True)
+        return jsonify({"error": "Could not load announcements"}), 500
+    return jsonify({"announcements": announcements, "total": total, "page": page, "limit": limit})
+
 # Route for sending feedback requests
 @csrf.exempt
 @admin_bp.route('/create_feedback', methods=['POST'])
@@ -817,7 +779,6 @@ def manage_alerts(admin_id, role, role_id):
 @admin_bp.route('/create_announcement', methods=['POST'])
 @token_required_with_roles(required_actions=["create_announcement"])
 def create_announcement(admin_id, role,role_id):
-    from datetime import datetime
     try:
         # Get the JSON data from the request
         data = request.get_json()
@@ -829,123 +790,32 @@ def create_announcement(admin_id, role,role_id):
         title = data.get('title')
         message = data.get('message')
         target_group = data.get('target_group')
-        target_id = data.get('target_id')
+        target_id = data.get('target_ids', data.get('target_id'))
         
         # Validate required fields
         if not title or not message or not target_group:
             return jsonify({"error": "Missing required fields"}), 400
-            
-        # Get current timestamp
-        created_at = datetime.now()
-        
-        # Connect to the database
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        # Based on role, determine which admin column to use
-        is_super_admin = (role == 'super_admin')
-        
-        if target_group == "all":
-            # Insert announcements for all employees
-            try:
-                # Get all employees
-                cur.execute("SELECT employee_id FROM employees")
-                employees = cur.fetchall()
-                
-                # Insert announcement for each employee
-                for employee in employees:
-                    if is_super_admin:
-                        cur.execute(
-                            "INSERT INTO announcements (title, message, created_at, employee_id, assigned_by_super_admin) VALUES (%s, %s, %s, %s, %s)",
-                            (title, message, created_at, employee[0], admin_id)
-                        )
-                    else:
-                        cur.execute(
-                            "INSERT INTO announcements (title, message, created_at, employee_id, assigned_by_admin) VALUES (%s, %s, %s, %s, %s)",
-                            (title, message, created_at, employee[0], admin_id)
-                        )
-                
-                # Get all teams
-                cur.execute("SELECT team_id FROM teams")
-                teams = cur.fetchall()
-                
-                # Insert announcement for each team
-                for team in teams:
-                    if is_super_admin:
-                        cur.execute(
-                            "INSERT INTO announcements (title, message, created_at, team_id, assigned_by_super_admin) VALUES (%s, %s, %s, %s, %s)",
-                            (title, message, created_at, team[0], admin_id)
-                        )
-                    else:
-                        cur.execute(
-                            "INSERT INTO announcements (title, message, created_at, team_id, assigned_by_admin) VALUES (%s, %s, %s, %s, %s)",
-                            (title, message, created_at, team[0], admin_id)
-                        )
-                
-                conn.commit()
-                return jsonify({"message": "Announcements sent to all employees and teams successfully"}), 201
-                
-            except Exception as e:
-                conn.rollback()
-                logging.error(f"Error sending announcements to all: {e}", exc_info=True)
-                return jsonify({"error": f"Failed to send announcements: {str(e)}"}), 500
-                
-        elif target_group == "employees" and target_id:
-            # Insert announcement for specific employee
-            try:
-                if is_super_admin:
-                    cur.execute(
-                        "INSERT INTO announcements (title, message, created_at, employee_id, assigned_by_super_admin) VALUES (%s, %s, %s, %s, %s)",
-                        (title, message, created_at, target_id, admin_id)
-                    )
-                else:
-                    cur.execute(
-                        "INSERT INTO announcements (title, message, created_at, employee_id, assigned_by_admin) VALUES (%s, %s, %s, %s, %s)",
-                        (title, message, created_at, target_id, admin_id)
-                    )
-                    
-                conn.commit()
-                return jsonify({"message": "Announcement sent to employee successfully"}), 201
-                
-            except Exception as e:
-                conn.rollback()
-                logging.error(f"Error sending announcement to employee: {e}", exc_info=True)
-                return jsonify({"error": f"Failed to send announcement: {str(e)}"}), 500
-                
-        elif target_group == "teams" and target_id:
-            # Insert announcement for specific team
-            try:
-                if is_super_admin:
-                    cur.execute(
-                        "INSERT INTO announcements (title, message, created_at, team_id, assigned_by_super_admin) VALUES (%s, %s, %s, %s, %s)",
-                        (title, message, created_at, target_id, admin_id)
-                    )
-                else:
-                    cur.execute(
-                        "INSERT INTO announcements (title, message, created_at, team_id, assigned_by_admin) VALUES (%s, %s, %s, %s, %s)",
-                        (title, message, created_at, target_id, admin_id)
-                    )
-                    
-                conn.commit()
-                return jsonify({"message": "Announcement sent to team successfully"}), 201
-                
-            except Exception as e:
-                conn.rollback()
-                logging.error(f"Error sending announcement to team: {e}", exc_info=True)
-                return jsonify({"error": f"Failed to send announcement: {str(e)}"}), 500
-                
-        else:
-            return jsonify({"error": "Invalid target group or missing target ID"}), 400
-            
+
+        # "all", one or more teams, or one or more employees; stored as a single row either way
+        try:
+            audience = Audience.from_request(target_group, target_id)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        announcement_id = store_announcement(
+            title, message, datetime.datetime.now(), audience, admin_id, is_super_admin=(role == 'super_admin')
+        )
+        log_audit(admin_id, role, "Create Announcement", f"Created announcement {announcement_id} for {audience.describe()}")
+
+        if audience.all_employees:
+            return jsonify({"message": "Announcement sent to all employees successfully", "announcement_id": announcement_id}), 201
+        if audience.team_ids:
+            return jsonify({"message": "Announcement sent to team successfully", "announcement_id": announcement_id}), 201
+        return jsonify({"message": "Announcement sent to employee successfully", "announcement_id": announcement_id}), 201
+
     except Exception as e:
         logging.error(f"Error creating announcement: {e}", exc_info=True)
-        return jsonify({"error": f"Internal server error: {str(e)}"}), 500
-        
-    finally:
-        if 'cur' in locals():
-            cur.close()
-        if 'conn' in locals():
-            conn.close()
+        return jsonify({"error": f"Failed to send announcement: {str(e)}"}), 500
 
 #route for creating meetings
 @csrf.exempt
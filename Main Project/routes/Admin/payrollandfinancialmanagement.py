@@ -4,9 +4,14 @@ import os
 import traceback
 import bcrypt
 from flask import Blueprint, Response, current_app, render_template, jsonify, request, send_file, send_from_directory, url_for
-from fpdf import FPDF
 import psycopg2
 from routes.Auth.audit import log_audit, log_incident
+from routes.Auth.payslips import generate_payslip_pdf
+from routes.Auth.payroll_jobs import (
+    JOB_COMPLETED, JOB_COMPLETED_WITH_ERRORS, JOB_QUEUED, JOB_RUNNING, create_payroll_job, get_payroll_job,
+    get_payroll_job_results, parse_payroll_month, start_payroll_job,
+)
+from routes.Auth.search import SearchTerms, employee_document, next_month, parse_month, payroll_search, rank_expression, search_limit
 from routes.Auth.token import get_admin_from_token, token_required_with_roles, token_required_with_roles_and_2fa
 from routes.Auth.utils import get_db_connection
 from routes.Auth.config import TAX_DOCS_FOLDER
@@ -859,6 +864,8 @@ def generate_tax_document(admin_id=None, role=None, role_id=None):
         file_path = os.path.join(TAX_DOCS_FOLDER, file_name)
         current_app.logger.debug(f"Saving PDF to: {file_path}")
 
+        from fpdf import FPDF  # loaded on first use, it is slow to import
+
         pdf = FPDF()
         pdf.add_page()
         pdf.set_font("Arial", size=12)
@@ -1120,9 +1127,6 @@ def process_payroll(admin_id, role, role_id):
     import traceback
     from datetime import datetime
     from flask import current_app, jsonify
-    from reportlab.lib.pagesizes import letter
-    from reportlab.pdfgen import canvas
-    import os
 
     def debug(msg, *args):
         print(f"[DEBUG][process_payroll] {msg}", *args, file=sys.stderr)
@@ -1131,44 +1135,6 @@ def process_payroll(admin_id, role, role_id):
         except Exception:
             pass
 
-    def generate_payslip_pdf(payroll_id, payroll_data):
-        folder = "static/payslips"
-        os.makedirs(folder, exist_ok=True)
-        pdf_path = os.path.join(folder, f"payslip_{payroll_id}.pdf")
-        c = canvas.Canvas(pdf_path, pagesize=letter)
-        width, height = letter
-        c.setFont("Helvetica-Bold", 16)
-        c.drawString(72, height-72, "Payslip")
-        c.setFont("Helvetica", 12)
-        c.drawString(72, height-100, f"Payroll ID: {payroll_id}")
-        c.drawString(72, height-120, f"Employee ID: {payroll_data.get('employee_id', 'N/A')}")
-        c.drawString(72, height-140, f"Month: {payroll_data.get('month', 'N/A')}")
-        y = height-180
-        c.setFont("Helvetica-Bold", 13)
-        c.drawString(72, y, "Details:")
-        y -= 20
-        c.setFont("Helvetica", 12)
-        c.drawString(90, y, f"Base Salary: ${payroll_data.get('base_salary', 0):,.2f}")
-        y -= 20
-        c.drawString(90, y, f"Hours Worked: {payroll_data.get('hours_worked', 0)}")
-        y -= 20
-        c.drawString(90, y, f"Overtime Hours: {payroll_data.get('overtime_hours', 0)}")
-        y -= 20
-        c.drawString(90, y, f"Overtime Pay: ${payroll_data.get('overtime_pay', 0):,.2f}")
-        y -= 20
-        c.drawString(90, y, f"Bonuses: ${payroll_data.get('bonuses', 0):,.2f}")
-        y -= 20
-        c.drawString(90, y, f"Tax Rate: {payroll_data.get('tax_rate', 0)}%")
-        y -= 20
-        c.drawString(90, y, f"Tax: ${payroll_data.get('tax', 0):,.2f}")
-        y -= 20
-        c.drawString(90, y, f"Net Salary: ${payroll_data.get('net_salary', 0):,.2f}")
-        c.setFont("Helvetica-Oblique", 10)
-        c.drawString(72, 72, "Generated by Payroll System")
-        c.save()
-        debug(f"Generated payslip PDF: {pdf_path}")
-        return pdf_path
-
     data = request.json
     debug("Received Data:", data)
 
@@ -1224,9 +1190,10 @@ def process_payroll(admin_id, role, role_id):
                                      overtime_hours, overtime_pay, bonuses, tax_rate, 
                                      tax, net_salary, created_at)
                 VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW())
+                RETURNING payroll_id
             """, (employee_id, month, base_salary, hours_worked, overtime_hours,
                   overtime_pay, bonuses, tax_rate, tax, net_salary))
-            payroll_id = cursor.lastrowid
+            payroll_id = cursor.fetchone()[0]
             action = "Created payroll"
 
         conn.commit()
@@ -1281,168 +1248,62 @@ def process_payroll(admin_id, role, role_id):
 @token_required_with_roles_and_2fa(required_actions=["process_payroll"])
 def process_payroll_all(admin_id, role, role_id):
     """
-    Process payroll for all employees for the current month.
+    Queue a background payroll job for all employees (current month, or "month": "YYYY-MM" in the body).
+    Poll /process-payroll/jobs/<job_id> for progress.
     """
-    import sys
-    import traceback
-    from datetime import datetime
-    from flask import current_app, jsonify
-    from reportlab.lib.pagesizes import letter
-    from reportlab.pdfgen import canvas
-    import os
-
-    def debug(msg, *args):
-        print(f"[DEBUG][process_payroll_all] {msg}", *args, file=sys.stderr)
-        try:
-            current_app.logger.debug(f"[process_payroll_all] {msg} {args if args else ''}")
-        except Exception:
-            pass
-
-    def generate_payslip_pdf(payroll_id, payroll_data):
-        folder = "static/payslips"
-        os.makedirs(folder, exist_ok=True)
-        pdf_path = os.path.join(folder, f"payslip_{payroll_id}.pdf")
-        c = canvas.Canvas(pdf_path, pagesize=letter)
-        width, height = letter
-        c.setFont("Helvetica-Bold", 16)
-        c.drawString(72, height-72, "Payslip")
-        c.setFont("Helvetica", 12)
-        c.drawString(72, height-100, f"Payroll ID: {payroll_id}")
-        c.drawString(72, height-120, f"Employee ID: {payroll_data.get('employee_id', 'N/A')}")
-        c.drawString(72, height-140, f"Month: {payroll_data.get('month', 'N/A')}")
-        y = height-180
-        c.setFont("Helvetica-Bold", 13)
-        c.drawString(72, y, "Details:")
-        y -= 20
-        c.setFont("Helvetica", 12)
-        c.drawString(90, y, f"Base Salary: ${payroll_data.get('base_salary', 0):,.2f}")
-        y -= 20
-        c.drawString(90, y, f"Hours Worked: {payroll_data.get('hours_worked', 0)}")
-        y -= 20
-        c.drawString(90, y, f"Overtime Hours: {payroll_data.get('overtime_hours', 0)}")
-        y -= 20
-        c.drawString(90, y, f"Overtime Pay: ${payroll_data.get('overtime_pay', 0):,.2f}")
-        y -= 20
-        c.drawString(90, y, f"Bonuses: ${payroll_data.get('bonuses', 0):,.2f}")
-        y -= 20
-        c.drawString(90, y, f"Tax Rate: {payroll_data.get('tax_rate', 0)}%")
-        y -= 20
-        c.drawString(90, y, f"Tax: ${payroll_data.get('tax', 0):,.2f}")
-        y -= 20
-        c.drawString(90, y, f"Net Salary: ${payroll_data.get('net_salary', 0):,.2f}")
-        c.setFont("Helvetica-Oblique", 10)
-        c.drawString(72, 72, "Generated by Payroll System")
-        c.save()
-        debug(f"Generated payslip PDF: {pdf_path}")
-        return pdf_path
-
-    debug("Starting bulk payroll processing...")
-
+    data = request.get_json(silent=True) or {}
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        month = datetime.now().replace(day=1).date()
-        debug(f"Processing payroll for month: {month}")
-
-        # Get all employees
-        cursor.execute("SELECT employee_id, email FROM employees")
-        employees = cursor.fetchall()
-        debug(f"Found {len(employees)} employees for payroll.")
-
-        processed = []
-        errors = []
-        base_salary = 3000  # You may want to fetch this per employee
-
-        for emp in employees:
-            try:
-                employee_id = emp[0]
-                email = emp[1]
-
-                # Default values; replace with actual logic if available
-                # You might want to get these from a timesheet, bonuses table, etc.
-                hours_worked = 0.0
-                overtime_hours = 0.0
-                bonuses = 0.0
-                tax_rate = 0.0
-
-                # If you have a source for hours/bonuses/tax_rate, query here
-
-                overtime_pay = overtime_hours * (base_salary / 160) * 1.5
-                total_salary = base_salary + overtime_pay + bonuses
-                tax = total_salary * (tax_rate / 100)
-                net_salary = total_salary - tax
-
-                # Check existing payroll
-                cursor.execute('SELECT payroll_id FROM payroll WHERE employee_id = %s AND month = %s', (employee_id, month))
-                existing_payroll = cursor.fetchone()
-
-                if existing_payroll:
-                    payroll_id = existing_payroll[0]
-                    cursor.execute("""
-                        UPDATE payroll
-                        SET base_salary = %s, hours_worked = %s, overtime_hours = %s, 
-                            overtime_pay = %s, bonuses = %s, tax_rate = %s, tax = %s, net_salary = %s
-                        WHERE payroll_id = %s
-                    """, (base_salary, hours_worked, overtime_hours, overtime_pay, bonuses, tax_rate, tax, net_salary, payroll_id))
-                    action = "Updated payroll"
-                else:
-                    cursor.execute("""
-                        INSERT INTO payroll (employee_id, month, base_salary, hours_worked, 
-                                             overtime_hours, overtime_pay, bonuses, tax_rate, 
-                                             tax, net_salary, created_at)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW())
-                    """, (employee_id, month, base_salary, hours_worked, overtime_hours,
-                          overtime_pay, bonuses, tax_rate, tax, net_salary))
-                    payroll_id = cursor.lastrowid
-                    action = "Created payroll"
-
-                conn.commit()
-                log_audit(admin_id, role, action, f'{action} for employee ID {employee_id} for {month}')
-
-                payroll_data = {
-                    "employee_id": employee_id,
-                    "email": email,
-                    "month": str(month),
-                    "base_salary": base_salary,
-                    "hours_worked": hours_worked,
-                    "overtime_hours": overtime_hours,
-                    "overtime_pay": overtime_pay,
-                    "bonuses": bonuses,
-                    "tax_rate": tax_rate,
-                    "tax": tax,
-                    "net_salary": net_salary
-                }
+        month = parse_payroll_month(data.get('month'))
+    except (ValueError, TypeError) as e:
+        return jsonify({"status": "Error", "message": "Invalid month, expected YYYY-MM", "error": str(e)}), 400
 
-                try:
-                    generate_payslip_pdf(payroll_id, payroll_data)
-                except Exception as pdf_err:
-                    debug("Payslip PDF generation error (employee_id=%s): %s", employee_id, pdf_err)
+    try:
+        job_id, created = create_payroll_job(month, admin_id, role)
+        start_payroll_job(job_id)
+    except Exception as e:
+        logging.error(f"[process_payroll_all] Could not queue payroll job: {e}", exc_info=True)
+        return jsonify({"status": "Error", "message": "Bulk payroll processing failed", "error": str(e)}), 500
 
-                processed.append(payroll_data)
-            except Exception as e:
-                debug("Error processing payroll for employee_id=%s: %s", emp[0], e)
-                errors.append({"employee_id": emp[0], "error": str(e)})
-                conn.rollback()
+    if created:
+        log_audit(admin_id, role, "Queued payroll", f'Queued payroll job {job_id} for all employees for {month}')
+    return jsonify({
+        "status": "Queued" if created else "Running",
+        "message": f"Payroll for {month} is being processed in the background." if created
+                   else f"Payroll for {month} is already being processed.",
+        "job_id": job_id,
+        "status_url": url_for('admin_bp.get_payroll_job_status', job_id=job_id)
+    }), 202
 
-        debug("Bulk payroll processing complete. Success: %d, Errors: %d", len(processed), len(errors))
-        return jsonify({
-            "status": "Success" if not errors else "Partial Success",
-            "message": f"Processed payroll for {len(processed)} employees. {len(errors)} errors.",
-            "data": processed,
-            "errors": errors
-        }), (200 if not errors else 207)
 
+# Route for checking the progress of a payroll job (add ?include=data for the payroll rows once it's done)
+@admin_bp.route('/process-payroll/jobs/<job_id>', methods=['GET'])
+@token_required_with_roles_and_2fa(required_actions=["process_payroll"])
+def get_payroll_job_status(admin_id, role, role_id, job_id):
+    try:
+        job = get_payroll_job(job_id)
+        if job is None:
+            return jsonify({"status": "Error", "message": "Payroll job not found"}), 404
+        if request.args.get('include') == 'data' and job['status'] in (JOB_COMPLETED, JOB_COMPLETED_WITH_ERRORS):
+            job['data'] = get_payroll_job_results(job_id)
+        return jsonify(job), 200
     except Exception as e:
-        debug("Bulk payroll DB Error:", e)
-        debug("Traceback:", traceback.format_exc())
-        return jsonify({"status": "Error", "message": "Bulk payroll processing failed", "error": str(e)}), 500
+        logging.error(f"[get_payroll_job_status] {e}", exc_info=True)
+        return jsonify({"status": "Error", "message": "Could not load payroll job", "error": str(e)}), 500
 
-    finally:
-        try:
-            cursor.close()
-            conn.close()
-        except Exception:
-            pass
+
+# Route for resuming a payroll job that stopped (e.g. the server restarted while it was running)
+@csrf.exempt
+@admin_bp.route('/process-payroll/jobs/<job_id>/resume', methods=['POST'])
+@token_required_with_roles_and_2fa(required_actions=["process_payroll"])
+def resume_payroll_job(admin_id, role, role_id, job_id):
+    job = get_payroll_job(job_id)
+    if job is None:
+        return jsonify({"status": "Error", "message": "Payroll job not found"}), 404
+    if job['status'] not in (JOB_QUEUED, JOB_RUNNING):
+        return jsonify({"status": "Error", "message": f"Payroll job is already {job['status']}"}), 409
+    started = start_payroll_job(job_id)
+    log_audit(admin_id, role, "Resumed payroll", f'Resumed payroll job {job_id} for {job["month"]}')
+    return jsonify({"status": "Running", "message": "Payroll job resumed." if started else "Payroll job is already running.", "job_id": job_id}), 202
 
 # ---- Update Payment Status to "Paid" ----
 @csrf.exempt
@@ -1613,21 +1474,37 @@ def get_payrolls(admin_id, role, role_id):
         """
         params = []
         where_clauses = []
-        if search:
-            where_clauses.append(
-                "(CAST(p.payroll_id AS TEXT) ILIKE %s OR "
-                "CAST(p.employee_id AS TEXT) ILIKE %s OR "
-                "CAST(p.month AS TEXT) ILIKE %s OR "
-                "CAST(p.net_salary AS TEXT) ILIKE %s OR "
-                "p.payment_status ILIKE %s OR "
-                "e.email ILIKE %s)"
-            )
-            s = f"%{search}%"
-            params.extend([s, s, s, s, s, s])
+        terms = SearchTerms(search)
+        if terms:
+            # Ids, amounts and months are compared as numbers/dates, text goes to the trigram indexes
+            where_sql, search_params = payroll_search(terms)
+            where_clauses.append(where_sql)
+            params.extend(search_params)
+
+        # Typed filters: ?employee_id=, ?status=, ?month=YYYY-MM, ?min_net=, ?max_net=
+        filters = request.args
+        if filters.get('employee_id', type=int) is not None:
+            where_clauses.append("p.employee_id = %s")
+            params.append(filters.get('employee_id', type=int))
+        if filters.get('status'):
+            where_clauses.append("p.payment_status = %s")
+            params.append(filters.get('status'))
+        month = parse_month(filters.get('month'))
+        if month:
+            where_clauses.append("p.month >= %s AND p.month < %s")
+            params.extend([month, next_month(month)])
+        if filters.get('min_net', type=float) is not None:
+            where_clauses.append("p.net_salary >= %s")
+            params.append(filters.get('min_net', type=float))
+        if filters.get('max_net', type=float) is not None:
+            where_clauses.append("p.net_salary <= %s")
+            params.append(filters.get('max_net', type=float))
 
         if where_clauses:
             base_query += " WHERE " + " AND ".join(where_clauses)
-        base_query += " ORDER BY p.payroll_id DESC LIMIT 100"
+        rank_sql = rank_expression(employee_document(), terms, params) if terms.integer is None else "0"
+        base_query += f" ORDER BY {rank_sql} DESC, p.payroll_id DESC LIMIT %s"
+        params.append(search_limit(request.args.get('limit')))
 
         logger.debug(f"Executing SQL: {base_query} | Params: {params}")
 
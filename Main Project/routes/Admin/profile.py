@@ -5,6 +5,8 @@ import bcrypt
 from flask import Blueprint, Response, render_template, jsonify, request, send_file, url_for
 import psycopg2
 from routes.Auth.audit import log_audit, log_incident
+from routes.Auth.images import send_profile_image
+from routes.Auth.password_hashing import hash_password
 from routes.Auth.token import token_required_with_roles
 from routes.Auth.utils import get_db_connection
 from . import admin_bp
@@ -159,7 +161,7 @@ def update_profile_details(admin_id, role, role_id):
             stored_hash = result[0].encode('utf-8')
             try:
                 if bcrypt.checkpw(current_password.encode('utf-8'), stored_hash):
-                    hashed_password = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+                    hashed_password = hash_password(new_password)
                     logging.debug("Current password verified using bcrypt")
                     if role == 'super_admin':
                         cur.execute("UPDATE super_admins SET password_hash = %s WHERE super_admin_id = %s", (hashed_password, admin_id))
@@ -213,26 +215,9 @@ def admin_profile_picture(admin_id, role, role_id, *args, **kwargs):
     route_admin_id = kwargs.get('route_admin_id')
 
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        if route_role == 'super_admin':
-            cursor.execute("SELECT profile_image FROM super_admins WHERE super_admin_id = %s", (route_admin_id,))
-        else:
-            cursor.execute("SELECT profile_image FROM admins WHERE admin_id = %s", (route_admin_id,))
-
-        result = cursor.fetchone()
-
-        if not result or not result[0]:
-            logging.info(f"No profile picture for {route_role} {route_admin_id}. Returning default.")
-            return send_file(os.path.join('static', 'default_resource.png'), mimetype='image/png')
-
-        return Response(result[0], mimetype='image/png')  # change mimetype if needed
+        # ETag + revalidation: unchanged pictures are answered with a 304 without reading the image
+        return send_profile_image('super_admin' if route_role == 'super_admin' else 'admin', route_admin_id)
 
     except Exception as e:
         logging.error(f"Error retrieving profile picture for {route_role} {route_admin_id}: {e}", exc_info=True)
-        return send_file(os.path.join('static', 'default_resource.png'), mimetype='image/png')
-
-    finally:
-        cursor.close()
-        conn.close()
\ No newline at end of file
+        return send_file(os.path.join('static', 'default_resource.png'), mimetype='image/png')
\ No newline at end of file
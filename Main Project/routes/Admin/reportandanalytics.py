@@ -4,7 +4,9 @@ import os
 import bcrypt
 from flask import Blueprint, Response, render_template, jsonify, request, send_file, url_for
 import psycopg2
+from routes.Auth.attendance_rollups import get_average_hours
 from routes.Auth.audit import log_audit, log_incident
+from routes.Auth.reports import ReportError, get_reports, report_names
 from routes.Auth.token import token_required_with_roles, token_required_with_roles_and_2fa
 from routes.Auth.utils import get_db_connection
 from . import admin_bp
@@ -147,119 +149,17 @@ def generate_reports(admin_id, role, role_id):
         
         if not start_date or not end_date:
             return jsonify({"error": "Missing start_date or end_date parameters"}), 400
-        
-        reports = {}
-        
-        conn = get_db_connection()
-        print("[DEBUG] DB connection established.")
-
-        # Attendance Report
-        if report_type in ["attendance", "all"]:
-            try:
-                cursor = conn.cursor()
-                print("[DEBUG] Running attendance query...")
-                cursor.execute("""
-                    SELECT date, AVG(hours_worked) 
-                    FROM attendance_logs
-                    WHERE date BETWEEN %s AND %s
-                    GROUP BY date ORDER BY date
-                """, (start_date, end_date))
-                data = cursor.fetchall()
-                cursor.close()
-                print(f"[DEBUG] Attendance Data: {data}")
-                reports["attendance"] = {
-                    "labels": [str(row[0]) for row in data],
-                    "data": [float(row[1]) for row in data]
-                }
-                print("[DEBUG] Attendance report parsed successfully.")
-            except Exception as e:
-                print(f"[ERROR] Attendance report error: {e}")
-                log_incident(admin_id, role, f"Error generating attendance report: {e}", severity="High")
-                return jsonify({'error': f"Attendance report error: {str(e)}"}), 500
-
-        # Payroll Report
-        if report_type in ["payroll", "all"]:
-            try:
-                cursor = conn.cursor()
-                print("[DEBUG] Running payroll query...")
-                cursor.execute("SELECT employee_id, net_salary, created_at FROM payroll WHERE created_at BETWEEN %s AND %s", (start_date, end_date))
-                data = cursor.fetchall()
-                cursor.close()
-                print(f"[DEBUG] Payroll Raw Data: {data}")
-
-                # Example processing - sum by employee
-                from collections import defaultdict
-                payroll_summary = defaultdict(float)
-                for emp_id, amount, created_at in data:
-                    payroll_summary[emp_id] += float(amount)
-                
-                reports["payroll"] = {
-                    "labels": list(map(str, payroll_summary.keys())),
-                    "data": list(payroll_summary.values())
-                }
-                print("[DEBUG] Payroll report parsed successfully.")
-            except Exception as e:
-                print(f"[ERROR] Payroll report error: {e}")
-                log_incident(admin_id, role, f"Error generating payroll report: {e}", severity="High")
-                return jsonify({'error': f"Payroll report error: {str(e)}"}), 500
-
-        # Performance Report
-        if report_type in ["performance", "all"]:
-            try:
-                cursor = conn.cursor()
-                print("[DEBUG] Running performance query...")
-                cursor.execute("""
-                    SELECT EXTRACT(MONTH FROM gp.updated_at), AVG(gpp.progress_percentage)
-                    FROM goal_progress gp
-                    JOIN goal_progress_percentage gpp
-                      ON gp.progress_percentage_id = gpp.progress_percentage_id
-                    WHERE gp.updated_at BETWEEN %s AND %s
-                    GROUP BY EXTRACT(MONTH FROM gp.updated_at)
-                    ORDER BY EXTRACT(MONTH FROM gp.updated_at)
-                """, (start_date, end_date))
-                data = cursor.fetchall()
-                cursor.close()
-                print(f"[DEBUG] Performance Data: {data}")
-
-                reports["performance"] = {
-                    "labels": [f"Month {int(row[0])}" for row in data],
-                    "data": [float(row[1]) for row in data]
-                }
-                print("[DEBUG] Performance report parsed successfully.")
-            except Exception as e:
-                print(f"[ERROR] Performance report error: {e}")
-                log_incident(admin_id, role, f"Error generating performance report: {e}", severity="High")
-                return jsonify({'error': f"Performance report error: {str(e)}"}), 500
-
-        # Productivity Report
-        if report_type in ["productivity", "all"]:
-            try:
-                cursor = conn.cursor()
-                print("[DEBUG] Running productivity query...")
-                cursor.execute("""
-                    SELECT e.department, COUNT(task_id)
-                    FROM tasks t
-                    LEFT JOIN employees e ON e.employee_id = t.employee_id
-                    WHERE due_date BETWEEN %s AND %s
-                    GROUP BY e.department
-                """, (start_date, end_date))
-                data = cursor.fetchall()
-                cursor.close()
-                print(f"[DEBUG] Productivity Data: {data}")
-
-                reports["productivity"] = {
-                    "labels": [row[0] if row[0] else "Unknown Department" for row in data],
-                    "data": [int(row[1]) for row in data]
-                }
-                print("[DEBUG] Productivity report parsed successfully.")
-            except Exception as e:
-                print(f"[ERROR] Productivity report error: {e}")
-                log_incident(admin_id, role, f"Error generating productivity report: {e}", severity="High")
-                return jsonify({'error': f"Productivity report error: {str(e)}"}), 500
-
-        # Finalize
-        conn.close()
-        print("[DEBUG] DB connection closed.")
+
+        # Sub-reports run concurrently; unchanged ranges come from the report cache (routes/Auth/reports.py)
+        try:
+            reports, _, _ = get_reports(report_type, start_date, end_date)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except ReportError as e:
+            print(f"[ERROR] {e.report.capitalize()} report error: {e}")
+            log_incident(admin_id, role, f"Error generating {e.report} report: {e}", severity="High")
+            return jsonify({'error': f"{e.report.capitalize()} report error: {str(e)}"}), 500
+        print(f"[DEBUG] Reports ready: {list(reports)}")
 
         log_audit(admin_id, role, "generate_reports", f"Generated {report_type} reports from {start_date} to {end_date}")
         print("[DEBUG] Audit log recorded.")
@@ -271,6 +171,67 @@ def generate_reports(admin_id, role, role_id):
         log_incident(admin_id, role, f"Error generating reports: {e}", severity="High")
         return jsonify({'error': str(e)}), 500
 
+# Route to start building reports in the background (multi-year ranges), fetch them with /generate_reports/result
+@csrf.exempt
+@admin_bp.route('/generate_reports/prepare', methods=['POST'])
+@token_required_with_roles_and_2fa(required_actions=["generate_reports"])
+def prepare_reports(admin_id, role, role_id):
+    data = request.get_json(silent=True) or request.args
+    report_type = data.get('report_type', 'all')
+    start_date = data.get('start_date')
+    end_date = data.get('end_date')
+    if not start_date or not end_date:
+        return jsonify({"error": "Missing start_date or end_date parameters"}), 400
+    try:
+        reports, pending, failed = get_reports(report_type, start_date, end_date, wait=False)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"[ERROR] prepare_reports error: {e}")
+        log_incident(admin_id, role, f"Error preparing reports: {e}", severity="High")
+        return jsonify({'error': str(e)}), 500
+
+    log_audit(admin_id, role, "prepare_reports", f"Prepared {report_type} reports from {start_date} to {end_date}")
+    result_url = url_for('admin_bp.fetch_prepared_reports', report_type=report_type, start_date=start_date, end_date=end_date)
+    return jsonify({
+        'status': 'pending' if pending else 'ready',
+        'ready': sorted(reports),
+        'pending': pending,
+        'result_url': result_url
+    }), 202 if pending else 200
+
+# Route to fetch reports started with /generate_reports/prepare (202 while they are still being built)
+@admin_bp.route('/generate_reports/result', methods=['GET'])
+@token_required_with_roles_and_2fa(required_actions=["generate_reports"])
+def fetch_prepared_reports(admin_id, role, role_id):
+    report_type = request.args.get('report_type', 'all')
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    if not start_date or not end_date:
+        return jsonify({"error": "Missing start_date or end_date parameters"}), 400
+    try:
+        reports, pending, failed = get_reports(report_type, start_date, end_date, wait=False, start_missing=False)
+        names = report_names(report_type)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"[ERROR] fetch_prepared_reports error: {e}")
+        log_incident(admin_id, role, f"Error fetching prepared reports: {e}", severity="High")
+        return jsonify({'error': str(e)}), 500
+
+    if failed:
+        name, error = next(iter(failed.items()))
+        return jsonify({'error': f"{name.capitalize()} report error: {error}", 'failed': failed}), 500
+    if pending:
+        return jsonify({'status': 'pending', 'ready': sorted(reports), 'pending': pending}), 202
+    missing = [name for name in names if name not in reports]
+    if missing:
+        # Never prepared, or the data changed since: prepare again
+        return jsonify({'status': 'missing', 'missing': missing}), 404
+
+    log_audit(admin_id, role, "generate_reports", f"Fetched prepared {report_type} reports from {start_date} to {end_date}")
+    return jsonify(reports)
+
 # API to get attendance data
 @admin_bp.route('/api/attendance_report', methods=['GET','POST'])
 @token_required_with_roles_and_2fa(required_actions=["get_attendance_report"])
@@ -280,19 +241,10 @@ def get_attendance_report(admin_id, role,role_id):
         end_date = request.args.get('end_date')
         print(f"[DEBUG] get_attendance_report from {start_date} to {end_date} by Admin ID: {admin_id}")
 
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        team_id = request.args.get('team_id', type=int)
 
-        query = """
-            SELECT date, AVG(hours_worked) 
-            FROM attendance_logs
-            WHERE date BETWEEN %s AND %s
-            GROUP BY date ORDER BY date
-        """
-        cursor.execute(query, (start_date, end_date))
-        data = cursor.fetchall()
-        cursor.close()
-        conn.close()
+        # Per-day averages come from the daily (or team) rollup, not from attendance_logs
+        data = get_average_hours(start_date, end_date, team_id=team_id)
 
         response = {"labels": [row[0] for row in data], "data": [row[1] for row in data]}
         log_audit(admin_id, role, "get_attendance_report", f"Viewed attendance data from {start_date} to {end_date}")
@@ -7,8 +7,9 @@ import bcrypt
 from flask import Blueprint, Response, render_template, jsonify, request, send_file, send_from_directory, url_for
 import psycopg2
 from routes.Auth.audit import log_audit, log_incident
+from routes.Auth.outbox import get_outbox_status, retry_dead_letters
 from routes.Auth.token import token_required_with_roles, token_required_with_roles_and_2fa
-from routes.Auth.utils import get_db_connection
+from routes.Auth.utils import get_db_connection, release_request_connection
 from routes.Auth.config import BACKUP_DIR, DB_HOST, DB_NAME, DB_PASSWORD, DB_USER, PG_DUMP_PATH, PG_PSQL_PATH
 from . import admin_bp
 from extensions import csrf
@@ -765,6 +766,32 @@ def list_backups(admin_id, role, role_id):
         log_incident(admin_id, role, f"Error listing backups: {e}", severity="High")
         return jsonify({"error": "Could not list backups", "details": str(e)}), 500
 
+# Route for the email outbox status (queue sizes, oldest waiting email, dead letters)
+@admin_bp.route('/email_outbox/status', methods=['GET'])
+@token_required_with_roles_and_2fa(required_actions=["list_backups"])
+def email_outbox_status(admin_id, role, role_id):
+    try:
+        return jsonify(get_outbox_status())
+    except Exception as e:
+        logging.error(f"❌ Error reading email outbox status: {e}")
+        return jsonify({"error": "Could not read the email outbox", "details": str(e)}), 500
+
+# Route for putting dead-lettered emails back in the outbox (all of them without "ids")
+@csrf.exempt
+@admin_bp.route('/email_outbox/retry', methods=['POST'])
+@token_required_with_roles_and_2fa(required_actions=["create_backup"])
+def retry_email_outbox(admin_id, role, role_id):
+    data = request.get_json(silent=True) or {}
+    ids = data.get('ids')
+    if ids is not None:
+        try:
+            ids = [int(i) for i in ids]
+        except (TypeError, ValueError):
+            return jsonify({"error": "ids must be a list of integers"}), 400
+    requeued = retry_dead_letters(ids)
+    log_audit(admin_id, role, "retry_email_outbox", f"Requeued {requeued} dead-lettered emails")
+    return jsonify({"requeued": requeued})
+
 @csrf.exempt
 @admin_bp.route('/restore', methods=['POST'])
 @token_required_with_roles_and_2fa(required_actions=["restore_backup"])
@@ -779,6 +806,10 @@ def restore_backup(admin_id, role, role_id):
         log_incident(admin_id, role, f"Attempted to restore non-existent backup file: {backup_file}", severity="Low")
         return jsonify({"error": "Backup file not found"}), 404
 
+    # The request's transaction still holds the locks of the token/permission lookups; end it before
+    # dropping tables on a separate connection, or the DROP waits on this very request
+    release_request_connection()
+
     # --- Drop all tables in the database (CASCADE) ---
     try:
         conn = psycopg2.connect(
@@ -8,6 +8,9 @@ import bcrypt
 from flask import Blueprint, Response, render_template, jsonify, request, send_file, url_for
 import psycopg2
 from routes.Auth.audit import log_audit, log_incident
+from routes.Auth.permissions import invalidate_admin_permissions, invalidate_permission_catalog
+from routes.Auth.events import publish_account_deactivated
+from routes.Auth.session_cache import invalidate_admin_sessions, invalidate_employee_sessions
 from routes.Auth.token import token_required_with_roles, token_required_with_roles_and_2fa
 from routes.Auth.utils import get_db_connection
 from . import admin_bp
@@ -72,6 +75,7 @@ def create_route(admin_id, role, role_id):
         cur.execute("INSERT INTO routes (route_name, description) VALUES (%s, %s) RETURNING id", (route_name, description))
         route_id = cur.fetchone()[0]
         conn.commit()
+        invalidate_permission_catalog()
         # Audit: log successful route creation
         log_audit(admin_id, role, "create_route", f"Created route '{route_name}' (id={route_id})")
         return jsonify({"route_id": route_id}), 201
@@ -99,6 +103,7 @@ def update_route(admin_id, role, role_id, route_id):
         cur.execute("UPDATE routes SET route_name = %s, description = %s WHERE id = %s RETURNING id", (route_name, description, route_id))
         updated = cur.fetchone()
         conn.commit()
+        invalidate_permission_catalog()
         if updated:
             # Audit: log successful route update
             log_audit(admin_id, role, "update_route", f"Updated route id={route_id} to name='{route_name}'")
@@ -126,6 +131,7 @@ def delete_route(admin_id, role, role_id, route_id):
         cur.execute("DELETE FROM routes WHERE id = %s RETURNING id", (route_id,))
         deleted = cur.fetchone()
         conn.commit()
+        invalidate_permission_catalog()
         if deleted:
             # Audit: log successful route deletion
             log_audit(admin_id, role, "delete_route", f"Deleted route id={route_id}")
@@ -162,6 +168,7 @@ def create_action(admin_id, role, role_id, route_id):
         action_id = cur.fetchone()[0]
         cur.execute("INSERT INTO route_actions (route_id, action_id) VALUES (%s, %s) ON CONFLICT DO NOTHING", (route_id, action_id))
         conn.commit()
+        invalidate_permission_catalog()
         # Audit: log successful action creation/linking
         log_audit(admin_id, role, "create_action", f"Created/linked action '{action_name}' (id={action_id}) to route id={route_id}")
         return jsonify({"action_id": action_id}), 201
@@ -189,6 +196,7 @@ def update_action(admin_id, role, role_id, route_id, action_id):
         cur.execute("UPDATE actions SET action_name = %s, description = %s WHERE id = %s RETURNING id", (action_name, description, action_id))
         updated = cur.fetchone()
         conn.commit()
+        invalidate_permission_catalog()
         if updated:
             # Audit: log successful action update
             log_audit(admin_id, role, "update_action", f"Updated action id={action_id} to name='{action_name}' on route id={route_id}")
@@ -217,6 +225,7 @@ def delete_action(admin_id, role, role_id, route_id, action_id):
         cur.execute("DELETE FROM actions WHERE id = %s RETURNING id", (action_id,))
         deleted = cur.fetchone()
         conn.commit()
+        invalidate_permission_catalog()
         if deleted:
             # Audit: log successful action deletion
             log_audit(admin_id, role, "delete_action", f"Deleted action id={action_id} from route id={route_id}")
@@ -506,6 +515,7 @@ def grant_access(current_admin_id, role, role_id):
                 )
 
         conn.commit()
+        invalidate_admin_permissions(target_admin_id)
         logging.info(f"Successfully granted access to admin_id={target_admin_id} with permissions={permissions}")
 
         # Audit: log successful access grant
@@ -547,6 +557,7 @@ def remove_access(current_admin_id, role, role_id):
             [(target_admin_id, route_id, action_id) for action_id in actions]
         )
         conn.commit()
+        invalidate_admin_permissions(target_admin_id)
 
         # Check if there are any granted actions left for this admin on this route
         cur.execute(
@@ -691,6 +702,8 @@ def delete_admin(current_admin_id, current_role, current_role_id):
             logging.info("[DELETE_ADMIN] Deleting from employees table.")
             cur.execute("DELETE FROM employees WHERE employee_id = %s;", (employee_id,))
             conn.commit()
+            invalidate_employee_sessions(employee_id)
+            publish_account_deactivated(employee_id, 'Deleted')
             logging.info(f"[DELETE_ADMIN] Deleted employee from employees table with ID {employee_id}.")
         else:
             logging.warning(f"Admin with ID {target_admin_id} not found in employees table; skipping employees delete.")
@@ -700,6 +713,8 @@ def delete_admin(current_admin_id, current_role, current_role_id):
         cur.execute("DELETE FROM admins WHERE admin_id = %s", (target_admin_id,))
         logging.debug("Successfully deleted from admins.")
         conn.commit()
+        invalidate_admin_sessions(target_admin_id)
+        invalidate_admin_permissions(target_admin_id)
 
         logging.info(f"Admin with ID {target_admin_id} deleted successfully by {current_admin_id}.")
 
@@ -843,6 +858,7 @@ def verify_admin(current_admin_id, current_role, current_role_id):
         )
 
         conn.commit()
+        invalidate_admin_permissions(target_admin_id)
         logging.info(f"Successfully verified admin {target_admin_id} by {current_admin_id}")
 
         # Audit: log successful admin verification
@@ -957,6 +973,7 @@ def reject_admin(current_admin_id, current_role, current_role_id):
         logging.debug(f"All permissions removed for admin ID {target_admin_id}.")
 
         conn.commit()
+        invalidate_admin_permissions(target_admin_id)
         cur.close()
         conn.close()
 
@@ -1080,6 +1097,8 @@ def review_requests_action(admin_id, role, role_id):
             """, (req_id,))
 
         conn.commit()
+        if action == "approve":
+            invalidate_admin_permissions(target_admin_id)
         return jsonify({"message": f"Request {action}d."})
     except Exception as e:
         conn.rollback()
@@ -7,6 +7,7 @@ import bcrypt
 from flask import Blueprint, Response, render_template, jsonify, request, send_file, url_for
 import psycopg2
 from routes.Auth.audit import log_audit, log_incident
+from routes.Auth.search import SearchTerms, rank_expression, search_limit, ticket_document, ticket_search
 from routes.Auth.token import get_admin_from_token, token_required_with_roles
 from routes.Auth.utils import get_db_connection
 from . import admin_bp
@@ -213,6 +214,7 @@ def get_edit_ticket(admin_id, role, role_id,ticket_id):
 @token_required_with_roles(required_actions=["get_tickets"])
 def get_tickets(admin_id, role, role_id):
     search_query = request.args.get('search', '')
+    terms = SearchTerms(search_query)
 
     conn = get_db_connection()
     cursor = conn.cursor()
@@ -235,24 +237,18 @@ def get_tickets(admin_id, role, role_id):
         e.email
     FROM tickets t
     LEFT JOIN employees e ON t.employee_id = e.employee_id
-    WHERE 
-        CAST(t.ticket_id AS TEXT) ILIKE %s OR
-        e.first_name ILIKE %s OR
-        e.last_name ILIKE %s OR
-        t.category ILIKE %s OR
-        t.subject ILIKE %s OR 
-        t.description ILIKE %s OR
-        t.priority ILIKE %s OR
-        t.status ILIKE %s
-    ORDER BY t.created_at DESC
     """
-
-    search_param = f"%{search_query}%"
-    cursor.execute(query, (
-        search_param, search_param, search_param,
-        search_param, search_param, search_param,
-        search_param, search_param
-    ))
+    params = []
+    if terms:
+        # Ticket id, or trigram-indexed text of the ticket and its employee, best matches first
+        where_sql, params = ticket_search(terms)
+        rank_sql = rank_expression(ticket_document(), terms, params)
+        query += f" WHERE {where_sql} ORDER BY {rank_sql} DESC, t.created_at DESC LIMIT %s"
+        params.append(search_limit(request.args.get('limit')))
+    else:
+        query += " ORDER BY t.created_at DESC"
+
+    cursor.execute(query, params)
 
     tickets = cursor.fetchall()
     cursor.close()
@@ -4,4 +4,4 @@ login_bp = Blueprint('login_bp', __name__, template_folder='../templates/Login')
 # Your secret key for signing the JWT token
 SECRET_KEY = '123456'
 # Import all route modules so routes are registered!
-from . import two_authentication,audit,config,decorator,device_tracking,permissions,token,utils
+from . import two_authentication,announcements,attendance_rollups,audit,audit_writer,config,db_pool,decorator,device_tracking,events,images,inbox,mailer,metrics,outbox,password_hashing,payroll_jobs,payslips,permissions,reports,search,session_cache,sql_trace,token,utils
@@ -0,0 +1,335 @@
+import logging
+import threading
+
+from routes.Auth.migrations import MigrationError, require_schema
+from routes.Auth.utils import db_session
+
+
+# ======================== Announcements ========================
+# An announcement is stored once, with its audience on the row:
+#   - audience_all: every employee
+#   - audience_team_ids: employees whose employees.team_id is in the list
+#   - audience_employee_ids: these employees
+# Membership is resolved when an employee reads (GIN indexes on the id lists, a partial index for
+# company-wide rows), so sending to everyone is one INSERT instead of one row per employee and team.
+# Read receipts stay sparse: announcement_reads only has a row once someone has read the announcement.
+# Rows written with only the old employee_id / team_id columns get their audience filled in by a trigger.
+
+SCHEMA_SQL = [
+    "ALTER TABLE announcements ADD COLUMN IF NOT EXISTS audience_all boolean NOT NULL DEFAULT FALSE",
+    "ALTER TABLE announcements ADD COLUMN IF NOT EXISTS audience_team_ids integer[] NOT NULL DEFAULT '{}'",
+    "ALTER TABLE announcements ADD COLUMN IF NOT EXISTS audience_employee_ids integer[] NOT NULL DEFAULT '{}'",
+    "CREATE INDEX IF NOT EXISTS announcements_audience_team_idx ON announcements USING gin (audience_team_ids)",
+    "CREATE INDEX IF NOT EXISTS announcements_audience_employee_idx ON announcements USING gin (audience_employee_ids)",
+    "CREATE INDEX IF NOT EXISTS announcements_audience_all_idx ON announcements (created_at DESC) WHERE audience_all",
+    """
+    CREATE OR REPLACE FUNCTION announcements_legacy_audience() RETURNS trigger
+        LANGUAGE plpgsql
+        AS $$
+    BEGIN
+      IF NOT NEW.audience_all AND NEW.audience_team_ids = '{}' AND NEW.audience_employee_ids = '{}' THEN
+        IF NEW.team_id IS NOT NULL THEN
+          NEW.audience_team_ids := ARRAY[NEW.team_id];
+        END IF;
+        IF NEW.employee_id IS NOT NULL THEN
+          NEW.audience_employee_ids := ARRAY[NEW.employee_id];
+        END IF;
+      END IF;
+      RETURN NEW;
+    END;
+    $$
+    """,
+]
+
+# Created (with the backfill of existing rows) only when missing
+TRIGGER_SQL = [
+    "LOCK TABLE announcements IN SHARE ROW EXCLUSIVE MODE",
+    "DROP TRIGGER IF EXISTS announcements_legacy_audience ON announcements",
+    """
+    CREATE TRIGGER announcements_legacy_audience BEFORE INSERT ON announcements
+    FOR EACH ROW EXECUTE FUNCTION announcements_legacy_audience()
+    """,
+    """
+    UPDATE announcements
+    SET audience_team_ids = CASE WHEN team_id IS NULL THEN '{}'::integer[] ELSE ARRAY[team_id] END,
+        audience_employee_ids = CASE WHEN employee_id IS NULL THEN '{}'::integer[] ELSE ARRAY[employee_id] END
+    WHERE NOT audience_all AND audience_team_ids = '{}' AND audience_employee_ids = '{}'
+      AND (team_id IS NOT NULL OR employee_id IS NOT NULL)
+    """,
+    # One receipt per employee and announcement, so marking as read can be a single upsert
+    """
+    DELETE FROM announcement_reads ar
+    USING announcement_reads dup
+    WHERE ar.announcement_id = dup.announcement_id AND ar.employee_id = dup.employee_id
+      AND ar.read_id > dup.read_id
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS announcement_reads_employee_announcement_idx ON announcement_reads (employee_id, announcement_id)",
+]
+
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+
+# Add the audience columns, their indexes and the legacy trigger if they don't exist yet (migrations/0007_announcement_audiences.py)
+def install_announcement_schema(cur):
+    for statement in SCHEMA_SQL:
+        cur.execute(statement)
+    cur.execute("SELECT 1 FROM pg_trigger WHERE tgname = 'announcements_legacy_audience'")
+    if cur.fetchone() is None:
+        logging.info("[ANNOUNCEMENTS] Installing audience trigger and backfilling existing announcements")
+        for statement in TRIGGER_SQL:
+            cur.execute(statement)
+
+
+# Check once per process that migrations/0007_announcement_audiences.py has run; the request path never runs the DDL
+def ensure_announcement_schema():
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if _schema_ready:
+            return
+        with db_session() as conn, conn.cursor() as cur:
+            require_schema(cur, '0007_announcement_audiences',
+                           relations=('announcements_audience_team_idx', 'announcements_audience_employee_idx',
+                                      'announcements_audience_all_idx', 'announcement_reads_employee_announcement_idx'),
+                           functions=('announcements_legacy_audience',))
+            cur.execute("SELECT 1 FROM pg_trigger WHERE tgname = 'announcements_legacy_audience'")
+            if cur.fetchone() is None:
+                raise MigrationError("Missing trigger announcements_legacy_audience: run `python migrate.py` (migration 0007_announcement_audiences)")
+        _schema_ready = True
+
+
+class Audience:
+    """Who an announcement is for: everyone, a set of teams and/or a set of employees."""
+
+    def __init__(self, all_employees=False, team_ids=(), employee_ids=()):
+        self.all_employees = bool(all_employees)
+        self.team_ids = sorted({int(team_id) for team_id in team_ids})
+        self.employee_ids = sorted({int(employee_id) for employee_id in employee_ids})
+
+    def __bool__(self):
+        return self.all_employees or bool(self.team_ids) or bool(self.employee_ids)
+
+    def describe(self):
+        if self.all_employees:
+            return "all employees"
+        parts = []
+        if self.team_ids:
+            parts.append(f"teams {self.team_ids}")
+        if self.employee_ids:
+            parts.append(f"employees {self.employee_ids}")
+        return " and ".join(parts)
+
+    @classmethod
+    def from_request(cls, target_group, target_id):
+        """
+        Parse the create_announcement payload: target_group is "all", "teams" or "employees" and target_id
+        one id or a list of ids. Raises ValueError when the combination is invalid.
+        """
+        if target_group == "all":
+            return cls(all_employees=True)
+        if target_group not in ("teams", "employees") or target_id in (None, "", []):
+            raise ValueError("Invalid target group or missing target ID")
+        ids = target_id if isinstance(target_id, (list, tuple)) else [target_id]
+        try:
+            ids = [int(i) for i in ids]
+        except (TypeError, ValueError):
+            raise ValueError("Target IDs must be integers")
+        if target_group == "teams":
+            return cls(team_ids=ids)
+        return cls(employee_ids=ids)
+
+
+# WHERE fragment matching announcements visible to one employee; takes (employee_id, team_id) as parameters
+def audience_condition(alias='a'):
+    return (
+        f"({alias}.audience_all"
+        f" OR {alias}.audience_employee_ids @> ARRAY[%s]::integer[]"
+        f" OR {alias}.audience_team_ids @> ARRAY[%s]::integer[])"
+    )
+
+
+def create_announcement(title, message, created_at, audience, admin_id, is_super_admin):
+    """
+    Store one announcement for the whole audience and return its id.
+    A single employee or team is also written to the old employee_id / team_id columns, which the
+    admin pages and the employee/team delete cascades still use.
+    """
+    ensure_announcement_schema()
+    employee_id = audience.employee_ids[0] if len(audience.employee_ids) == 1 and not audience.team_ids else None
+    team_id = audience.team_ids[0] if len(audience.team_ids) == 1 and not audience.employee_ids else None
+    admin_column = 'assigned_by_super_admin' if is_super_admin else 'assigned_by_admin'
+    with db_session() as conn, conn.cursor() as cur:
+        cur.execute(f"""
+            INSERT INTO announcements
+                (title, message, created_at, employee_id, team_id, {admin_column},
+                 audience_all, audience_team_ids, audience_employee_ids)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s::integer[], %s::integer[])
+            RETURNING announcement_id
+        """, (title, message, created_at, employee_id, team_id, admin_id,
+              audience.all_employees, audience.team_ids, audience.employee_ids))
+        return cur.fetchone()[0]
+
+
+def get_employee_team(employee_id):
+    with db_session() as conn, conn.cursor() as cur:
+        cur.execute("SELECT team_id FROM employees WHERE employee_id = %s", (employee_id,))
+        row = cur.fetchone()
+    return row[0] if row else None
+
+
+def get_employee_announcements(employee_id, team_id):
+    """
+    Announcements visible to the employee, newest first.
+    Rows are (announcement_id, title, message, created_at, employee_id, team_id, creator_name, read_at, audience_all).
+    """
+    ensure_announcement_schema()
+    with db_session() as conn, conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT
+                a.announcement_id,
+                a.title,
+                a.message,
+                a.created_at,
+                a.employee_id,
+                a.team_id,
+                COALESCE(r1.role_name, r2.role_name, 'Admin') AS creator_name,
+                ar.read_at,
+                a.audience_all
+            FROM announcements a
+            LEFT JOIN admins ad ON a.assigned_by_admin = ad.admin_id
+            LEFT JOIN roles r1 ON ad.role_id = r1.role_id
+            LEFT JOIN super_admins sad ON a.assigned_by_super_admin = sad.super_admin_id
+            LEFT JOIN roles r2 ON sad.role_id = r2.role_id
+            LEFT JOIN announcement_reads ar
+                ON ar.announcement_id = a.announcement_id AND ar.employee_id = %s
+            WHERE {audience_condition('a')}
+            ORDER BY a.created_at DESC, a.announcement_id DESC
+        """, (employee_id, employee_id, team_id))
+        return cur.fetchall()
+
+
+def get_announcement_for_employee(announcement_id, employee_id, team_id):
+    """(title, message, visible) for the announcement, or None if it doesn't exist."""
+    ensure_announcement_schema()
+    with db_session() as conn, conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT a.title, a.message, {audience_condition('a')}
+            FROM announcements a
+            WHERE a.announcement_id = %s
+        """, (employee_id, team_id, announcement_id))
+        return cur.fetchone()
+
+
+def mark_announcement_read(announcement_id, employee_id, team_id):
+    """Record the read receipt; returns its read_id, or None if the employee had already read it."""
+    ensure_announcement_schema()
+    with db_session() as conn, conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO announcement_reads (employee_id, read_at, team_id, announcement_id)
+            VALUES (%s, NOW(), %s, %s)
+            ON CONFLICT (employee_id, announcement_id) DO NOTHING
+            RETURNING read_id
+        """, (employee_id, team_id, announcement_id))
+        row = cur.fetchone()
+    return row[0] if row else None
+
+
+# Admin overview, one page at a time: each announcement with its audience and how many of them have read it.
+# The page is picked first; its recipients are counted set-based (audience arrays unnested, joined to employees
+# directly and through their team, de-duplicated, grouped), so the cost follows the page size, not the table size.
+ADMIN_PAGE_SIZE = 40
+ADMIN_MAX_PAGE_SIZE = 200
+
+ADMIN_LIST_SQL = """
+    WITH page AS (
+        SELECT announcement_id, audience_all, audience_team_ids, audience_employee_ids
+        FROM announcements
+        ORDER BY created_at DESC, announcement_id DESC
+        LIMIT %(limit)s OFFSET %(offset)s
+    ),
+    targets AS (
+        SELECT p.announcement_id, e.employee_id
+        FROM page p
+        CROSS JOIN LATERAL unnest(p.audience_employee_ids) AS ids(employee_id)
+        JOIN employees e ON e.employee_id = ids.employee_id
+        WHERE NOT p.audience_all
+        UNION
+        SELECT p.announcement_id, e.employee_id
+        FROM page p
+        CROSS JOIN LATERAL unnest(p.audience_team_ids) AS teams(team_id)
+        JOIN employees e ON e.team_id = teams.team_id
+        WHERE NOT p.audience_all
+    ),
+    recipients AS (
+        SELECT announcement_id, COUNT(*) AS total
+        FROM targets
+        GROUP BY announcement_id
+    ),
+    everyone AS (
+        SELECT COUNT(*) AS total FROM employees
+    ),
+    reads AS (
+        SELECT ar.announcement_id, COUNT(*) AS read_count, MAX(ar.read_at) AS last_read_at
+        FROM announcement_reads ar
+        JOIN page p ON p.announcement_id = ar.announcement_id
+        GROUP BY ar.announcement_id
+    )
+    SELECT
+        CASE WHEN a.audience_all THEN 'All employees'
+             ELSE (SELECT string_agg(e.email, ', ' ORDER BY e.email) FROM employees e
+                   WHERE e.employee_id = ANY(a.audience_employee_ids))
+        END AS email,
+        a.title,
+        a.team_id,
+        a.message,
+        a.employee_id,
+        a.created_at,
+        CASE
+            WHEN NOT a.audience_all AND a.audience_team_ids = '{}' AND cardinality(a.audience_employee_ids) = 1 THEN
+                COALESCE(TO_CHAR(rd.last_read_at, 'YYYY-MM-DD HH24:MI:SS'), 'Unread')
+            WHEN COALESCE(rd.read_count, 0) = 0 THEN 'Unread by all recipients'
+            WHEN rd.read_count >= rc.total THEN 'Read by all recipients'
+            ELSE 'Read by ' || rd.read_count || ' of ' || rc.total || ' recipients'
+        END AS status,
+        CASE WHEN a.audience_all THEN 'All teams'
+             ELSE (SELECT string_agg(t.team_name, ', ' ORDER BY t.team_name) FROM teams t
+                   WHERE t.team_id = ANY(a.audience_team_ids))
+        END AS team_name,
+        a.announcement_id
+    FROM page
+    JOIN announcements a ON a.announcement_id = page.announcement_id
+    CROSS JOIN everyone
+    LEFT JOIN recipients r ON r.announcement_id = a.announcement_id
+    CROSS JOIN LATERAL (
+        SELECT CASE WHEN a.audience_all THEN everyone.total ELSE COALESCE(r.total, 0) END AS total
+    ) rc
+    LEFT JOIN reads rd ON rd.announcement_id = a.announcement_id
+    ORDER BY a.created_at DESC, a.announcement_id DESC
+"""
+
+
+# Clamp the ?page= / ?limit= query parameters
+def admin_page_args(page, limit):
+    try:
+        page = max(1, int(page))
+    except (TypeError, ValueError):
+        page = 1
+    try:
+        limit = max(1, min(int(limit), ADMIN_MAX_PAGE_SIZE))
+    except (TypeError, ValueError):
+        limit = ADMIN_PAGE_SIZE
+    return page, limit
+
+
+def get_admin_announcements(page=1, limit=ADMIN_PAGE_SIZE):
+    """(rows, total): one page of the admin overview, newest first, and how many announcements there are."""
+    ensure_announcement_schema()
+    with db_session() as conn, conn.cursor() as cur:
+        cur.execute(ADMIN_LIST_SQL, {'limit': limit, 'offset': (page - 1) * limit})
+        columns = [desc[0] for desc in cur.description]
+        rows = [dict(zip(columns, row)) for row in cur.fetchall()]
+        cur.execute("SELECT COUNT(*) FROM announcements")
+        total = cur.fetchone()[0]
+    return rows, total
@@ -0,0 +1,365 @@
+import logging
+import threading
+
+from routes.Auth.migrations import MigrationError, require_schema
+from routes.Auth.utils import db_session
+
+
+# ======================== Attendance rollups ========================
+# Daily aggregates of attendance_logs so dashboards and reports read one row per day instead of scanning logs:
+#   attendance_rollup_employee  (date, employee_id)  one row per employee with logs that day
+#   attendance_rollup_team      (date, team_id)      sums over the team's employees (team at the time of the log)
+#   attendance_rollup_daily     (date)               sums over everyone
+# Each row keeps headcount (employees clocked in), employee_count (employees with any log), log_count,
+# hours_sum/hours_count (SUM/COUNT of hours_worked, so AVG(hours_worked) = hours_sum / hours_count),
+# overtime_sum and total_hours_sum (SUM(hours_worked + overtime_hours), what the team average is based on).
+#
+# A trigger on attendance_logs recomputes the (employee, date) it touched from the raw logs and applies the
+# difference to the day and team rows. That keeps clock_in, clock_out, breaks, edit_attendance,
+# delete_attendance, leave and absent records (and manual SQL) in step without every write path calling in.
+# Sums are numeric, so repeated +/- never drifts.
+#
+# Rebuild everything (or a date range) after bulk loads with triggers disabled:
+#   python rollups.py rebuild [--start 2024-01-01 --end 2024-12-31]
+
+SCHEMA_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS attendance_rollup_employee (
+        date date NOT NULL,
+        employee_id integer NOT NULL,
+        team_id integer,
+        log_count integer NOT NULL,
+        clocked_in boolean NOT NULL,
+        hours_sum numeric NOT NULL,
+        hours_count integer NOT NULL,
+        overtime_sum numeric NOT NULL,
+        total_hours numeric,
+        PRIMARY KEY (date, employee_id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS attendance_rollup_employee_employee_idx ON attendance_rollup_employee (employee_id, date)",
+    """
+    CREATE TABLE IF NOT EXISTS attendance_rollup_team (
+        date date NOT NULL,
+        team_id integer NOT NULL,
+        headcount integer NOT NULL DEFAULT 0,
+        employee_count integer NOT NULL DEFAULT 0,
+        log_count integer NOT NULL DEFAULT 0,
+        hours_sum numeric NOT NULL DEFAULT 0,
+        hours_count integer NOT NULL DEFAULT 0,
+        overtime_sum numeric NOT NULL DEFAULT 0,
+        total_hours_sum numeric NOT NULL DEFAULT 0,
+        PRIMARY KEY (team_id, date)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS attendance_rollup_daily (
+        date date PRIMARY KEY,
+        headcount integer NOT NULL DEFAULT 0,
+        employee_count integer NOT NULL DEFAULT 0,
+        log_count integer NOT NULL DEFAULT 0,
+        hours_sum numeric NOT NULL DEFAULT 0,
+        hours_count integer NOT NULL DEFAULT 0,
+        overtime_sum numeric NOT NULL DEFAULT 0,
+        total_hours_sum numeric NOT NULL DEFAULT 0
+    )
+    """,
+    # Add (sign = 1) or remove (sign = -1) one employee-day from the day and team totals
+    """
+    CREATE OR REPLACE FUNCTION attendance_rollup_apply(r attendance_rollup_employee, sign integer) RETURNS void
+        LANGUAGE plpgsql
+        AS $$
+    BEGIN
+      INSERT INTO attendance_rollup_daily AS d
+          (date, headcount, employee_count, log_count, hours_sum, hours_count, overtime_sum, total_hours_sum)
+      VALUES (r.date, sign * r.clocked_in::integer, sign, sign * r.log_count, sign * r.hours_sum,
+              sign * r.hours_count, sign * r.overtime_sum, sign * COALESCE(r.total_hours, 0))
+      ON CONFLICT (date) DO UPDATE SET
+          headcount = d.headcount + EXCLUDED.headcount,
+          employee_count = d.employee_count + EXCLUDED.employee_count,
+          log_count = d.log_count + EXCLUDED.log_count,
+          hours_sum = d.hours_sum + EXCLUDED.hours_sum,
+          hours_count = d.hours_count + EXCLUDED.hours_count,
+          overtime_sum = d.overtime_sum + EXCLUDED.overtime_sum,
+          total_hours_sum = d.total_hours_sum + EXCLUDED.total_hours_sum;
+      IF r.team_id IS NOT NULL THEN
+        INSERT INTO attendance_rollup_team AS t
+            (date, team_id, headcount, employee_count, log_count, hours_sum, hours_count, overtime_sum, total_hours_sum)
+        VALUES (r.date, r.team_id, sign * r.clocked_in::integer, sign, sign * r.log_count, sign * r.hours_sum,
+                sign * r.hours_count, sign * r.overtime_sum, sign * COALESCE(r.total_hours, 0))
+        ON CONFLICT (team_id, date) DO UPDATE SET
+            headcount = t.headcount + EXCLUDED.headcount,
+            employee_count = t.employee_count + EXCLUDED.employee_count,
+            log_count = t.log_count + EXCLUDED.log_count,
+            hours_sum = t.hours_sum + EXCLUDED.hours_sum,
+            hours_count = t.hours_count + EXCLUDED.hours_count,
+            overtime_sum = t.overtime_sum + EXCLUDED.overtime_sum,
+            total_hours_sum = t.total_hours_sum + EXCLUDED.total_hours_sum;
+      END IF;
+    END;
+    $$
+    """,
+    # Recompute one employee-day from attendance_logs and move the totals by the difference
+    """
+    CREATE OR REPLACE FUNCTION attendance_rollup_refresh(p_employee_id integer, p_date date) RETURNS void
+        LANGUAGE plpgsql
+        AS $$
+    DECLARE
+      old_row attendance_rollup_employee;
+      new_row attendance_rollup_employee;
+    BEGIN
+      -- Serialize writers of the same employee-day so each one recomputes from committed logs
+      PERFORM pg_advisory_xact_lock(p_employee_id, p_date - DATE '2000-01-01');
+      SELECT * INTO old_row FROM attendance_rollup_employee WHERE date = p_date AND employee_id = p_employee_id;
+      SELECT p_date, p_employee_id, (SELECT team_id FROM employees WHERE employee_id = p_employee_id),
+             COUNT(*), COALESCE(BOOL_OR(clock_in_time IS NOT NULL), FALSE),
+             COALESCE(SUM(hours_worked::numeric), 0), COUNT(hours_worked),
+             COALESCE(SUM(overtime_hours::numeric), 0), SUM((hours_worked + overtime_hours)::numeric)
+        INTO new_row
+        FROM attendance_logs WHERE employee_id = p_employee_id AND date = p_date;
+      IF old_row.employee_id IS NOT NULL THEN
+        IF old_row IS NOT DISTINCT FROM new_row THEN
+          RETURN;
+        END IF;
+        PERFORM attendance_rollup_apply(old_row, -1);
+        DELETE FROM attendance_rollup_employee WHERE date = p_date AND employee_id = p_employee_id;
+      END IF;
+      IF new_row.log_count > 0 THEN
+        INSERT INTO attendance_rollup_employee SELECT new_row.*;
+        PERFORM attendance_rollup_apply(new_row, 1);
+      END IF;
+    END;
+    $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION attendance_rollup_trigger() RETURNS trigger
+        LANGUAGE plpgsql
+        AS $$
+    BEGIN
+      IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM attendance_rollup_refresh(OLD.employee_id, OLD.date);
+      END IF;
+      IF TG_OP = 'INSERT' OR (TG_OP = 'UPDATE' AND (NEW.employee_id, NEW.date) IS DISTINCT FROM (OLD.employee_id, OLD.date)) THEN
+        PERFORM attendance_rollup_refresh(NEW.employee_id, NEW.date);
+      END IF;
+      RETURN NULL;
+    END;
+    $$
+    """,
+]
+
+# Created (with a full rebuild) only when missing, under a lock so no log slips in between
+TRIGGER_SQL = [
+    "LOCK TABLE attendance_logs IN SHARE ROW EXCLUSIVE MODE",
+    "DROP TRIGGER IF EXISTS attendance_rollup_ins_del ON attendance_logs",
+    "DROP TRIGGER IF EXISTS attendance_rollup_upd ON attendance_logs",
+    """
+    CREATE TRIGGER attendance_rollup_ins_del AFTER INSERT OR DELETE ON attendance_logs
+    FOR EACH ROW EXECUTE FUNCTION attendance_rollup_trigger()
+    """,
+    # Verification/approval flags and remarks don't change any total
+    """
+    CREATE TRIGGER attendance_rollup_upd
+    AFTER UPDATE OF employee_id, date, clock_in_time, hours_worked, overtime_hours ON attendance_logs
+    FOR EACH ROW
+    WHEN ((OLD.employee_id, OLD.date, OLD.clock_in_time, OLD.hours_worked, OLD.overtime_hours)
+          IS DISTINCT FROM (NEW.employee_id, NEW.date, NEW.clock_in_time, NEW.hours_worked, NEW.overtime_hours))
+    EXECUTE FUNCTION attendance_rollup_trigger()
+    """,
+]
+
+
+# Date range filter; %(start)s / %(end)s may be NULL for "no bound"
+def _range(column='date'):
+    return f"(%(start)s::date IS NULL OR {column} >= %(start)s::date) AND (%(end)s::date IS NULL OR {column} <= %(end)s::date)"
+
+
+RANGE_CONDITION = _range()
+
+REBUILD_SQL = [
+    f"DELETE FROM attendance_rollup_employee WHERE {RANGE_CONDITION}",
+    f"DELETE FROM attendance_rollup_team WHERE {RANGE_CONDITION}",
+    f"DELETE FROM attendance_rollup_daily WHERE {RANGE_CONDITION}",
+    f"""
+    INSERT INTO attendance_rollup_employee
+    SELECT al.date, al.employee_id, e.team_id,
+           COUNT(*), BOOL_OR(al.clock_in_time IS NOT NULL),
+           COALESCE(SUM(al.hours_worked::numeric), 0), COUNT(al.hours_worked),
+           COALESCE(SUM(al.overtime_hours::numeric), 0), SUM((al.hours_worked + al.overtime_hours)::numeric)
+    FROM attendance_logs al
+    LEFT JOIN employees e ON e.employee_id = al.employee_id
+    WHERE {_range('al.date')}
+    GROUP BY al.date, al.employee_id, e.team_id
+    """,
+    f"""
+    INSERT INTO attendance_rollup_daily
+    SELECT date, COUNT(*) FILTER (WHERE clocked_in), COUNT(*), SUM(log_count), SUM(hours_sum), SUM(hours_count),
+           SUM(overtime_sum), COALESCE(SUM(total_hours), 0)
+    FROM attendance_rollup_employee
+    WHERE {RANGE_CONDITION}
+    GROUP BY date
+    """,
+    f"""
+    INSERT INTO attendance_rollup_team
+    SELECT date, team_id, COUNT(*) FILTER (WHERE clocked_in), COUNT(*), SUM(log_count), SUM(hours_sum),
+           SUM(hours_count), SUM(overtime_sum), COALESCE(SUM(total_hours), 0)
+    FROM attendance_rollup_employee
+    WHERE team_id IS NOT NULL AND {RANGE_CONDITION}
+    GROUP BY date, team_id
+    """,
+]
+
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+
+# Create the rollup tables, functions and triggers if they don't exist yet (migrations/0004_attendance_rollups.py)
+def install_attendance_rollup_schema(cur):
+    for statement in SCHEMA_SQL:
+        cur.execute(statement)
+    cur.execute("SELECT 1 FROM pg_trigger WHERE tgname = 'attendance_rollup_upd'")
+    if cur.fetchone() is None:
+        logging.info("[ROLLUPS] Installing attendance rollup triggers and backfilling from attendance_logs")
+        for statement in TRIGGER_SQL:
+            cur.execute(statement)
+        _rebuild(cur, None, None)
+
+
+# Check once per process that migrations/0004_attendance_rollups.py has run; the request path never runs the DDL
+# (nor the backfill: that is `python migrate.py` / `python rollups.py rebuild`)
+def ensure_attendance_rollup_schema():
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if _schema_ready:
+            return
+        with db_session() as conn, conn.cursor() as cur:
+            require_schema(cur, '0004_attendance_rollups',
+                           relations=('attendance_rollup_employee', 'attendance_rollup_team', 'attendance_rollup_daily',
+                                      'attendance_rollup_employee_employee_idx'),
+                           functions=('attendance_rollup_refresh', 'attendance_rollup_trigger'))
+            cur.execute("""
+                SELECT name FROM unnest(ARRAY['attendance_rollup_ins_del', 'attendance_rollup_upd']) AS name
+                WHERE NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = name)
+            """)
+            missing = [row[0] for row in cur.fetchall()]
+            if missing:
+                raise MigrationError(f"Missing trigger {', '.join(missing)}: run `python migrate.py` (migration 0004_attendance_rollups)")
+        _schema_ready = True
+
+
+def _rebuild(cur, start, end):
+    params = {'start': start, 'end': end}
+    for statement in REBUILD_SQL:
+        cur.execute(statement, params)
+
+
+def rebuild_attendance_rollups(start=None, end=None):
+    """
+    Recompute the rollups for [start, end] (whole history by default) from attendance_logs.
+    Attendance writes wait while it runs. Returns the number of days rebuilt.
+    """
+    ensure_attendance_rollup_schema()
+    with db_session() as conn, conn.cursor() as cur:
+        cur.execute("LOCK TABLE attendance_logs IN SHARE ROW EXCLUSIVE MODE")
+        _rebuild(cur, start, end)
+        cur.execute(f"SELECT COUNT(*) FROM attendance_rollup_daily WHERE {RANGE_CONDITION}", {'start': start, 'end': end})
+        return cur.fetchone()[0]
+
+
+def check_attendance_rollups(start=None, end=None):
+    """Days in [start, end] where attendance_rollup_daily disagrees with attendance_logs: [(date, rollup, actual)]."""
+    ensure_attendance_rollup_schema()
+    params = {'start': start, 'end': end}
+    with db_session() as conn, conn.cursor() as cur:
+        cur.execute(f"""
+            WITH actual AS (
+                SELECT date, COUNT(DISTINCT employee_id) FILTER (WHERE clock_in_time IS NOT NULL) AS headcount,
+                       COUNT(*) AS log_count, COALESCE(SUM(hours_worked::numeric), 0) AS hours_sum
+                FROM attendance_logs WHERE {RANGE_CONDITION} GROUP BY date
+            ), rollup AS (
+                SELECT date, headcount, log_count, hours_sum
+                FROM attendance_rollup_daily WHERE log_count > 0 AND {RANGE_CONDITION}
+            )
+            SELECT COALESCE(a.date, r.date), (r.headcount, r.log_count, r.hours_sum)::text,
+                   (a.headcount, a.log_count, a.hours_sum)::text
+            FROM actual a FULL JOIN rollup r ON r.date = a.date
+            WHERE (a.headcount, a.log_count, a.hours_sum) IS DISTINCT FROM (r.headcount, r.log_count, r.hours_sum)
+            ORDER BY 1
+        """, params)
+        return cur.fetchall()
+
+
+# ---------------- Reads ----------------
+
+# Employees clocked in on a day
+def get_clocked_in_count(day):
+    ensure_attendance_rollup_schema()
+    with db_session() as conn, conn.cursor() as cur:
+        cur.execute("SELECT headcount FROM attendance_rollup_daily WHERE date = %s", (day,))
+        row = cur.fetchone()
+    return row[0] if row else 0
+
+
+# [(date, employees with a log)] for each day with logs, oldest first
+def get_attendance_trend(start, end=None):
+    ensure_attendance_rollup_schema()
+    with db_session() as conn, conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT date, employee_count FROM attendance_rollup_daily
+            WHERE employee_count > 0 AND {RANGE_CONDITION}
+            ORDER BY date
+        """, {'start': start, 'end': end})
+        return cur.fetchall()
+
+
+# [(date, AVG(hours_worked))] per day, for the whole company or one team; pass `cur` to run it on a
+# connection the caller already holds (the report engine's builders)
+def get_average_hours(start, end, team_id=None, cur=None):
+    if cur is None:
+        ensure_attendance_rollup_schema()
+        with db_session() as conn, conn.cursor() as cur:
+            return get_average_hours(start, end, team_id, cur)
+    params = {'start': start, 'end': end, 'team_id': team_id}
+    table = 'attendance_rollup_daily'
+    team_condition = ''
+    if team_id is not None:
+        table = 'attendance_rollup_team'
+        team_condition = 'AND team_id = %(team_id)s'
+    cur.execute(f"""
+        SELECT date, (hours_sum / hours_count)::float
+        FROM {table}
+        WHERE hours_count > 0 {team_condition} AND {RANGE_CONDITION}
+        ORDER BY date
+    """, params)
+    return cur.fetchall()
+
+
+# SUM(hours_worked + overtime_hours) for one employee over [start, end]
+def get_employee_total_hours(employee_id, start, end):
+    ensure_attendance_rollup_schema()
+    with db_session() as conn, conn.cursor() as cur:
+        cur.execute("""
+            SELECT COALESCE(SUM(total_hours), 0)::float
+            FROM attendance_rollup_employee
+            WHERE employee_id = %s AND date BETWEEN %s AND %s
+        """, (employee_id, start, end))
+        return cur.fetchone()[0]
+
+
+# Average per-employee SUM(hours_worked + overtime_hours) over [start, end] for the team's current members
+def get_team_average_hours(team_id, start, end):
+    ensure_attendance_rollup_schema()
+    with db_session() as conn, conn.cursor() as cur:
+        cur.execute("""
+            SELECT COALESCE(AVG(total_hours), 0)::float
+            FROM (
+                SELECT SUM(r.total_hours) AS total_hours
+                FROM attendance_rollup_employee r
+                JOIN employees e ON e.employee_id = r.employee_id
+                WHERE e.team_id = %s AND r.date BETWEEN %s AND %s
+                GROUP BY r.employee_id
+            ) AS team_totals
+        """, (team_id, start, end))
+        return cur.fetchone()[0]
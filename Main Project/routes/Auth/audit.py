@@ -1,7 +1,38 @@
-from .utils import get_db_connection, get_role_name
+from .audit_writer import (
+    ADMIN_AUDIT, ADMIN_INCIDENT, AUDIT_ASYNC, AUDIT_SYNC_ACTIONS, AUDIT_SYNC_SEVERITIES, EMPLOYEE_AUDIT, EMPLOYEE_INCIDENT,
+    audit_writer, get_cached_role_id, get_cached_role_name, record_time, write_records,
+)
+from .utils import db_session
+
+# Audit and incident records are queued and written in batches by routes/Auth/audit_writer.py.
+# Pass critical=True (or use an action in AUDIT_SYNC_ACTIONS / an incident severity of High or Critical) to write the record synchronously:
+# audit rows inside the request's transaction, so they commit or roll back together with the action they describe,
+# incidents in their own transaction, so they are kept when the request rolls back.
+
+
+# Incidents are usually logged about a failure whose transaction is about to roll back, so they commit on their own
+DETACHED_KINDS = {ADMIN_INCIDENT, EMPLOYEE_INCIDENT}
+
+
+# Write one record right away (audit rows in the request's unit of work when called from a view)
+def _write_now(kind, values):
+    detached = kind in DETACHED_KINDS
+    with db_session(savepoint=True, detached=detached) as conn, conn.cursor() as cursor:
+        if detached:
+            # never wait forever on locks the request's own transaction holds
+            cursor.execute("SET LOCAL lock_timeout = '5s'")
+        return write_records(cursor, kind, [values]) > 0
+
+
+# Queue a record, or write it synchronously when it's critical, async is off or the queue is full
+def _submit(kind, values, critical):
+    if not critical and AUDIT_ASYNC and audit_writer.enqueue(kind, values):
+        return None
+    return _write_now(kind, values)
+
 
 # Log a security or compliance incident by admin or super admin
-def log_incident(admin_id, role, description, severity, status="Open"):
+def log_incident(admin_id, role, description, severity, status="Open", critical=None):
     """Logs a security or compliance incident."""
     try:
         # Validate role before proceeding
@@ -9,152 +40,76 @@ def log_incident(admin_id, role, description, severity, status="Open"):
             print("⚠️ Invalid role detected, skipping incident log.")
             return  # Prevent logging invalid roles
 
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        super_admin_id = None  # Default
-        normal_admin_id = None  # Default
-
-        if role == "super_admin":
-            # Check if the user exists in super_admins table
-            cursor.execute("SELECT super_admin_id FROM super_admins WHERE super_admin_id = %s", (admin_id,))
-            super_admin_exists = cursor.fetchone()
-            if super_admin_exists:
-                super_admin_id = admin_id  # Store in correct column
-            else:
-                print(f"⚠️ Super Admin ID {admin_id} not found, skipping incident log.")
-                return  # Prevent logging
-
-        else:  # role == "admin"
-            # Check if the user exists in admins table
-            cursor.execute("SELECT admin_id FROM admins WHERE admin_id = %s", (admin_id,))
-            admin_exists = cursor.fetchone()
-            if admin_exists:
-                normal_admin_id = admin_id  # Store in correct column
-            else:
-                print(f"⚠️ Admin ID {admin_id} not found, skipping incident log.")
-                return  # Prevent logging
-
-        # Insert incident log with correct column
-        cursor.execute("""
-            INSERT INTO incident_logs (admin_id, super_admin_id, role, description, severity, status, timestamp)
-            VALUES (%s, %s, %s, %s, %s, %s, NOW())
-        """, (normal_admin_id, super_admin_id, role, description, severity, status))
-
-        conn.commit()
-        print(f"🚨 Incident logged: {description} (Severity: {severity})")
+        if critical is None:
+            critical = severity in AUDIT_SYNC_SEVERITIES
+
+        # The admin/super admin existence check is part of the INSERT ... SELECT
+        written = _submit(ADMIN_INCIDENT, (admin_id, role, description, severity, status, record_time()), critical)
+        if written is False:
+            print(f"⚠️ {role} ID {admin_id} not found, skipping incident log.")
+        elif written:
+            print(f"🚨 Incident logged: {description} (Severity: {severity})")
 
     except Exception as e:
         print(f"❌ Incident Log Error: {e}")
 
-    finally:
-        cursor.close()
-        conn.close()
-
 # Log an audit trail action by admin or super admin
-def log_audit(admin_id,role, action, details):
+def log_audit(admin_id,role, action, details, critical=False):
     """Logs an admin or super_admin action in the audit trail."""
     try:
         # Convert role_id to role_name if role is an integer
         if isinstance(role, int):
-            role = get_role_name(role)
+            role = get_cached_role_name(role)
             if role is None:
                 print(f"⚠️ Invalid role ID {role}, skipping audit log.")
-                return  
+                return
 
         role = role.lower().strip()  # Normalize role to lowercase
 
         valid_roles = ["admin", "super_admin", "manager", "hr"]
         if role not in valid_roles:
             print(f"⚠️ Invalid role detected ({role}), skipping audit log.")
-            return  
-
-        conn = get_db_connection()
-        cursor = conn.cursor()
+            return
 
-        cursor.execute("SELECT role_id FROM roles WHERE role_name = %s", (role,))
-        role_id = cursor.fetchone()
+        role_id = get_cached_role_id(role)
         if not role_id:
             print(f"⚠️ Role {role} not found in roles table, skipping audit log.")
-            return  
-
-        cursor.execute("""
-            INSERT INTO audit_trail_admin (role_id, action, details, timestamp,compliance_status)
-            VALUES (%s, %s, %s, NOW(),'Active')
-        """, (role_id[0], action, details))
+            return
 
-        conn.commit()
-        print(f"📝 Audit log recorded: {action} - {details}")
+        critical = critical or action in AUDIT_SYNC_ACTIONS
+        if _submit(ADMIN_AUDIT, (role_id, action, details, record_time()), critical):
+            print(f"📝 Audit log recorded: {action} - {details}")
 
     except Exception as e:
         print(f"🚨 Audit Log Error: {e}")
 
-    finally:
-        if 'cursor' in locals():
-            cursor.close()
-        if 'conn' in locals():
-            conn.close()
-
 
 # Log an audit trail action by employee
-def log_employee_audit(employee_id, action, details):
+def log_employee_audit(employee_id, action, details, critical=False):
     """Logs an employee action in the audit trail."""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        # Verify employee exists
-        cursor.execute("SELECT employee_id FROM employees WHERE employee_id = %s", (employee_id,))
-        employee_exists = cursor.fetchone()
-        if not employee_exists:
+        # The employee existence check is part of the INSERT ... SELECT
+        written = _submit(EMPLOYEE_AUDIT, (employee_id, action, details, record_time()), critical)
+        if written is False:
             print(f"⚠️ Employee ID {employee_id} not found, skipping audit log.")
-            return
-
-        cursor.execute("""
-            INSERT INTO audit_trail_employee (employee_id, action, details, timestamp, compliance_status)
-            VALUES (%s, %s, %s, NOW(), 'Active')
-        """, (employee_id, action, details))
-
-        conn.commit()
-        print(f"📝 Employee audit log recorded: {action} - {details}")
+        elif written:
+            print(f"📝 Employee audit log recorded: {action} - {details}")
 
     except Exception as e:
         print(f"🚨 Employee Audit Log Error: {e}")
 
-    finally:
-        if 'cursor' in locals():
-            cursor.close()
-        if 'conn' in locals():
-            conn.close()
-
 # Log a security or compliance incident by employee
-def log_employee_incident(employee_id, description, severity, status="Open"):
+def log_employee_incident(employee_id, description, severity, status="Open", critical=None):
     """Logs a security or compliance incident involving an employee."""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        if critical is None:
+            critical = severity in AUDIT_SYNC_SEVERITIES
 
-        # Verify employee exists
-        cursor.execute("SELECT employee_id FROM employees WHERE employee_id = %s", (employee_id,))
-        employee_exists = cursor.fetchone()
-        if not employee_exists:
+        written = _submit(EMPLOYEE_INCIDENT, (employee_id, description, severity, status, record_time()), critical)
+        if written is False:
             print(f"⚠️ Employee ID {employee_id} not found, skipping incident log.")
-            return
-
-        # Insert incident log
-        cursor.execute("""
-            INSERT INTO incident_logs_employee (employee_id, incident_type, description, severity_level, status, reported_at, timestamp)
-            VALUES (%s, %s, %s, %s, %s, NOW(), NOW())
-        """, (employee_id, "system", description, severity, status))
-
-        conn.commit()
-        print(f"🚨 Employee incident logged: {description} (Severity: {severity})")
+        elif written:
+            print(f"🚨 Employee incident logged: {description} (Severity: {severity})")
 
     except Exception as e:
         print(f"❌ Employee Incident Log Error: {e}")
-
-    finally:
-        if 'cursor' in locals():
-            cursor.close()
-        if 'conn' in locals():
-            conn.close()
\ No newline at end of file
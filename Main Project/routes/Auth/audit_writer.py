@@ -0,0 +1,271 @@
+import atexit
+from datetime import datetime
+import logging
+import os
+import queue
+import threading
+import time
+
+from psycopg2.extras import execute_values
+
+from .utils import db_session
+
+
+# ======================== Background audit / incident writer ========================
+# log_audit, log_employee_audit, log_incident and log_employee_incident (routes/Auth/audit.py) put
+# records on a bounded in-memory queue. A daemon thread drains it and writes multi-row INSERTs to
+# audit_trail_admin, audit_trail_employee, incident_logs and incident_logs_employee every
+# AUDIT_FLUSH_INTERVAL seconds or as soon as AUDIT_BATCH_SIZE records are waiting. The
+# "does this admin/employee exist" checks are done by the INSERT ... SELECT itself.
+#
+# Compliance-critical records (critical=True, actions in AUDIT_SYNC_ACTIONS, incidents with a severity in AUDIT_SYNC_SEVERITIES)
+# and every record when AUDIT_ASYNC=0 are still written synchronously inside the request.
+
+AUDIT_ASYNC = os.getenv('AUDIT_ASYNC', '1') == '1'
+AUDIT_QUEUE_SIZE = int(os.getenv('AUDIT_QUEUE_SIZE', 10000))
+AUDIT_BATCH_SIZE = int(os.getenv('AUDIT_BATCH_SIZE', 500))
+AUDIT_FLUSH_INTERVAL = float(os.getenv('AUDIT_FLUSH_INTERVAL', 1.0))  # seconds
+AUDIT_ENQUEUE_TIMEOUT = float(os.getenv('AUDIT_ENQUEUE_TIMEOUT', 0.2))  # seconds to wait on a full queue before writing synchronously
+AUDIT_SYNC_SEVERITIES = {'High', 'Critical'}
+# Admin actions whose audit row must commit together with the change itself
+AUDIT_SYNC_ACTIONS = {
+    'grant_access', 'remove_access', 'verify_admin', 'reject_admin', 'delete_admin',
+    'delete_employee', 'terminate_employee', 'activate_employee', 'deactivate_employee',
+    'restore_backup', 'delete_backup',
+}
+ROLE_CACHE_TTL = float(os.getenv('ROLE_CACHE_TTL', 300))  # seconds
+
+# Record kinds
+ADMIN_AUDIT = 'admin_audit'
+EMPLOYEE_AUDIT = 'employee_audit'
+ADMIN_INCIDENT = 'admin_incident'
+EMPLOYEE_INCIDENT = 'employee_incident'
+
+
+# ---------- role_name <-> role_id cache ----------
+
+_roles = {'expires_at': 0.0, 'by_name': {}, 'by_id': {}}
+_roles_lock = threading.Lock()
+
+
+def _load_roles():
+    with _roles_lock:
+        if _roles['expires_at'] > time.monotonic():
+            return _roles
+    with db_session() as conn, conn.cursor() as cur:
+        cur.execute("SELECT role_id, role_name FROM roles")
+        rows = cur.fetchall()
+    with _roles_lock:
+        _roles['by_name'] = {name: role_id for role_id, name in rows}
+        _roles['by_id'] = {role_id: name for role_id, name in rows}
+        _roles['expires_at'] = time.monotonic() + ROLE_CACHE_TTL
+    return _roles
+
+
+# Cached role_name -> role_id lookup (None if the role doesn't exist)
+def get_cached_role_id(role_name):
+    return _load_roles()['by_name'].get(role_name)
+
+
+# Cached role_id -> role_name lookup (None if the role doesn't exist)
+def get_cached_role_name(role_id):
+    return _load_roles()['by_id'].get(role_id)
+
+
+# Call after creating/renaming/deleting roles
+def invalidate_role_cache():
+    with _roles_lock:
+        _roles['expires_at'] = 0.0
+
+
+# ---------- batch INSERT statements ----------
+
+_INSERT_SQL = {
+    ADMIN_AUDIT: (
+        """
+        INSERT INTO audit_trail_admin (role_id, action, details, timestamp, compliance_status)
+        VALUES %s
+        """,
+        "(%s, %s, %s, %s, 'Active')",
+    ),
+    EMPLOYEE_AUDIT: (
+        """
+        INSERT INTO audit_trail_employee (employee_id, action, details, timestamp, compliance_status)
+        SELECT e.employee_id, v.action, v.details, v.ts, 'Active'
+        FROM (VALUES %s) AS v(employee_id, action, details, ts)
+        JOIN employees e ON e.employee_id = v.employee_id
+        """,
+        "(%s::integer, %s, %s, %s::timestamp)",
+    ),
+    ADMIN_INCIDENT: (
+        """
+        INSERT INTO incident_logs (admin_id, super_admin_id, role, description, severity, status, timestamp)
+        SELECT a.admin_id, s.super_admin_id, v.role, v.description, v.severity, v.status, v.ts
+        FROM (VALUES %s) AS v(id, role, description, severity, status, ts)
+        LEFT JOIN admins a ON v.role = 'admin' AND a.admin_id = v.id
+        LEFT JOIN super_admins s ON v.role = 'super_admin' AND s.super_admin_id = v.id
+        WHERE a.admin_id IS NOT NULL OR s.super_admin_id IS NOT NULL
+        """,
+        "(%s::integer, %s, %s, %s, %s, %s::timestamp)",
+    ),
+    EMPLOYEE_INCIDENT: (
+        """
+        INSERT INTO incident_logs_employee (employee_id, incident_type, description, severity_level, status, reported_at, timestamp)
+        SELECT e.employee_id, 'system', v.description, v.severity, v.status, v.ts, v.ts
+        FROM (VALUES %s) AS v(employee_id, description, severity, status, ts)
+        JOIN employees e ON e.employee_id = v.employee_id
+        """,
+        "(%s::integer, %s, %s, %s, %s::timestamp)",
+    ),
+}
+
+
+# Write one group of records of the same kind with a multi-row INSERT
+def write_records(cursor, kind, rows):
+    sql, template = _INSERT_SQL[kind]
+    execute_values(cursor, sql, rows, template=template, page_size=AUDIT_BATCH_SIZE)
+    return cursor.rowcount
+
+
+class AuditWriter:
+    """Bounded queue + background flusher for audit and incident records."""
+
+    def __init__(self, maxsize=AUDIT_QUEUE_SIZE, batch_size=AUDIT_BATCH_SIZE, flush_interval=AUDIT_FLUSH_INTERVAL):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self.metrics = {
+            'enqueued': 0,
+            'written': 0,
+            'skipped': 0,  # admin/employee no longer exists
+            'failed': 0,
+            'batches': 0,
+            'queue_full': 0,
+            'last_flush_seconds': 0.0,
+        }
+
+    def _ensure_started(self):
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != pid or not self._thread.is_alive():
+                if self._pid != pid:
+                    # Forked worker: the parent's queue and thread don't exist here
+                    self._queue = queue.Queue(maxsize=self._queue.maxsize)
+                self._pid = pid
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+                self._thread.start()
+
+    def enqueue(self, kind, values):
+        """Queue a record; returns False when the queue stayed full (the caller then writes it synchronously)."""
+        self._ensure_started()
+        try:
+            self._queue.put((kind, values), timeout=AUDIT_ENQUEUE_TIMEOUT)
+        except queue.Full:
+            self.metrics['queue_full'] += 1
+            return False
+        self.metrics['enqueued'] += 1
+        return True
+
+    def _run(self):
+        while not self._stopping.is_set():
+            batch = self._collect()
+            if batch:
+                self._flush(batch)
+        # Drain whatever is left on shutdown
+        while True:
+            batch = self._collect(block=False)
+            if not batch:
+                break
+            self._flush(batch)
+
+    def _collect(self, block=True):
+        batch = []
+        try:
+            batch.append(self._queue.get(timeout=self.flush_interval) if block else self._queue.get_nowait())
+        except queue.Empty:
+            return batch
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _flush(self, batch):
+        started = time.monotonic()
+        grouped = {}
+        for kind, values in batch:
+            grouped.setdefault(kind, []).append(values)
+        try:
+            try:
+                with db_session() as conn, conn.cursor() as cur:
+                    for kind, rows in grouped.items():
+                        written = write_records(cur, kind, rows)
+                        self.metrics['written'] += written
+                        self.metrics['skipped'] += len(rows) - written
+            except Exception as e:
+                logging.error(f"[AUDIT WRITER] Batch of {len(batch)} failed, retrying one by one: {e}")
+                self._flush_one_by_one(grouped)
+        finally:
+            # Only now are these records done: flush() waits for this, not for the queue to look empty
+            for _ in batch:
+                self._queue.task_done()
+        self.metrics['batches'] += 1
+        self.metrics['last_flush_seconds'] = time.monotonic() - started
+
+    def _flush_one_by_one(self, grouped):
+        for kind, rows in grouped.items():
+            for values in rows:
+                try:
+                    with db_session() as conn, conn.cursor() as cur:
+                        written = write_records(cur, kind, [values])
+                    self.metrics['written'] += written
+                    self.metrics['skipped'] += 1 - written
+                except Exception as e:
+                    self.metrics['failed'] += 1
+                    print(f"🚨 Audit Writer Error ({kind}): {e} - record dropped: {values}")
+
+    def flush(self, timeout=5.0):
+        """
+        Block until everything queued so far has been written, including a batch the writer thread has
+        already taken off the queue (Queue.join() with a timeout). Returns False if the timeout ran out.
+        """
+        deadline = time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def stop(self, timeout=5.0):
+        self._stopping.set()
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            self._thread.join(timeout)
+
+    def stats(self):
+        stats = dict(self.metrics)
+        stats['queue_depth'] = self._queue.qsize()
+        stats['queue_max'] = self._queue.maxsize
+        return stats
+
+
+audit_writer = AuditWriter()
+atexit.register(audit_writer.stop)
+
+
+# Current time for queued records, so the row keeps the time of the action rather than of the flush
+def record_time():
+    return datetime.now()
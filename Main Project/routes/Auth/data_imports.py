@@ -1,12 +1,16 @@
-import io
+import codecs
 import csv
 import logging
-import bcrypt
 import re
 from datetime import datetime
 from typing import List, Dict, Any, Optional, Tuple
 from flask import request, jsonify
+from psycopg2.extras import execute_values
 from routes.Auth.config import get_db_connection
+from routes.Auth.password_hashing import hash_passwords
+
+# Rows loaded per multi-row INSERT (and per commit) in bulk mode
+BULK_IMPORT_CHUNK_SIZE = 5000
 
 
 class ImportResult:
@@ -69,8 +73,20 @@ class ValidationUtils:
 
 class BaseImportService:
     """Base service class for handling CSV imports"""
+
+    # Imports are bulk by default (set-based duplicate check + multi-row INSERTs, one commit per chunk).
+    # A service whose insert_record() does more than a single-table INSERT sets bulk_import = False and is
+    # imported row by row through insert_record().
+    bulk_import: bool = True
+    # Columns written by the bulk loader, in order; each one must be a key of the dict returned by process_data.
+    # None uses the keys of that dict as they are.
+    insert_columns: Optional[List[str]] = None
+    bulk_chunk_size: int = BULK_IMPORT_CHUNK_SIZE
+    # Fields holding plain-text passwords; they are bcrypt-hashed in parallel batches right before insert
+    # (after validation and duplicate checks, so skipped rows are never hashed)
+    password_fields: List[str] = []
     
-    def __init__(self, table_name: str, expected_columns: int, unique_field: str):
+    def __init__(self, table_name: str, expected_columns: int, unique_field):
         self.table_name = table_name
         self.expected_columns = expected_columns
         self.unique_field = unique_field
@@ -82,10 +98,39 @@ class BaseImportService:
             return False, "No file uploaded or selected"
         return True, ""
     
+    def check_file(self, file) -> Tuple[bool, str]:
+        """
+        Decode and parse the whole upload once before anything is written, so a bad UTF-8 byte or a broken
+        CSV line near the end is reported up front instead of failing after earlier chunks were committed
+        """
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        line_number = 1
+        for block in iter(lambda: file.stream.read(1024 * 1024), b''):
+            try:
+                decoder.decode(block)
+            except UnicodeDecodeError as e:
+                line_number += block[:e.start].count(b'\n')
+                return False, f"Line {line_number}: file is not valid UTF-8 ({e.reason}). Nothing was imported."
+            line_number += block.count(b'\n')
+        try:
+            decoder.decode(b'', final=True)
+        except UnicodeDecodeError:
+            return False, f"Line {line_number}: file ends in the middle of a UTF-8 character. Nothing was imported."
+        file.stream.seek(0)
+
+        csv_reader = csv.reader(codecs.getreader("utf-8")(file.stream))
+        try:
+            for _ in csv_reader:
+                pass
+        except csv.Error as e:
+            return False, f"Line {csv_reader.line_num}: invalid CSV ({e}). Nothing was imported."
+        file.stream.seek(0)
+        return True, ""
+
     def setup_csv_reader(self, file):
-        """Setup CSV reader and skip header"""
+        """Setup CSV reader and skip header (the upload is decoded and parsed as a stream, not read into memory)"""
         try:
-            stream = io.StringIO(file.stream.read().decode("UTF8"), newline=None)
+            stream = codecs.getreader("utf-8")(file.stream)
             csv_reader = csv.reader(stream)
             
             try:
@@ -106,6 +151,42 @@ class BaseImportService:
             return False
         return True
     
+    def unique_fields(self) -> List[str]:
+        """unique_field as a list (it can be a single column name or a list of them)"""
+        if not self.unique_field:
+            return []
+        if isinstance(self.unique_field, (list, tuple)):
+            return list(self.unique_field)
+        return [self.unique_field]
+
+    def unique_key(self, processed_data: Dict[str, Any]) -> Optional[Tuple]:
+        """Values of the unique field(s) for a row, or None if any of them is empty (no duplicate check)"""
+        fields = self.unique_fields()
+        key = tuple(processed_data.get(field) for field in fields)
+        if not fields or not all(key):
+            return None
+        return key
+
+    def duplicate_message(self, key: Tuple) -> str:
+        if len(key) == 1:
+            return f"Duplicate {self.unique_field} '{key[0]}'. Skipped."
+        values = ", ".join(f"{field}='{value}'" for field, value in zip(self.unique_fields(), key))
+        return f"Duplicate ({values}). Skipped."
+
+    def find_existing(self, cursor, keys: List[Tuple]) -> set:
+        """One set-based query: which of these unique keys already exist in the table"""
+        if not keys:
+            return set()
+        columns = ", ".join(self.unique_fields())
+        rows = execute_values(
+            cursor,
+            f"SELECT {columns} FROM {self.table_name} WHERE ({columns}) IN (VALUES %s)",
+            keys,
+            page_size=len(keys),
+            fetch=True
+        )
+        return {tuple(row) for row in rows}
+
     def check_duplicate(self, cursor, unique_value: str, line_number: int) -> bool:
         """Check for duplicate records"""
         try:
@@ -133,11 +214,91 @@ class BaseImportService:
         """
         raise NotImplementedError("Subclasses must implement insert_record method")
     
+    def hash_password_fields(self, rows: List[Tuple[int, Dict[str, Any]]]):
+        """Replace every password field of these rows with its bcrypt hash, using the hashing pool"""
+        for field in self.password_fields:
+            targets = [data for _, data in rows if data.get(field)]
+            for data, hashed in zip(targets, hash_passwords([data[field] for data in targets])):
+                data[field] = hashed
+
+    def insert_records(self, cursor, rows: List[Tuple[int, Dict[str, Any]]]):
+        """
+        Bulk-insert a chunk of (line_number, processed_data) rows with multi-row INSERTs.
+        If the chunk fails (e.g. a constraint violation), it is retried row by row through insert_record()
+        so every bad row still gets its own error line in ImportResult.
+        """
+        if not rows:
+            return
+        insert_columns = self.insert_columns or list(rows[0][1])
+        columns = ", ".join(insert_columns)
+        values = [tuple(data[column] for column in insert_columns) for _, data in rows]
+        cursor.execute("SAVEPOINT bulk_import_chunk")
+        try:
+            execute_values(cursor, f"INSERT INTO {self.table_name} ({columns}) VALUES %s", values, page_size=1000)
+            cursor.execute("RELEASE SAVEPOINT bulk_import_chunk")
+            self.result.imported_count += len(rows)
+            return
+        except Exception as e:
+            cursor.execute("ROLLBACK TO SAVEPOINT bulk_import_chunk")
+            logging.warning(f"Bulk insert into {self.table_name} failed ({e}), retrying chunk row by row.")
+
+        for line_number, data in rows:
+            cursor.execute("SAVEPOINT bulk_import_row")
+            if self.insert_record(cursor, data, line_number):
+                cursor.execute("RELEASE SAVEPOINT bulk_import_row")
+                self.result.increment_imported()
+            else:
+                cursor.execute("ROLLBACK TO SAVEPOINT bulk_import_row")
+
+    def load_chunk(self, cursor, chunk: List[Tuple[int, Dict[str, Any]]]):
+        """Drop rows whose unique key already exists (one query for the whole chunk), then bulk-insert the rest"""
+        existing = self.find_existing(cursor, [key for key in (self.unique_key(data) for _, data in chunk) if key])
+        rows = []
+        for line_number, data in chunk:
+            key = self.unique_key(data)
+            if key and key in existing:
+                self.result.add_error(line_number, self.duplicate_message(key))
+                continue
+            rows.append((line_number, data))
+        self.hash_password_fields(rows)
+        self.insert_records(cursor, rows)
+
+    def import_rows_bulk(self, conn, cursor, csv_reader):
+        """Bulk mode: validate/process rows as they stream in, load and commit them chunk by chunk"""
+        seen_keys = set()
+        chunk = []
+        for line_number, row in enumerate(csv_reader, start=2):
+            if not self.validate_row(row, line_number):
+                continue
+
+            processed_data = self.process_data(row, line_number)
+            if not processed_data:
+                continue
+
+            # Duplicates inside the file itself
+            key = self.unique_key(processed_data)
+            if key:
+                if key in seen_keys:
+                    self.result.add_error(line_number, self.duplicate_message(key))
+                    continue
+                seen_keys.add(key)
+
+            chunk.append((line_number, processed_data))
+            if len(chunk) >= self.bulk_chunk_size:
+                self.load_chunk(cursor, chunk)
+                conn.commit()
+                chunk = []
+
+        self.load_chunk(cursor, chunk)
+
     def import_csv(self, file) -> Tuple[Dict[str, Any], int]:
         """Main import method"""
         try:
             # Validate file
             is_valid, error_msg = self.validate_file(file)
+            if not is_valid:
+                return {"error": error_msg}, 400
+            is_valid, error_msg = self.check_file(file)
             if not is_valid:
                 return {"error": error_msg}, 400
             
@@ -151,6 +312,14 @@ class BaseImportService:
             if not csv_reader:
                 return {"error": error_msg}, 400
             
+            if self.bulk_import:
+                self.import_rows_bulk(conn, cursor, csv_reader)
+                conn.commit()
+                cursor.close()
+                conn.close()
+                logging.debug("Bulk import completed successfully.")
+                return self.result.to_response(self.table_name), 200
+
             # Process each row
             for line_number, row in enumerate(csv_reader, start=2):
                 # Validate row structure
@@ -168,6 +337,7 @@ class BaseImportService:
                     continue
                 
                 # Insert record
+                self.hash_password_fields([(line_number, processed_data)])
                 if self.insert_record(cursor, processed_data, line_number):
                     self.result.increment_imported()
             
@@ -199,9 +369,15 @@ class EmployeeImportService(BaseImportService):
             # if you have multiple columns that don't allow duplicate values , change the "unique_field" variable to this form :
             # unique_field=["email", "field1", "field2"] 
         )
+
+    # list the table columns in the same order as the keys returned by process_data (optional, the keys are used when it's left out)
+    # imports are bulk by default, set "bulk_import = False" to import row by row with insert_record instead
+    insert_columns = ['first_name', 'email', 'position', 'department', 'password']
+    # plain-text password columns, hashed in batches by the base class
+    password_fields = ['password']
     
     def process_data(self, row: List[str], line_number: int) -> Optional[Dict[str, Any]]:
-        """Process employee data with password hashing"""
+        """Process employee data (the password is hashed later, see password_fields)"""
         try:
             # add the name of the amount of fields you set like below
             first_name, email, position, department, password = [item.strip() for item in row]
@@ -213,9 +389,6 @@ class EmployeeImportService(BaseImportService):
             if not ValidationUtils.validate_email(email):
                 self.result.add_error(line_number, f"Invalid email format '{email}'. Skipped.")
                 return None
-            
-            # Hash password
-            hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
 
             # ============== validate section =============== 
             
@@ -225,7 +398,7 @@ class EmployeeImportService(BaseImportService):
                 'email': email,
                 'position': position,
                 'department': department,
-                'password': hashed_password
+                'password': password
             }
             
         except Exception as e:
@@ -0,0 +1,254 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+import psycopg2
+from psycopg2 import extensions
+
+
+# ======================== Connection pool ========================
+# One pool per worker process. Connections are handed out by get_db_connection()/db_session()
+# in routes/Auth/utils.py and go back into the pool when the caller calls conn.close().
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    """Raised when no connection became free within the checkout timeout."""
+
+
+# Wrapper returned to callers, behaves like a psycopg2 connection but close() returns it to the pool
+class PooledConnection:
+    """Proxy around a pooled psycopg2 connection."""
+
+    def __init__(self, pool, raw):
+        object.__setattr__(self, '_pool', pool)
+        object.__setattr__(self, '_raw', raw)
+        object.__setattr__(self, '_released', False)
+
+    def __getattr__(self, name):
+        if self._released:
+            raise psycopg2.InterfaceError("connection already closed")
+        return getattr(self._raw, name)
+
+    def __setattr__(self, name, value):
+        if self._released:
+            raise psycopg2.InterfaceError("connection already closed")
+        setattr(self._raw, name, value)
+
+    @property
+    def closed(self):
+        return 1 if self._released else self._raw.closed
+
+    @property
+    def raw(self):
+        """The underlying psycopg2 connection (for libraries that type-check it)."""
+        return self._raw
+
+    def close(self):
+        """Give the connection back to the pool instead of closing the socket."""
+        if self._released:
+            return
+        object.__setattr__(self, '_released', True)
+        self._pool.putconn(self._raw)
+
+    # Same semantics as psycopg2: commit/rollback on exit, the connection stays open
+    def __enter__(self):
+        self._raw.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        return self._raw.__exit__(exc_type, exc_value, tb)
+
+    # Callers that forget to close() still give their connection back
+    def __del__(self):
+        try:
+            if not self._released:
+                logging.debug("[DB POOL] Connection garbage collected without close(), returning it to pool")
+                self.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """Thread-safe psycopg2 connection pool with checkout health checks and usage metrics."""
+
+    def __init__(self, connect, minconn=1, maxconn=10, timeout=10.0, health_check_interval=30.0):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError("Invalid pool size: need 0 <= minconn <= maxconn and maxconn >= 1")
+        self._connect = connect
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self._idle = deque()  # (connection, last_returned_at)
+        self._size = 0
+        self._in_use = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._metrics = {
+            'checkouts': 0,
+            'waits': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+            'timeouts': 0,
+            'connections_created': 0,
+            'connections_discarded': 0,
+            'health_check_failures': 0,
+            'in_use_peak': 0,
+        }
+        for _ in range(minconn):
+            self._idle.append((self._new_connection(), time.monotonic()))
+            self._size += 1
+
+    def _new_connection(self):
+        conn = self._connect()
+        self._metrics['connections_created'] += 1
+        return conn
+
+    def _discard(self, conn):
+        self._metrics['connections_discarded'] += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _is_healthy(self, conn, idle_since):
+        """Cheap state check on every checkout, plus a SELECT 1 ping if the connection sat idle."""
+        if conn.closed:
+            return False
+        if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            return False
+        if time.monotonic() - idle_since < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception as e:
+            logging.warning(f"[DB POOL] Health check failed, replacing connection: {e}")
+            return False
+
+    def getconn(self, timeout=None):
+        """Check a healthy connection out of the pool, waiting up to `timeout` seconds."""
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        waited = False
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise psycopg2.InterfaceError("connection pool is closed")
+                if self._idle:
+                    conn, idle_since = self._idle.pop()
+                    break
+                if self._size < self.maxconn:
+                    self._size += 1
+                    conn, idle_since = None, None
+                    break
+                remaining = timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self._metrics['timeouts'] += 1
+                    raise PoolTimeout(f"No database connection available after {timeout}s (max {self.maxconn})")
+                waited = True
+                self._cond.wait(remaining)
+
+            self._in_use += 1
+            self._metrics['checkouts'] += 1
+            self._metrics['in_use_peak'] = max(self._metrics['in_use_peak'], self._in_use)
+            if waited:
+                wait_time = time.monotonic() - started
+                self._metrics['waits'] += 1
+                self._metrics['wait_time_total'] += wait_time
+                self._metrics['wait_time_max'] = max(self._metrics['wait_time_max'], wait_time)
+
+        try:
+            if conn is not None and not self._is_healthy(conn, idle_since):
+                with self._cond:
+                    self._metrics['health_check_failures'] += 1
+                    self._discard(conn)
+                conn = None
+            if conn is None:
+                new_conn = self._connect()
+                with self._cond:
+                    self._metrics['connections_created'] += 1
+                conn = new_conn
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        return conn
+
+    def putconn(self, conn, discard=False):
+        """Return a connection; open transactions are rolled back and session state is reset."""
+        if not discard and not conn.closed:
+            try:
+                if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+                if conn.autocommit:
+                    conn.autocommit = False
+                conn.cursor_factory = None
+            except Exception as e:
+                logging.warning(f"[DB POOL] Could not reset connection, discarding it: {e}")
+                discard = True
+
+        with self._cond:
+            self._in_use -= 1
+            if discard or conn.closed or self._closed:
+                self._size -= 1
+                self._discard(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def closeall(self):
+        """Close every idle connection and refuse further checkouts."""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._size -= 1
+                self._discard(conn)
+            self._cond.notify_all()
+
+    def stats(self):
+        """Snapshot of pool size and wait/usage counters."""
+        with self._cond:
+            stats = dict(self._metrics)
+            stats.update({
+                'min_size': self.minconn,
+                'max_size': self.maxconn,
+                'size': self._size,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'wait_time_avg': (stats['wait_time_total'] / stats['waits']) if stats['waits'] else 0.0,
+            })
+        return stats
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+# Get (or lazily create) the pool for this process, a forked worker never reuses its parent's sockets
+def get_pool(connect, **settings):
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool is not None and _pool_pid == pid:
+        return _pool
+    with _pool_lock:
+        if _pool is None or _pool_pid != pid:
+            _pool = ConnectionPool(connect, **settings)
+            _pool_pid = pid
+            logging.info(f"[DB POOL] Created pool min={_pool.minconn} max={_pool.maxconn} for pid {pid}")
+    return _pool
+
+
+# Pool metrics for monitoring (empty dict until the first connection is requested)
+def get_pool_stats():
+    if _pool is None or _pool_pid != os.getpid():
+        return {}
+    return _pool.stats()
@@ -1,17 +1,11 @@
 # Decorator for protecting web endpoints with JWT (employee version, redirects on error)
 from functools import wraps
 import logging
-from turtle import color
 from flask import g, jsonify, redirect, request, send_file, url_for
 from routes.Auth.token import verify_employee_token
-from routes.Auth.utils import get_db_connection
+from routes.Auth.utils import db_session
 from routes.Login import SECRET_KEY
 import jwt
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
 import io
 
 def get_token_from_header():
@@ -49,6 +43,10 @@ def login_required(f):
 
 # Function to generate PDF (you'll need to implement it or use a library like ReportLab)
 def generate_pdf(dataframe, title):
+    # reportlab is only needed for exports, so it is not loaded at startup
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
     pdf_output = io.BytesIO()
     c = canvas.Canvas(pdf_output, pagesize=letter)
     width, height = letter
@@ -127,18 +125,13 @@ def employee_required(f):
         g.employee_role = role
 
         # Now fetch role_id from DB and set g.role_id
-        conn = get_db_connection()
-        cur = conn.cursor()
-        try:
+        with db_session() as conn, conn.cursor() as cur:
             cur.execute("SELECT role_id FROM roles WHERE role_name = %s", (role,))
             row = cur.fetchone()
             if row:
                 g.role_id = row[0]
             else:
                 g.role_id = None
-        finally:
-            cur.close()
-            conn.close()
 
         return f(*args, **kwargs)
     return decorated_function
@@ -1,16 +1,20 @@
 import os
-import threading
 import logging
-from flask_mail import Message
 from datetime import datetime
 from routes.Auth.token import employee_jwt_required
 from routes.Auth.token import verify_employee_token
+from routes.Auth.outbox import enqueue_email
 from routes.Auth.utils import get_db_connection
-from user_agents import parse
 from flask import g, jsonify, render_template, request
 import psycopg2
 from routes.Employee import employee_bp
 
+# user_agents compiles its whole regex table on import, so it is loaded by the first login rather than at startup
+def parse_user_agent(user_agent):
+    from user_agents import parse
+    return parse(user_agent)
+
+
 def get_readable_device_name(user_agent_obj):
     brand = getattr(user_agent_obj.device, "brand", None)
     model = getattr(user_agent_obj.device, "model", None)
@@ -41,7 +45,7 @@ def detect_device_info():
     if not user_agent:
         return {}
 
-    user_agent_obj = parse(user_agent)
+    user_agent_obj = parse_user_agent(user_agent)
     device_name = get_readable_device_name(user_agent_obj)
 
     device_os = user_agent_obj.os.family + " " + user_agent_obj.os.version_string
@@ -102,16 +106,13 @@ def save_or_update_device(mail, employee_id=None, admin_id=None):
                 device_info.get('ip_address', 'Unknown')
             ))
 
-            # 🎯 Send New Device Email (in background thread)
-            threading.Thread(
-                target=send_new_device_alert_email,
-                kwargs={
-                    "mail": mail,
-                    "employee_id": employee_id,
-                    "admin_id": admin_id,
-                    "device_info": device_info
-                }
-            ).start()
+            # 🎯 Queue New Device Email (delivered by the outbox sender)
+            send_new_device_alert_email(
+                mail,
+                employee_id=employee_id,
+                admin_id=admin_id,
+                device_info=device_info
+            )
 
 
         conn.commit()
@@ -121,7 +122,8 @@ def save_or_update_device(mail, employee_id=None, admin_id=None):
         cursor.close()
         conn.close()
 
-def send_new_device_alert_email(mail, employee_id=None, admin_id=None, device_info=None):
+# `mail` is unused (emails go through the outbox), kept for existing callers
+def send_new_device_alert_email(mail=None, employee_id=None, admin_id=None, device_info=None):
     sender_email = os.getenv("EMAIL_USER")
 
     conn = get_db_connection()
@@ -142,13 +144,7 @@ def send_new_device_alert_email(mail, employee_id=None, admin_id=None, device_in
         user_email = row[0]
 
         # Create the email
-        msg = Message(
-            subject="⚠️ New Device Login Detected",
-            sender=sender_email,
-            recipients=[user_email]
-        )
-
-        msg.body = f"""\
+        body = f"""\
 Hello,
 
 A new device has just logged into your account:
@@ -166,17 +162,17 @@ Stay safe,
 Your Security Team
 """
 
-        mail.send(msg)
-        logging.info(f"✅ New device alert email sent to {user_email}")
+        enqueue_email("device_alert", user_email, "⚠️ New Device Login Detected", body, sender=sender_email)
+        logging.info(f"✅ New device alert email queued for {user_email}")
 
     except Exception as e:
-        logging.error(f"❌ Failed to send device alert email: {e}", exc_info=True)
+        logging.error(f"❌ Failed to queue device alert email: {e}", exc_info=True)
     finally:
         cursor.close()
         conn.close()
 
 def log_device_session(request, employee_id=None, admin_id=None, jti=None, issued_at=None):
-    user_agent_obj = parse(request.headers.get('User-Agent', ''))
+    user_agent_obj = parse_user_agent(request.headers.get('User-Agent', ''))
     ip_address = request.remote_addr or request.environ.get('HTTP_X_FORWARDED_FOR')
 
     device_name = get_readable_device_name(user_agent_obj)  # << Use helper!
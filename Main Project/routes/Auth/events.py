@@ -0,0 +1,382 @@
+import json
+import logging
+import os
+import queue
+import select
+import threading
+import time
+
+from flask import Response
+
+from routes.Auth.utils import _checkout, _connect, on_commit
+
+
+# ======================== Push events (Server-Sent Events) ========================
+# One text/event-stream connection per browser session replaces the 10s/30s polling of
+# /validate_token, /api/employee_status, /check_jti, /dashboard_data and the unread-count endpoints.
+#
+# Events are published to channels:
+#   employee:<id> / admin:<id> / super_admin:<id>  -> session_conflict, account_deactivated, permission_changed
+#   inbox:<receiver_id>                            -> new_message (same receiver_id matching as the inbox)
+#   admins                                         -> permission_changed for every admin (route/action catalog edits)
+# publish() waits for the current unit of work to commit (routes/Auth/utils.py on_commit), so a client
+# reacting to an event always sees the new rows.
+#
+# Fan-out:
+#   EVENT_BROKER=local     in-process queues, enough for a single worker process (default)
+#   EVENT_BROKER=postgres  publishes with pg_notify and every worker LISTENs, for multi-worker deployments
+#   set_event_broker()     plug in anything else with the same publish/subscribe/unsubscribe methods
+# add_event_listener() also hands every delivered event to a callback in this process (e.g. to drop a
+# process-local cache); with EVENT_BROKER=postgres that includes the events published by other workers.
+
+EVENT_BROKER = os.getenv('EVENT_BROKER', 'local')
+EVENT_PG_CHANNEL = os.getenv('EVENT_PG_CHANNEL', 'app_events')
+EVENT_KEEPALIVE_SECONDS = float(os.getenv('EVENT_KEEPALIVE_SECONDS', 20))
+EVENT_STREAM_MAX_SECONDS = float(os.getenv('EVENT_STREAM_MAX_SECONDS', 600))  # client reconnects, which re-checks the token
+EVENT_QUEUE_SIZE = int(os.getenv('EVENT_QUEUE_SIZE', 100))
+EVENT_RETRY_MS = 5000  # reconnect delay suggested to the client
+
+# Event types
+SESSION_CONFLICT = 'session_conflict'
+ACCOUNT_DEACTIVATED = 'account_deactivated'
+NEW_MESSAGE = 'new_message'
+PERMISSION_CHANGED = 'permission_changed'
+RESYNC = 'resync'  # events were dropped, the client should run all of its checks once
+
+# The stream closes after these, the session is over
+TERMINAL_EVENTS = (SESSION_CONFLICT, ACCOUNT_DEACTIVATED)
+
+
+class Subscription:
+    """Bounded queue of events for one open stream."""
+
+    def __init__(self, channels, maxsize=EVENT_QUEUE_SIZE):
+        self.channels = frozenset(channels)
+        self._queue = queue.Queue(maxsize=maxsize)
+
+    def put(self, event):
+        try:
+            self._queue.put_nowait(event)
+            return True
+        except queue.Full:
+            # Slow client: replace the backlog with a single resync
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            self._queue.put_nowait({'type': RESYNC, 'data': {}})
+            return False
+
+    def get(self, timeout):
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class LocalBroker:
+    """In-process fan-out from channel name to open subscriptions."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._channels = {}  # channel -> set of Subscription
+        self._listeners = []  # callback(channel, event) for every delivered event
+        self.metrics = {'published': 0, 'delivered': 0, 'dropped': 0}
+
+    def add_listener(self, callback):
+        with self._lock:
+            if callback not in self._listeners:
+                self._listeners.append(callback)
+
+    def _notify_listeners(self, channel, event):
+        with self._lock:
+            listeners = list(self._listeners)
+        for callback in listeners:
+            try:
+                callback(channel, event)
+            except Exception as e:
+                logging.error(f"[EVENTS] Listener {callback} failed on {event.get('type')}: {e}")
+
+    def subscribe(self, channels):
+        subscription = Subscription(channels)
+        with self._lock:
+            for channel in subscription.channels:
+                self._channels.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._channels.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._channels[channel]
+
+    def publish(self, channel, event):
+        self.metrics['published'] += 1
+        self.deliver(channel, event)
+
+    def publish_many(self, events):
+        """Publish [(channel, event)] in one go."""
+        for channel, event in events:
+            self.publish(channel, event)
+
+    def deliver(self, channel, event):
+        self._notify_listeners(channel, event)
+        with self._lock:
+            subscribers = list(self._channels.get(channel, ()))
+        for subscription in subscribers:
+            if subscription.put(event):
+                self.metrics['delivered'] += 1
+            else:
+                self.metrics['dropped'] += 1
+
+    def stats(self):
+        with self._lock:
+            streams = len({subscription for subscribers in self._channels.values() for subscription in subscribers})
+            channels = len(self._channels)
+        stats = dict(self.metrics)
+        stats.update({'broker': type(self).__name__, 'streams': streams, 'channels': channels})
+        return stats
+
+
+class PostgresBroker(LocalBroker):
+    """Cross-process fan-out over LISTEN/NOTIFY; each process delivers to its own subscribers."""
+
+    def __init__(self, pg_channel=EVENT_PG_CHANNEL):
+        super().__init__()
+        self.pg_channel = pg_channel
+        self._listener = None
+        self._listener_pid = None
+        self._listener_lock = threading.Lock()
+        self.metrics['listener_reconnects'] = 0
+
+    def subscribe(self, channels):
+        self._ensure_listener()
+        return super().subscribe(channels)
+
+    def add_listener(self, callback):
+        super().add_listener(callback)
+        self._ensure_listener()
+
+    def publish(self, channel, event):
+        payload = json.dumps({'channel': channel, 'event': event}, default=str)
+        conn = _checkout()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_notify(%s, %s)", (self.pg_channel, payload))
+            conn.commit()
+        finally:
+            conn.close()
+        self.metrics['published'] += 1
+
+    def publish_many(self, events):
+        """One connection and one statement for the whole batch (one notification per event)."""
+        payloads = [json.dumps({'channel': channel, 'event': event}, default=str) for channel, event in events]
+        if not payloads:
+            return
+        conn = _checkout()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_notify(%s, payload) FROM unnest(%s::text[]) AS payload",
+                            (self.pg_channel, payloads))
+            conn.commit()
+        finally:
+            conn.close()
+        self.metrics['published'] += len(payloads)
+
+    def _ensure_listener(self):
+        pid = os.getpid()
+        if self._listener is not None and self._listener_pid == pid and self._listener.is_alive():
+            return
+        with self._listener_lock:
+            if self._listener is None or self._listener_pid != pid or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, name='event-listener', daemon=True)
+                self._listener_pid = pid
+                self._listener.start()
+
+    def _listen(self):
+        while True:
+            conn = None
+            try:
+                conn = _connect()
+                conn.autocommit = True
+                with conn.cursor() as cur:
+                    cur.execute(f'LISTEN "{self.pg_channel}"')
+                logging.info(f"[EVENTS] Listening on {self.pg_channel} (pid {os.getpid()})")
+                # Anything published while we were disconnected is lost: make clients re-check
+                self._resync_all()
+                while True:
+                    if select.select([conn], [], [], EVENT_KEEPALIVE_SECONDS) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        try:
+                            message = json.loads(notify.payload)
+                            self.deliver(message['channel'], message['event'])
+                        except (ValueError, KeyError) as e:
+                            logging.error(f"[EVENTS] Bad notification payload: {e}")
+            except Exception as e:
+                logging.error(f"[EVENTS] Listener connection lost: {e}")
+                self.metrics['listener_reconnects'] += 1
+                time.sleep(EVENT_RETRY_MS / 1000)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
+    def _resync_all(self):
+        self._notify_listeners(None, {'type': RESYNC, 'data': {}})
+        with self._lock:
+            subscribers = {subscription for subscribers in self._channels.values() for subscription in subscribers}
+        for subscription in subscribers:
+            subscription.put({'type': RESYNC, 'data': {}})
+
+
+def _create_broker():
+    if EVENT_BROKER == 'postgres':
+        return PostgresBroker()
+    if EVENT_BROKER != 'local':
+        logging.warning(f"[EVENTS] Unknown EVENT_BROKER '{EVENT_BROKER}', using in-process fan-out")
+    return LocalBroker()
+
+
+event_broker = _create_broker()
+
+
+# Swap the fan-out implementation (e.g. a Redis pub/sub broker), before any stream is opened.
+# publish_many is optional; brokers without it get one publish() per event.
+def set_event_broker(broker):
+    global event_broker
+    listeners = list(getattr(event_broker, '_listeners', ()))
+    event_broker = broker
+    for callback in listeners:
+        add_event_listener(callback)
+
+
+# Call callback(channel, event) for every event this process delivers (channel is None for a resync, after
+# which anything derived from earlier events should be thrown away). Brokers without add_listener: no-op.
+def add_event_listener(callback):
+    add_listener = getattr(event_broker, 'add_listener', None)
+    if add_listener is not None:
+        add_listener(callback)
+
+
+# Channel names
+def user_channel(kind, user_id):
+    return f"{kind}:{int(user_id)}"
+
+
+def inbox_channel(receiver_id):
+    return f"inbox:{int(receiver_id)}"
+
+
+ADMINS_CHANNEL = 'admins'
+
+
+# Publish an event once the current transaction has committed
+def publish(channel, event_type, data=None):
+    event = {'type': event_type, 'data': data or {}}
+
+    def send():
+        try:
+            event_broker.publish(channel, event)
+        except Exception as e:
+            logging.error(f"[EVENTS] Failed to publish {event_type} to {channel}: {e}")
+    on_commit(send)
+
+
+# Publish [(channel, event_type, data)] as one batch once the current transaction has committed
+def publish_many(events):
+    events = [(channel, {'type': event_type, 'data': data or {}}) for channel, event_type, data in events]
+    if not events:
+        return
+
+    def send():
+        try:
+            publish_batch = getattr(event_broker, 'publish_many', None)
+            if publish_batch is not None:
+                publish_batch(events)
+            else:
+                for channel, event in events:
+                    event_broker.publish(channel, event)
+        except Exception as e:
+            logging.error(f"[EVENTS] Failed to publish a batch of {len(events)} event(s): {e}")
+    on_commit(send)
+
+
+# Someone logged in as this user: every other session of theirs is over
+def publish_session_conflict(kind, user_id, jti):
+    publish(user_channel(kind, user_id), SESSION_CONFLICT, {'jti': jti})
+
+
+# Employee terminated/deactivated (or removed)
+def publish_account_deactivated(employee_id, status):
+    publish(user_channel('employee', employee_id), ACCOUNT_DEACTIVATED, {'status': status})
+
+
+def publish_new_message(receiver_id, message_id=None):
+    publish(inbox_channel(receiver_id), NEW_MESSAGE, {'message_id': message_id})
+
+
+# New messages for many receivers at once ({receiver_id: message_id}), e.g. a reminder sweep
+def publish_new_messages(message_ids):
+    publish_many((inbox_channel(receiver_id), NEW_MESSAGE, {'message_id': message_id})
+                 for receiver_id, message_id in message_ids.items())
+
+
+# An admin's grants or verification changed; without admin_id every admin is told (catalog change)
+def publish_permission_changed(admin_id=None, role='admin'):
+    if admin_id is None:
+        publish(ADMINS_CHANNEL, PERMISSION_CHANGED)
+    else:
+        publish(user_channel('super_admin' if role == 'super_admin' else 'admin', admin_id), PERMISSION_CHANGED)
+
+
+def _format(event_type, data):
+    return f"event: {event_type}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def event_stream_response(channels, jti, initial_events=()):
+    """
+    text/event-stream response for the current session. Call it after authenticating; the generator
+    runs after the request context (and its database connection) is gone, so it only uses its arguments.
+    """
+    subscription = event_broker.subscribe(channels)
+
+    def generate():
+        try:
+            yield f"retry: {EVENT_RETRY_MS}\n" + _format('ready', {'channels': sorted(channels)})
+            for event_type, data in initial_events:
+                yield _format(event_type, data)
+                if event_type in TERMINAL_EVENTS:
+                    return
+            deadline = time.monotonic() + EVENT_STREAM_MAX_SECONDS
+            while time.monotonic() < deadline:
+                event = subscription.get(timeout=EVENT_KEEPALIVE_SECONDS)
+                if event is None:
+                    yield ": keepalive\n\n"
+                    continue
+                # The login that caused a conflict doesn't conflict with itself
+                if event['type'] == SESSION_CONFLICT and event['data'].get('jti') == jti:
+                    continue
+                yield _format(event['type'], event['data'])
+                if event['type'] in TERMINAL_EVENTS:
+                    return
+        finally:
+            event_broker.unsubscribe(subscription)
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',  # don't let a reverse proxy buffer the stream
+    })
+
+
+# Fan-out counters for monitoring
+def get_event_stats():
+    return event_broker.stats()
@@ -0,0 +1,178 @@
+import glob
+import hashlib
+import io
+import logging
+import os
+import tempfile
+
+from flask import Response, request, send_file, url_for
+from PIL import Image, ImageOps
+
+from routes.Auth.utils import db_session
+
+
+# ======================== Profile images & thumbnails ========================
+# Profile pictures live in bytea columns. Instead of shipping them base64-encoded inside JSON lists:
+#   - list endpoints return thumbnail_url(kind, owner_id, digest), where digest is md5(image) computed by
+#     PostgreSQL (SELECT md5(profile) ...), so the image bytes never leave the database for a list
+#   - the thumbnail is rendered once per (image, size) and cached on disk under its owner and content hash,
+#     then served with an ETag and a long, immutable Cache-Control (a new image means a new URL)
+#   - every thumbnail request first checks in SQL that the digest is still the owner's current picture, so a
+#     replaced or deleted picture is gone from its old URL too; the owner's stale cache files are removed then
+#   - the full-size picture endpoints answer If-None-Match with 304 without reading the image
+
+THUMBNAIL_CACHE_FOLDER = os.getenv('THUMBNAIL_CACHE_FOLDER', os.path.join('static', 'thumbnails'))
+THUMBNAIL_SIZES = (64, 128, 256)
+THUMBNAIL_DEFAULT_SIZE = 128
+THUMBNAIL_MAX_AGE = 365 * 24 * 3600  # seconds, thumbnail URLs change whenever the image does
+DEFAULT_PROFILE_IMAGE = os.path.join('static', 'default_resource.png')
+
+# Where each kind of profile picture is stored: (table, id column, image column)
+IMAGE_SOURCES = {
+    'employee': ('employees', 'employee_id', 'profile'),
+    'admin': ('admins', 'admin_id', 'profile_image'),
+    'super_admin': ('super_admins', 'super_admin_id', 'profile_image'),
+}
+
+
+# Same value as PostgreSQL's md5(bytea)
+def image_digest(image_bytes):
+    return hashlib.md5(image_bytes).hexdigest()
+
+
+# URL of the cached thumbnail for a profile picture (None when there is no picture)
+def thumbnail_url(kind, owner_id, digest, size=THUMBNAIL_DEFAULT_SIZE):
+    if not digest:
+        return None
+    return url_for('admin_bp.profile_thumbnail', kind=kind, owner_id=owner_id, digest=digest, size=size)
+
+
+def load_image(kind, owner_id, known_digest=None):
+    """
+    Returns (digest, image_bytes) for a profile picture, or (None, None) if there is none.
+    image_bytes is None when the stored image still matches known_digest (nothing to send).
+    """
+    table, id_column, image_column = IMAGE_SOURCES[kind]
+    with db_session() as conn, conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT md5({image_column}),
+                   CASE WHEN md5({image_column}) = %s THEN NULL ELSE {image_column} END
+            FROM {table} WHERE {id_column} = %s
+        """, (known_digest or '', owner_id))
+        row = cur.fetchone()
+    if not row or not row[0]:
+        return None, None
+    return row[0], (bytes(row[1]) if row[1] is not None else None)
+
+
+# Detect PNG/JPEG from the first bytes
+def image_mimetype(image_bytes):
+    if image_bytes[:8] == b'\x89PNG\r\n\x1a\n':
+        return 'image/png'
+    if image_bytes[:2] == b'\xff\xd8':
+        return 'image/jpeg'
+    return 'application/octet-stream'
+
+
+def make_thumbnail(image_bytes, size):
+    """Square, center-cropped JPEG thumbnail."""
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        img = ImageOps.exif_transpose(img)
+        if img.mode in ('RGBA', 'LA', 'P'):
+            img = img.convert('RGBA')
+            background = Image.new('RGB', img.size, (255, 255, 255))
+            background.paste(img, mask=img.split()[-1])
+            img = background
+        elif img.mode != 'RGB':
+            img = img.convert('RGB')
+        thumb = ImageOps.fit(img, (size, size), Image.LANCZOS)
+        out = io.BytesIO()
+        thumb.save(out, format='JPEG', quality=85, optimize=True)
+        return out.getvalue()
+
+
+def _thumbnail_prefix(kind, owner_id):
+    return os.path.join(THUMBNAIL_CACHE_FOLDER, f"{kind}_{int(owner_id)}_")
+
+
+# Remove an owner's cached thumbnails, except those of keep_digest
+def discard_thumbnails(kind, owner_id, keep_digest=None):
+    keep = _thumbnail_prefix(kind, owner_id) + f"{keep_digest}_" if keep_digest else None
+    for path in glob.glob(glob.escape(_thumbnail_prefix(kind, owner_id)) + '*.jpg'):
+        if keep is None or not path.startswith(keep):
+            try:
+                os.remove(path)
+            except OSError:
+                pass  # removed by another worker
+
+
+def _current_image(kind, owner_id, digest, with_bytes):
+    """
+    (True, image_bytes or None) if digest is the owner's current picture, else (False, None).
+    The bytes are only read when with_bytes is set and the digest matches.
+    """
+    table, id_column, image_column = IMAGE_SOURCES[kind]
+    with db_session() as conn, conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT CASE WHEN %s THEN {image_column} END
+            FROM {table} WHERE {id_column} = %s AND md5({image_column}) = %s
+        """, (with_bytes, owner_id, digest))
+        row = cur.fetchone()
+    if row is None:
+        return False, None
+    return True, (bytes(row[0]) if row[0] is not None else None)
+
+
+def get_thumbnail_path(kind, owner_id, digest, size):
+    """Path of the cached thumbnail, rendering it on first use; None if digest isn't the owner's current image."""
+    path = _thumbnail_prefix(kind, owner_id) + f"{digest}_{size}.jpg"
+    cached = os.path.exists(path)
+    current, image_bytes = _current_image(kind, owner_id, digest, with_bytes=not cached)
+    if not current:
+        # Replaced or deleted picture: nothing of this owner's old pictures stays on disk
+        discard_thumbnails(kind, owner_id)
+        return None
+    if cached:
+        return path
+    if image_bytes is None:
+        return None
+
+    os.makedirs(THUMBNAIL_CACHE_FOLDER, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=THUMBNAIL_CACHE_FOLDER, prefix='.tmp_', suffix='.jpg')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(make_thumbnail(image_bytes, size))
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    discard_thumbnails(kind, owner_id, keep_digest=digest)
+    logging.debug(f"[THUMBNAILS] Rendered {size}px thumbnail for {kind} {owner_id}")
+    return path
+
+
+def send_thumbnail(path, digest, size):
+    response = send_file(path, mimetype='image/jpeg', etag=f"{digest}-{size}", conditional=True, max_age=THUMBNAIL_MAX_AGE)
+    response.headers['Cache-Control'] = f'private, max-age={THUMBNAIL_MAX_AGE}, immutable'
+    return response
+
+
+def send_profile_image(kind, owner_id):
+    """
+    Full-size profile picture with ETag revalidation: the browser keeps its copy and gets a 304
+    (the image isn't even read from the database) until the picture changes.
+    """
+    known = request.if_none_match.as_set()
+    known_digest = next(iter(known), None) if len(known) == 1 else None
+    digest, image_bytes = load_image(kind, owner_id, known_digest)
+    if digest is None:
+        return send_file(DEFAULT_PROFILE_IMAGE, mimetype='image/png')
+
+    if image_bytes is None or request.if_none_match.contains(digest):
+        response = Response(status=304)
+    else:
+        response = Response(image_bytes, mimetype=image_mimetype(image_bytes))
+    response.set_etag(digest)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
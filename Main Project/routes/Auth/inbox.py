@@ -0,0 +1,203 @@
+import base64
+from datetime import datetime
+import logging
+import threading
+
+from routes.Auth.migrations import MigrationError, require_schema
+from routes.Auth.utils import db_session
+
+
+# ======================== Message inbox ========================
+# Inbox reads shared by the employee and admin message endpoints:
+#   - get_inbox_page(): keyset pagination on ("timestamp", message_id), newest first, served by an index
+#   - get_unread_count(): O(1) lookup in message_unread_counters, which triggers on messages keep up to date on
+#     insert, delete and is_read/receiver changes (so every place that writes messages is covered)
+#   - receiver ids: a person can exist as employee, admin and super admin with the same email; get_alias_ids()
+#     finds all of them in one query and the reads below take the whole list (receiver_id = ANY(...))
+# Like the existing message endpoints, messages are matched on receiver_id.
+
+INBOX_PAGE_SIZE = 50
+INBOX_MAX_PAGE_SIZE = 200
+
+SCHEMA_SQL = [
+    'CREATE INDEX IF NOT EXISTS messages_receiver_timestamp_idx ON messages (receiver_id, "timestamp" DESC, message_id DESC)',
+    'CREATE INDEX IF NOT EXISTS messages_receiver_unread_idx ON messages (receiver_id, "timestamp" DESC, message_id DESC) WHERE is_read = FALSE',
+    """
+    CREATE TABLE IF NOT EXISTS message_unread_counters (
+        receiver_id integer PRIMARY KEY,
+        unread_count integer NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE OR REPLACE FUNCTION messages_unread_counter() RETURNS trigger
+        LANGUAGE plpgsql
+        AS $$
+    BEGIN
+      IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.is_read IS FALSE THEN
+        UPDATE message_unread_counters SET unread_count = unread_count - 1 WHERE receiver_id = OLD.receiver_id;
+      END IF;
+      IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.is_read IS FALSE THEN
+        INSERT INTO message_unread_counters (receiver_id, unread_count) VALUES (NEW.receiver_id, 1)
+        ON CONFLICT (receiver_id) DO UPDATE SET unread_count = message_unread_counters.unread_count + 1;
+      END IF;
+      RETURN NULL;
+    END;
+    $$
+    """,
+]
+
+# Created (with a full recount) only when missing, under a lock so no message slips in between
+TRIGGER_SQL = [
+    "LOCK TABLE messages IN SHARE ROW EXCLUSIVE MODE",
+    "DROP TRIGGER IF EXISTS messages_unread_counter_ins_del ON messages",
+    "DROP TRIGGER IF EXISTS messages_unread_counter_upd ON messages",
+    """
+    CREATE TRIGGER messages_unread_counter_ins_del AFTER INSERT OR DELETE ON messages
+    FOR EACH ROW EXECUTE FUNCTION messages_unread_counter()
+    """,
+    """
+    CREATE TRIGGER messages_unread_counter_upd AFTER UPDATE OF is_read, receiver_id ON messages
+    FOR EACH ROW
+    WHEN (OLD.is_read IS DISTINCT FROM NEW.is_read OR OLD.receiver_id IS DISTINCT FROM NEW.receiver_id)
+    EXECUTE FUNCTION messages_unread_counter()
+    """,
+]
+
+RECOUNT_SQL = [
+    "DELETE FROM message_unread_counters",
+    """
+    INSERT INTO message_unread_counters (receiver_id, unread_count)
+    SELECT receiver_id, COUNT(*) FROM messages WHERE is_read = FALSE GROUP BY receiver_id
+    """,
+]
+
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+
+# Create the inbox indexes, the unread counter table and its triggers if they don't exist yet
+def install_inbox_schema(cur):
+    for statement in SCHEMA_SQL:
+        cur.execute(statement)
+    cur.execute("SELECT 1 FROM pg_trigger WHERE tgname = 'messages_unread_counter_upd'")
+    if cur.fetchone() is None:
+        logging.info("[INBOX] Installing unread counter triggers and counting unread messages")
+        for statement in TRIGGER_SQL + RECOUNT_SQL:
+            cur.execute(statement)
+
+
+# Check once per process that migrations/0002_message_inbox.py has run; the request path never runs the DDL
+def ensure_inbox_schema():
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if _schema_ready:
+            return
+        with db_session() as conn, conn.cursor() as cur:
+            require_schema(cur, '0002_message_inbox',
+                           relations=('message_unread_counters', 'messages_receiver_timestamp_idx'),
+                           functions=('messages_unread_counter',))
+            cur.execute("SELECT 1 FROM pg_trigger WHERE tgname = 'messages_unread_counter_upd'")
+            if cur.fetchone() is None:
+                raise MigrationError("Missing trigger messages_unread_counter_upd: run `python migrate.py` (migration 0002_message_inbox)")
+        _schema_ready = True
+
+
+# Recount every receiver's unread messages (repair tool, e.g. after bulk SQL with triggers disabled)
+def rebuild_unread_counters():
+    ensure_inbox_schema()
+    with db_session() as conn, conn.cursor() as cur:
+        cur.execute("LOCK TABLE messages IN SHARE ROW EXCLUSIVE MODE")
+        for statement in RECOUNT_SQL:
+            cur.execute(statement)
+
+
+# Every id this person receives messages under (employee/admin/super admin rows sharing the email)
+def get_alias_ids(user_id, role):
+    tables = {
+        'employee': ('employees', 'employee_id'),
+        'admin': ('admins', 'admin_id'),
+        'super_admin': ('super_admins', 'super_admin_id'),
+    }
+    if role not in tables:
+        return [user_id]
+    table, id_column = tables[role]
+    with db_session() as conn, conn.cursor() as cur:
+        cur.execute(f"""
+            WITH me AS (SELECT email FROM {table} WHERE {id_column} = %s)
+            SELECT admin_id FROM admins WHERE email = (SELECT email FROM me)
+            UNION
+            SELECT employee_id FROM employees WHERE email = (SELECT email FROM me)
+            UNION
+            SELECT super_admin_id FROM super_admins WHERE email = (SELECT email FROM me)
+        """, (user_id,))
+        ids = [row[0] for row in cur.fetchall()]
+    return ids or [user_id]
+
+
+def encode_cursor(timestamp, message_id):
+    raw = f"{timestamp.isoformat()}|{message_id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """Returns (timestamp, message_id); raises ValueError for a malformed cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        timestamp, message_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(timestamp), int(message_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+# Clamp the ?limit= query parameter
+def page_size(limit):
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        return INBOX_PAGE_SIZE
+    return max(1, min(limit, INBOX_MAX_PAGE_SIZE))
+
+
+def get_inbox_page(receiver_ids, limit=INBOX_PAGE_SIZE, cursor=None, unread_only=False):
+    """
+    One page of messages for all receiver ids, newest first.
+    Returns (rows, next_cursor); rows are (message_id, sender_id, sender_role, body, timestamp, is_read, subject).
+    Pass next_cursor back as cursor to get the following page (None means this was the last one).
+    """
+    ensure_inbox_schema()
+    conditions = ["receiver_id = ANY(%s)"]
+    params = [list(receiver_ids)]
+    if unread_only:
+        conditions.append("is_read = FALSE")
+    if cursor:
+        timestamp, message_id = decode_cursor(cursor)
+        conditions.append('("timestamp", message_id) < (%s, %s)')
+        params += [timestamp, message_id]
+    params.append(limit + 1)
+    with db_session() as conn, conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT message_id, sender_id, sender_role, body, "timestamp", is_read, subject
+            FROM messages
+            WHERE {' AND '.join(conditions)}
+            ORDER BY "timestamp" DESC, message_id DESC
+            LIMIT %s
+        """, params)
+        rows = cur.fetchall()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][4], rows[-1][0])
+    return rows, next_cursor
+
+
+# Unread messages across all receiver ids (counter lookup, no scan of messages)
+def get_unread_count(receiver_ids):
+    ensure_inbox_schema()
+    with db_session() as conn, conn.cursor() as cur:
+        cur.execute(
+            "SELECT COALESCE(SUM(unread_count), 0) FROM message_unread_counters WHERE receiver_id = ANY(%s)",
+            (list(receiver_ids),)
+        )
+        return int(cur.fetchone()[0])
@@ -0,0 +1,170 @@
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import os
+import smtplib
+import threading
+import time
+
+
+# ======================== Pooled mail sender ========================
+# Sends a batch of flask_mail Messages over a few long-lived SMTP sessions instead of one connect + TLS
+# handshake + login per message (what mail.send() does):
+#   - MAIL_WORKERS threads, each holding one SMTP connection for up to MAIL_MESSAGES_PER_CONNECTION messages
+#   - a shared token bucket keeps the whole process under MAIL_RATE_PER_SECOND (SMTP providers throttle)
+#   - a dropped connection is reopened and the message retried once; other errors fail only that message
+# Runs outside requests (scheduler jobs, background senders); each worker pushes its own app context.
+# app.py hands it the flask_mail instance with init_mailer(mail).
+
+MAIL_WORKERS = int(os.getenv('MAIL_WORKERS', 4))
+MAIL_RATE_PER_SECOND = float(os.getenv('MAIL_RATE_PER_SECOND', 10))
+MAIL_MESSAGES_PER_CONNECTION = int(os.getenv('MAIL_MESSAGES_PER_CONNECTION', 100))
+
+# The server refused this message; the session is still fine
+MESSAGE_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError)
+# Errors after which the SMTP session is unusable (reconnect), as opposed to a rejected message
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, TimeoutError, OSError)
+
+
+class RateLimiter:
+    """Token bucket shared by all sender threads (rate <= 0 disables it)."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class PooledMailSender:
+    def __init__(self, workers=MAIL_WORKERS, rate=MAIL_RATE_PER_SECOND,
+                 per_connection=MAIL_MESSAGES_PER_CONNECTION, mail=None):
+        self.workers = max(1, workers)
+        self.per_connection = max(1, per_connection)
+        self.limiter = RateLimiter(rate)
+        self._mail = mail
+        self._lock = threading.Lock()
+        self.stats = {'batches': 0, 'sent': 0, 'failed': 0, 'connections': 0}
+
+    @property
+    def mail(self):
+        if self._mail is None:
+            raise RuntimeError("PooledMailSender has no flask_mail instance; call init_mailer(mail) at startup")
+        return self._mail
+
+    def init_mail(self, mail):
+        self._mail = mail
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def _open(self):
+        connection = self.mail.connect()
+        connection.__enter__()
+        self._count('connections')
+        return connection
+
+    @staticmethod
+    def _close(connection):
+        try:
+            connection.__exit__(None, None, None)
+        except Exception:
+            pass  # the session is gone either way
+
+    def _send_chunk(self, messages):
+        """Send messages over one connection (reopened as needed); returns [(index, error or None)]."""
+        results = []
+        connection = None
+        sent_on_connection = 0
+        with self.mail.app.app_context():
+            try:
+                for index, message in messages:
+                    error = None
+                    for _ in range(2):  # one retry on a fresh connection
+                        try:
+                            if connection is None or sent_on_connection >= self.per_connection:
+                                if connection is not None:
+                                    self._close(connection)
+                                connection = None
+                                connection = self._open()
+                                sent_on_connection = 0
+                            self.limiter.acquire()
+                            connection.send(message)
+                            sent_on_connection += 1
+                            error = None
+                            break
+                        except MESSAGE_ERRORS as e:
+                            error = e
+                            break
+                        except CONNECTION_ERRORS as e:
+                            error = e
+                            if connection is not None:
+                                self._close(connection)
+                            connection = None
+                        except Exception as e:
+                            error = e
+                            break
+                    results.append((index, error))
+            finally:
+                if connection is not None:
+                    self._close(connection)
+        return results
+
+    def send_batch(self, messages):
+        """
+        Send every message and return a list with None (sent) or the exception for each one, in order.
+        Blocks until the batch is done.
+        """
+        messages = list(messages)
+        if not messages:
+            return []
+        workers = min(self.workers, len(messages))
+        chunks = [[] for _ in range(workers)]
+        for index, message in enumerate(messages):
+            chunks[index % workers].append((index, message))
+
+        errors = [None] * len(messages)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='mail-sender') as executor:
+            for chunk_results in executor.map(self._send_chunk, chunks):
+                for index, error in chunk_results:
+                    errors[index] = error
+
+        failed = sum(1 for error in errors if error is not None)
+        self._count('batches')
+        self._count('sent', len(messages) - failed)
+        self._count('failed', failed)
+        if failed:
+            logging.warning(f"[MAILER] {failed} of {len(messages)} emails failed, first error: {next(e for e in errors if e)}")
+        return errors
+
+
+mail_sender = PooledMailSender()
+
+
+# Give the shared sender the app's flask_mail instance (app.py, right after Mail(app))
+def init_mailer(mail):
+    mail_sender.init_mail(mail)
+
+
+def send_batch(messages):
+    return mail_sender.send_batch(messages)
+
+
+def get_mailer_stats():
+    with mail_sender._lock:
+        return dict(mail_sender.stats, workers=mail_sender.workers, rate_per_second=mail_sender.limiter.rate)
@@ -0,0 +1,354 @@
+from bisect import bisect_left
+import contextvars
+import hmac
+import logging
+import os
+import threading
+import time
+
+from flask import Response, current_app, g, request
+from psycopg2 import extensions
+
+from routes.Auth.db_pool import get_pool_stats
+
+
+# ======================== Request and database metrics ========================
+# Every request to the app's blueprints records, per endpoint:
+#   - latency (histogram) and responses per status code
+#   - database queries, database time and rows fetched (histograms / counter)
+# Database work is measured by the connection class the pool opens (InstrumentedConnection below): its
+# cursors time execute() and add to the counters of the request running on that thread. Queries outside
+# a request (scheduler jobs, background senders) go to the "background" totals.
+# The cost per query is two perf_counter() calls and a ContextVar lookup; per request, one lock and a few
+# list increments, so this stays on in production.
+# GET /metrics renders everything in the Prometheus text format together with the connection pool,
+# scheduler and background worker gauges. Metrics are per process: scrape every worker (or run one).
+# Access: "Authorization: Bearer <METRICS_TOKEN>" when METRICS_TOKEN is set, otherwise localhost only.
+# A request's QueryStats can carry a trace (routes/Auth/sql_trace.py), which then also gets every statement.
+
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+METRICS_PREFIX = 'ems'
+
+# Blueprints whose endpoints are measured (Blueprint names, see routes/*/__init__.py)
+INSTRUMENTED_BLUEPRINTS = {'admin_bp', 'employee_bp', 'login_bp', 'test_reminder'}
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+DB_TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+LOCAL_ADDRESSES = {'127.0.0.1', '::1'}
+
+
+class QueryStats:
+    """Database work done by one request (or by everything outside requests)."""
+
+    __slots__ = ('queries', 'seconds', 'rows', 'trace')
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+        self.rows = 0
+        self.trace = None
+
+
+_current_stats = contextvars.ContextVar('db_query_stats', default=None)
+_background_stats = QueryStats()
+_background_lock = threading.Lock()
+
+
+# Database work of the current request, None outside requests
+def current_query_stats():
+    return _current_stats.get()
+
+
+def record_query(seconds, rows, statement=True, query=None, cursor=None):
+    stats = _current_stats.get()
+    if stats is not None:  # a request thread: only that thread touches its stats
+        stats.queries += statement
+        stats.seconds += seconds
+        stats.rows += rows
+        if stats.trace is not None and statement:
+            stats.trace.add(query, seconds, rows, cursor)
+        return
+    with _background_lock:
+        _background_stats.queries += statement
+        _background_stats.seconds += seconds
+        _background_stats.rows += rows
+
+
+class TimedCursorMixin:
+    """Times execute()/executemany()/callproc()/copy_expert() and counts the rows a SELECT returned."""
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            record_query(time.perf_counter() - started, max(self.rowcount, 0) if self.description is not None else 0,
+                         query=query, cursor=self)
+
+    def executemany(self, query, vars_list):
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            record_query(time.perf_counter() - started, 0, query=query, cursor=self)
+
+    def callproc(self, procname, parameters=None):
+        started = time.perf_counter()
+        try:
+            return super().callproc(procname, parameters)
+        finally:
+            record_query(time.perf_counter() - started, max(self.rowcount, 0) if self.description is not None else 0,
+                         query=f"CALL {procname}", cursor=self)
+
+    def copy_expert(self, sql, file, size=8192):
+        started = time.perf_counter()
+        try:
+            return super().copy_expert(sql, file, size)
+        finally:
+            record_query(time.perf_counter() - started, 0, query=sql, cursor=self)
+
+
+_cursor_classes = {}
+
+
+# Timed subclass of a cursor class (plain, DictCursor, RealDictCursor, ...), created once per class
+def timed_cursor_class(base):
+    cls = _cursor_classes.get(base)
+    if cls is None:
+        cls = _cursor_classes[base] = type(f"Timed{base.__name__}", (TimedCursorMixin, base), {})
+    return cls
+
+
+class InstrumentedConnection(extensions.connection):
+    """psycopg2 connection whose cursors report to the metrics; commit time counts as database time."""
+
+    def cursor(self, name=None, cursor_factory=None, **kwargs):
+        base = cursor_factory or self.cursor_factory or extensions.cursor
+        return super().cursor(name, cursor_factory=timed_cursor_class(base), **kwargs)
+
+    def commit(self):
+        started = time.perf_counter()
+        try:
+            return super().commit()
+        finally:
+            record_query(time.perf_counter() - started, 0, statement=False)
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last slot is +Inf
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def render(self, name, labels, lines):
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        cumulative += self.counts[-1]
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {cumulative}')
+        lines.append(f'{name}_sum{{{labels}}} {self.sum:.6f}')
+        lines.append(f'{name}_count{{{labels}}} {cumulative}')
+
+
+class EndpointMetrics:
+    __slots__ = ('latency', 'queries', 'db_seconds', 'rows', 'statuses')
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.db_seconds = Histogram(DB_TIME_BUCKETS)
+        self.rows = 0
+        self.statuses = {}
+
+
+class RequestMetrics:
+    """Per (endpoint, method) histograms and counters, shared by all request threads of the process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self.started_at = time.time()
+
+    def observe(self, endpoint, method, status, seconds, db):
+        with self._lock:
+            metrics = self._endpoints.get((endpoint, method))
+            if metrics is None:
+                metrics = self._endpoints[(endpoint, method)] = EndpointMetrics()
+            metrics.latency.observe(seconds)
+            metrics.queries.observe(db.queries)
+            metrics.db_seconds.observe(db.seconds)
+            metrics.rows += db.rows
+            metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+
+    def render(self, lines):
+        p = METRICS_PREFIX
+        with self._lock:
+            endpoints = sorted(self._endpoints.items())
+            _header(lines, f'{p}_http_request_duration_seconds', 'histogram', 'Request latency per endpoint')
+            for (endpoint, method), metrics in endpoints:
+                metrics.latency.render(f'{p}_http_request_duration_seconds', _labels(endpoint=endpoint, method=method), lines)
+            _header(lines, f'{p}_http_responses_total', 'counter', 'Responses per endpoint and status code')
+            for (endpoint, method), metrics in endpoints:
+                for status, count in sorted(metrics.statuses.items()):
+                    lines.append(f'{p}_http_responses_total{{{_labels(endpoint=endpoint, method=method, status=status)}}} {count}')
+            _header(lines, f'{p}_db_queries_per_request', 'histogram', 'Database statements executed per request')
+            for (endpoint, method), metrics in endpoints:
+                metrics.queries.render(f'{p}_db_queries_per_request', _labels(endpoint=endpoint, method=method), lines)
+            _header(lines, f'{p}_db_seconds_per_request', 'histogram', 'Time spent in the database (statements and commit) per request')
+            for (endpoint, method), metrics in endpoints:
+                metrics.db_seconds.render(f'{p}_db_seconds_per_request', _labels(endpoint=endpoint, method=method), lines)
+            _header(lines, f'{p}_db_rows_fetched_total', 'counter', 'Rows returned by SELECT statements')
+            for (endpoint, method), metrics in endpoints:
+                lines.append(f'{p}_db_rows_fetched_total{{{_labels(endpoint=endpoint, method=method)}}} {metrics.rows}')
+
+
+request_metrics = RequestMetrics()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+
+
+def _header(lines, name, kind, help_text):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} {kind}')
+
+
+def _gauges(lines, component, stats):
+    """One gauge per numeric value of a stats() dict (strings such as modes are skipped)."""
+    for key, value in sorted(stats.items()):
+        if isinstance(value, bool):
+            value = int(value)
+        if not isinstance(value, (int, float)):
+            continue
+        name = f'{METRICS_PREFIX}_{component}_{key}'
+        lines.append(f'# TYPE {name} gauge')
+        lines.append(f'{name} {value}')
+
+
+def _background_sources():
+    # Imported here: these modules need the database helpers, which import this module
+    from routes.Auth.audit_writer import audit_writer
+    from routes.Auth.events import get_event_stats
+    from routes.Auth.mailer import get_mailer_stats
+    from routes.Auth.outbox import outbox_sender
+    from routes.Auth.password_hashing import get_password_hasher_stats
+    from routes.Auth.payslips import get_payslip_stats
+    from routes.Auth.reports import get_report_stats
+    return [
+        ('audit_writer', audit_writer.stats),
+        ('events', get_event_stats),
+        ('mailer', get_mailer_stats),
+        ('outbox', lambda: dict(outbox_sender.metrics)),
+        ('password_hasher', get_password_hasher_stats),
+        ('payslips', get_payslip_stats),
+        ('reports', get_report_stats),
+    ]
+
+
+def _render_scheduler(lines, scheduler):
+    p = METRICS_PREFIX
+    jobs = scheduler.get_jobs() if scheduler is not None else []
+    _header(lines, f'{p}_scheduler_running', 'gauge', 'Whether the reminder scheduler is running')
+    lines.append(f'{p}_scheduler_running {int(bool(scheduler is not None and scheduler.running))}')
+    _header(lines, f'{p}_scheduler_jobs', 'gauge', 'Scheduled jobs')
+    lines.append(f'{p}_scheduler_jobs {len(jobs)}')
+    _header(lines, f'{p}_scheduler_job_next_run_seconds', 'gauge', 'Seconds until the job runs next')
+    now = time.time()
+    for job in jobs:
+        if job.next_run_time is not None:
+            lines.append(f'{p}_scheduler_job_next_run_seconds{{{_labels(job=job.id)}}} {job.next_run_time.timestamp() - now:.0f}')
+
+
+def render_metrics(scheduler=None):
+    """Everything in the Prometheus text exposition format."""
+    p = METRICS_PREFIX
+    lines = []
+    _header(lines, f'{p}_process_start_time_seconds', 'gauge', 'When the metrics of this process started')
+    lines.append(f'{p}_process_start_time_seconds {request_metrics.started_at:.0f}')
+    request_metrics.render(lines)
+
+    with _background_lock:
+        background = (_background_stats.queries, _background_stats.seconds, _background_stats.rows)
+    _header(lines, f'{p}_db_background_queries_total', 'counter', 'Statements executed outside requests')
+    lines.append(f'{p}_db_background_queries_total {background[0]}')
+    _header(lines, f'{p}_db_background_seconds_total', 'counter', 'Database time outside requests')
+    lines.append(f'{p}_db_background_seconds_total {background[1]:.6f}')
+    _header(lines, f'{p}_db_background_rows_fetched_total', 'counter', 'Rows fetched outside requests')
+    lines.append(f'{p}_db_background_rows_fetched_total {background[2]}')
+
+    _gauges(lines, 'db_pool', get_pool_stats())
+    _render_scheduler(lines, scheduler)
+    for component, stats in _background_sources():
+        try:
+            _gauges(lines, component, stats())
+        except Exception as e:
+            logging.warning(f"[METRICS] Could not read {component} stats: {e}")
+    lines.append('')
+    return '\n'.join(lines)
+
+
+# Who may read /metrics and the SQL traces
+def metrics_access_allowed():
+    if METRICS_TOKEN:
+        supplied = request.headers.get('Authorization', '')
+        return hmac.compare_digest(supplied, f'Bearer {METRICS_TOKEN}')
+    return request.remote_addr in LOCAL_ADDRESSES
+
+
+def metrics_endpoint():
+    if not metrics_access_allowed():
+        return Response("Forbidden\n", status=403, mimetype='text/plain')
+    body = render_metrics(getattr(current_app, 'scheduler', None))
+    return Response(body, mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+
+# Register the request hooks and GET /metrics; call before init_db() so the commit at teardown is measured
+def init_metrics(app):
+
+    @app.before_request
+    def start_request_metrics():
+        if request.blueprint in INSTRUMENTED_BLUEPRINTS:
+            stats = QueryStats()
+            _current_stats.set(stats)
+            g._metrics = [time.perf_counter(), stats, None]
+
+    @app.after_request
+    def record_response_status(response):
+        state = g.get('_metrics')
+        if state is not None:
+            state[2] = response.status_code
+            if response.is_streamed:
+                # Streams (server-sent events) stay open: count them when the response starts
+                _finish(state)
+        return response
+
+    @app.teardown_request
+    def finish_request_metrics(exc):
+        state = g.pop('_metrics', None)
+        if state is not None:
+            if state[2] is None:
+                state[2] = 500  # unhandled exception, after_request never ran
+            _finish(state)
+
+    def _finish(state):
+        if g.get('_metrics') is state:
+            g._metrics = None
+        _current_stats.set(None)
+        request_metrics.observe(request.endpoint or 'unknown', request.method, state[2],
+                                time.perf_counter() - state[0], state[1])
+
+    app.add_url_rule('/metrics', 'metrics', metrics_endpoint, methods=['GET'])
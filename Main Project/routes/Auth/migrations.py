@@ -0,0 +1,246 @@
+import hashlib
+import importlib.util
+import logging
+import os
+import re
+import time
+
+from routes.Auth.utils import _connect
+
+
+# ======================== Versioned schema migrations ========================
+# Schema changes after "Database Setup/DatabaseSetup.sql" live in Main Project/migrations as numbered files:
+#   0003_hot_path_indexes.sql   plain SQL, split into statements and run in order
+#   0001_payroll_jobs.py        Python, defines upgrade(cur)
+# Applied versions are recorded in schema_migrations (with a checksum of the file). Every migration runs in
+# its own transaction, except files that start with "-- migrate: no-transaction" (needed for
+# CREATE INDEX CONCURRENTLY, which can't run inside a transaction block).
+# A session advisory lock keeps two processes from migrating at the same time.
+#
+# Run with: python migrate.py [status | up [--target VERSION] [--dry-run]]
+
+MIGRATIONS_DIR = os.getenv('MIGRATIONS_DIR', os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'migrations'))
+MIGRATION_LOCK_ID = 7210401  # pg_advisory_lock key
+NO_TRANSACTION_MARKER = '-- migrate: no-transaction'
+
+MIGRATION_FILE_RE = re.compile(r'^(\d{4})_([a-z0-9_]+)\.(sql|py)$')
+
+MIGRATIONS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version integer PRIMARY KEY,
+        name varchar(200) NOT NULL,
+        checksum varchar(64) NOT NULL,
+        applied_at timestamp without time zone NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        duration_ms integer
+    )
+"""
+
+
+class MigrationError(Exception):
+    pass
+
+
+class Migration:
+    """One file in the migrations folder."""
+
+    def __init__(self, version, name, path, kind):
+        self.version = version
+        self.name = name
+        self.path = path
+        self.kind = kind
+        with open(path, 'rb') as f:
+            content = f.read()
+        self.checksum = hashlib.sha256(content).hexdigest()
+        self.source = content.decode('utf-8')
+        self.transactional = not self.source.lstrip().startswith(NO_TRANSACTION_MARKER)
+
+    def statements(self):
+        return split_sql(self.source)
+
+    def run(self, cur):
+        if self.kind == 'sql':
+            for statement in self.statements():
+                cur.execute(statement)
+            return
+        spec = importlib.util.spec_from_file_location(f"migration_{self.version:04d}", self.path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        module.upgrade(cur)
+
+    def __repr__(self):
+        return f"<Migration {self.version:04d}_{self.name}.{self.kind}>"
+
+
+def split_sql(sql):
+    """Split a SQL script into statements, keeping quoted strings, dollar-quoted bodies and comments intact."""
+    statements = []
+    current = []
+    i = 0
+    length = len(sql)
+    while i < length:
+        char = sql[i]
+        if sql.startswith('--', i):
+            end = sql.find('\n', i)
+            end = length if end == -1 else end + 1
+            i = end
+            continue
+        if sql.startswith('/*', i):
+            end = sql.find('*/', i + 2)
+            i = length if end == -1 else end + 2
+            continue
+        if char == "'":
+            end = i + 1
+            while end < length:
+                if sql[end] == "'" and sql.startswith("''", end):
+                    end += 2
+                    continue
+                if sql[end] == "'":
+                    break
+                end += 1
+            current.append(sql[i:end + 1])
+            i = end + 1
+            continue
+        if char == '$':
+            match = re.match(r'\$[A-Za-z_]*\$', sql[i:])
+            if match:
+                tag = match.group(0)
+                end = sql.find(tag, i + len(tag))
+                end = length if end == -1 else end + len(tag)
+                current.append(sql[i:end])
+                i = end
+                continue
+        if char == ';':
+            statement = ''.join(current).strip()
+            if statement:
+                statements.append(statement)
+            current = []
+            i += 1
+            continue
+        current.append(char)
+        i += 1
+    statement = ''.join(current).strip()
+    if statement:
+        statements.append(statement)
+    return statements
+
+
+def require_schema(cur, migration, relations=(), functions=()):
+    """
+    Read-only runtime check for the ensure_*_schema() helpers: raise MigrationError if any of these tables/indexes
+    (to_regclass) or functions (to_regproc) don't exist yet. The request path never runs the DDL itself.
+    """
+    cur.execute(
+        """
+        SELECT name FROM unnest(%s::text[]) AS name WHERE to_regclass(name) IS NULL
+        UNION ALL
+        SELECT name FROM unnest(%s::text[]) AS name WHERE to_regproc(name) IS NULL
+        """,
+        (list(relations), list(functions))
+    )
+    missing = [row[0] for row in cur.fetchall()]
+    if missing:
+        raise MigrationError(f"Missing {', '.join(missing)}: run `python migrate.py` (migration {migration})")
+
+
+def discover_migrations(directory=MIGRATIONS_DIR):
+    """All migration files, ordered by version."""
+    migrations = {}
+    for filename in sorted(os.listdir(directory)):
+        match = MIGRATION_FILE_RE.match(filename)
+        if not match:
+            continue
+        version = int(match.group(1))
+        if version in migrations:
+            raise MigrationError(f"Duplicate migration version {version:04d}: {migrations[version].path} and {filename}")
+        migrations[version] = Migration(version, match.group(2), os.path.join(directory, filename), match.group(3))
+    return [migrations[version] for version in sorted(migrations)]
+
+
+def _applied(cur):
+    cur.execute(MIGRATIONS_TABLE_SQL)
+    cur.execute("SELECT version, name, checksum, applied_at FROM schema_migrations ORDER BY version")
+    return {row[0]: row for row in cur.fetchall()}
+
+
+def migration_status(conn=None, directory=MIGRATIONS_DIR):
+    """[(migration, applied_at or None, checksum_changed)] for every migration file."""
+    own = conn is None
+    conn = conn or _connect()
+    try:
+        with conn.cursor() as cur:
+            applied = _applied(cur)
+        conn.commit()
+        status = []
+        for migration in discover_migrations(directory):
+            row = applied.get(migration.version)
+            status.append((migration, row[3] if row else None, bool(row) and row[2] != migration.checksum))
+        return status
+    finally:
+        if own:
+            conn.close()
+
+
+def migrate(target=None, dry_run=False, conn=None, directory=MIGRATIONS_DIR):
+    """Apply pending migrations up to target (default: all). Returns the migrations that were (or would be) applied."""
+    own = conn is None
+    conn = conn or _connect()
+    conn.autocommit = True
+    done = []
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_ID,))
+        try:
+            with conn.cursor() as cur:
+                applied = _applied(cur)
+            for migration in discover_migrations(directory):
+                if target is not None and migration.version > target:
+                    break
+                row = applied.get(migration.version)
+                if row is not None:
+                    if row[2] != migration.checksum:
+                        logging.warning(f"[MIGRATIONS] {migration} changed after it was applied (checksum mismatch)")
+                    continue
+                done.append(migration)
+                if dry_run:
+                    continue
+                _apply(conn, migration)
+        finally:
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_ID,))
+    finally:
+        if own:
+            conn.close()
+    return done
+
+
+def _apply(conn, migration):
+    logging.info(f"[MIGRATIONS] Applying {migration}")
+    started = time.monotonic()
+    try:
+        if migration.transactional:
+            conn.autocommit = False
+            try:
+                with conn.cursor() as cur:
+                    migration.run(cur)
+                    _record(cur, migration, started)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.autocommit = True
+        else:
+            with conn.cursor() as cur:
+                migration.run(cur)
+                _record(cur, migration, started)
+    except Exception as e:
+        hint = '' if migration.transactional else ' (not transactional: drop any INVALID index it left behind before retrying)'
+        raise MigrationError(f"{migration} failed: {e}{hint}") from e
+    logging.info(f"[MIGRATIONS] Applied {migration} in {time.monotonic() - started:.1f}s")
+
+
+def _record(cur, migration, started):
+    cur.execute(
+        "INSERT INTO schema_migrations (version, name, checksum, duration_ms) VALUES (%s, %s, %s, %s)",
+        (migration.version, migration.name, migration.checksum, int((time.monotonic() - started) * 1000))
+    )
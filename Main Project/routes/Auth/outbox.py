@@ -0,0 +1,344 @@
+import logging
+import os
+import smtplib
+import threading
+import time
+
+from flask_mail import Message
+from psycopg2.extras import RealDictCursor
+
+from routes.Auth.mailer import init_mailer, mail_sender
+from routes.Auth.migrations import require_schema
+from routes.Auth.utils import db_session, on_commit
+
+
+# ======================== Email outbox ========================
+# Request handlers don't talk to SMTP any more. enqueue_email() inserts a row into email_outbox in the
+# request's own transaction, so the email exists exactly when the change that caused it (2FA code, reset
+# code, contact reply) is committed. A background sender per process then:
+#   - claims up to OUTBOX_BATCH_SIZE due rows (FOR UPDATE SKIP LOCKED, so any number of processes can share
+#     the outbox), highest priority first
+#   - sends them through the pooled SMTP sender (routes/Auth/mailer.py), which reuses connections
+#   - marks them sent, or reschedules them with exponential backoff; after OUTBOX_MAX_ATTEMPTS, on a
+#     permanent SMTP rejection, or once expires_at has passed, they are dead-lettered (status 'dead')
+# Rows left 'sending' by a crashed process are claimed again after OUTBOX_STALE_AFTER seconds.
+# get_outbox_status() is what the admin status endpoint and `python outbox.py status` show.
+
+OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', 50))
+OUTBOX_POLL_INTERVAL = float(os.getenv('OUTBOX_POLL_INTERVAL', 5))  # seconds between checks when idle
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', 6))
+OUTBOX_RETRY_BASE = float(os.getenv('OUTBOX_RETRY_BASE', 10))  # seconds before the first retry, doubled each time
+OUTBOX_RETRY_MAX = float(os.getenv('OUTBOX_RETRY_MAX', 3600))
+OUTBOX_STALE_AFTER = int(os.getenv('OUTBOX_STALE_AFTER', 300))
+OUTBOX_SENDER = os.getenv('OUTBOX_SENDER', '1') == '1'  # 0: this process only enqueues
+
+# Priorities: codes the user is waiting for go first
+PRIORITY_NORMAL = 0
+PRIORITY_HIGH = 10
+
+# Statuses
+PENDING = 'pending'
+SENDING = 'sending'
+SENT = 'sent'
+DEAD = 'dead'
+
+# The server will never accept these, retrying is pointless
+PERMANENT_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused)
+
+SCHEMA_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS email_outbox (
+        outbox_id bigserial PRIMARY KEY,
+        kind varchar(40) NOT NULL,
+        sender text,
+        recipients text[] NOT NULL,
+        subject text NOT NULL,
+        body text NOT NULL,
+        priority smallint NOT NULL DEFAULT 0,
+        status varchar(10) NOT NULL DEFAULT 'pending',
+        attempts integer NOT NULL DEFAULT 0,
+        last_error text,
+        created_at timestamp without time zone NOT NULL DEFAULT now(),
+        next_attempt_at timestamp without time zone NOT NULL DEFAULT now(),
+        expires_at timestamp without time zone,
+        claimed_at timestamp without time zone,
+        sent_at timestamp without time zone
+    )
+    """,
+    # The sender's claim query: due pending rows by priority
+    "CREATE INDEX IF NOT EXISTS email_outbox_due_idx ON email_outbox (priority DESC, next_attempt_at, outbox_id) WHERE status = 'pending'",
+    "CREATE INDEX IF NOT EXISTS email_outbox_sending_idx ON email_outbox (claimed_at) WHERE status = 'sending'",
+    "CREATE INDEX IF NOT EXISTS email_outbox_status_created_idx ON email_outbox (status, created_at DESC)",
+]
+
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+
+# Create the outbox table and its indexes if they don't exist yet (migrations/0009_email_outbox.py)
+def install_outbox_schema(cur):
+    for statement in SCHEMA_SQL:
+        cur.execute(statement)
+
+
+# Check once per process that migrations/0009_email_outbox.py has run; the request path never runs the DDL
+def ensure_outbox_schema():
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if _schema_ready:
+            return
+        with db_session() as conn, conn.cursor() as cur:
+            require_schema(cur, '0009_email_outbox',
+                           relations=('email_outbox', 'email_outbox_due_idx', 'email_outbox_sending_idx',
+                                      'email_outbox_status_created_idx'))
+        _schema_ready = True
+
+
+def enqueue_email(kind, recipients, subject, body, sender=None, priority=PRIORITY_NORMAL, expires_in=None):
+    """
+    Queue an email and return its outbox_id. Inside a request the row commits with the request's other
+    writes (and is dropped if they roll back); the sender is woken up once it is committed.
+    expires_in (seconds): give up instead of sending it late, e.g. for a code that expires.
+    """
+    ensure_outbox_schema()
+    if isinstance(recipients, str):
+        recipients = [recipients]
+    with db_session() as conn, conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO email_outbox (kind, sender, recipients, subject, body, priority, expires_at)
+            VALUES (%s, %s, %s, %s, %s, %s, CASE WHEN %s::float IS NULL THEN NULL ELSE now() + make_interval(secs => %s::float) END)
+            RETURNING outbox_id
+        """, (kind, sender or os.getenv("EMAIL_USER"), list(recipients), subject, body, priority, expires_in, expires_in))
+        outbox_id = cur.fetchone()[0]
+    on_commit(outbox_sender.wake)
+    logging.debug(f"[OUTBOX] Queued {kind} email {outbox_id} to {recipients}")
+    return outbox_id
+
+
+def enqueue_emails(cur, kind, subject, emails, sender=None, priority=PRIORITY_NORMAL):
+    """
+    Queue one email per (recipient, body) with a single INSERT on the caller's cursor, so the rows commit with
+    the caller's other writes (a scheduler job's own transaction, not only a request's). Returns the outbox_ids
+    in input order; call outbox_sender.wake() once committed.
+    """
+    ensure_outbox_schema()
+    if not emails:
+        return []
+    cur.execute("""
+        WITH queued AS (
+            SELECT r.ord, nextval(pg_get_serial_sequence('email_outbox', 'outbox_id')) AS outbox_id, r.recipient, r.body
+            FROM unnest(%s::text[], %s::text[]) WITH ORDINALITY AS r(recipient, body, ord)
+        ), inserted AS (
+            INSERT INTO email_outbox (outbox_id, kind, sender, recipients, subject, body, priority)
+            SELECT outbox_id, %s, %s, ARRAY[recipient], %s, body, %s FROM queued
+        )
+        SELECT outbox_id FROM queued ORDER BY ord
+    """, ([recipient for recipient, _ in emails], [body for _, body in emails],
+          kind, sender or os.getenv("EMAIL_USER"), subject, priority))
+    return [row[0] for row in cur.fetchall()]
+
+
+def retry_delay(attempts):
+    """Seconds to wait after the given number of failed attempts."""
+    return min(OUTBOX_RETRY_BASE * (2 ** max(attempts - 1, 0)), OUTBOX_RETRY_MAX)
+
+
+class OutboxSender:
+    """Background thread (one per process, restarted after a fork) that drains email_outbox."""
+
+    def __init__(self, batch_size=OUTBOX_BATCH_SIZE, poll_interval=OUTBOX_POLL_INTERVAL, mailer=mail_sender):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.mailer = mailer
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.metrics = {'batches': 0, 'sent': 0, 'retried': 0, 'dead': 0, 'last_batch_seconds': 0.0}
+
+    def start(self):
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != pid or not self._thread.is_alive():
+                self._pid = pid
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name='email-outbox', daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        self._wakeup.set()
+
+    def wake(self):
+        if OUTBOX_SENDER:
+            self.start()
+        self._wakeup.set()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                sent = self.process_batch()
+            except Exception as e:
+                logging.error(f"[OUTBOX] Sender error: {e}", exc_info=True)
+                sent = 0
+            if sent < self.batch_size:
+                # Nothing (more) due right now: sleep until woken or the next poll
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+    def _claim(self):
+        ensure_outbox_schema()
+        with db_session() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+            # Too late to be useful: dead-letter instead of sending
+            cur.execute("""
+                UPDATE email_outbox
+                SET status = %s, last_error = 'expired before it could be sent'
+                WHERE status = %s AND expires_at < now()
+            """, (DEAD, PENDING))
+            expired = cur.rowcount
+            cur.execute("""
+                UPDATE email_outbox o
+                SET status = %s, attempts = o.attempts + 1, claimed_at = now()
+                FROM (
+                    SELECT outbox_id FROM email_outbox
+                    WHERE (status = %s AND next_attempt_at <= now())
+                       OR (status = %s AND claimed_at < now() - make_interval(secs => %s))
+                    ORDER BY priority DESC, next_attempt_at, outbox_id
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                ) due
+                WHERE o.outbox_id = due.outbox_id
+                RETURNING o.outbox_id, o.kind, o.sender, o.recipients, o.subject, o.body, o.attempts
+            """, (SENDING, PENDING, SENDING, OUTBOX_STALE_AFTER, self.batch_size))
+            rows = cur.fetchall()
+        if expired:
+            self.metrics['dead'] += expired
+            logging.warning(f"[OUTBOX] {expired} email(s) expired before they could be sent")
+        return rows
+
+    def process_batch(self):
+        """Claim, send and settle one batch; returns how many rows were claimed."""
+        mail = self.mailer.mail  # resolve the mail extension before claiming anything (fails while the app is still loading)
+        rows = self._claim()
+        if not rows:
+            return 0
+        started = time.perf_counter()
+        default_sender = os.getenv("EMAIL_USER")
+        with mail.app.app_context():  # Message() falls back to MAIL_DEFAULT_SENDER
+            messages = [
+                Message(subject=row['subject'], sender=row['sender'] or default_sender,
+                        recipients=list(row['recipients']), body=row['body'])
+                for row in rows
+            ]
+        errors = self.mailer.send_batch(messages)
+
+        sent_ids, retry, dead = [], [], []
+        for row, error in zip(rows, errors):
+            if error is None:
+                sent_ids.append(row['outbox_id'])
+            elif isinstance(error, PERMANENT_ERRORS) or row['attempts'] >= OUTBOX_MAX_ATTEMPTS:
+                dead.append((row['outbox_id'], str(error)[:1000]))
+            else:
+                retry.append((row['outbox_id'], str(error)[:1000], retry_delay(row['attempts'])))
+
+        with db_session() as conn, conn.cursor() as cur:
+            if sent_ids:
+                cur.execute("""
+                    UPDATE email_outbox SET status = %s, sent_at = now(), last_error = NULL
+                    WHERE outbox_id = ANY(%s)
+                """, (SENT, sent_ids))
+            if retry:
+                cur.execute("""
+                    UPDATE email_outbox o
+                    SET status = %s, last_error = r.error, next_attempt_at = now() + make_interval(secs => r.delay)
+                    FROM unnest(%s::bigint[], %s::text[], %s::float[]) AS r(outbox_id, error, delay)
+                    WHERE o.outbox_id = r.outbox_id
+                """, (PENDING, [r[0] for r in retry], [r[1] for r in retry], [r[2] for r in retry]))
+            if dead:
+                cur.execute("""
+                    UPDATE email_outbox o
+                    SET status = %s, last_error = r.error
+                    FROM unnest(%s::bigint[], %s::text[]) AS r(outbox_id, error)
+                    WHERE o.outbox_id = r.outbox_id
+                """, (DEAD, [r[0] for r in dead], [r[1] for r in dead]))
+
+        self.metrics['batches'] += 1
+        self.metrics['sent'] += len(sent_ids)
+        self.metrics['retried'] += len(retry)
+        self.metrics['dead'] += len(dead)
+        self.metrics['last_batch_seconds'] = round(time.perf_counter() - started, 3)
+        for outbox_id, error in dead:
+            logging.error(f"[OUTBOX] Email {outbox_id} dead-lettered: {error}")
+        logging.info(f"[OUTBOX] Batch of {len(rows)}: {len(sent_ids)} sent, {len(retry)} to retry, {len(dead)} dead")
+        return len(rows)
+
+
+outbox_sender = OutboxSender()
+
+
+# Send everything that is due now on the calling thread (CLI / tests); returns the number of rows processed
+def drain_outbox(max_batches=None):
+    processed = batches = 0
+    while max_batches is None or batches < max_batches:
+        claimed = outbox_sender.process_batch()
+        if not claimed:
+            break
+        processed += claimed
+        batches += 1
+    return processed
+
+
+def get_outbox_status(dead_limit=20):
+    ensure_outbox_schema()
+    with db_session() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute("SELECT status, COUNT(*) AS count FROM email_outbox GROUP BY status")
+        counts = {row['status']: row['count'] for row in cur.fetchall()}
+        cur.execute("""
+            SELECT EXTRACT(EPOCH FROM now() - MIN(created_at)) AS oldest_pending_seconds
+            FROM email_outbox WHERE status IN (%s, %s)
+        """, (PENDING, SENDING))
+        oldest = cur.fetchone()['oldest_pending_seconds']
+        cur.execute("""
+            SELECT outbox_id, kind, recipients, subject, attempts, last_error, created_at
+            FROM email_outbox WHERE status = %s
+            ORDER BY created_at DESC LIMIT %s
+        """, (DEAD, dead_limit))
+        dead = cur.fetchall()
+    for row in dead:
+        row['created_at'] = row['created_at'].isoformat() if row['created_at'] else None
+    return {
+        "counts": {status: counts.get(status, 0) for status in (PENDING, SENDING, SENT, DEAD)},
+        "oldest_pending_seconds": round(float(oldest), 1) if oldest is not None else None,
+        "dead_letters": dead,
+        "sender": dict(outbox_sender.metrics, running=bool(outbox_sender._thread and outbox_sender._thread.is_alive())),
+    }
+
+
+# Put dead letters back in the queue (all of them when outbox_ids is None); returns how many were requeued.
+# Expired ones (a 2FA or reset code past its expires_at) stay dead: sending them late is worse than not at all.
+def retry_dead_letters(outbox_ids=None):
+    ensure_outbox_schema()
+    with db_session() as conn, conn.cursor() as cur:
+        cur.execute("""
+            UPDATE email_outbox
+            SET status = %s, attempts = 0, next_attempt_at = now()
+            WHERE status = %s AND (%s::bigint[] IS NULL OR outbox_id = ANY(%s::bigint[]))
+              AND (expires_at IS NULL OR expires_at > now())
+        """, (PENDING, DEAD, outbox_ids, outbox_ids))
+        requeued = cur.rowcount
+    if requeued:
+        on_commit(outbox_sender.wake)
+    return requeued
+
+
+# Called by app.py right after Mail(app): hands the pooled sender (shared with the reminder sweeps) the app's
+# flask_mail instance and starts the sender, so mail queued before a restart goes out
+def init_outbox(app, mail):
+    init_mailer(mail)
+    if OUTBOX_SENDER:
+        outbox_sender.start()
@@ -0,0 +1,160 @@
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+import bcrypt
+
+
+# ======================== Password hashing pool ========================
+# bcrypt work is fanned out over a process pool so a CSV import (or a burst of account creations)
+# doesn't pin one request thread for minutes. The salt is generated here and bcrypt.hashpw itself is
+# sent to the workers, so they never import the application.
+#
+# hash_password()  -> one hash, for interactive endpoints (register, add/update employee, password reset)
+# hash_passwords() -> a list of hashes in input order, for imports (routes/Auth/data_imports.py)
+#
+# PASSWORD_HASH_WORKERS=0 hashes inline on the calling thread.
+
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', 12))
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', 60))  # seconds for a single interactive hash
+# Not fork: the pool is created lazily on a request thread, and forking a threaded server copies locks held by
+# other threads. The forkserver imports app.py once as __mp_main__ (app.py skips its background services there).
+PASSWORD_HASH_START_METHOD = os.getenv(
+    'PASSWORD_HASH_START_METHOD',
+    'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+)
+
+
+class PasswordHasher:
+    """Process pool for bcrypt with throughput metrics."""
+
+    def __init__(self, workers=PASSWORD_HASH_WORKERS, rounds=BCRYPT_ROUNDS):
+        self.workers = workers
+        self.rounds = rounds
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.metrics = {
+            'hashes': 0,
+            'batches': 0,
+            'inline_hashes': 0,  # hashed on the calling thread (pool disabled, broken or too slow)
+            'timeouts': 0,
+            'pool_restarts': 0,
+            'hash_seconds_total': 0.0,
+        }
+
+    def _get_executor(self):
+        if self.workers <= 0:
+            return None
+        pid = os.getpid()
+        if self._executor is not None and self._pid == pid:
+            return self._executor
+        with self._lock:
+            if self._executor is None or self._pid != pid:
+                # A forked web worker can't use its parent's pool
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context(PASSWORD_HASH_START_METHOD)
+                )
+                self._pid = pid
+                logging.info(f"[PASSWORD HASHER] Started pool with {self.workers} worker(s) for pid {pid}")
+        return self._executor
+
+    def _reset_executor(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self.metrics['pool_restarts'] += 1
+
+    def _record(self, count, started, inline=False):
+        self.metrics['hashes'] += count
+        self.metrics['hash_seconds_total'] += time.monotonic() - started
+        if inline:
+            self.metrics['inline_hashes'] += count
+
+    def hash_password(self, password, rounds=None):
+        """Hash one password (str) and return the bcrypt hash as str."""
+        started = time.monotonic()
+        password = password.encode('utf-8')
+        salt = bcrypt.gensalt(rounds or self.rounds)
+        executor = self._get_executor()
+        if executor is not None:
+            future = executor.submit(bcrypt.hashpw, password, salt)
+            try:
+                hashed = future.result(timeout=PASSWORD_HASH_TIMEOUT)
+                self._record(1, started)
+                return hashed.decode('utf-8')
+            except FuturesTimeoutError:
+                # The pool is saturated (e.g. a large import): don't fail the request, hash it here instead
+                future.cancel()
+                self.metrics['timeouts'] += 1
+                logging.warning(f"[PASSWORD HASHER] No pool result after {PASSWORD_HASH_TIMEOUT:.0f}s, hashing inline")
+            except BrokenProcessPool as e:
+                logging.error(f"[PASSWORD HASHER] Pool broken, hashing inline: {e}")
+                self._reset_executor()
+        hashed = bcrypt.hashpw(password, salt)
+        self._record(1, started, inline=True)
+        return hashed.decode('utf-8')
+
+    def hash_passwords(self, passwords, rounds=None):
+        """Hash a list of passwords in parallel; returns the hashes in the same order."""
+        passwords = [password.encode('utf-8') for password in passwords]
+        if not passwords:
+            return []
+        started = time.monotonic()
+        salts = [bcrypt.gensalt(rounds or self.rounds) for _ in passwords]
+        executor = self._get_executor()
+        hashed = None
+        if executor is not None:
+            try:
+                chunksize = max(1, len(passwords) // (self.workers * 4))
+                hashed = list(executor.map(bcrypt.hashpw, passwords, salts, chunksize=chunksize))
+            except BrokenProcessPool as e:
+                logging.error(f"[PASSWORD HASHER] Pool broken, hashing batch inline: {e}")
+                self._reset_executor()
+        inline = hashed is None
+        if inline:
+            hashed = [bcrypt.hashpw(password, salt) for password, salt in zip(passwords, salts)]
+        self.metrics['batches'] += 1
+        self._record(len(passwords), started, inline=inline)
+        logging.debug(f"[PASSWORD HASHER] Hashed {len(passwords)} password(s) in {time.monotonic() - started:.2f}s")
+        return [value.decode('utf-8') for value in hashed]
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self):
+        stats = dict(self.metrics)
+        stats.update({
+            'workers': self.workers,
+            'rounds': self.rounds,
+            'hashes_per_second': (stats['hashes'] / stats['hash_seconds_total']) if stats['hash_seconds_total'] else 0.0,
+        })
+        return stats
+
+
+password_hasher = PasswordHasher()
+
+
+# Hash one password for an interactive endpoint
+def hash_password(password, rounds=None):
+    return password_hasher.hash_password(password, rounds)
+
+
+# Hash many passwords at once (imports)
+def hash_passwords(passwords, rounds=None):
+    return password_hasher.hash_passwords(passwords, rounds)
+
+
+# Hashing throughput for monitoring
+def get_password_hasher_stats():
+    return password_hasher.stats()
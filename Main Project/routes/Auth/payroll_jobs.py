@@ -0,0 +1,503 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+import psycopg2
+from psycopg2.extras import RealDictCursor, execute_values
+
+from routes.Auth.audit import log_audit
+from routes.Auth.migrations import require_schema
+from routes.Auth.payslips import render_payslips_for_run
+from routes.Auth.utils import db_session, get_db_connection
+
+
+# ======================== Background payroll jobs ========================
+# "Process payroll for all employees" runs as a job instead of inside the HTTP request:
+#   - create_payroll_job() splits the employees into chunks (payroll_job_chunks) and returns a job id
+#   - PAYROLL_JOB_WORKERS threads claim chunks (FOR UPDATE SKIP LOCKED), upsert the whole chunk with one
+#     INSERT ... ON CONFLICT (employee_id, month) and commit once per chunk together with the progress counters
+#   - get_payroll_job() is what the status endpoint returns
+# A chunk left "running" by a crashed process is claimed again after PAYROLL_JOB_STALE_AFTER seconds,
+# and unfinished jobs are picked up again when the app starts (resume_payroll_jobs), so a run is resumable.
+# Upserts are idempotent, re-running a chunk just rewrites the same rows.
+
+PAYROLL_JOB_CHUNK_SIZE = int(os.getenv('PAYROLL_JOB_CHUNK_SIZE', 500))
+PAYROLL_JOB_WORKERS = int(os.getenv('PAYROLL_JOB_WORKERS', 4))
+PAYROLL_JOB_MAX_ATTEMPTS = int(os.getenv('PAYROLL_JOB_MAX_ATTEMPTS', 3))
+PAYROLL_JOB_STALE_AFTER = int(os.getenv('PAYROLL_JOB_STALE_AFTER', 600))  # seconds before a "running" chunk counts as abandoned
+PAYROLL_JOB_POLL_INTERVAL = float(os.getenv('PAYROLL_JOB_POLL_INTERVAL', 5))  # seconds between checks while other processes hold chunks
+PAYROLL_DEFAULT_BASE_SALARY = 3000  # You may want to fetch this per employee
+
+# Job statuses
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_COMPLETED = 'completed'
+JOB_COMPLETED_WITH_ERRORS = 'completed_with_errors'
+JOB_FAILED = 'failed'
+
+# Rows that share an (employee_id, month) with a better row are moved to payroll_duplicates before the unique
+# index is built: the paid row is kept, otherwise the newest one
+_DUPLICATES_SQL = """
+    SELECT payroll_id
+    FROM (
+        SELECT payroll_id, ROW_NUMBER() OVER (
+            PARTITION BY employee_id, month ORDER BY (payment_status = 'Paid') IS TRUE DESC, payroll_id DESC
+        ) AS rank
+        FROM payroll
+        WHERE employee_id IS NOT NULL
+    ) ranked
+    WHERE rank > 1
+"""
+ARCHIVE_DUPLICATES_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS payroll_duplicates (
+        LIKE payroll INCLUDING DEFAULTS,
+        archived_at timestamp without time zone DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    WITH moved AS (
+        DELETE FROM payroll WHERE payroll_id = ANY(%(ids)s) RETURNING *
+    )
+    INSERT INTO payroll_duplicates SELECT * FROM moved
+    """,
+]
+
+SCHEMA_SQL = [
+    # Needed by INSERT ... ON CONFLICT (employee_id, month)
+    "CREATE UNIQUE INDEX IF NOT EXISTS payroll_employee_id_month_key ON payroll (employee_id, month)",
+    """
+    CREATE TABLE IF NOT EXISTS payroll_jobs (
+        job_id varchar(32) PRIMARY KEY,
+        month date NOT NULL,
+        status varchar(30) NOT NULL DEFAULT 'queued',
+        total_employees integer NOT NULL DEFAULT 0,
+        processed_employees integer NOT NULL DEFAULT 0,
+        failed_employees integer NOT NULL DEFAULT 0,
+        created_by integer,
+        created_by_role varchar(50),
+        created_at timestamp without time zone DEFAULT CURRENT_TIMESTAMP,
+        started_at timestamp without time zone,
+        finished_at timestamp without time zone,
+        updated_at timestamp without time zone DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS payroll_job_chunks (
+        job_id varchar(32) NOT NULL REFERENCES payroll_jobs(job_id) ON DELETE CASCADE,
+        chunk_no integer NOT NULL,
+        first_employee_id integer NOT NULL,
+        last_employee_id integer NOT NULL,
+        employee_count integer NOT NULL,
+        status varchar(20) NOT NULL DEFAULT 'pending',
+        attempts integer NOT NULL DEFAULT 0,
+        errors jsonb NOT NULL DEFAULT '[]'::jsonb,
+        claimed_at timestamp without time zone,
+        finished_at timestamp without time zone,
+        PRIMARY KEY (job_id, chunk_no)
+    )
+    """,
+]
+
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+
+# Move duplicate (employee_id, month) payroll rows to payroll_duplicates; returns how many were moved
+def archive_duplicate_payroll(cur):
+    cur.execute("SELECT to_regclass('payroll_employee_id_month_key')")
+    if cur.fetchone()[0] is not None:
+        return 0
+    cur.execute(_DUPLICATES_SQL)
+    ids = [row[0] for row in cur.fetchall()]
+    if not ids:
+        return 0
+    for statement in ARCHIVE_DUPLICATES_SQL:
+        cur.execute(statement, {'ids': ids})
+    logging.warning(f"[PAYROLL JOB] Moved {len(ids)} duplicate (employee_id, month) payroll row(s) to payroll_duplicates")
+    return len(ids)
+
+
+# Create the job tables and the payroll (employee_id, month) unique index if they don't exist yet
+# (run by migrations/0001_payroll_jobs.py)
+def install_payroll_job_schema(cur):
+    archive_duplicate_payroll(cur)
+    for statement in SCHEMA_SQL:
+        cur.execute(statement)
+
+
+# Check once per process that the migration has run; the request path never runs the DDL
+def ensure_payroll_job_schema():
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if _schema_ready:
+            return
+        with db_session() as conn, conn.cursor() as cur:
+            require_schema(cur, '0001_payroll_jobs',
+                           relations=('payroll_jobs', 'payroll_job_chunks', 'payroll_employee_id_month_key'))
+        _schema_ready = True
+
+
+# Payroll figures for one employee (same formula as the single-employee route)
+def compute_payroll(base_salary, hours_worked=0.0, overtime_hours=0.0, bonuses=0.0, tax_rate=0.0):
+    overtime_pay = overtime_hours * (base_salary / 160) * 1.5
+    total_salary = base_salary + overtime_pay + bonuses
+    tax = total_salary * (tax_rate / 100)
+    return {
+        "base_salary": base_salary,
+        "hours_worked": hours_worked,
+        "overtime_hours": overtime_hours,
+        "overtime_pay": overtime_pay,
+        "bonuses": bonuses,
+        "tax_rate": tax_rate,
+        "tax": tax,
+        "net_salary": total_salary - tax,
+    }
+
+
+_UPSERT_SQL = """
+    INSERT INTO payroll (employee_id, month, base_salary, hours_worked,
+                         overtime_hours, overtime_pay, bonuses, tax_rate,
+                         tax, net_salary, created_at)
+    VALUES %s
+    ON CONFLICT (employee_id, month) DO UPDATE
+    SET base_salary = EXCLUDED.base_salary, hours_worked = EXCLUDED.hours_worked,
+        overtime_hours = EXCLUDED.overtime_hours, overtime_pay = EXCLUDED.overtime_pay,
+        bonuses = EXCLUDED.bonuses, tax_rate = EXCLUDED.tax_rate,
+        tax = EXCLUDED.tax, net_salary = EXCLUDED.net_salary
+    RETURNING payroll_id, employee_id, (xmax = 0) AS inserted
+"""
+_UPSERT_TEMPLATE = "(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW())"
+
+_PAYROLL_FIELDS = ("base_salary", "hours_worked", "overtime_hours", "overtime_pay", "bonuses", "tax_rate", "tax", "net_salary")
+
+
+def _upsert_rows(cursor, month, rows):
+    values = [(row["employee_id"], month) + tuple(row[field] for field in _PAYROLL_FIELDS) for row in rows]
+    return execute_values(cursor, _UPSERT_SQL, values, template=_UPSERT_TEMPLATE, page_size=len(values), fetch=True)
+
+
+# Create a payroll run for a month (or reuse the one already in progress), returns (job_id, created)
+def create_payroll_job(month, admin_id=None, role=None):
+    ensure_payroll_job_schema()
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "SELECT job_id FROM payroll_jobs WHERE month = %s AND status IN (%s, %s) ORDER BY created_at DESC LIMIT 1",
+            (month, JOB_QUEUED, JOB_RUNNING)
+        )
+        existing = cursor.fetchone()
+        if existing:
+            return existing[0], False
+
+        job_id = uuid.uuid4().hex
+        cursor.execute(
+            "INSERT INTO payroll_jobs (job_id, month, status, created_by, created_by_role) VALUES (%s, %s, %s, %s, %s)",
+            (job_id, month, JOB_QUEUED, admin_id, role)
+        )
+        # Split employees into contiguous employee_id ranges of PAYROLL_JOB_CHUNK_SIZE
+        cursor.execute("""
+            INSERT INTO payroll_job_chunks (job_id, chunk_no, first_employee_id, last_employee_id, employee_count)
+            SELECT %s, chunk_no, MIN(employee_id), MAX(employee_id), COUNT(*)
+            FROM (
+                SELECT employee_id, (ROW_NUMBER() OVER (ORDER BY employee_id) - 1) / %s AS chunk_no
+                FROM employees
+            ) numbered
+            GROUP BY chunk_no
+        """, (job_id, PAYROLL_JOB_CHUNK_SIZE))
+        cursor.execute("""
+            UPDATE payroll_jobs
+            SET total_employees = (SELECT COALESCE(SUM(employee_count), 0) FROM payroll_job_chunks WHERE job_id = %s)
+            WHERE job_id = %s
+        """, (job_id, job_id))
+        conn.commit()
+        logging.info(f"[PAYROLL JOB] Created job {job_id} for {month}")
+        return job_id, True
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+
+# Job progress for the status endpoint (None if the job doesn't exist)
+def get_payroll_job(job_id):
+    ensure_payroll_job_schema()
+    with db_session() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute("SELECT * FROM payroll_jobs WHERE job_id = %s", (job_id,))
+        job = cur.fetchone()
+        if not job:
+            return None
+        cur.execute("""
+            SELECT status, COUNT(*) AS chunks
+            FROM payroll_job_chunks WHERE job_id = %s GROUP BY status
+        """, (job_id,))
+        chunks = {row['status']: row['chunks'] for row in cur.fetchall()}
+        cur.execute("""
+            SELECT jsonb_array_elements(errors) AS error
+            FROM payroll_job_chunks WHERE job_id = %s
+            ORDER BY chunk_no LIMIT 100
+        """, (job_id,))
+        errors = [row['error'] for row in cur.fetchall()]
+
+    total = job['total_employees'] or 0
+    done = job['processed_employees'] + job['failed_employees']
+    return {
+        "job_id": job['job_id'],
+        "month": str(job['month']),
+        "status": job['status'],
+        "total_employees": total,
+        "processed_employees": job['processed_employees'],
+        "failed_employees": job['failed_employees'],
+        "progress": round(done * 100.0 / total, 1) if total else 100.0,
+        "chunks": chunks,
+        "errors": errors,
+        "created_at": job['created_at'].isoformat() if job['created_at'] else None,
+        "started_at": job['started_at'].isoformat() if job['started_at'] else None,
+        "finished_at": job['finished_at'].isoformat() if job['finished_at'] else None,
+    }
+
+
+# Payroll rows written by a job (for the bulk payroll report)
+def get_payroll_job_results(job_id):
+    with db_session() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute("""
+            SELECT p.payroll_id, p.employee_id, e.email, p.month::text AS month, p.base_salary, p.hours_worked,
+                   p.overtime_hours, p.overtime_pay, p.bonuses, p.tax_rate, p.tax, p.net_salary
+            FROM payroll_jobs j
+            JOIN payroll p ON p.month = j.month
+            JOIN employees e ON e.employee_id = p.employee_id
+            WHERE j.job_id = %s
+            ORDER BY p.employee_id
+        """, (job_id,))
+        rows = cur.fetchall()
+    for row in rows:
+        for field in _PAYROLL_FIELDS:
+            if row[field] is not None:
+                row[field] = float(row[field])
+    return rows
+
+
+class PayrollJobRunner:
+    """Runs payroll jobs on background threads; chunks are claimed from the database so several processes can share a job."""
+
+    def __init__(self, workers=PAYROLL_JOB_WORKERS):
+        self.workers = workers
+        self._jobs = {}  # job_id -> coordinator thread (this process only)
+        self._lock = threading.Lock()
+
+    def start(self, job_id):
+        """Start (or resume) a job in this process; no-op if it is already running here."""
+        with self._lock:
+            thread = self._jobs.get(job_id)
+            if thread is not None and thread.is_alive():
+                return False
+            thread = threading.Thread(target=self._run, args=(job_id,), name=f'payroll-job-{job_id[:8]}', daemon=True)
+            self._jobs[job_id] = thread
+            thread.start()
+            return True
+
+    def is_running(self, job_id):
+        thread = self._jobs.get(job_id)
+        return thread is not None and thread.is_alive()
+
+    def _run(self, job_id):
+        try:
+            job = self._mark_running(job_id)
+            if job is None:
+                return
+            while True:
+                with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='payroll-chunk') as executor:
+                    for future in [executor.submit(self._work, job) for _ in range(self.workers)]:
+                        future.result()
+                if self._finish(job_id):
+                    break
+                # Chunks are still held by another process (or by one that crashed, until they go stale)
+                time.sleep(PAYROLL_JOB_POLL_INTERVAL)
+        except Exception as e:
+            logging.error(f"[PAYROLL JOB] Job {job_id} stopped: {e}", exc_info=True)
+
+    def _mark_running(self, job_id):
+        with db_session() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute("""
+                UPDATE payroll_jobs
+                SET status = %s, started_at = COALESCE(started_at, NOW()), updated_at = NOW()
+                WHERE job_id = %s AND status IN (%s, %s)
+                RETURNING job_id, month, created_by, created_by_role
+            """, (JOB_RUNNING, job_id, JOB_QUEUED, JOB_RUNNING))
+            return cur.fetchone()
+
+    def _claim(self, job_id):
+        with db_session() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute("""
+                UPDATE payroll_job_chunks c
+                SET status = 'running', attempts = c.attempts + 1, claimed_at = NOW()
+                FROM (
+                    SELECT job_id, chunk_no FROM payroll_job_chunks
+                    WHERE job_id = %s
+                      AND (status = 'pending'
+                           OR (status = 'running' AND claimed_at < NOW() - make_interval(secs => %s)))
+                    ORDER BY chunk_no
+                    LIMIT 1
+                    FOR UPDATE SKIP LOCKED
+                ) next_chunk
+                WHERE c.job_id = next_chunk.job_id AND c.chunk_no = next_chunk.chunk_no
+                RETURNING c.chunk_no, c.first_employee_id, c.last_employee_id, c.attempts
+            """, (job_id, PAYROLL_JOB_STALE_AFTER))
+            return cur.fetchone()
+
+    def _work(self, job):
+        while True:
+            chunk = self._claim(job['job_id'])
+            if chunk is None:
+                return
+            try:
+                self._process_chunk(job, chunk)
+            except Exception as e:
+                logging.error(f"[PAYROLL JOB] Chunk {chunk['chunk_no']} of job {job['job_id']} failed: {e}", exc_info=True)
+                final = chunk['attempts'] >= PAYROLL_JOB_MAX_ATTEMPTS
+                with db_session() as conn, conn.cursor() as cur:
+                    cur.execute("""
+                        UPDATE payroll_job_chunks
+                        SET status = %s, errors = %s::jsonb, finished_at = CASE WHEN %s THEN NOW() END
+                        WHERE job_id = %s AND chunk_no = %s
+                    """, ('failed' if final else 'pending', json.dumps([{"chunk": chunk['chunk_no'], "error": str(e)}]),
+                          final, job['job_id'], chunk['chunk_no']))
+                    if final:
+                        cur.execute("""
+                            UPDATE payroll_jobs
+                            SET failed_employees = failed_employees + (
+                                SELECT employee_count FROM payroll_job_chunks WHERE job_id = %s AND chunk_no = %s
+                            ), updated_at = NOW()
+                            WHERE job_id = %s
+                        """, (job['job_id'], chunk['chunk_no'], job['job_id']))
+
+    def _process_chunk(self, job, chunk):
+        """Upsert one chunk and record its progress in a single transaction, then audit and render payslips."""
+        job_id, month = job['job_id'], job['month']
+        errors = []
+        with db_session() as conn, conn.cursor() as cur:
+            cur.execute("""
+                SELECT employee_id, email FROM employees
+                WHERE employee_id BETWEEN %s AND %s
+                ORDER BY employee_id
+            """, (chunk['first_employee_id'], chunk['last_employee_id']))
+            rows = []
+            for employee_id, email in cur.fetchall():
+                # Default values; replace with actual logic if available (timesheets, bonuses table, ...)
+                row = compute_payroll(PAYROLL_DEFAULT_BASE_SALARY)
+                row.update({"employee_id": employee_id, "email": email, "month": str(month)})
+                rows.append(row)
+
+            cur.execute("SAVEPOINT payroll_chunk")
+            try:
+                written = _upsert_rows(cur, month, rows) if rows else []
+                cur.execute("RELEASE SAVEPOINT payroll_chunk")
+            except psycopg2.Error as e:
+                # Isolate the bad rows so the rest of the chunk still goes through
+                cur.execute("ROLLBACK TO SAVEPOINT payroll_chunk")
+                logging.warning(f"[PAYROLL JOB] Chunk {chunk['chunk_no']} upsert failed ({e}), retrying row by row")
+                written = []
+                for row in rows:
+                    cur.execute("SAVEPOINT payroll_row")
+                    try:
+                        written.extend(_upsert_rows(cur, month, [row]))
+                        cur.execute("RELEASE SAVEPOINT payroll_row")
+                    except psycopg2.Error as row_error:
+                        cur.execute("ROLLBACK TO SAVEPOINT payroll_row")
+                        errors.append({"employee_id": row["employee_id"], "error": str(row_error).strip()})
+
+            cur.execute("""
+                UPDATE payroll_job_chunks
+                SET status = 'done', errors = %s::jsonb, finished_at = NOW()
+                WHERE job_id = %s AND chunk_no = %s
+            """, (json.dumps(errors), job_id, chunk['chunk_no']))
+            cur.execute("""
+                UPDATE payroll_jobs
+                SET processed_employees = processed_employees + %s, failed_employees = failed_employees + %s, updated_at = NOW()
+                WHERE job_id = %s
+            """, (len(written), len(errors), job_id))
+
+        by_employee = {row["employee_id"]: row for row in rows}
+        for payroll_id, employee_id, inserted in written:
+            action = "Created payroll" if inserted else "Updated payroll"
+            if job['created_by'] is not None:
+                log_audit(job['created_by'], job['created_by_role'], action, f'{action} for employee ID {employee_id} for {month}')
+        # Payslip failures are logged by the renderer and don't fail the chunk
+        render_payslips_for_run([(payroll_id, by_employee[employee_id]) for payroll_id, employee_id, _ in written])
+
+        logging.debug(f"[PAYROLL JOB] Job {job_id} chunk {chunk['chunk_no']}: {len(written)} written, {len(errors)} errors")
+
+    def _finish(self, job_id):
+        """Close the job once no chunk is pending or running; returns False while chunks are still outstanding."""
+        with db_session() as conn, conn.cursor() as cur:
+            cur.execute("""
+                UPDATE payroll_jobs j
+                SET status = CASE
+                        WHEN j.processed_employees = 0 AND j.failed_employees > 0 THEN %s
+                        WHEN j.failed_employees > 0 THEN %s
+                        ELSE %s
+                    END,
+                    finished_at = NOW(), updated_at = NOW()
+                WHERE j.job_id = %s AND j.status = %s
+                  AND NOT EXISTS (
+                      SELECT 1 FROM payroll_job_chunks c
+                      WHERE c.job_id = j.job_id AND c.status IN ('pending', 'running')
+                  )
+                RETURNING j.status, j.processed_employees, j.failed_employees
+            """, (JOB_FAILED, JOB_COMPLETED_WITH_ERRORS, JOB_COMPLETED, job_id, JOB_RUNNING))
+            finished = cur.fetchone()
+            if finished:
+                logging.info(f"[PAYROLL JOB] Job {job_id} {finished[0]}: {finished[1]} processed, {finished[2]} failed")
+                return True
+            cur.execute("SELECT status FROM payroll_jobs WHERE job_id = %s", (job_id,))
+            status = cur.fetchone()
+            # Someone else already closed it
+            return status is None or status[0] != JOB_RUNNING
+
+
+payroll_job_runner = PayrollJobRunner()
+
+
+# Start a job in the background
+def start_payroll_job(job_id):
+    return payroll_job_runner.start(job_id)
+
+
+# Pick up jobs that were queued/running when the app last stopped
+def resume_payroll_jobs():
+    try:
+        with db_session() as conn, conn.cursor() as cur:
+            cur.execute("SELECT to_regclass('payroll_jobs')")
+            if cur.fetchone()[0] is None:
+                return []
+            cur.execute("SELECT job_id FROM payroll_jobs WHERE status IN (%s, %s) ORDER BY created_at", (JOB_QUEUED, JOB_RUNNING))
+            job_ids = [row[0] for row in cur.fetchall()]
+    except Exception as e:
+        logging.error(f"[PAYROLL JOB] Could not look for unfinished jobs: {e}")
+        return []
+    for job_id in job_ids:
+        logging.info(f"[PAYROLL JOB] Resuming job {job_id}")
+        start_payroll_job(job_id)
+    return job_ids
+
+
+# Resume unfinished payroll jobs in the background when the app starts
+def init_payroll_jobs(app):
+    threading.Thread(target=resume_payroll_jobs, name='payroll-job-resume', daemon=True).start()
+
+
+# First day of the month for a "YYYY-MM" string (current month if empty)
+def parse_payroll_month(month_str=None):
+    if not month_str:
+        return datetime.now().replace(day=1).date()
+    return datetime.strptime(month_str, "%Y-%m").date()
@@ -0,0 +1,275 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+
+
+# ======================== Payslip PDFs ========================
+# Used by the single-employee payroll route, the background payroll jobs (routes/Auth/payroll_jobs.py)
+# and the employee payslip download.
+#
+# - render_payslips() renders a batch on a process pool (PAYSLIP_RENDER_WORKERS)
+# - every PDF has a sidecar payslip_<id>.pdf.sha256 with the hash of the payroll values it was rendered from,
+#   a payslip whose values didn't change is not rendered again
+# - files are written to a temp file in the same folder and renamed, so a download never sees half a PDF
+# - ensure_payslip() renders on first download; with PAYSLIP_RENDER_MODE=lazy payroll runs don't render at all
+
+PAYSLIP_FOLDER = os.path.join('static', 'payslips')
+PAYSLIP_RENDER_WORKERS = int(os.getenv('PAYSLIP_RENDER_WORKERS', os.cpu_count() or 1))
+PAYSLIP_RENDER_MODE = os.getenv('PAYSLIP_RENDER_MODE', 'eager')  # "eager" (render during payroll runs) or "lazy" (on first download)
+# Not fork, the pool starts on a request or payroll-job thread; see PASSWORD_HASH_START_METHOD in password_hashing.py
+PAYSLIP_START_METHOD = os.getenv(
+    'PAYSLIP_START_METHOD',
+    'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+)
+PAYSLIP_TEMPLATE_VERSION = '1'  # bump when the layout below changes so every payslip is rendered again
+
+# Payroll values printed on the payslip (and hashed)
+PAYSLIP_FIELDS = ('employee_id', 'month', 'base_salary', 'hours_worked', 'overtime_hours', 'overtime_pay',
+                  'bonuses', 'tax_rate', 'tax', 'net_salary')
+
+
+# Path of the payslip PDF for a payroll row
+def payslip_path(payroll_id, folder=PAYSLIP_FOLDER):
+    return os.path.join(folder, f"payslip_{payroll_id}.pdf")
+
+
+def _hash_path(pdf_path):
+    return pdf_path + '.sha256'
+
+
+# Hash of everything that ends up on the payslip; numbers are normalised so floats and Decimals hash the same
+def payslip_content_hash(payroll_id, payroll_data):
+    values = {'payroll_id': int(payroll_id), 'template': PAYSLIP_TEMPLATE_VERSION}
+    for field in PAYSLIP_FIELDS:
+        value = payroll_data.get(field)
+        if field in ('employee_id', 'month') or value is None:
+            values[field] = None if value is None else str(value)
+        else:
+            values[field] = f"{float(value):.2f}"
+    return hashlib.sha256(json.dumps(values, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+# True if the PDF on disk was rendered from exactly these values
+def is_payslip_current(payroll_id, payroll_data, folder=PAYSLIP_FOLDER, digest=None):
+    pdf_path = payslip_path(payroll_id, folder)
+    try:
+        with open(_hash_path(pdf_path)) as f:
+            stored = f.read().strip()
+    except OSError:
+        return False
+    digest = digest or payslip_content_hash(payroll_id, payroll_data)
+    return stored == digest and os.path.exists(pdf_path)
+
+
+def _write_atomic(path, write):
+    """Write through a temp file in the same folder, then rename over the target."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp_', suffix=os.path.basename(path))
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _draw_payslip(pdf_path, payroll_id, payroll_data):
+    from reportlab.lib.pagesizes import letter  # imported here so only rendering pays for reportlab
+    from reportlab.pdfgen import canvas
+
+    c = canvas.Canvas(pdf_path, pagesize=letter)
+    width, height = letter
+    c.setFont("Helvetica-Bold", 16)
+    c.drawString(72, height-72, "Payslip")
+    c.setFont("Helvetica", 12)
+    c.drawString(72, height-100, f"Payroll ID: {payroll_id}")
+    c.drawString(72, height-120, f"Employee ID: {payroll_data.get('employee_id', 'N/A')}")
+    c.drawString(72, height-140, f"Month: {payroll_data.get('month', 'N/A')}")
+    y = height-180
+    c.setFont("Helvetica-Bold", 13)
+    c.drawString(72, y, "Details:")
+    y -= 20
+    c.setFont("Helvetica", 12)
+    c.drawString(90, y, f"Base Salary: ${payroll_data.get('base_salary', 0):,.2f}")
+    y -= 20
+    c.drawString(90, y, f"Hours Worked: {payroll_data.get('hours_worked', 0)}")
+    y -= 20
+    c.drawString(90, y, f"Overtime Hours: {payroll_data.get('overtime_hours', 0)}")
+    y -= 20
+    c.drawString(90, y, f"Overtime Pay: ${payroll_data.get('overtime_pay', 0):,.2f}")
+    y -= 20
+    c.drawString(90, y, f"Bonuses: ${payroll_data.get('bonuses', 0):,.2f}")
+    y -= 20
+    c.drawString(90, y, f"Tax Rate: {payroll_data.get('tax_rate', 0)}%")
+    y -= 20
+    c.drawString(90, y, f"Tax: ${payroll_data.get('tax', 0):,.2f}")
+    y -= 20
+    c.drawString(90, y, f"Net Salary: ${payroll_data.get('net_salary', 0):,.2f}")
+    c.setFont("Helvetica-Oblique", 10)
+    c.drawString(72, 72, "Generated by Payroll System")
+    c.save()
+
+
+def _render_to_disk(payroll_id, payroll_data, folder, digest):
+    """Render one payslip and its hash file (runs in the worker processes)."""
+    os.makedirs(folder, exist_ok=True)
+    pdf_path = payslip_path(payroll_id, folder)
+    _write_atomic(pdf_path, lambda tmp_path: _draw_payslip(tmp_path, payroll_id, payroll_data))
+
+    def write_hash(tmp_path):
+        with open(tmp_path, 'w') as f:
+            f.write(digest)
+    _write_atomic(_hash_path(pdf_path), write_hash)
+    return pdf_path
+
+
+class PayslipRenderer:
+    """Process pool for payslip PDFs with hash-based skipping."""
+
+    def __init__(self, workers=PAYSLIP_RENDER_WORKERS):
+        self.workers = workers
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.metrics = {
+            'rendered': 0,
+            'skipped_unchanged': 0,
+            'failed': 0,
+            'batches': 0,
+            'render_seconds_total': 0.0,
+        }
+
+    def _get_executor(self):
+        if self.workers <= 0:
+            return None
+        pid = os.getpid()
+        if self._executor is not None and self._pid == pid:
+            return self._executor
+        with self._lock:
+            if self._executor is None or self._pid != pid:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context(PAYSLIP_START_METHOD)
+                )
+                self._pid = pid
+                logging.info(f"[PAYSLIPS] Started render pool with {self.workers} worker(s) for pid {pid}")
+        return self._executor
+
+    def _reset_executor(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def render_one(self, payroll_id, payroll_data, folder=PAYSLIP_FOLDER, force=False):
+        """Render a single payslip on the calling thread if it is missing or out of date; returns its path."""
+        digest = payslip_content_hash(payroll_id, payroll_data)
+        if not force and is_payslip_current(payroll_id, payroll_data, folder, digest):
+            self.metrics['skipped_unchanged'] += 1
+            return payslip_path(payroll_id, folder)
+        started = time.monotonic()
+        try:
+            path = _render_to_disk(payroll_id, payroll_data, folder, digest)
+        except Exception:
+            self.metrics['failed'] += 1
+            raise
+        self.metrics['rendered'] += 1
+        self.metrics['render_seconds_total'] += time.monotonic() - started
+        return path
+
+    def render_many(self, items, folder=PAYSLIP_FOLDER, force=False):
+        """
+        Render a batch of (payroll_id, payroll_data) on the pool, skipping unchanged payslips.
+        Returns {'rendered': [...ids], 'skipped': [...ids], 'failed': {id: error}}.
+        """
+        result = {'rendered': [], 'skipped': [], 'failed': {}}
+        pending = []
+        for payroll_id, payroll_data in items:
+            digest = payslip_content_hash(payroll_id, payroll_data)
+            if not force and is_payslip_current(payroll_id, payroll_data, folder, digest):
+                result['skipped'].append(payroll_id)
+            else:
+                pending.append((payroll_id, payroll_data, digest))
+        self.metrics['skipped_unchanged'] += len(result['skipped'])
+        if not pending:
+            return result
+
+        started = time.monotonic()
+        executor = self._get_executor()
+        if executor is not None:
+            try:
+                futures = [(payroll_id, executor.submit(_render_to_disk, payroll_id, data, folder, digest))
+                           for payroll_id, data, digest in pending]
+                for payroll_id, future in futures:
+                    try:
+                        future.result()
+                        result['rendered'].append(payroll_id)
+                    except BrokenProcessPool:
+                        raise
+                    except Exception as e:
+                        result['failed'][payroll_id] = str(e)
+            except BrokenProcessPool as e:
+                logging.error(f"[PAYSLIPS] Render pool broken, rendering the rest inline: {e}")
+                self._reset_executor()
+                executor = None
+                done = set(result['rendered']) | set(result['failed'])
+                pending = [item for item in pending if item[0] not in done]
+        if executor is None:
+            for payroll_id, data, digest in pending:
+                try:
+                    _render_to_disk(payroll_id, data, folder, digest)
+                    result['rendered'].append(payroll_id)
+                except Exception as e:
+                    result['failed'][payroll_id] = str(e)
+
+        self.metrics['batches'] += 1
+        self.metrics['rendered'] += len(result['rendered'])
+        self.metrics['failed'] += len(result['failed'])
+        self.metrics['render_seconds_total'] += time.monotonic() - started
+        for payroll_id, error in result['failed'].items():
+            logging.error(f"[PAYSLIPS] Payslip PDF generation error (payroll_id={payroll_id}): {error}")
+        return result
+
+    def stats(self):
+        stats = dict(self.metrics)
+        stats['workers'] = self.workers
+        stats['mode'] = PAYSLIP_RENDER_MODE
+        return stats
+
+
+payslip_renderer = PayslipRenderer()
+
+
+# Render the payslip PDF for one payroll row (skipped if it is already up to date)
+def generate_payslip_pdf(payroll_id, payroll_data, folder=PAYSLIP_FOLDER):
+    return payslip_renderer.render_one(payroll_id, payroll_data, folder)
+
+
+# Render many payslips in parallel, e.g. a payroll chunk
+def render_payslips(items, folder=PAYSLIP_FOLDER, force=False):
+    return payslip_renderer.render_many(items, folder, force)
+
+
+# Payroll runs call this: renders now in eager mode, leaves it to the first download in lazy mode
+def render_payslips_for_run(items, folder=PAYSLIP_FOLDER):
+    if PAYSLIP_RENDER_MODE == 'lazy':
+        return {'rendered': [], 'skipped': [payroll_id for payroll_id, _ in items], 'failed': {}}
+    return render_payslips(items, folder)
+
+
+# Lazy mode for downloads: make sure the PDF exists and matches the current payroll row, returns its path
+def ensure_payslip(payroll_id, payroll_data, folder=PAYSLIP_FOLDER):
+    return payslip_renderer.render_one(payroll_id, payroll_data, folder)
+
+
+# Rendering counters for monitoring
+def get_payslip_stats():
+    return payslip_renderer.stats()
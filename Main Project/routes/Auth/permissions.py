@@ -1,4 +1,12 @@
-from routes.Auth.utils import get_db_connection
+import logging
+import os
+import threading
+import time
+
+from routes.Auth.events import (
+    ADMINS_CHANNEL, EVENT_BROKER, PERMISSION_CHANGED, RESYNC, add_event_listener, publish_permission_changed,
+)
+from routes.Auth.utils import db_session, get_db_connection
 
 # Check if a user/role has the required permission for a document
 def check_permission(user_id, role, document_id, required_permission='view'):
@@ -15,3 +23,153 @@ def check_permission(user_id, role, document_id, required_permission='view'):
         (document_id, user_id, role, required_permission),
         fetch_one=True
     )
+
+
+# ======================== Compiled admin permission index ========================
+# token_required_with_roles checks (route, action) grants against this in-process index instead of
+# querying routes/actions/admin_route_actions/admins on every call. Each admin's grants are compiled
+# with one query on first use; grant/revoke/verify endpoints drop that admin's entry and the
+# route/action management endpoints bump the catalog version, which drops everything.
+# The other workers drop theirs when the permission_changed event reaches them (add_event_listener); that
+# needs EVENT_BROKER=postgres with more than one worker, otherwise the short default TTL bounds staleness.
+
+# seconds an entry is trusted without an event
+PERMISSION_INDEX_TTL = float(os.getenv('PERMISSION_INDEX_TTL', 300 if EVENT_BROKER == 'postgres' else 5))
+
+
+class PermissionIndex:
+    """admin_id -> (is_verified, frozenset of (route_name, action_name)), plus the known route/action names."""
+
+    def __init__(self, ttl=PERMISSION_INDEX_TTL):
+        self.ttl = ttl
+        self.version = 0
+        self._lock = threading.Lock()
+        self._admins = {}  # admin_id -> (expires_at, entry)
+        self._catalog = None  # (expires_at, route_names, action_names)
+        self._watching_pid = None
+        self.builds = 0
+        self.hits = 0
+
+    def _watch(self):
+        """Follow permission_changed events in this process (started on first use, again after a fork)."""
+        pid = os.getpid()
+        if self._watching_pid != pid:
+            self._watching_pid = pid
+            add_event_listener(self.on_event)
+
+    def on_event(self, channel, event):
+        if event['type'] == RESYNC or (event['type'] == PERMISSION_CHANGED and channel == ADMINS_CHANNEL):
+            self.invalidate_all()
+        elif event['type'] == PERMISSION_CHANGED and channel.startswith('admin:'):
+            self.invalidate_admin(channel.split(':', 1)[1])
+
+    def catalog(self):
+        """Known route and action names (a missing route is denied, a missing action is ignored)."""
+        now = time.monotonic()
+        with self._lock:
+            if self._catalog is not None and self._catalog[0] > now:
+                return self._catalog[1], self._catalog[2]
+            version = self.version
+        self._watch()
+        with db_session() as conn, conn.cursor() as cur:
+            cur.execute("SELECT route_name FROM routes")
+            route_names = frozenset(row[0] for row in cur.fetchall())
+            cur.execute("SELECT action_name FROM actions")
+            action_names = frozenset(row[0] for row in cur.fetchall())
+        with self._lock:
+            if version == self.version:
+                self._catalog = (now + self.ttl, route_names, action_names)
+        return route_names, action_names
+
+    def admin(self, admin_id):
+        """Compiled entry for one admin: {'verified': bool, 'grants': frozenset}, or None if the admin doesn't exist."""
+        admin_id = int(admin_id)
+        now = time.monotonic()
+        with self._lock:
+            cached = self._admins.get(admin_id)
+            if cached is not None and cached[0] > now:
+                self.hits += 1
+                return cached[1]
+            version = self.version
+        self._watch()
+        with db_session() as conn, conn.cursor() as cur:
+            cur.execute("""
+                SELECT a.is_verified, r.route_name, ac.action_name
+                FROM admins a
+                LEFT JOIN admin_route_actions ara ON ara.admin_id = a.admin_id
+                LEFT JOIN routes r ON r.id = ara.route_id
+                LEFT JOIN actions ac ON ac.id = ara.action_id
+                WHERE a.admin_id = %s
+            """, (admin_id,))
+            rows = cur.fetchall()
+        entry = None
+        if rows:
+            entry = {
+                'verified': bool(rows[0][0]),
+                'grants': frozenset((route, action) for _, route, action in rows if route and action),
+            }
+        with self._lock:
+            self.builds += 1
+            # Only keep the result if nothing was invalidated while we were querying
+            if version == self.version:
+                self._admins[admin_id] = (now + self.ttl, entry)
+        return entry
+
+    def invalidate_admin(self, admin_id):
+        with self._lock:
+            self.version += 1
+            self._admins.pop(int(admin_id), None)
+
+    def invalidate_all(self):
+        with self._lock:
+            self.version += 1
+            self._admins.clear()
+            self._catalog = None
+
+    def stats(self):
+        with self._lock:
+            return {'admins': len(self._admins), 'version': self.version, 'builds': self.builds, 'hits': self.hits}
+
+
+permission_index = PermissionIndex()
+
+
+# Check whether an admin holds any/all of the given actions on a route
+def has_route_permission(admin_id, route_name, actions, require="any"):
+    """
+    Returns (allowed, reason). reason is None when allowed, otherwise 'route_not_found',
+    'admin_not_found' or 'forbidden'. Actions that don't exist in the actions table are ignored,
+    same as the per-request queries this replaces.
+    """
+    route_names, action_names = permission_index.catalog()
+    if route_name not in route_names:
+        return False, 'route_not_found'
+    entry = permission_index.admin(admin_id)
+    if entry is None:
+        return False, 'admin_not_found'
+    known = [action for action in actions if action in action_names]
+    if require == "all":
+        allowed = all((route_name, action) in entry['grants'] for action in known)
+    else:  # require == "any"
+        allowed = any((route_name, action) in entry['grants'] for action in known)
+    return allowed, None if allowed else 'forbidden'
+
+
+# Whether an admin account exists and is verified (None if it doesn't exist)
+def is_admin_verified(admin_id):
+    entry = permission_index.admin(admin_id)
+    return None if entry is None else entry['verified']
+
+
+# Call after changing an admin's grants or verification status
+def invalidate_admin_permissions(admin_id):
+    permission_index.invalidate_admin(admin_id)
+    publish_permission_changed(admin_id)
+    logging.debug(f"[PERMISSIONS] Permission index rebuilt on next use for admin {admin_id}")
+
+
+# Call after creating/renaming/deleting routes or actions
+def invalidate_permission_catalog():
+    permission_index.invalidate_all()
+    publish_permission_changed()
+    logging.debug("[PERMISSIONS] Permission catalog invalidated")
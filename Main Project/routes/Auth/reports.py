@@ -0,0 +1,376 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+import logging
+import os
+import threading
+
+from psycopg2.extras import Json
+
+from routes.Auth.attendance_rollups import ensure_attendance_rollup_schema, get_average_hours
+from routes.Auth.migrations import MigrationError, require_schema
+from routes.Auth.utils import db_session, release_request_connection
+
+
+# ======================== Report engine ========================
+# Backs /generate_reports. Each sub-report (attendance, payroll, performance, productivity):
+#   - is one aggregate query (grouping happens in SQL), run on its own pooled connection so the
+#     sub-reports of one request run concurrently (and only on that connection: a builder that opened a
+#     second one could drain the pool); the request gives its own connection back before it waits
+#   - is cached in report_snapshots keyed by (report, start_date, end_date), shared by all workers
+#   - stays valid until data lands inside its range: triggers on the source tables bump a per-day
+#     counter in report_source_versions, and a snapshot is reused only while the sum of those counters
+#     over its range (plus the source's "any day" counter) is unchanged. Historical ranges therefore
+#     stay cached until someone edits old data.
+# Long ranges can be prepared in the background (get_reports(..., wait=False)) and fetched later.
+#
+# After bulk loads with triggers disabled, call invalidate_report_cache().
+
+REPORT_WORKERS = int(os.getenv('REPORT_WORKERS', 4))
+REPORT_PENDING_TIMEOUT = int(os.getenv('REPORT_PENDING_TIMEOUT', 900))  # seconds before someone else's "pending" counts as abandoned
+REPORT_MAX_RANGE_DAYS = int(os.getenv('REPORT_MAX_RANGE_DAYS', 3660))
+
+# Snapshot states
+REPORT_PENDING = 'pending'
+REPORT_READY = 'ready'
+REPORT_FAILED = 'failed'
+
+ANY_DAY = '-infinity'  # report_source_versions.day for changes that can affect every date
+
+SCHEMA_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS report_source_versions (
+        source varchar(30) NOT NULL,
+        day date NOT NULL,
+        version bigint NOT NULL DEFAULT 0,
+        PRIMARY KEY (source, day)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS report_snapshots (
+        report varchar(30) NOT NULL,
+        start_date date NOT NULL,
+        end_date date NOT NULL,
+        status varchar(20) NOT NULL,
+        versions jsonb,
+        payload jsonb,
+        error text,
+        updated_at timestamp without time zone NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (report, start_date, end_date)
+    )
+    """,
+    # TG_ARGV[0] = source, TG_ARGV[1] = date/timestamp column of the row (none: the change affects every date)
+    """
+    CREATE OR REPLACE FUNCTION report_source_touch() RETURNS trigger
+        LANGUAGE plpgsql
+        AS $$
+    DECLARE
+      old_day date;
+      new_day date;
+    BEGIN
+      IF TG_NARGS < 2 THEN
+        old_day := DATE '-infinity';
+        new_day := old_day;
+      ELSE
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+          old_day := (to_jsonb(OLD) ->> TG_ARGV[1])::timestamp::date;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+          new_day := (to_jsonb(NEW) ->> TG_ARGV[1])::timestamp::date;
+        END IF;
+      END IF;
+      IF old_day IS NOT NULL THEN
+        INSERT INTO report_source_versions AS v (source, day, version) VALUES (TG_ARGV[0], old_day, 1)
+        ON CONFLICT (source, day) DO UPDATE SET version = v.version + 1;
+      END IF;
+      IF new_day IS NOT NULL AND new_day IS DISTINCT FROM old_day THEN
+        INSERT INTO report_source_versions AS v (source, day, version) VALUES (TG_ARGV[0], new_day, 1)
+        ON CONFLICT (source, day) DO UPDATE SET version = v.version + 1;
+      END IF;
+      RETURN NULL;
+    END;
+    $$
+    """,
+]
+
+# (trigger, table, events, arguments); UPDATE OF lists only the columns a report reads
+SOURCE_TRIGGERS = [
+    ('report_source_attendance', 'attendance_logs',
+     'INSERT OR DELETE OR UPDATE OF date, hours_worked', "'attendance', 'date'"),
+    ('report_source_payroll', 'payroll',
+     'INSERT OR DELETE OR UPDATE OF created_at, employee_id, net_salary', "'payroll', 'created_at'"),
+    ('report_source_performance', 'goal_progress',
+     'INSERT OR DELETE OR UPDATE OF updated_at, progress_percentage_id', "'performance', 'updated_at'"),
+    ('report_source_performance_pct', 'goal_progress_percentage',
+     'DELETE OR UPDATE OF progress_percentage', "'performance'"),
+    ('report_source_productivity', 'tasks',
+     'INSERT OR DELETE OR UPDATE OF due_date, employee_id', "'productivity', 'due_date'"),
+    ('report_source_productivity_dept', 'employees',
+     'DELETE OR UPDATE OF department', "'productivity'"),
+]
+
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+
+# Create the snapshot/version tables and the source triggers if they don't exist yet (migrations/0005_report_engine.py)
+def install_report_schema(cur):
+    for statement in SCHEMA_SQL:
+        cur.execute(statement)
+    for trigger, table, events, arguments in SOURCE_TRIGGERS:
+        cur.execute("SELECT 1 FROM pg_trigger WHERE tgname = %s", (trigger,))
+        if cur.fetchone() is None:
+            cur.execute(f"""
+                CREATE TRIGGER {trigger} AFTER {events} ON {table}
+                FOR EACH ROW EXECUTE FUNCTION report_source_touch({arguments})
+            """)
+
+
+# Check once per process that migrations/0005_report_engine.py has run; the request path never runs the DDL
+def ensure_report_schema():
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if _schema_ready:
+            return
+        with db_session() as conn, conn.cursor() as cur:
+            require_schema(cur, '0005_report_engine',
+                           relations=('report_source_versions', 'report_snapshots'),
+                           functions=('report_source_touch',))
+            cur.execute("""
+                SELECT name FROM unnest(%s::text[]) AS name
+                WHERE NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = name)
+            """, ([trigger for trigger, _, _, _ in SOURCE_TRIGGERS],))
+            missing = [row[0] for row in cur.fetchall()]
+            if missing:
+                raise MigrationError(f"Missing trigger {', '.join(missing)}: run `python migrate.py` (migration 0005_report_engine)")
+        _schema_ready = True
+
+
+# ---------------- Sub-reports ----------------
+
+def _attendance_report(cur, start_date, end_date):
+    data = get_average_hours(start_date, end_date, cur=cur)
+    return {"labels": [str(row[0]) for row in data], "data": [float(row[1]) for row in data]}
+
+
+def _payroll_report(cur, start_date, end_date):
+    cur.execute("""
+        SELECT employee_id, COALESCE(SUM(net_salary), 0)::float
+        FROM payroll
+        WHERE created_at BETWEEN %s AND %s
+        GROUP BY employee_id
+        ORDER BY employee_id
+    """, (start_date, end_date))
+    data = cur.fetchall()
+    return {"labels": [str(row[0]) for row in data], "data": [row[1] for row in data]}
+
+
+def _performance_report(cur, start_date, end_date):
+    cur.execute("""
+        SELECT EXTRACT(MONTH FROM gp.updated_at), AVG(gpp.progress_percentage)::float
+        FROM goal_progress gp
+        JOIN goal_progress_percentage gpp
+          ON gp.progress_percentage_id = gpp.progress_percentage_id
+        WHERE gp.updated_at BETWEEN %s AND %s
+        GROUP BY EXTRACT(MONTH FROM gp.updated_at)
+        ORDER BY EXTRACT(MONTH FROM gp.updated_at)
+    """, (start_date, end_date))
+    data = cur.fetchall()
+    return {"labels": [f"Month {int(row[0])}" for row in data], "data": [row[1] for row in data]}
+
+
+def _productivity_report(cur, start_date, end_date):
+    cur.execute("""
+        SELECT e.department, COUNT(task_id)
+        FROM tasks t
+        LEFT JOIN employees e ON e.employee_id = t.employee_id
+        WHERE due_date BETWEEN %s AND %s
+        GROUP BY e.department
+    """, (start_date, end_date))
+    data = cur.fetchall()
+    return {"labels": [row[0] if row[0] else "Unknown Department" for row in data], "data": [int(row[1]) for row in data]}
+
+
+# report name -> (builder, source it is invalidated by)
+REPORTS = {
+    'attendance': (_attendance_report, 'attendance'),
+    'payroll': (_payroll_report, 'payroll'),
+    'performance': (_performance_report, 'performance'),
+    'productivity': (_productivity_report, 'productivity'),
+}
+
+
+class ReportError(Exception):
+    """A sub-report failed; .report names it."""
+
+    def __init__(self, report, message):
+        super().__init__(message)
+        self.report = report
+
+
+def report_names(report_type):
+    """Sub-reports for ?report_type= ('all' or one name); raises ValueError for anything else."""
+    if report_type == 'all':
+        return list(REPORTS)
+    if report_type not in REPORTS:
+        raise ValueError(f"Unknown report_type: {report_type}")
+    return [report_type]
+
+
+def parse_report_range(start_date, end_date):
+    """(start, end) as dates; raises ValueError for bad or oversized ranges."""
+    start = date.fromisoformat(str(start_date)[:10])
+    end = date.fromisoformat(str(end_date)[:10])
+    if end < start:
+        raise ValueError("end_date is before start_date")
+    if (end - start).days > REPORT_MAX_RANGE_DAYS:
+        raise ValueError(f"Date range is longer than {REPORT_MAX_RANGE_DAYS} days")
+    return start, end
+
+
+class ReportEngine:
+    """Runs sub-reports on a thread pool and keeps their results in report_snapshots."""
+
+    def __init__(self, workers=REPORT_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='report')
+        self._lock = threading.Lock()
+        self._running = {}  # (report, start, end, source version) -> Future, for this process
+        self.hits = 0
+        self.builds = 0
+        self.failures = 0
+
+    def source_versions(self, sources, start, end):
+        with db_session() as conn, conn.cursor() as cur:
+            cur.execute("""
+                SELECT source, SUM(version)
+                FROM report_source_versions
+                WHERE source = ANY(%s) AND (day BETWEEN %s AND %s OR day = %s)
+                GROUP BY source
+            """, (list(sources), start, end, ANY_DAY))
+            found = {row[0]: int(row[1]) for row in cur.fetchall()}
+        return {source: found.get(source, 0) for source in sources}
+
+    def _snapshots(self, names, start, end):
+        with db_session() as conn, conn.cursor() as cur:
+            cur.execute("""
+                SELECT report, status, versions, payload, error, updated_at
+                FROM report_snapshots
+                WHERE report = ANY(%s) AND start_date = %s AND end_date = %s
+            """, (list(names), start, end))
+            return {row[0]: row[1:] for row in cur.fetchall()}
+
+    def _build(self, name, start, end, version):
+        """Compute one sub-report and store it; `version` was read before the queries ran, so a write that
+        lands meanwhile leaves the snapshot out of date instead of hiding the change."""
+        builder, source = REPORTS[name]
+        try:
+            with db_session() as conn, conn.cursor() as cur:
+                payload = builder(cur, start, end)
+        except Exception as e:
+            self.failures += 1
+            logging.error(f"[REPORTS] {name} report {start}..{end} failed: {e}", exc_info=True)
+            self._store(name, start, end, REPORT_FAILED, {source: version}, None, str(e))
+            raise ReportError(name, str(e)) from e
+        self.builds += 1
+        self._store(name, start, end, REPORT_READY, {source: version}, payload, None)
+        return payload
+
+    def _store(self, name, start, end, status, versions, payload, error):
+        with db_session() as conn, conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO report_snapshots (report, start_date, end_date, status, versions, payload, error, updated_at)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, NOW())
+                ON CONFLICT (report, start_date, end_date) DO UPDATE SET
+                    status = EXCLUDED.status, versions = EXCLUDED.versions, payload = EXCLUDED.payload,
+                    error = EXCLUDED.error, updated_at = EXCLUDED.updated_at
+            """, (name, start, end, status, Json(versions), Json(payload) if payload is not None else None, error))
+
+    def _submit(self, name, start, end, version):
+        # A build started for an older version must not be handed to a request that already sees newer data
+        key = (name, start, end, version)
+        with self._lock:
+            future = self._running.get(key)
+            if future is not None:
+                return future
+            future = self._executor.submit(self._build, name, start, end, version)
+            self._running[key] = future
+        future.add_done_callback(lambda _: self._forget(key, future))
+        return future
+
+    def _forget(self, key, future):
+        with self._lock:
+            if self._running.get(key) is future:
+                del self._running[key]
+
+    def get_reports(self, names, start, end, wait=True, start_missing=True):
+        """
+        Returns (reports, pending, failed): {name: payload} for up-to-date sub-reports, names still being
+        computed, and {name: error}.
+        wait=True computes missing/out-of-date sub-reports concurrently and waits (raises ReportError).
+        wait=False starts them in the background (or, with start_missing=False, only reports on them).
+        """
+        ensure_report_schema()
+        ensure_attendance_rollup_schema()  # here, not on a report thread that already holds a connection
+        versions = self.source_versions({REPORTS[name][1] for name in names}, start, end)
+        snapshots = self._snapshots(names, start, end)
+        reports, pending, failed, futures = {}, [], {}, {}
+        stale_before = datetime.now() - timedelta(seconds=REPORT_PENDING_TIMEOUT)
+        for name in names:
+            source = REPORTS[name][1]
+            current = {source: versions[source]}
+            snapshot = snapshots.get(name)
+            if snapshot is not None and snapshot[1] == current:
+                status, _, payload, error, updated_at = snapshot
+                if status == REPORT_READY:
+                    self.hits += 1
+                    reports[name] = payload
+                    continue
+                # Fetching reports the failure; preparing again retries it
+                if status == REPORT_FAILED and not wait and not start_missing:
+                    failed[name] = error
+                    continue
+                if status == REPORT_PENDING and not wait and updated_at > stale_before:
+                    pending.append(name)
+                    continue
+            if not wait and not start_missing:
+                continue
+            if not wait:
+                self._store(name, start, end, REPORT_PENDING, current, None, None)
+            futures[name] = self._submit(name, start, end, versions[source])
+
+        if wait and futures:
+            # Don't hold a pooled connection while the builders need theirs
+            release_request_connection()
+        for name, future in futures.items():
+            if not wait:
+                pending.append(name)
+                continue
+            reports[name] = future.result()
+        return reports, pending, failed
+
+    def stats(self):
+        with self._lock:
+            running = len(self._running)
+        return {'hits': self.hits, 'builds': self.builds, 'failures': self.failures, 'running': running}
+
+
+report_engine = ReportEngine()
+
+
+def get_reports(report_type, start_date, end_date, wait=True, start_missing=True):
+    """Validate the request arguments and return (reports, pending, failed); see ReportEngine.get_reports."""
+    names = report_names(report_type)
+    start, end = parse_report_range(start_date, end_date)
+    return report_engine.get_reports(names, start, end, wait=wait, start_missing=start_missing)
+
+
+# Drop every cached report (after bulk loads that bypassed the triggers)
+def invalidate_report_cache():
+    ensure_report_schema()
+    with db_session() as conn, conn.cursor() as cur:
+        cur.execute("DELETE FROM report_snapshots")
+
+
+def get_report_stats():
+    return report_engine.stats()
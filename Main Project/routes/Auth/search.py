@@ -0,0 +1,167 @@
+from datetime import date
+from decimal import Decimal
+import logging
+import os
+import re
+import threading
+
+from routes.Auth.utils import db_session
+
+
+# ======================== Search ========================
+# Shared by the employee, payroll and ticket search endpoints.
+#   - Free text is matched with ILIKE against one "search document" per table (the searchable columns
+#     joined with spaces). migrations/0006_search_indexes.sql puts a pg_trgm GIN index on exactly these
+#     expressions, so '%term%' is an index lookup instead of a scan of every row.
+#   - Matches are ranked with pg_trgm's word_similarity(term, document) (without the extension the
+#     results are still correct, just ordered by the endpoint's default order).
+#   - Numbers and dates are compared as numbers and dates (payroll_id = 42, month in 2024-05) instead
+#     of casting columns to text.
+#   - Every branch of an OR has its own index (0006 and 0011), so the planner combines them with a
+#     BitmapOr instead of falling back to a scan. "The employee matches" is employee_id = ANY(ARRAY(...)):
+#     the matching ids are collected once from the trigram index and looked up on the employee_id index.
+#   - Every search returns at most SEARCH_MAX_LIMIT rows.
+# The document expressions below must stay identical to the index definitions in 0006.
+
+SEARCH_DEFAULT_LIMIT = int(os.getenv('SEARCH_DEFAULT_LIMIT', 100))
+SEARCH_MAX_LIMIT = int(os.getenv('SEARCH_MAX_LIMIT', 500))
+
+
+def _document(columns, alias):
+    prefix = f"{alias}." if alias else ''
+    return "(" + " || ' ' || ".join(f"coalesce({prefix}{column}, '')" for column in columns) + ")"
+
+
+def employee_document(alias='e'):
+    return _document(('first_name', 'last_name', 'email', 'department'), alias)
+
+
+def ticket_document(alias='t'):
+    return _document(('subject', 'description', 'category', 'priority', 'status'), alias)
+
+
+_trgm_available = None
+_trgm_lock = threading.Lock()
+
+
+# Whether pg_trgm is installed (ranking needs word_similarity), checked once per process
+def trigram_available():
+    global _trgm_available
+    if _trgm_available is None:
+        with _trgm_lock:
+            if _trgm_available is None:
+                try:
+                    with db_session() as conn, conn.cursor() as cur:
+                        cur.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+                        _trgm_available = cur.fetchone() is not None
+                except Exception as e:
+                    logging.warning(f"[SEARCH] Could not check for pg_trgm: {e}")
+                    return False
+                if not _trgm_available:
+                    logging.warning("[SEARCH] pg_trgm is not installed, search results are not ranked (run python migrate.py)")
+    return _trgm_available
+
+
+def like_pattern(text):
+    """'%text%' with LIKE wildcards in the user's text escaped."""
+    escaped = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"%{escaped}%"
+
+
+def search_limit(limit):
+    """Clamp the ?limit= query parameter."""
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        return SEARCH_DEFAULT_LIMIT
+    return max(1, min(limit, SEARCH_MAX_LIMIT))
+
+
+MONTH_RE = re.compile(r'^(\d{4})-(\d{1,2})(?:-(\d{1,2}))?$')
+# Plain ASCII amounts only: Decimal() alone would also take NaN, Infinity and 1e3
+DECIMAL_RE = re.compile(r'^\d+(\.\d+)?$', re.ASCII)
+
+
+class SearchTerms:
+    """A search box value split into the typed interpretations it allows."""
+
+    def __init__(self, raw):
+        self.text = (raw or '').strip()
+        self.integer = int(self.text) if self.text.isascii() and self.text.isdigit() else None
+        self.decimal = None
+        if self.integer is None and DECIMAL_RE.match(self.text):
+            self.decimal = Decimal(self.text)
+        self.month = parse_month(self.text)
+
+    def __bool__(self):
+        return bool(self.text)
+
+    @property
+    def pattern(self):
+        return like_pattern(self.text)
+
+
+def parse_month(text):
+    """'2024-05' or '2024-05-17' -> first day of that month, anything else -> None."""
+    match = MONTH_RE.match((text or '').strip())
+    if not match:
+        return None
+    try:
+        return date(int(match.group(1)), int(match.group(2)), 1)
+    except ValueError:
+        return None
+
+
+def next_month(month):
+    return date(month.year + (month.month == 12), month.month % 12 + 1, 1)
+
+
+def rank_expression(document, terms, params):
+    """ORDER BY expression for the free-text part (appends its parameter); a constant without pg_trgm."""
+    if not terms.text or not trigram_available():
+        return "0"
+    params.append(terms.text)
+    return f"word_similarity(%s, {document})"
+
+
+def employee_search(terms, alias='e'):
+    """(where_sql, params) matching an employee id / phone number, or the text in name, email or department."""
+    if terms.integer is not None:
+        return f"({alias}.employee_id = %s OR {alias}.phone_number = %s)", [terms.integer, terms.text]
+    return f"{employee_document(alias)} ILIKE %s", [terms.pattern]
+
+
+def matching_employee_ids(terms):
+    """(sql, params): `= ANY(...)` operand with the ids of the employees whose search document matches."""
+    return f"ANY(ARRAY(SELECT employee_id FROM employees WHERE {employee_document(None)} ILIKE %s))", [terms.pattern]
+
+
+def payroll_search(terms, alias='p'):
+    """(where_sql, params) matching payroll/employee ids, net salary, month, payment status or the employee."""
+    conditions, params = [], []
+    if terms.integer is not None:
+        conditions.append(f"{alias}.payroll_id = %s OR {alias}.employee_id = %s OR {alias}.net_salary = %s")
+        params += [terms.integer, terms.integer, terms.integer]
+    elif terms.decimal is not None:
+        conditions.append(f"{alias}.net_salary = %s")
+        params.append(terms.decimal)
+    if terms.month is not None:
+        conditions.append(f"({alias}.month >= %s AND {alias}.month < %s)")
+        params += [terms.month, next_month(terms.month)]
+    if terms.integer is None and terms.decimal is None and terms.month is None:
+        employee_ids, employee_params = matching_employee_ids(terms)
+        conditions.append(f"{alias}.payment_status ILIKE %s")
+        conditions.append(f"{alias}.employee_id = {employee_ids}")
+        params += [terms.pattern] + employee_params
+    return "(" + " OR ".join(conditions) + ")", params
+
+
+def ticket_search(terms, alias='t'):
+    """(where_sql, params) matching the ticket id, its text columns or the employee who raised it."""
+    if terms.integer is not None:
+        return f"{alias}.ticket_id = %s", [terms.integer]
+    employee_ids, employee_params = matching_employee_ids(terms)
+    return (
+        f"({ticket_document(alias)} ILIKE %s OR {alias}.employee_id = {employee_ids})",
+        [terms.pattern] + employee_params,
+    )
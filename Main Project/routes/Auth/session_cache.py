@@ -0,0 +1,129 @@
+import logging
+import os
+import threading
+import time
+
+
+# ======================== Session validation cache ========================
+# Short-lived, in-process cache of JWT session checks keyed by jti, so the polling endpoints
+# (/validate_token, /api/employee_status, /check_jti) don't hit the database on every call.
+# Every place that changes a session (login, logout/blacklist, termination, deactivation,
+# role change, account removal) invalidates it explicitly; the TTL only bounds staleness
+# across worker processes.
+
+SESSION_CACHE_TTL = float(os.getenv('SESSION_CACHE_TTL', 30))  # seconds
+SESSION_CACHE_MAX_ENTRIES = int(os.getenv('SESSION_CACHE_MAX_ENTRIES', 50000))
+
+# Session states stored in the cache
+SESSION_VALID = 'valid'
+SESSION_BLACKLISTED = 'blacklisted'
+SESSION_MISMATCH = 'mismatch'
+
+
+class SessionCache:
+    """Thread-safe TTL cache of session lookups keyed by jti, with an owner index for bulk invalidation."""
+
+    def __init__(self, ttl=SESSION_CACHE_TTL, max_entries=SESSION_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}  # jti -> (expires_at, owner, data)
+        self._owners = {}  # owner -> set of jtis
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, jti):
+        """Return the cached data for a jti, or None if missing/expired."""
+        if not jti or self.ttl <= 0:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(jti)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    self._drop(jti)
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[2]
+
+    def put(self, jti, owner, data):
+        """Cache the lookup result for a jti owned by e.g. ('employee', 12) or ('admin', 3)."""
+        if not jti or self.ttl <= 0:
+            return
+        with self._lock:
+            if jti not in self._entries and len(self._entries) >= self.max_entries:
+                self._evict_expired()
+                if len(self._entries) >= self.max_entries:
+                    # Still full: drop the oldest entry (dicts keep insertion order)
+                    self._drop(next(iter(self._entries)))
+            self._drop(jti)
+            self._entries[jti] = (time.monotonic() + self.ttl, owner, data)
+            self._owners.setdefault(owner, set()).add(jti)
+
+    def invalidate(self, jti):
+        with self._lock:
+            if self._drop(jti):
+                self.invalidations += 1
+
+    def invalidate_owner(self, owner):
+        """Forget every cached session of one employee/admin."""
+        with self._lock:
+            for jti in list(self._owners.get(owner, ())):
+                self._drop(jti)
+                self.invalidations += 1
+            self._owners.pop(owner, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._owners.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'ttl': self.ttl,
+            }
+
+    def _drop(self, jti):
+        entry = self._entries.pop(jti, None)
+        if entry is None:
+            return False
+        jtis = self._owners.get(entry[1])
+        if jtis is not None:
+            jtis.discard(jti)
+            if not jtis:
+                del self._owners[entry[1]]
+        return True
+
+    def _evict_expired(self):
+        now = time.monotonic()
+        for jti in [jti for jti, entry in self._entries.items() if entry[0] <= now]:
+            self._drop(jti)
+
+
+session_cache = SessionCache()
+
+
+# Invalidate one session (logout / blacklisting)
+def invalidate_session(jti):
+    session_cache.invalidate(jti)
+    logging.debug(f"[SESSION CACHE] Invalidated jti {jti}")
+
+
+# Invalidate every session of an employee (new login, termination, deactivation, deletion)
+def invalidate_employee_sessions(employee_id):
+    session_cache.invalidate_owner(('employee', int(employee_id)))
+    logging.debug(f"[SESSION CACHE] Invalidated sessions of employee {employee_id}")
+
+
+# Invalidate every session of an admin or super admin (new login, role change, deletion)
+def invalidate_admin_sessions(admin_id, role=None):
+    kind = 'super_admin' if role == 'super_admin' else 'admin'
+    session_cache.invalidate_owner((kind, int(admin_id)))
+    logging.debug(f"[SESSION CACHE] Invalidated sessions of {kind} {admin_id}")
@@ -0,0 +1,244 @@
+from collections import OrderedDict
+from datetime import datetime
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+
+from flask import g, jsonify, request
+from psycopg2 import sql as pg_sql
+
+from routes.Auth.metrics import current_query_stats, metrics_access_allowed
+
+
+# ======================== SQL tracing ========================
+# Records every statement a request runs, using the instrumented cursors of routes/Auth/metrics.py:
+#   - normalized SQL (literals and parameters replaced by ?, IN lists collapsed), duration, rows, call site
+#   - N+1 warnings: one statement shape executed more than SQL_TRACE_REPEAT_THRESHOLD times in the request
+#   - slow statements: longer than SQL_TRACE_SLOW_MS
+# Enabled with SQL_TRACE:
+#   off     nothing is traced (default, the cursors then only count for /metrics)
+#   header  requests sent with "X-SQL-Trace: 1" are traced
+#   all     every request is traced (development)
+# A traced response carries X-SQL-Trace-Id; GET /sql-trace/<id> returns its JSON report and GET /sql-trace
+# lists the latest SQL_TRACE_KEEP traces. Both use the /metrics access rule (localhost or METRICS_TOKEN).
+
+SQL_TRACE = os.getenv('SQL_TRACE', 'off').lower()
+SQL_TRACE_HEADER = 'X-SQL-Trace'
+SQL_TRACE_REPEAT_THRESHOLD = int(os.getenv('SQL_TRACE_REPEAT_THRESHOLD', 5))
+SQL_TRACE_SLOW_MS = float(os.getenv('SQL_TRACE_SLOW_MS', 100))
+SQL_TRACE_MAX_QUERIES = int(os.getenv('SQL_TRACE_MAX_QUERIES', 1000))  # statements kept per report (all are counted)
+SQL_TRACE_KEEP = int(os.getenv('SQL_TRACE_KEEP', 200))
+
+# Source files below this folder count as call sites; frames in the database helpers are skipped
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SKIPPED_FILES = {
+    os.path.join(PROJECT_ROOT, 'routes', 'Auth', name)
+    for name in ('metrics.py', 'sql_trace.py', 'utils.py', 'db_pool.py')
+}
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w$.])-?\d+(?:\.\d+)?\b")
+_PARAM_RE = re.compile(r"%\(\w+\)s|%s")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ARRAY_RE = re.compile(r"ARRAY\[\s*\?(?:\s*,\s*\?)*\s*\]", re.IGNORECASE)
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_sql(query, cursor=None):
+    """Statement shape: the same query with different values gives the same string."""
+    if isinstance(query, pg_sql.Composable):
+        try:
+            query = query.as_string(cursor)
+        except Exception:
+            query = repr(query)
+    elif isinstance(query, bytes):
+        query = query.decode('utf-8', 'replace')
+    text = _SPACE_RE.sub(' ', str(query or '')).strip()
+    text = _STRING_RE.sub('?', text)
+    text = _PARAM_RE.sub('?', text)
+    text = _NUMBER_RE.sub('?', text)
+    text = _IN_LIST_RE.sub('(?...)', text)
+    return _ARRAY_RE.sub('ARRAY[?...]', text)
+
+
+def call_site():
+    """'routes/Employee/notifications.py:120 in get_unread_messages' for the code that ran the statement."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(PROJECT_ROOT) and filename not in SKIPPED_FILES and 'site-packages' not in filename:
+            relative = os.path.relpath(filename, PROJECT_ROOT).replace(os.sep, '/')
+            return f"{relative}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
+
+
+class RequestTrace:
+    """Statements of one request; attached to the request's QueryStats so the cursors feed it."""
+
+    def __init__(self, trace_id):
+        self.trace_id = trace_id
+        self.started = time.perf_counter()
+        self.started_at = datetime.now()
+        self.queries = []
+        self.shapes = {}  # normalized sql -> [count, seconds, rows, max seconds, call sites]
+        self.count = 0
+
+    def add(self, query, seconds, rows, cursor):
+        shape = normalize_sql(query, cursor)
+        site = call_site()
+        self.count += 1
+        entry = self.shapes.get(shape)
+        if entry is None:
+            entry = self.shapes[shape] = [0, 0.0, 0, 0.0, {}]
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2] += rows
+        entry[3] = max(entry[3], seconds)
+        entry[4][site] = entry[4].get(site, 0) + 1
+        if len(self.queries) < SQL_TRACE_MAX_QUERIES:
+            self.queries.append({
+                'sql': shape,
+                'duration_ms': round(seconds * 1000, 3),
+                'rows': rows,
+                'call_site': site,
+                'offset_ms': round((time.perf_counter() - self.started - seconds) * 1000, 3),
+            })
+
+    def report(self, method, path, endpoint, status):
+        statements = sorted(
+            ({
+                'sql': shape,
+                'count': count,
+                'total_ms': round(seconds * 1000, 3),
+                'max_ms': round(slowest * 1000, 3),
+                'rows': rows,
+                'call_sites': [{'call_site': site, 'count': n} for site, n in sorted(sites.items(), key=lambda i: -i[1])],
+            } for shape, (count, seconds, rows, slowest, sites) in self.shapes.items()),
+            key=lambda s: -s['total_ms'],
+        )
+        n_plus_one = [
+            {'sql': s['sql'], 'count': s['count'], 'total_ms': s['total_ms'], 'call_sites': s['call_sites']}
+            for s in statements if s['count'] > SQL_TRACE_REPEAT_THRESHOLD
+        ]
+        slow = [q for q in self.queries if q['duration_ms'] > SQL_TRACE_SLOW_MS]
+        return {
+            'trace_id': self.trace_id,
+            'method': method,
+            'path': path,
+            'endpoint': endpoint,
+            'status': status,
+            'started_at': self.started_at.isoformat(),
+            'duration_ms': round((time.perf_counter() - self.started) * 1000, 3),
+            'query_count': self.count,
+            'db_ms': round(sum(s['total_ms'] for s in statements), 3),
+            'rows': sum(s['rows'] for s in statements),
+            'n_plus_one': n_plus_one,
+            'slow_queries': slow,
+            'statements': statements,
+            'queries': self.queries,
+            'truncated': self.count > len(self.queries),
+            'thresholds': {'repeat': SQL_TRACE_REPEAT_THRESHOLD, 'slow_ms': SQL_TRACE_SLOW_MS},
+        }
+
+
+class TraceStore:
+    """The latest SQL_TRACE_KEEP reports of this process."""
+
+    def __init__(self, keep=SQL_TRACE_KEEP):
+        self.keep = keep
+        self._reports = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, report):
+        with self._lock:
+            self._reports[report['trace_id']] = report
+            while len(self._reports) > self.keep:
+                self._reports.popitem(last=False)
+
+    def get(self, trace_id):
+        with self._lock:
+            return self._reports.get(trace_id)
+
+    def summaries(self):
+        with self._lock:
+            reports = list(self._reports.values())
+        return [{
+            'trace_id': r['trace_id'],
+            'started_at': r['started_at'],
+            'method': r['method'],
+            'path': r['path'],
+            'status': r['status'],
+            'duration_ms': r['duration_ms'],
+            'query_count': r['query_count'],
+            'db_ms': r['db_ms'],
+            'n_plus_one': len(r['n_plus_one']),
+            'slow_queries': len(r['slow_queries']),
+        } for r in reversed(reports)]
+
+
+trace_store = TraceStore()
+
+
+def _trace_requested():
+    if SQL_TRACE == 'all':
+        return True
+    return SQL_TRACE == 'header' and request.headers.get(SQL_TRACE_HEADER) == '1'
+
+
+def list_traces():
+    if not metrics_access_allowed():
+        return jsonify({"error": "Forbidden"}), 403
+    return jsonify({"mode": SQL_TRACE, "traces": trace_store.summaries()})
+
+
+def get_trace(trace_id):
+    if not metrics_access_allowed():
+        return jsonify({"error": "Forbidden"}), 403
+    report = trace_store.get(trace_id)
+    if report is None:
+        return jsonify({"error": "Trace not found (only the latest traces of this process are kept)"}), 404
+    return jsonify(report)
+
+
+# Register the tracing hooks and the report endpoints; call after init_metrics() and before init_db()
+def init_sql_trace(app):
+    app.add_url_rule('/sql-trace', 'list_sql_traces', list_traces, methods=['GET'])
+    app.add_url_rule('/sql-trace/<trace_id>', 'get_sql_trace', get_trace, methods=['GET'])
+    if SQL_TRACE not in ('header', 'all'):
+        return
+    logging.info(f"[SQL TRACE] Tracing enabled ({SQL_TRACE})")
+
+    @app.before_request
+    def start_sql_trace():
+        stats = current_query_stats()
+        if stats is not None and _trace_requested():
+            stats.trace = RequestTrace(uuid.uuid4().hex[:16])
+            g._sql_trace = stats.trace
+
+    @app.after_request
+    def add_trace_header(response):
+        trace = g.get('_sql_trace')
+        if trace is not None:
+            response.headers['X-SQL-Trace-Id'] = trace.trace_id
+            g._sql_trace_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def finish_sql_trace(exc):
+        trace = g.pop('_sql_trace', None)
+        if trace is None:
+            return
+        report = trace.report(request.method, request.path, request.endpoint, g.pop('_sql_trace_status', 500))
+        trace_store.add(report)
+        if report['n_plus_one'] or report['slow_queries']:
+            worst = report['n_plus_one'][0] if report['n_plus_one'] else None
+            logging.warning(
+                f"[SQL TRACE] {request.method} {request.path} ({report['trace_id']}): {report['query_count']} statements, "
+                f"{len(report['n_plus_one'])} repeated shape(s), {len(report['slow_queries'])} slow"
+                + (f"; worst: {worst['count']}x {worst['sql'][:120]} at {worst['call_sites'][0]['call_site']}" if worst else "")
+            )
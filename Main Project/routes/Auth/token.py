@@ -6,7 +6,9 @@ import logging
 import uuid
 import jwt
 from flask import current_app, g, jsonify, redirect, request, url_for
-from routes.Auth.utils import get_db_connection
+from routes.Auth.permissions import has_route_permission, is_admin_verified
+from routes.Auth.session_cache import SESSION_BLACKLISTED, SESSION_MISMATCH, SESSION_VALID, invalidate_admin_sessions, session_cache
+from routes.Auth.utils import db_session
 from psycopg2.errors import UniqueViolation
 import psycopg2
 from psycopg2 import DatabaseError,extras
@@ -109,7 +111,8 @@ EMPLOYEE_MANAGEMENT_ENDPOINTS = {
     "get_team_management_data",
     "add_employee",
     "delete_employee",
-    "employeemanagement_data"
+    "employeemanagement_data",
+    "employeemanagement_detail"
 }
 
 # Import Data endpoints
@@ -141,6 +144,9 @@ PAYROLL_AND_FINANCIAL_MANAGEMENT_ENDPOINTS = {
     "get_payrolls",
     "view_payroll_details",
     "process_payroll",
+    "process_payroll_all",
+    "get_payroll_job_status",
+    "resume_payroll_job",
     "get_employee_details_salary",
     "reject_expense",
     "approve_expense",
@@ -207,6 +213,8 @@ REPORT_AND_ANALYTICS_ENDPOINTS = {
     "payroll_report",
     "get_attendance_report",
     "generate_reports",
+    "prepare_reports",
+    "fetch_prepared_reports",
     "reporting_and_analytics_data"
 }
 
@@ -254,7 +262,9 @@ SYSTEM_ADMINISTRATION_ENDPOINTS = {
     "view_holiday",
     "edit_leave_balance",
     "get_employee_leave_details",
-    "get_leave_balances"
+    "get_leave_balances",
+    "email_outbox_status",
+    "retry_email_outbox"
 }
 
 # Training and Development endpoints
@@ -397,15 +407,17 @@ def verify_admin_token(fn):
         jti = payload.get('jti')
         role_id = payload.get('role_id')
 
+        # Session lookups are cached by jti (see routes/Auth/session_cache.py)
+        cached = session_cache.get(jti)
+        if cached is not None and not role_id:
+            role_id = cached['role_id']
+
         # Fallback: fetch role_id from DB if not in token
         if not role_id and admin_id:
             try:
-                conn = get_db_connection()
-                cur = conn.cursor()
-                cur.execute("SELECT role_id FROM admins WHERE admin_id = %s", (admin_id,))
-                res = cur.fetchone()
-                cur.close()
-                conn.close()
+                with db_session() as conn, conn.cursor() as cur:
+                    cur.execute("SELECT role_id FROM admins WHERE admin_id = %s", (admin_id,))
+                    res = cur.fetchone()
                 if res:
                     role_id = res[0]
             except Exception as e:
@@ -417,28 +429,29 @@ def verify_admin_token(fn):
             return jsonify({'error': 'Invalid token payload'}), 401
 
         try:
-            conn = get_db_connection()
-            cur = conn.cursor()
-
-            if role == 'super_admin':
-                cur.execute("SELECT jti FROM super_admins WHERE super_admin_id = %s", (admin_id,))
-            else:
-                cur.execute("""
-                    SELECT jti FROM admins
-                    WHERE admin_id = %s AND role_id = (
-                        SELECT role_id FROM roles WHERE role_name = %s
-                    )
-                """, (admin_id, role))
-
-            result = cur.fetchone()
-            cur.close()
-            conn.close()
-
-            if not result:
+            if cached is None:
+                with db_session() as conn, conn.cursor() as cur:
+                    if role == 'super_admin':
+                        cur.execute("SELECT jti FROM super_admins WHERE super_admin_id = %s", (admin_id,))
+                    else:
+                        cur.execute("""
+                            SELECT jti FROM admins
+                            WHERE admin_id = %s AND role_id = (
+                                SELECT role_id FROM roles WHERE role_name = %s
+                            )
+                        """, (admin_id, role))
+
+                    result = cur.fetchone()
+
+                cached = {'found': result is not None, 'db_jti': result[0] if result else None, 'role_id': role_id}
+                owner = ('super_admin' if role == 'super_admin' else 'admin', int(admin_id))
+                session_cache.put(jti, owner, cached)
+
+            if not cached['found']:
                 logging.warning(f"No JTI found for {role} ID {admin_id}")
                 return jsonify({'error': 'Invalid admin credentials'}), 403
 
-            db_jti = result[0]
+            db_jti = cached['db_jti']
             if db_jti != jti:
                 logging.warning(f"JTI mismatch for {role} {admin_id}: token={jti}, db={db_jti}")
                 return jsonify({'error': 'session_conflict'}), 403
@@ -536,43 +549,15 @@ def token_required_with_roles(allowed_roles=None, required_actions=None, require
             has_role_permission = False
 
             if allowed_roles is None and route_name and actions:
-                conn = get_db_connection()
-                with conn.cursor() as cur:
-                    # Get route_id
-                    cur.execute("SELECT id FROM routes WHERE route_name = %s", (route_name,))
-                    route_row = cur.fetchone()
-                    if not route_row:
-                        logging.warning(f"Route '{route_name}' not found.")
-                        conn.close()
-                        return jsonify({"error": f"Route '{route_name}' not found."}), 403
-                    route_id = route_row[0]
-
-                    # Get action_ids
-                    action_ids = []
-                    for action in actions:
-                        cur.execute("SELECT id FROM actions WHERE action_name = %s", (action,))
-                        row = cur.fetchone()
-                        if not row:
-                            logging.warning(f"Action '{action}' not found.")
-                            continue
-                        action_ids.append(row[0])
-
-                    # Query all granted action_ids for this admin/route
-                    cur.execute(
-                        "SELECT action_id FROM admin_route_actions WHERE admin_id = %s AND route_id = %s",
-                        (admin_id, route_id)
-                    )
-                    granted_action_ids = {row[0] for row in cur.fetchall()}
-
-                    if require == "all":
-                        has_permission = all(
-                            aid in granted_action_ids for aid in action_ids
-                        )
-                    else:  # require == "any"
-                        has_permission = any(
-                            aid in granted_action_ids for aid in action_ids
-                        )
-                conn.close()
+                # O(1) set checks against the compiled permission index (routes/Auth/permissions.py)
+                try:
+                    has_permission, reason = has_route_permission(admin_id, route_name, actions, require)
+                except Exception as e:
+                    logging.error(f"Database error in permission check: {e}", exc_info=True)
+                    return jsonify({"error": "Internal server error"}), 500
+                if reason == 'route_not_found':
+                    logging.warning(f"Route '{route_name}' not found.")
+                    return jsonify({"error": f"Route '{route_name}' not found."}), 403
             elif allowed_roles is not None:
                 has_role_permission = (role_id in allowed_roles)
 
@@ -588,21 +573,16 @@ def token_required_with_roles(allowed_roles=None, required_actions=None, require
             # --- Verified Admin Check ---
             if role != 'super_admin':
                 try:
-                    conn = get_db_connection()
-                    with conn.cursor() as cur:
-                        cur.execute("SELECT is_verified FROM admins WHERE admin_id = %s", (admin_id,))
-                        result = cur.fetchone()
-                        if not result:
-                            logging.warning(f"Admin ID {admin_id} not found.")
-                            return jsonify({"error": "Access denied. Admin not found."}), 403
-                        if not result[0]:
-                            logging.warning(f"Admin ID {admin_id} is not verified.")
-                            return jsonify({"error": "Access denied. Admin not verified."}), 403
+                    verified = is_admin_verified(admin_id)
+                    if verified is None:
+                        logging.warning(f"Admin ID {admin_id} not found.")
+                        return jsonify({"error": "Access denied. Admin not found."}), 403
+                    if not verified:
+                        logging.warning(f"Admin ID {admin_id} is not verified.")
+                        return jsonify({"error": "Access denied. Admin not verified."}), 403
                 except Exception as e:
                     logging.error(f"Database error in role check: {e}", exc_info=True)
                     return jsonify({"error": "Internal server error"}), 500
-                finally:
-                    conn.close()
 
             logging.debug(f"Permission check passed for admin_id={admin_id}, route={route_name}, actions={actions}, require={require}")
             return view_function(admin_id, role, role_id, *args, **kwargs)
@@ -696,17 +676,14 @@ def fix_jwt_padding(token):
   
 # Helper function to generate JWT token (Employee)
 def generate_token(user_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT e.role_id, r.role_name
-        FROM employees e
-        JOIN roles r ON e.role_id = r.role_id
-        WHERE e.employee_id = %s
-    """, (user_id,))
-    result = cursor.fetchone()
-    cursor.close()
-    conn.close()
+    with db_session() as conn, conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT e.role_id, r.role_name
+            FROM employees e
+            JOIN roles r ON e.role_id = r.role_id
+            WHERE e.employee_id = %s
+        """, (user_id,))
+        result = cursor.fetchone()
 
     if not result:
         raise Exception("User not found")
@@ -749,15 +726,12 @@ def generate_admin_token(admin_id, role, role_id, is_super_admin=False):
         payload['role_id'] = role_id
 
     # Save JTI to database
-    conn = get_db_connection()
-    cur = conn.cursor()
-    if is_super_admin:
-        cur.execute("UPDATE super_admins SET jti = %s WHERE super_admin_id = %s", (jti, admin_id))
-    else:
-        cur.execute("UPDATE admins SET jti = %s WHERE admin_id = %s", (jti, admin_id))
-    conn.commit()
-    cur.close()
-    conn.close()
+    with db_session() as conn, conn.cursor() as cur:
+        if is_super_admin:
+            cur.execute("UPDATE super_admins SET jti = %s WHERE super_admin_id = %s", (jti, admin_id))
+        else:
+            cur.execute("UPDATE admins SET jti = %s WHERE admin_id = %s", (jti, admin_id))
+    invalidate_admin_sessions(admin_id, 'super_admin' if is_super_admin else 'admin')
 
     return jwt.encode(payload, SECRET_KEY, algorithm='HS256')
 
@@ -802,8 +776,6 @@ def get_admin_from_token(token=None):
 
 # Helper function to verify token for employee
 def verify_employee_token(token):
-    conn = None
-    cursor = None
     try:
         # Fix padding for base64 if needed
         token = fix_jwt_padding(token)
@@ -819,10 +791,9 @@ def verify_employee_token(token):
             raise Exception("Invalid token payload")
 
         # Query role_name from database
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT role_name FROM roles WHERE role_id = %s", (role_id,))
-        result = cursor.fetchone()
+        with db_session() as conn, conn.cursor() as cursor:
+            cursor.execute("SELECT role_name FROM roles WHERE role_id = %s", (role_id,))
+            result = cursor.fetchone()
 
         if not result:
             raise Exception("Role not found")
@@ -841,12 +812,6 @@ def verify_employee_token(token):
         logging.error(f"Error verifying token: {e}", exc_info=True)
         return None, None
 
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
-
 
 # decorator to check for logged in employee's token
 def get_employee_token():
@@ -887,8 +852,6 @@ def employee_jwt_required(check_jti=True):
                     return jsonify({'error': 'Unauthorized', 'debug': 'No token found'}), 401
                 return redirect(url_for('login_bp.employeelogin', reason='session_expired'))
 
-            conn = None
-            cursor = None
             try:
                 payload = jwt.decode(token, SECRET_KEY, algorithms=['HS256'])
                 print(f"[JWT DECORATOR] JWT payload: {payload}")
@@ -898,14 +861,35 @@ def employee_jwt_required(check_jti=True):
                 print(f"[JWT DECORATOR] JTI from payload: {jti}")
                 logging.debug(f"[JWT DECORATOR] JTI from payload: {jti}")
 
-                conn = get_db_connection()
-                cursor = conn.cursor()
+                employee_id = payload.get('employee_id') or payload.get('user_id') or payload.get('sub')
+                employee_role = payload.get('role_name')
+                role_id = payload.get('role_id')
 
-                # Check if token is blacklisted
-                cursor.execute("SELECT 1 FROM blacklisted_tokens WHERE jti = %s", (jti,))
-                blacklisted = cursor.fetchone()
-                print(f"[JWT DECORATOR] Token blacklisted? {blacklisted is not None}")
-                logging.debug(f"[JWT DECORATOR] Token blacklisted? {blacklisted is not None}")
+                # Blacklist, current-session and account-status lookups are cached by jti,
+                # steady-state polling doesn't touch the database (see routes/Auth/session_cache.py)
+                session = session_cache.get(jti)
+                if session is None:
+                    with db_session() as conn, conn.cursor() as cursor:
+                        cursor.execute("""
+                            SELECT EXISTS (SELECT 1 FROM blacklisted_tokens WHERE jti = %s),
+                                   e.current_jti, e.account_status
+                            FROM (SELECT 1) AS one
+                            LEFT JOIN employees e ON e.employee_id = %s
+                        """, (jti, employee_id))
+                        blacklisted, current_jti, account_status = cursor.fetchone()
+                    if blacklisted:
+                        state = SESSION_BLACKLISTED
+                    elif current_jti is None or current_jti != jti:
+                        state = SESSION_MISMATCH
+                    else:
+                        state = SESSION_VALID
+                    session = {'state': state, 'account_status': account_status}
+                    if employee_id:
+                        session_cache.put(jti, ('employee', int(employee_id)), session)
+
+                blacklisted = session['state'] == SESSION_BLACKLISTED
+                print(f"[JWT DECORATOR] Token blacklisted? {blacklisted}")
+                logging.debug(f"[JWT DECORATOR] Token blacklisted? {blacklisted}")
                 if blacklisted:
                     print("[JWT DECORATOR] Token found in blacklist.")
                     logging.debug("[JWT DECORATOR] Token found in blacklist.")
@@ -913,9 +897,6 @@ def employee_jwt_required(check_jti=True):
                         return jsonify({'error': 'Unauthorized', 'debug': 'Token is blacklisted'}), 401
                     return redirect(url_for('login_bp.employeelogin', reason='session_expired'))
 
-                employee_id = payload.get('employee_id') or payload.get('user_id') or payload.get('sub')
-                employee_role = payload.get('role_name')
-                role_id = payload.get('role_id')
                 print(f"[JWT DECORATOR] employee_id: {employee_id}, employee_role: {employee_role}, role_id: {role_id}")
                 logging.debug(f"[JWT DECORATOR] employee_id: {employee_id}, employee_role: {employee_role}, role_id: {role_id}")
 
@@ -927,11 +908,9 @@ def employee_jwt_required(check_jti=True):
                     return redirect(url_for('login_bp.employeelogin', reason='session_expired'))
 
                 if check_jti:
-                    cursor.execute("SELECT current_jti FROM employees WHERE employee_id = %s", (employee_id,))
-                    result = cursor.fetchone()
-                    print(f"[JWT DECORATOR] current_jti from DB: {result[0] if result else None}")
-                    logging.debug(f"[JWT DECORATOR] current_jti from DB: {result[0] if result else None}")
-                    if result is None or result[0] != jti:
+                    print(f"[JWT DECORATOR] Session state: {session['state']}")
+                    logging.debug(f"[JWT DECORATOR] Session state: {session['state']}")
+                    if session['state'] != SESSION_VALID:
                         print("[JWT DECORATOR] JTI mismatch or user not found in DB.")
                         logging.debug("[JWT DECORATOR] JTI mismatch or user not found in DB.")
                         if is_api_request():
@@ -941,6 +920,8 @@ def employee_jwt_required(check_jti=True):
                 g.employee_id = employee_id
                 g.employee_role = employee_role
                 g.role_id = role_id
+                g.account_status = session['account_status']
+                g.jti = jti
 
                 print("[JWT DECORATOR] Passed all checks, proceeding with request.")
                 logging.debug("[JWT DECORATOR] Passed all checks, proceeding with request.")
@@ -963,10 +944,5 @@ def employee_jwt_required(check_jti=True):
                 if is_api_request():
                     return jsonify({'error': 'Unauthorized', 'debug': str(e)}), 401
                 return redirect(url_for('login_bp.employeelogin', reason='session_expired'))
-            finally:
-                if cursor:
-                    cursor.close()
-                if conn:
-                    conn.close()
         return decorated_function
     return wrapper
\ No newline at end of file
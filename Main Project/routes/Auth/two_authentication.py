@@ -5,19 +5,21 @@ from functools import wraps
 from datetime import datetime, timedelta
 
 from flask import flash, g, jsonify, redirect, render_template, request
-from flask_mail import Message
 from flask.cli import load_dotenv
 
 import psycopg2
 from routes.Auth.token import employee_jwt_required, get_employee_token, token_required_with_roles
-from user_agents import parse
 
 from routes.Auth.token import get_admin_from_token, verify_employee_token
+from routes.Auth.outbox import PRIORITY_HIGH, enqueue_email
 from routes.Auth.utils import get_db_connection
 from routes.Login import login_bp
 
 # ============================ Shared utilities for both admin and employees ============================ (Start)
 
+# 2FA emails are queued in the outbox; one that can't go out within the code's lifetime is dropped
+TWO_FA_EMAIL_TTL = 60  # seconds
+
 # Generate a 6-digit 2FA code
 def generate_2fa_code():
     code = str(random.randint(100000, 999999))
@@ -70,7 +72,6 @@ def verify_employee_2fa():
 
 # sending two-authentication code to employee's email
 def send_employee_2fa_email(employee_id):
-    from app import mail
     import logging
 
     """Sends a 2FA verification email to the employee."""
@@ -115,16 +116,13 @@ def send_employee_2fa_email(employee_id):
             logging.error("❌ EMAIL_USER not set in .env")
             return False
 
-        logging.debug(f"[2FA EMAIL] Preparing to send email: sender={sender_email}, recipient={email}")
-        msg = Message(
-            subject="Your 2FA Verification Code",
-            sender=sender_email,
-            recipients=[email]
+        logging.debug(f"[2FA EMAIL] Queueing email: sender={sender_email}, recipient={email}")
+        enqueue_email(
+            "2fa", email, "Your 2FA Verification Code",
+            f"Your 2FA verification code is: {code}. This code expires in 60 seconds.",
+            sender=sender_email, priority=PRIORITY_HIGH, expires_in=TWO_FA_EMAIL_TTL
         )
-        msg.body = f"Your 2FA verification code is: {code}. This code expires in 60 seconds."
-
-        mail.send(msg)
-        logging.info(f"✅ 2FA email sent successfully to {email}")
+        logging.info(f"✅ 2FA email queued for {email}")
         return True
 
     except Exception as db_error:
@@ -387,8 +385,6 @@ def generate_and_send_2fa_code(admin_id, role):
     Generate a new 2FA code, store it for this admin, and send it via email.
     """
     import os
-    from flask_mail import Message
-    from app import mail
 
     # Connect to DB
     conn = get_db_connection()
@@ -417,15 +413,12 @@ def generate_and_send_2fa_code(admin_id, role):
             logging.error("❌ EMAIL_USER not set in .env")
             return False
 
-        msg = Message(
-            subject="Your 2FA Verification Code",
-            sender=sender_email,
-            recipients=[email]
+        enqueue_email(
+            "2fa", email, "Your 2FA Verification Code",
+            f"Your 2FA verification code is: {code}. This code expires in 60 seconds.",
+            sender=sender_email, priority=PRIORITY_HIGH, expires_in=TWO_FA_EMAIL_TTL
         )
-        msg.body = f"Your 2FA verification code is: {code}. This code expires in 60 seconds."
-
-        mail.send(msg)
-        logging.info(f"✅ 2FA email resent successfully to {email}")
+        logging.info(f"✅ 2FA email queued again for {email}")
         return True
     except Exception as e:
         logging.error(f"❌ Error in generate_and_send_2fa_code: {e}")
@@ -437,7 +430,6 @@ def generate_and_send_2fa_code(admin_id, role):
 # Send verification code via email (For admin)
 load_dotenv()
 def send_2fa_email():
-    from app import mail
     """Sends a 2FA verification email to the admin."""
     admin_id, role, error = get_admin_from_token()
     if not admin_id:
@@ -473,21 +465,17 @@ def send_2fa_email():
             logging.error("❌ EMAIL_USER is not set in the .env file")
             return False  
 
-        # Prepare email message
-        msg = Message(
-            subject="Your 2FA Verification Code",
-            sender=sender_email,  # Use the sender email from .env
-            recipients=[email]
-        )
-        msg.body = f"Your 2FA verification code is: {code}. This code expires in 60 seconds."
-
-        # Send email
+        # Queue the email; the outbox sender delivers it in the background
         try:
-            mail.send(msg)
-            logging.info(f"✅ 2FA email sent successfully to {email}")
+            enqueue_email(
+                "2fa", email, "Your 2FA Verification Code",
+                f"Your 2FA verification code is: {code}. This code expires in 60 seconds.",
+                sender=sender_email, priority=PRIORITY_HIGH, expires_in=TWO_FA_EMAIL_TTL
+            )
+            logging.info(f"✅ 2FA email queued for {email}")
             return True
         except Exception as e:
-            logging.error(f"❌ Failed to send email to {email}: {e}")
+            logging.error(f"❌ Failed to queue email to {email}: {e}")
             return False
     except Exception as db_error:
         logging.error(f"❌ Database error: {db_error}")
@@ -1,30 +1,249 @@
+from contextlib import contextmanager
+import logging
 import os
 import psycopg2
+from flask import g, has_request_context
+from psycopg2 import extensions
 from werkzeug.utils import secure_filename
 
+from routes.Auth.db_pool import PooledConnection, get_pool, get_pool_stats
+from routes.Auth.metrics import InstrumentedConnection
+
 
 # ======================== Setup the database first ========================
 
+# Database settings (change these to match your server)
+DB_CONFIG = {
+    'host': 'localhost',
+    'database': 'YourDatabaseName', # Change this to your database name
+    'user': 'YourUsername', # Change this to your server username
+    'password': '123', # Change this to your database password
+}
+
+# Connection pool settings (can be overridden in .env)
+DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', 2))
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', 20))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 10))  # seconds to wait for a free connection
+DB_POOL_HEALTH_CHECK_INTERVAL = float(os.getenv('DB_POOL_HEALTH_CHECK_INTERVAL', 30))  # ping connections idle longer than this
+
+
+# Open a brand-new physical connection (used by the pool only); its cursors feed the /metrics counters
+def _connect():
+    return psycopg2.connect(connection_factory=InstrumentedConnection, **DB_CONFIG)
+
+
+# Check a connection out of the process-wide pool
+def _checkout():
+    pool = get_pool(
+        _connect,
+        minconn=DB_POOL_MIN_SIZE,
+        maxconn=DB_POOL_MAX_SIZE,
+        timeout=DB_POOL_TIMEOUT,
+        health_check_interval=DB_POOL_HEALTH_CHECK_INTERVAL,
+    )
+    return PooledConnection(pool, pool.getconn())
+
+
+# Connection handed out inside a request: every caller shares it, close() is a no-op
+class RequestConnection:
+    """
+    Proxy around the request's pooled connection; the unit of work is finished in init_db() hooks.
+    It tracks the view's own commit()/rollback() calls, so on_commit callbacks only run for work that
+    really was committed.
+    """
+
+    def __init__(self, conn):
+        object.__setattr__(self, '_conn', conn)
+        object.__setattr__(self, '_pending_callbacks', [])  # waiting for the current transaction to commit
+        object.__setattr__(self, '_committed_callbacks', [])  # their transaction was committed by the view
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._conn, name, value)
+
+    @property
+    def closed(self):
+        return self._conn.closed
+
+    def close(self):
+        pass
+
+    def commit(self):
+        self._conn.commit()
+        self._committed_callbacks.extend(self._pending_callbacks)
+        self._pending_callbacks.clear()
+
+    def rollback(self):
+        self._conn.rollback()
+        self._pending_callbacks.clear()
+
+    def __enter__(self):
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        # like psycopg2's "with conn:": commit on success, roll back on error
+        result = self._conn.__exit__(exc_type, exc_value, tb)
+        if exc_type is None:
+            self._committed_callbacks.extend(self._pending_callbacks)
+        self._pending_callbacks.clear()
+        return result
+
+
+# Get (or open) the unit of work for the current request, stored on flask.g
+def get_request_connection():
+    conn = g.get('_db_conn')
+    if conn is None:
+        conn = RequestConnection(_checkout())
+        g._db_conn = conn
+    return conn
+
+
 # Get database connection
 def get_db_connection():
-    """Establish a connection to the PostgreSQL database."""
-    return psycopg2.connect(
-        host='localhost',
-        database='YourDatabaseName', # Change this to your database name
-        user='YourUsername', # Change this to your server username
-        password='123', # Change this to your database password
-    )
+    """
+    Inside a request: the request's shared connection (decorators, view and audit helpers all use it,
+    it is committed once after the view and released at teardown).
+    Outside a request (scheduler jobs, threads, scripts): a connection from the pool, conn.close() returns it.
+    """
+    if has_request_context():
+        return get_request_connection()
+    return _checkout()
+
+
+# Borrow a pooled connection for a block of work
+@contextmanager
+def db_session(savepoint=False, detached=False):
+    """
+    Usage:
+        with db_session() as conn:
+            with conn.cursor() as cur:
+                cur.execute(...)
+    Outside a request: commits when the block finishes, rolls back if it raises, and always returns
+    the connection to the pool.
+    Inside a request: joins the request's unit of work. With savepoint=True a failing block only
+    undoes its own statements, so best-effort writes (audit logs) can't poison the view's transaction.
+    If the view's transaction has already failed, a savepoint block gets its own pooled connection instead.
+    With detached=True the block always runs and commits on its own pooled connection, so the rows survive
+    a rollback of the request (incident logs about the failure being rolled back).
+    """
+    in_request = has_request_context() and not detached
+    if in_request:
+        conn = get_request_connection()
+        if not savepoint:
+            yield conn
+            return
+        in_request = conn.get_transaction_status() != extensions.TRANSACTION_STATUS_INERROR
+    if in_request:
+        with conn.cursor() as cur:
+            cur.execute("SAVEPOINT db_session")
+        try:
+            yield conn
+        except Exception:
+            with conn.cursor() as cur:
+                cur.execute("ROLLBACK TO SAVEPOINT db_session")
+            raise
+        with conn.cursor() as cur:
+            cur.execute("RELEASE SAVEPOINT db_session")
+        return
+
+    conn = _checkout()
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+# Run a callback once the current unit of work is committed (e.g. push notifications about new rows)
+def on_commit(callback):
+    """
+    Inside a request that has used the database: the callback runs at teardown once the transaction it was
+    registered in has committed (by the view's own conn.commit() or the teardown commit), and is dropped if
+    that transaction rolls back. Otherwise it runs right away, so call it after your own commit.
+    """
+    conn = g.get('_db_conn') if has_request_context() else None
+    if conn is not None:
+        conn._pending_callbacks.append(callback)
+    else:
+        callback()
+
+
+# Commit (or roll back) the request's connection, return it to the pool and run its on_commit callbacks
+def _finish_request_connection(commit):
+    conn = g.pop('_db_conn', None)
+    if conn is None:
+        return
+    pooled = conn._conn
+    callbacks = conn._committed_callbacks
+    committed = False
+    try:
+        if commit and pooled.get_transaction_status() == extensions.TRANSACTION_STATUS_INTRANS:
+            pooled.commit()
+            committed = True
+        elif commit and pooled.get_transaction_status() == extensions.TRANSACTION_STATUS_IDLE:
+            committed = True  # nothing pending: registered after the view's last commit/rollback
+        else:
+            pooled.rollback()
+    except Exception as e:
+        logging.error(f"Error finishing request transaction: {e}", exc_info=True)
+        try:
+            pooled.rollback()
+        except Exception:
+            pass
+    finally:
+        pooled.close()
+    if committed:
+        callbacks = callbacks + conn._pending_callbacks
+    for callback in callbacks:
+        try:
+            callback()
+        except Exception as e:
+            logging.error(f"Error in on_commit callback: {e}", exc_info=True)
+
+
+# Commit what the request has done so far and give its connection back before out-of-band work
+def release_request_connection():
+    """
+    Call before a view opens its own connection (or runs psql/pg_dump) for work that takes exclusive locks,
+    e.g. DROP TABLE during a restore: the request's open transaction still holds the ACCESS SHARE locks of
+    the decorator's lookups, and the DDL would wait on them forever. Later get_db_connection() calls in the
+    same request start a fresh unit of work.
+    """
+    if has_request_context():
+        _finish_request_connection(commit=True)
+
+
+# Register the per-request unit of work on the app
+def init_db(app):
+    """
+    Commit the request's shared connection once at teardown and release it. Unhandled errors and error
+    responses (status 500 and above, e.g. a view that caught its exception) roll back instead.
+    """
+
+    @app.after_request
+    def remember_response_status(response):
+        g._db_response_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def finish_request_connection(exc):
+        status = g.pop('_db_response_status', 500)
+        _finish_request_connection(commit=exc is None and status < 500)
 
 
 # Get the role name string from a role_id
 def get_role_name(role_id):
     """Fetch the role name from the database based on role ID."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT role_name FROM roles WHERE role_id = %s", (role_id,))
-    role_name = cursor.fetchone()
-    cursor.close()
-    conn.close()
+    with db_session() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT role_name FROM roles WHERE role_id = %s", (role_id,))
+            role_name = cursor.fetchone()
     return role_name[0] if role_name else None
 
 # Save an uploaded file securely to the given folder if extension allowed
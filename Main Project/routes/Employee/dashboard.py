@@ -6,6 +6,7 @@ from extensions import csrf
 from routes.Auth.token import employee_jwt_required
 from routes.Auth.token import verify_employee_token
 from routes.Auth.utils import get_db_connection
+from routes.Auth.attendance_rollups import get_employee_total_hours, get_team_average_hours
 from . import employee_bp
 from routes.Auth.two_authentication import require_employee_2fa
 from routes.Auth.audit import log_employee_incident,log_employee_audit
@@ -440,27 +441,12 @@ def team_average():
 
         team_id = result[0]
 
-        # Total hours for this employee
-        cur.execute("""
-            SELECT COALESCE(SUM(hours_worked + overtime_hours), 0)
-            FROM attendance_logs
-            WHERE employee_id = %s AND date BETWEEN %s AND %s
-        """, (employee_id, start_date, end_date))
-        your_hours = cur.fetchone()[0]
+        # Total hours for this employee (per-day rollup rows, not raw logs)
+        your_hours = get_employee_total_hours(employee_id, start_date, end_date)
         logging.debug(f"[TEAM AVERAGE] Your hours: {your_hours}")
 
         # Team average hours
-        cur.execute("""
-            SELECT COALESCE(AVG(total_hours), 0)
-            FROM (
-                SELECT SUM(hours_worked + overtime_hours) AS total_hours
-                FROM attendance_logs al
-                JOIN employees e ON al.employee_id = e.employee_id
-                WHERE e.team_id = %s AND date BETWEEN %s AND %s
-                GROUP BY al.employee_id
-            ) AS team_totals
-        """, (team_id, start_date, end_date))
-        team_average_hours = cur.fetchone()[0]
+        team_average_hours = get_team_average_hours(team_id, start_date, end_date)
         logging.debug(f"[TEAM AVERAGE] Team average hours: {team_average_hours}")
 
         # Log successful audit trail
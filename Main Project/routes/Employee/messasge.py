@@ -7,6 +7,8 @@ from routes.Auth.token import verify_employee_token
 from routes.Auth.utils import get_db_connection
 from extensions import csrf
 from routes.Auth.audit import log_employee_audit,log_employee_incident
+from routes.Auth.events import publish_new_message
+from routes.Auth.inbox import get_inbox_page, get_unread_count, page_size
 
 # === USER LOOKUP HELPERS ===
 
@@ -60,47 +62,12 @@ def get_employee_inbox():
         )
         return jsonify({'error': 'Unauthorized'}), 401
 
-    conn = get_db_connection()
-    cur = conn.cursor()
     try:
-        cur.execute("""
-            SELECT message_id, sender_id, sender_role, body, timestamp, is_read
-            FROM messages
-            WHERE receiver_id = %s 
-            ORDER BY timestamp DESC
-        """, (user_id, ))
-        rows = cur.fetchall()
-        
-        messages = []
-        unread_count = 0
-        sender_roles = {}
-        
-        for row in rows:
-            is_read = row[5]
-            sender_role = row[2] or 'Unknown'
-            
-            if not is_read:
-                unread_count += 1
-            
-            sender_roles[sender_role] = sender_roles.get(sender_role, 0) + 1
-            
-            messages.append({
-                "message_id": row[0],
-                "sender_id": row[1],
-                "sender_role": sender_role,
-                "content": row[3],
-                "timestamp": row[4],
-                "is_read": is_read
-            })
-
-        # Log successful audit trail
-        role_summary = ', '.join([f"{count} from {role}" for role, count in sender_roles.items()]) if sender_roles else "none"
-        log_employee_audit(
-            employee_id=user_id,
-            action="view_inbox",
-            details=f"Retrieved {len(messages)} messages ({unread_count} unread): {role_summary}"
-        )
-
+        limit = page_size(request.args.get('limit'))
+        unread_only = request.args.get('unread') in ('1', 'true')
+        rows, next_cursor = get_inbox_page([user_id], limit, request.args.get('cursor'), unread_only)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logging.error(f"Failed to fetch inbox: {e}")
         
@@ -112,10 +79,41 @@ def get_employee_inbox():
         )
         
         return jsonify({'error': 'Database query failed'}), 500
-    finally:
-        cur.close()
-        conn.close()
-    return jsonify(messages)
+
+    messages = []
+    unread_count = 0
+    sender_roles = {}
+    
+    for row in rows:
+        is_read = row[5]
+        sender_role = row[2] or 'Unknown'
+        
+        if not is_read:
+            unread_count += 1
+        
+        sender_roles[sender_role] = sender_roles.get(sender_role, 0) + 1
+        
+        messages.append({
+            "message_id": row[0],
+            "sender_id": row[1],
+            "sender_role": sender_role,
+            "content": row[3],
+            "timestamp": row[4],
+            "is_read": is_read
+        })
+
+    # Log successful audit trail (first page only, following pages are the same inbox view)
+    if not request.args.get('cursor'):
+        role_summary = ', '.join([f"{count} from {role}" for role, count in sender_roles.items()]) if sender_roles else "none"
+        log_employee_audit(
+            employee_id=user_id,
+            action="view_inbox",
+            details=f"Retrieved {len(messages)} messages ({unread_count} unread): {role_summary}"
+        )
+    return jsonify({
+        'messages': messages,
+        'next_cursor': next_cursor
+    })
 
 # ========== MARK AS READ ==========
 @employee_bp.route('/employee/messages/read/<int:message_id>', methods=['POST'])
@@ -312,17 +310,9 @@ def employee_unread_count():
         )
         return jsonify({'error': 'Unauthorized'}), 401
 
-    conn = get_db_connection()
-    cur = conn.cursor()
     try:
-        cur.execute("""
-            SELECT message_id, sender_id, sender_role, body, timestamp
-            FROM messages
-            WHERE receiver_id = %s AND is_read = FALSE
-            ORDER BY timestamp DESC
-            LIMIT 5
-        """, (user_id,))
-        rows = cur.fetchall()
+        total = get_unread_count([user_id])
+        rows, _ = get_inbox_page([user_id], 5, unread_only=True)
         
         messages = []
         sender_roles = {}
@@ -338,8 +328,6 @@ def employee_unread_count():
                 'content': row[3],
                 'timestamp': row[4].isoformat() if row[4] else None
             })
-        
-        total = len(messages)
 
         # Log successful audit trail
         if total > 0:
@@ -347,7 +335,7 @@ def employee_unread_count():
             log_employee_audit(
                 employee_id=user_id,
                 action="check_unread_count",
-                details=f"Retrieved {total} unread messages (showing top 5): {role_summary}"
+                details=f"{total} unread messages (showing top 5): {role_summary}"
             )
         else:
             log_employee_audit(
@@ -367,9 +355,6 @@ def employee_unread_count():
         )
         
         return jsonify({'error': 'Database query failed'}), 500
-    finally:
-        cur.close()
-        conn.close()
     return jsonify({
         'unread_count': total,
         'messages': messages
@@ -442,6 +427,7 @@ def employee_send_message():
             print(f"[DEBUG] Inserting message: {values}")
             cur.execute(query, values)
             message_id = cur.fetchone()[0] if cur.rowcount > 0 else None
+            publish_new_message(recv_id, message_id)
             message_count += 1
             recipient_details.append(f"{recv_role} {recv_id}")
         
@@ -8,6 +8,7 @@ from routes.Auth.token import employee_jwt_required
 from routes.Auth.utils import get_db_connection
 from extensions import csrf
 from routes.Auth.audit import log_employee_incident,log_employee_audit
+from routes.Auth.announcements import get_announcement_for_employee, get_employee_announcements, get_employee_team, mark_announcement_read
 
 #route to fetch meeting details to display
 @employee_bp.route('/api/employees/meetings', methods=['GET'])
@@ -234,38 +235,9 @@ def get_announcements():
     try:
         logging.debug(f"Fetching announcements for employee_id: {employee_id}")
 
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        # Get employee's team_id for logging
-        cursor.execute("SELECT team_id FROM employees WHERE employee_id = %s", (employee_id,))
-        employee_team_info = cursor.fetchone()
-        employee_team_id = employee_team_info[0] if employee_team_info else None
-
-        query = """
-            SELECT
-                a.announcement_id,
-                a.title,
-                a.message,
-                a.created_at,
-                a.employee_id,
-                a.team_id,
-                COALESCE(r1.role_name, r2.role_name, 'Admin') AS creator_name,
-                ar.read_at
-            FROM announcements a
-            LEFT JOIN admins ad ON a.assigned_by_admin = ad.admin_id
-            LEFT JOIN roles r1 ON ad.role_id = r1.role_id
-            LEFT JOIN super_admins sad ON a.assigned_by_super_admin = sad.super_admin_id
-            LEFT JOIN roles r2 ON sad.role_id = r2.role_id
-            LEFT JOIN announcement_reads ar
-                ON ar.announcement_id = a.announcement_id AND ar.employee_id = %s
-            WHERE a.employee_id = %s
-               OR a.team_id = (SELECT team_id FROM employees WHERE employee_id = %s)
-            ORDER BY a.created_at DESC
-        """
-
-        cursor.execute(query, (employee_id, employee_id, employee_id))
-        announcements = cursor.fetchall()
+        # Audience membership (everyone / the employee's team / the employee) is resolved through indexes
+        employee_team_id = get_employee_team(employee_id)
+        announcements = get_employee_announcements(employee_id, employee_team_id)
 
         all_announcements = []
         read_count = 0
@@ -273,6 +245,7 @@ def get_announcements():
         creator_roles = {}
         individual_announcements = 0
         team_announcements = 0
+        company_announcements = 0
         
         for a in announcements:
             is_read = a[7] is not None  # read_at timestamp
@@ -287,10 +260,12 @@ def get_announcements():
                 
             creator_roles[creator_role] = creator_roles.get(creator_role, 0) + 1
             
-            if announcement_employee_id == employee_id:
-                individual_announcements += 1
-            elif announcement_team_id == employee_team_id:
+            if a[8]:
+                company_announcements += 1
+            elif announcement_team_id is not None and announcement_team_id == employee_team_id:
                 team_announcements += 1
+            else:
+                individual_announcements += 1
             
             announcement_data = {
                 'announcement_id': a[0],
@@ -302,7 +277,6 @@ def get_announcements():
                 'creator_name': creator_role,
                 'read_at': str(a[7]) if a[7] else None
             }
-            logging.debug(f"Announcement fetched: {announcement_data}")
             all_announcements.append(announcement_data)
 
         # Log successful audit trail
@@ -310,11 +284,9 @@ def get_announcements():
         log_employee_audit(
             employee_id=employee_id,
             action="view_announcements",
-            details=f"Retrieved {len(all_announcements)} announcements ({individual_announcements} individual, {team_announcements} team): {unread_count} unread, {read_count} read | Creators: {creator_summary} (employee_team_id: {employee_team_id})"
+            details=f"Retrieved {len(all_announcements)} announcements ({company_announcements} company-wide, {individual_announcements} individual, {team_announcements} team): {unread_count} unread, {read_count} read | Creators: {creator_summary} (employee_team_id: {employee_team_id})"
         )
 
-        cursor.close()
-        conn.close()
         return jsonify(all_announcements), 200
 
     except Exception as e:
@@ -328,11 +300,6 @@ def get_announcements():
         )
         
         return jsonify({'error': 'Internal server error'}), 500
-    finally:
-        if 'cursor' in locals():
-            cursor.close()
-        if 'conn' in locals():
-            conn.close()
 
 # Route to fetch events
 @employee_bp.route('/events', methods=['GET'])
@@ -688,17 +655,10 @@ def mark_announcement_as_read_specific(announcement_id):
             )
             return jsonify({'error': 'Unauthorized'}), 401
 
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        team_id = get_employee_team(employee_id)
 
-        # First verify the announcement exists and get details for logging
-        cursor.execute("""
-            SELECT title, message, employee_id, team_id
-            FROM announcements
-            WHERE announcement_id = %s
-        """, (announcement_id,))
-        
-        announcement_info = cursor.fetchone()
+        # One lookup for existence and audience membership
+        announcement_info = get_announcement_for_employee(announcement_id, employee_id, team_id)
         
         if not announcement_info:
             log_employee_incident(
@@ -706,61 +666,30 @@ def mark_announcement_as_read_specific(announcement_id):
                 description=f"Employee attempted to mark non-existent announcement {announcement_id} as read",
                 severity="Medium"
             )
-            cursor.close()
-            conn.close()
             return jsonify({'error': 'Announcement not found'}), 404
 
-        announcement_title, announcement_message, announcement_employee_id, announcement_team_id = announcement_info
-
-        # Get employee's team_id (if any)
-        cursor.execute("SELECT team_id FROM employees WHERE employee_id = %s", (employee_id,))
-        team_row = cursor.fetchone()
-        team_id = team_row[0] if team_row else None
-
-        # Verify employee has access to this announcement
-        has_access = (
-            announcement_employee_id == employee_id or 
-            (announcement_team_id == team_id and team_id is not None)
-        )
+        announcement_title, announcement_message, has_access = announcement_info
         
         if not has_access:
             log_employee_incident(
                 employee_id=employee_id,
-                description=f"Employee attempted to mark unauthorized announcement {announcement_id} ('{announcement_title}') as read - announcement_employee_id: {announcement_employee_id}, announcement_team_id: {announcement_team_id}, employee_team_id: {team_id}",
+                description=f"Employee attempted to mark unauthorized announcement {announcement_id} ('{announcement_title}') as read - not in its audience (employee_team_id: {team_id})",
                 severity="High"
             )
-            cursor.close()
-            conn.close()
             return jsonify({'error': 'Access denied to this announcement'}), 403
 
-        # Check if already marked as read
-        cursor.execute("""
-            SELECT read_id FROM announcement_reads 
-            WHERE employee_id = %s AND announcement_id = %s
-        """, (employee_id, announcement_id))
-        already = cursor.fetchone()
+        # Sparse receipt: inserted once, a repeat is a no-op
+        read_id = mark_announcement_read(announcement_id, employee_id, team_id)
 
-        if already:
+        if read_id is None:
             # Log audit for already read announcement
             log_employee_audit(
                 employee_id=employee_id,
                 action="mark_announcement_read",
                 details=f"Attempted to mark already-read announcement {announcement_id} as read: '{announcement_title}'"
             )
-            cursor.close()
-            conn.close()
             return jsonify({"message": "Announcement already marked as read."}), 200
 
-        # Insert new read record
-        cursor.execute("""
-            INSERT INTO announcement_reads (employee_id, read_at, team_id, announcement_id)
-            VALUES (%s, NOW(), %s, %s)
-            RETURNING read_id
-        """, (employee_id, team_id, announcement_id))
-        
-        read_id = cursor.fetchone()[0] if cursor.rowcount > 0 else None
-        conn.commit()
-
         # Log successful audit trail
         message_preview = announcement_message[:50] + "..." if announcement_message and len(announcement_message) > 50 else announcement_message or "No message"
         log_employee_audit(
@@ -769,14 +698,9 @@ def mark_announcement_as_read_specific(announcement_id):
             details=f"Successfully marked announcement {announcement_id} as read (read_id: {read_id}): '{announcement_title}' - '{message_preview}'"
         )
 
-        cursor.close()
-        conn.close()
         return jsonify({"message": "Announcement marked as read."}), 200
 
     except Exception as e:
-        if 'conn' in locals() and conn: 
-            conn.rollback()
-        
         # Log incident for system error
         log_employee_incident(
             employee_id=getattr(g, 'employee_id', None),
@@ -785,11 +709,6 @@ def mark_announcement_as_read_specific(announcement_id):
         )
         
         return jsonify({"error": str(e)}), 500
-    finally:
-        if 'cursor' in locals() and cursor: 
-            cursor.close()
-        if 'conn' in locals() and conn: 
-            conn.close()
 
 # Route to mark an alert as read
 @csrf.exempt
@@ -2,17 +2,17 @@ import logging
 import os
 from flask import current_app, g, jsonify, render_template, request, send_file, send_from_directory, url_for
 import psycopg2
+import psycopg2.extras
 from routes.Auth.token import employee_jwt_required,verify_employee_token
 from routes.Auth.two_authentication import require_employee_2fa
 from routes.Auth.utils import get_db_connection
 from . import employee_bp
 from extensions import csrf
-import pandas as pd
 import io
-import openpyxl
 from flask import g
 from routes.Auth.decorator import generate_pdf
 from routes.Auth.audit import log_employee_audit,log_employee_incident
+from routes.Auth.payslips import ensure_payslip
 
 @employee_bp.route('/payroll')
 def payroll_page_shell():
@@ -22,8 +22,35 @@ def payroll_page_shell():
 @employee_jwt_required()
 @require_employee_2fa
 def download_payslip(payroll_id):
-    # Locate and send the payslip PDF (implement this as per your logic)
-    file_path = f"static/payslips/payslip_{payroll_id}.pdf"
+    # Render the payslip on first download (or when the payroll row changed since it was rendered), then send it
+    employee_id = g.employee_id
+    conn = get_db_connection()
+    cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+    try:
+        cursor.execute("""
+            SELECT employee_id, month::text AS month, base_salary, hours_worked, overtime_hours, overtime_pay,
+                   bonuses, tax_rate, tax, net_salary
+            FROM payroll
+            WHERE payroll_id = %s AND employee_id = %s
+        """, (payroll_id, employee_id))
+        payroll_data = cursor.fetchone()
+    finally:
+        cursor.close()
+        conn.close()
+
+    if not payroll_data:
+        log_employee_incident(
+            employee_id=employee_id,
+            description=f"Employee attempted to download payslip {payroll_id} that doesn't exist or isn't theirs",
+            severity="Medium"
+        )
+        return jsonify({"error": "Payslip not found"}), 404
+
+    try:
+        file_path = ensure_payslip(payroll_id, payroll_data)
+    except Exception as e:
+        logging.error(f"Payslip PDF generation error (payroll_id={payroll_id}): {e}", exc_info=True)
+        return jsonify({"error": "Could not generate payslip"}), 500
     return send_file(file_path, as_attachment=True)
  
 @employee_bp.route('/employee/TaxDocuments/<filename>')
@@ -303,6 +330,8 @@ def api_payroll_info():
 @employee_bp.route('/export-timesheet', methods=['GET'])
 @employee_jwt_required()
 def export_timesheet():
+    import pandas as pd  # only the exports need pandas (and openpyxl, loaded by pd.ExcelWriter)
+
     try:
         # Get logged-in employee from decorator
         employee_id = g.employee_id
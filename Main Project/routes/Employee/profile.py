@@ -11,6 +11,7 @@ from routes.Auth.token import employee_jwt_required
 from routes.Auth.two_authentication import require_employee_2fa
 from routes.Auth.utils import get_db_connection
 from routes.Auth.audit import log_employee_incident,log_employee_audit
+from routes.Auth.images import send_profile_image
 
 @employee_bp.route('/profile', methods=['GET','POST'])
 def profile_page_shell():
@@ -372,40 +373,9 @@ def profile_picture(user_id):
                 details=f"Accessed own profile picture"
             )
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT profile FROM employees WHERE employee_id = %s", (user_id,))
-        result = cursor.fetchone()
-        
-        if not result or not result[0]:
-            print(f"⚠️ No profile picture found for user {user_id}. Returning default.")
-            cursor.close()
-            conn.close()
-            return send_file('static/default_resource.png', mimetype='image/png')
-            
-        # Convert memoryview (from some DBs) to bytes
-        image_bytes = bytes(result[0])
-        print(f"🖼️ Retrieved {len(image_bytes)} bytes from DB for user {user_id}")
-
-        # Try to detect format (PNG/JPEG)
-        if image_bytes[:8] == b'\x89PNG\r\n\x1a\n':
-            mimetype = 'image/png'
-        elif image_bytes[:2] == b'\xff\xd8':
-            mimetype = 'image/jpeg'
-        else:
-            mimetype = 'application/octet-stream'
-        print(f"🖼️ Detected image mimetype: {mimetype}")
-
-        response = make_response(image_bytes)
-        response.headers['Content-Type'] = mimetype
-        # Prevent caching
-        response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
-        response.headers['Pragma'] = 'no-cache'
-        response.headers['Expires'] = '0'
-        print("🖼️ Response ready, returning image data.")
-        
-        cursor.close()
-        conn.close()
+        # ETag + revalidation instead of no-store: unchanged pictures are answered with a 304
+        response = send_profile_image('employee', user_id)
+        print(f"🖼️ Serving profile picture for user {user_id} (status {response.status_code})")
         return response
 
     except Exception as e:
@@ -419,11 +389,6 @@ def profile_picture(user_id):
         )
         
         return send_file('static/default_resource.png', mimetype='image/png')
-    finally:
-        if 'cursor' in locals():
-            cursor.close()
-        if 'conn' in locals():
-            conn.close()
 
 @employee_bp.route('/get_employee_for_update/<int:id>', methods=['GET'])
 @employee_jwt_required()
@@ -2,7 +2,6 @@
 from datetime import datetime
 import logging
 from flask import g, jsonify, render_template, request
-import requests
 from routes.Auth.config import GITHUB_REPO, GITHUB_TOKEN
 from routes.Auth.token import employee_jwt_required
 from routes.Auth.utils import get_db_connection
@@ -692,6 +691,8 @@ def update_task_part():
 @employee_bp.route('/create-issue', methods=['POST'])
 @employee_jwt_required()  # Added JWT requirement for security
 def create_github_issue():
+    import requests  # only this route talks to GitHub; keeps requests out of startup
+
     try:
         employee_id = g.employee_id
         
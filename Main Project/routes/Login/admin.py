@@ -5,6 +5,8 @@ import uuid
 
 from flask import current_app, jsonify, render_template, request
 from routes.Auth.audit import log_audit
+from routes.Auth.events import publish_session_conflict
+from routes.Auth.session_cache import invalidate_admin_sessions
 from routes.Auth.token import get_admin_from_token
 from routes.Auth.utils import get_db_connection
 from extensions import csrf
@@ -117,6 +119,8 @@ def admin_login():
                 (jti, admin_id)
             )
         conn.commit()
+        invalidate_admin_sessions(admin_id, role)
+        publish_session_conflict('super_admin' if role == 'super_admin' else 'admin', admin_id, jti)
 
         logging.debug(f"Generated admin token payload: {payload}")
         logging.info(f"Admin login successful - admin_id: {admin_id}, role: {role}, role_id: {role_id}")
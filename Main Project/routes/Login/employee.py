@@ -4,13 +4,14 @@ import traceback
 from flask import g, jsonify, render_template, request
 from routes.Auth.token import employee_jwt_required
 from routes.Auth.device_tracking import detect_device_info
+from routes.Auth.events import publish_session_conflict
+from routes.Auth.session_cache import invalidate_employee_sessions, invalidate_session
 from routes.Auth.token import generate_token
 from routes.Auth.utils import get_db_connection
 from . import SECRET_KEY, login_bp
 from extensions import csrf
 import bcrypt
 import jwt
-from user_agents import parse
 
 
 # Route for logging in (For employee)
@@ -124,6 +125,8 @@ def employeelogin():
                     conn.commit()
                     cursor.close()
                     conn.close()
+                    invalidate_employee_sessions(user_id)
+                    publish_session_conflict('employee', user_id, jti)
                     debug_log("Device info inserted and employee current_jti/status updated successfully")
 
                     return jsonify({"message": "Login successful", "token": token}), 200
@@ -207,6 +210,7 @@ def employee_logout():
             """, (jti, employee_id))
             
             conn.commit()
+            invalidate_session(jti)
             print("[LOGOUT] Token successfully blacklisted and employee status set to Inactive.")
             logging.info("[LOGOUT] Token successfully blacklisted and employee status set to Inactive.")
         except Exception as db_error:
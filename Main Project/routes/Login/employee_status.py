@@ -2,6 +2,7 @@
 from venv import logger
 
 from flask import g, jsonify
+from routes.Auth.events import ACCOUNT_DEACTIVATED, event_stream_response, inbox_channel, user_channel
 from routes.Auth.token import employee_jwt_required
 from routes.Auth.utils import get_db_connection
 from . import login_bp
@@ -14,16 +15,20 @@ def check_employee_status():
     logger.debug(f"Checking status for employee_id: {employee_id}")
 
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
+        # account_status comes from the decorator's cached session lookup
+        if 'account_status' in g:
+            row = (g.account_status,) if g.account_status is not None else None
+        else:
+            conn = get_db_connection()
+            cur = conn.cursor()
 
-        logger.debug("Connected to database, executing status query...")
-        cur.execute("SELECT account_status FROM employees WHERE employee_id = %s", (employee_id,))
-        row = cur.fetchone()
+            logger.debug("Connected to database, executing status query...")
+            cur.execute("SELECT account_status FROM employees WHERE employee_id = %s", (employee_id,))
+            row = cur.fetchone()
 
-        cur.close()
-        conn.close()
-        logger.debug("Database connection closed.")
+            cur.close()
+            conn.close()
+            logger.debug("Database connection closed.")
 
         if not row:
             logger.warning(f"No status found for employee_id: {employee_id}")
@@ -49,3 +54,14 @@ def check_employee_status():
 def validate_token():
     return jsonify({"valid": True}), 200
 
+
+# Route for the employee push channel, replaces polling /api/employee_status, /validate_token and the unread count
+@login_bp.route('/api/employee/events', methods=['GET'])
+@employee_jwt_required(check_jti=True)
+def employee_events():
+    employee_id = g.employee_id
+    initial_events = []
+    if g.account_status in ['Terminated', 'Deactivated']:
+        initial_events.append((ACCOUNT_DEACTIVATED, {'status': g.account_status}))
+    channels = {user_channel('employee', employee_id), inbox_channel(employee_id)}
+    return event_stream_response(channels, g.jti, initial_events)
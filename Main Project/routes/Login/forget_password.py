@@ -3,10 +3,10 @@ import random
 import logging
 import sys
 import traceback
-import bcrypt
 from datetime import datetime, timedelta
 from flask import request, jsonify, render_template, session
-from flask_mail import Message
+from routes.Auth.outbox import PRIORITY_HIGH, enqueue_email
+from routes.Auth.password_hashing import hash_password
 from routes.Auth.utils import get_db_connection
 from . import login_bp
 from extensions import csrf
@@ -31,11 +31,11 @@ def reset_password():
 
 # ---- API ROUTES FOR FORGOT PASSWORD FLOW ----
 
+RESET_CODE_EMAIL_TTL = 600  # seconds, same as the code's lifetime
+
 def send_contact_admin_email(first_name, last_name, sender_email_address, message_body):
-    from app import mail
     import os
     import logging
-    from flask_mail import Message
 
     admin_email = os.getenv("ADMIN_CONTACT_EMAIL")
     if not admin_email:
@@ -57,43 +57,33 @@ Message:
 {message_body}
 """
 
-    msg = Message(
-        subject=subject,
-        sender=sender_email,
-        recipients=[admin_email]
-    )
-    msg.body = body
-
     try:
-        mail.send(msg)
-        logging.info(f"✅ Contact admin email sent successfully to {admin_email}")
+        enqueue_email("contact_admin", admin_email, subject, body, sender=sender_email)
+        logging.info(f"✅ Contact admin email queued for {admin_email}")
         return True
     except Exception as e:
-        logging.error(f"❌ Failed to send contact email to {admin_email}: {e}")
+        logging.error(f"❌ Failed to queue contact email to {admin_email}: {e}")
         return False
 
 def generate_reset_code():
     return str(random.randint(100000, 999999))
 
 def send_reset_code_email(email, code):
-    from app import mail
     sender_email = os.getenv("EMAIL_USER")
     if not sender_email:
         logging.error("EMAIL_USER not set in .env")
         return False
 
-    msg = Message(
-        subject="Your Password Reset Code",
-        sender=sender_email,
-        recipients=[email]
-    )
-    msg.body = f"Your password reset code is: {code}. This code expires in 10 minutes."
     try:
-        mail.send(msg)
-        logging.info(f"✅ Password reset code sent to {email}")
+        enqueue_email(
+            "password_reset", email, "Your Password Reset Code",
+            f"Your password reset code is: {code}. This code expires in 10 minutes.",
+            sender=sender_email, priority=PRIORITY_HIGH, expires_in=RESET_CODE_EMAIL_TTL
+        )
+        logging.info(f"✅ Password reset code queued for {email}")
         return True
     except Exception as e:
-        logging.error(f"❌ Failed to send password reset code to {email}: {e}")
+        logging.error(f"❌ Failed to queue password reset code to {email}: {e}")
         return False
 
 # 1. Request password reset code (POST: send code to email)
@@ -226,7 +216,7 @@ def api_forgot_password_reset_password():
         cur = conn.cursor()
         try:
             debug_log(f"Processing user_type: {user_type}")
-            hashed = bcrypt.hashpw(new_password.encode(), bcrypt.gensalt()).decode()
+            hashed = hash_password(new_password)
 
             if user_type == "employee":
                 cur.execute("SELECT employee_id FROM employees WHERE email = %s", (email,))
@@ -289,7 +279,6 @@ def api_forgot_password_reset_password():
 @csrf.exempt
 @login_bp.route("/api/contact_admin", methods=["POST"])
 def api_contact_admin():
-    from app import mail
     """
     Endpoint for users to contact admin for password reset/help.
     Stores request in contact_requests and notifies admin by email.
@@ -334,17 +323,11 @@ Message:
 
 (Request ID: {request_id})
 """
-        msg = Message(
-            subject=subject,
-            sender=sender_email,
-            recipients=[admin_email],
-            body=body
-        )
         try:
-            mail.send(msg)
-            logging.info(f"✅ Contact admin email sent to {admin_email}")
+            enqueue_email("contact_admin", admin_email, subject, body, sender=sender_email)
+            logging.info(f"✅ Contact admin email queued for {admin_email}")
         except Exception as e:
-            logging.error(f"❌ Failed to send admin notification email: {e}")
+            logging.error(f"❌ Failed to queue admin notification email: {e}")
 
         return jsonify({"success": True, "message": "Your message has been submitted."})
     except Exception as e:
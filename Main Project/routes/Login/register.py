@@ -1,8 +1,8 @@
 import logging
 import os
 from venv import logger
-import bcrypt
 from flask import jsonify, render_template, request
+from routes.Auth.password_hashing import hash_password
 from routes.Auth.utils import get_db_connection
 from . import login_bp
 
@@ -73,8 +73,7 @@ def register():
             return jsonify({"error": "Invalid role ID"}), 400
 
         # Hash the password using bcrypt
-        salt = bcrypt.gensalt()
-        hashed_password = bcrypt.hashpw(password.encode("utf-8"), salt).decode("utf-8")
+        hashed_password = hash_password(password)
         logger.debug('Password hashed successfully')
 
         # Database operations
@@ -6,7 +6,7 @@ from routes.Auth.token import token_required_with_roles
 from extensions import csrf
 import logging
 import time
-from routes.SystemTesting.Clock_in_and_out_reminders.config import check_missing_clock_ins, check_missing_clock_outs
+from routes.SystemTesting.Clock_in_and_out_reminders.config import check_missing_clock_ins, check_missing_clock_outs, get_recent_sweeps
 
 # Create a dedicated blueprint for reminder testing
 test_reminder_bp = Blueprint('test_reminder', __name__)
@@ -86,12 +86,13 @@ def test_clock_in_reminders(admin_id, role, role_id, *args, **kwargs):
             }), 429
         
         logging.info(f"[TEST] {role.capitalize()} {admin_id} manually triggering missing clock-in check")
-        check_missing_clock_ins(force_test=True)
+        metrics = check_missing_clock_ins(force_test=True)
         
         log_audit(admin_id, role, 'reminder_test_clock-in', 'Successfully ran clock-in reminder test')
         return jsonify({
             'success': True,
             'message': 'Clock-in reminder check completed successfully.',
+            'sweep': metrics,
             'timestamp': datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
         })
     except Exception as e:
@@ -121,12 +122,13 @@ def test_clock_out_reminders(admin_id, role, role_id, *args, **kwargs):
             }), 429
         
         logging.info(f"[TEST] {role.capitalize()} {admin_id} manually triggering missing clock-out check")
-        check_missing_clock_outs(force_test=True)
+        metrics = check_missing_clock_outs(force_test=True)
         
         log_audit(admin_id, role, 'reminder_test_clock-out', 'Successfully ran clock-out reminder test')
         return jsonify({
             'success': True,
             'message': 'Clock-out reminder check completed successfully.',
+            'sweep': metrics,
             'timestamp': datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
         })
     except Exception as e:
@@ -489,4 +491,21 @@ def reminder_health_check(admin_id, role, role_id, *args, **kwargs):
         if cursor:
             cursor.close()
         if conn:
-            conn.close()
\ No newline at end of file
+            conn.close()
+
+
+@test_reminder_bp.route('/admin/reminder-sweeps', methods=['GET'])
+@token_required_with_roles(allowed_roles=['admin', 'super_admin'])
+def get_reminder_sweeps(admin_id, role, role_id, *args, **kwargs):
+    """Duration, candidates and email results of the latest reminder sweeps"""
+    try:
+        limit = min(int(request.args.get('limit', 20)), 100)
+        sweeps = get_recent_sweeps(limit)
+        for sweep in sweeps:
+            for key in ('started_at', 'finished_at'):
+                if sweep[key]:
+                    sweep[key] = sweep[key].strftime('%Y-%m-%d %H:%M:%S')
+        return jsonify({'success': True, 'sweeps': sweeps, 'count': len(sweeps)})
+    except Exception as e:
+        logging.error(f"[TEST] Error fetching reminder sweeps: {e}")
+        return jsonify({'success': False, 'message': f'Error: {str(e)}', 'sweeps': []}), 500
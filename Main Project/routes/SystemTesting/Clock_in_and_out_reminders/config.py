@@ -1,9 +1,12 @@
+from collections import deque
 from datetime import datetime, timezone, timedelta
 import logging
-import os
-from flask import current_app
-from routes.Auth.utils import get_db_connection
-from flask_mail import Message
+import threading
+import time
+from routes.Auth.events import publish_new_messages
+from routes.Auth.migrations import MigrationError, require_schema
+from routes.Auth.outbox import enqueue_emails, outbox_sender
+from routes.Auth.utils import db_session
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 
@@ -11,13 +14,239 @@ from apscheduler.triggers.cron import CronTrigger
 SYSTEM_SENDER_ID = 1  # Use a designated system user ID
 SYSTEM_SENDER_ROLE = "super_admin"  # Use a role that identifies the system
 
-def check_missing_clock_ins(force_test=False):
+# ======================== Reminder sweeps ========================
+# Each scheduled check is one batched sweep:
+#   1. one query selects everyone who needs a reminder
+#   2. the sweep claims them in reminder_deliveries (PRIMARY KEY (sweep, employee_id), ON CONFLICT DO NOTHING),
+#      so a restarted or duplicate scheduler (one per worker process) never reminds anyone twice per sweep
+#   3. one INSERT ... SELECT FROM unnest(...) writes all in-app messages, in the same transaction as the claim
+#   4. one INSERT queues all emails in the outbox (routes/Auth/outbox.py), also in that transaction, so the sweep
+#      returns at once and the outbox sender delivers them with its retries and dead-lettering
+#   5. the sweep's metrics (duration, candidates, queued) are stored in reminder_sweeps; sent and failed
+#      emails are counted from the outbox rows linked in reminder_deliveries.outbox_id
+# A sweep is identified as "<kind>:<date>:<slot>", slot being the scheduled run ("first"/"second").
+
+SCHEMA_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS reminder_deliveries (
+        sweep varchar(64) NOT NULL,
+        employee_id integer NOT NULL,
+        message_id integer,
+        email_status varchar(10) NOT NULL DEFAULT 'none',
+        email_error text,
+        created_at timestamp NOT NULL DEFAULT now(),
+        emailed_at timestamp,
+        PRIMARY KEY (sweep, employee_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS reminder_sweeps (
+        sweep varchar(64) PRIMARY KEY,
+        kind varchar(16) NOT NULL,
+        started_at timestamp NOT NULL,
+        finished_at timestamp,
+        duration_ms integer,
+        candidates integer NOT NULL DEFAULT 0,
+        notified integer NOT NULL DEFAULT 0,
+        emails_sent integer NOT NULL DEFAULT 0,
+        emails_failed integer NOT NULL DEFAULT 0
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS reminder_sweeps_started_at_idx ON reminder_sweeps (started_at DESC)",
+]
+
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+
+# Create the delivery/sweep tables if they don't exist yet (migrations/0008_reminder_sweeps.py)
+def install_reminder_schema(cur):
+    for statement in SCHEMA_SQL:
+        cur.execute(statement)
+
+
+# Check once per process that migrations 0008 and 0013 have run; the scheduler never runs the DDL itself
+def ensure_reminder_schema():
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if _schema_ready:
+            return
+        with db_session() as conn, conn.cursor() as cur:
+            require_schema(cur, '0008_reminder_sweeps',
+                           relations=('reminder_deliveries', 'reminder_sweeps', 'reminder_sweeps_started_at_idx'))
+            cur.execute("""
+                SELECT 1 FROM information_schema.columns
+                WHERE table_name = 'reminder_sweeps' AND column_name = 'emails_queued'
+            """)
+            if cur.fetchone() is None:
+                raise MigrationError("Missing column reminder_sweeps.emails_queued: run `python migrate.py` (migration 0013_reminder_outbox)")
+        _schema_ready = True
+
+
+# Employees who haven't clocked in today (those on leave are skipped unless testing)
+# Rows: employee_id, role_id, email, first_name, last_name, status, clock_in_time (always NULL here)
+MISSING_CLOCK_INS_SQL = """
+    SELECT e.employee_id, e.role_id, e.email, e.first_name, e.last_name, e.status, NULL
+    FROM employees e
+    WHERE e.account_status = 'Activated'
+    AND NOT EXISTS (
+        -- Employees who have already clocked in today
+        SELECT 1 FROM attendance_logs al
+        WHERE al.employee_id = e.employee_id AND al.date = %(today)s
+    )
+    AND (%(force_test)s OR e.status IS NULL OR lower(e.status) NOT IN ('on leave', 'vacation', 'sick leave'))
+"""
+
+# Employees who clocked in today but haven't clocked out
+MISSING_CLOCK_OUTS_SQL = """
+    SELECT DISTINCT ON (a.employee_id)
+           a.employee_id, e.role_id, e.email, e.first_name, e.last_name, e.status, a.clock_in_time
+    FROM attendance_logs a
+    JOIN employees e ON a.employee_id = e.employee_id
+    WHERE a.date = %(today)s
+    AND e.account_status = 'Activated'
+    AND a.clock_in_time IS NOT NULL
+    AND a.clock_out_time IS NULL
+    ORDER BY a.employee_id, a.clock_in_time
+"""
+
+
+def _clock_in_message(first_name, clock_in_time):
+    return f"Hi {first_name}, our system shows you haven't clocked in today. Please clock in as soon as possible or contact HR if you're not working today."
+
+
+def _clock_out_message(first_name, clock_in_time):
+    clock_in_str = clock_in_time.strftime("%I:%M %p") if clock_in_time else "earlier today"
+    return f"Hi {first_name}, our system shows you clocked in at {clock_in_str} but haven't clocked out. Please remember to clock out before leaving."
+
+
+SWEEPS = {
+    'clock_in': (MISSING_CLOCK_INS_SQL, "Missing Clock-In Reminder", _clock_in_message),
+    'clock_out': (MISSING_CLOCK_OUTS_SQL, "Missing Clock-Out Reminder", _clock_out_message),
+}
+
+# Metrics of the most recent sweeps in this process (the full history is in reminder_sweeps)
+recent_sweeps = deque(maxlen=20)
+
+
+def run_reminder_sweep(kind, today, slot, force_test=False):
+    """Remind everyone the `kind` check selects, at most once per (sweep, employee). Returns the sweep's metrics."""
+    query, subject, compose = SWEEPS[kind]
+    sweep = f"{kind}:{today.isoformat()}:{slot}"
+    tag = 'TEST MODE' if force_test else 'REMINDER'
+    ensure_reminder_schema()
+    started_at = datetime.now(timezone.utc).replace(tzinfo=None)
+    started = time.perf_counter()
+
+    with db_session() as conn, conn.cursor() as cur:
+        cur.execute(query, {'today': today, 'force_test': force_test})
+        candidates = cur.fetchall()
+
+        # Claim; rows another run of this sweep already handled are dropped here
+        cur.execute("""
+            INSERT INTO reminder_deliveries (sweep, employee_id)
+            SELECT %s, unnest(%s::integer[])
+            ON CONFLICT (sweep, employee_id) DO NOTHING
+            RETURNING employee_id
+        """, (sweep, [row[0] for row in candidates]))
+        claimed = {row[0] for row in cur.fetchall()}
+        recipients = [row for row in candidates if row[0] in claimed]
+        bodies = [compose(row[3], row[6]) for row in recipients]
+
+        message_ids = {}
+        emails = []
+        if recipients:
+            cur.execute("""
+                INSERT INTO messages (sender_id, sender_role, receiver_id, receiver_role, subject, body)
+                SELECT %s, %s, r.receiver_id, r.receiver_role, %s, r.body
+                FROM unnest(%s::integer[], %s::integer[], %s::text[]) AS r(receiver_id, receiver_role, body)
+                RETURNING receiver_id, message_id
+            """, (SYSTEM_SENDER_ID, SYSTEM_SENDER_ROLE, subject,
+                  [row[0] for row in recipients], [row[1] for row in recipients], bodies))
+            message_ids = dict(cur.fetchall())
+            # Emails: queued in the outbox in this same transaction, sent (and retried) by its sender
+            emails = [(row[0], row[2], body) for row, body in zip(recipients, bodies) if row[2]]
+            outbox_ids = enqueue_emails(cur, f'reminder_{kind}', subject, [(email, body) for _, email, body in emails])
+            outbox_by_employee = {employee_id: outbox_id for (employee_id, _, _), outbox_id in zip(emails, outbox_ids)}
+            cur.execute("""
+                UPDATE reminder_deliveries d
+                SET message_id = m.message_id, outbox_id = m.outbox_id,
+                    email_status = CASE WHEN m.outbox_id IS NULL THEN 'none' ELSE 'queued' END
+                FROM unnest(%s::integer[], %s::integer[], %s::bigint[]) AS m(employee_id, message_id, outbox_id)
+                WHERE d.sweep = %s AND d.employee_id = m.employee_id
+            """, (list(message_ids), list(message_ids.values()),
+                  [outbox_by_employee.get(employee_id) for employee_id in message_ids], sweep))
+        duration_ms = int((time.perf_counter() - started) * 1000)
+        cur.execute("""
+            INSERT INTO reminder_sweeps (sweep, kind, started_at, finished_at, duration_ms, candidates, notified, emails_queued)
+            VALUES (%s, %s, %s, now(), %s, %s, %s, %s)
+            ON CONFLICT (sweep) DO UPDATE
+            SET candidates = EXCLUDED.candidates, notified = reminder_sweeps.notified + EXCLUDED.notified,
+                finished_at = EXCLUDED.finished_at, duration_ms = EXCLUDED.duration_ms,
+                emails_queued = reminder_sweeps.emails_queued + EXCLUDED.emails_queued
+        """, (sweep, kind, started_at, duration_ms, len(candidates), len(recipients), len(emails)))
+
+    # One batch of inbox events for the whole sweep; the outbox sender picks the emails up now
+    publish_new_messages(message_ids)
+    if emails:
+        outbox_sender.wake()
+
+    metrics = {
+        'sweep': sweep,
+        'candidates': len(candidates),
+        'already_reminded': len(candidates) - len(recipients),
+        'notified': len(recipients),
+        'emails_queued': len(emails),
+        'duration_ms': duration_ms,
+    }
+    recent_sweeps.appendleft(metrics)
+    logging.info(
+        f"[{tag}] Sweep {sweep}: {len(candidates)} candidates, {len(recipients)} notified "
+        f"({metrics['already_reminded']} already reminded), {len(emails)} emails queued in {duration_ms} ms"
+    )
+    return metrics
+
+
+def get_reminder_stats():
+    return list(recent_sweeps)
+
+
+def get_recent_sweeps(limit=20):
+    """Stored metrics of the latest sweeps, newest first."""
+    ensure_reminder_schema()
+    with db_session() as conn, conn.cursor() as cur:
+        # emails_sent/emails_failed: stored for sweeps from before the outbox, counted from the outbox since
+        cur.execute("""
+            WITH recent AS (
+                SELECT * FROM reminder_sweeps
+                ORDER BY started_at DESC
+                LIMIT %s
+            )
+            SELECT s.sweep, s.kind, s.started_at, s.finished_at, s.duration_ms, s.candidates, s.notified,
+                   s.emails_queued,
+                   s.emails_sent + COUNT(o.outbox_id) FILTER (WHERE o.status = 'sent') AS emails_sent,
+                   s.emails_failed + COUNT(o.outbox_id) FILTER (WHERE o.status = 'dead') AS emails_failed
+            FROM recent s
+            LEFT JOIN reminder_deliveries d ON d.sweep = s.sweep AND d.outbox_id IS NOT NULL
+            LEFT JOIN email_outbox o ON o.outbox_id = d.outbox_id
+            GROUP BY s.sweep, s.kind, s.started_at, s.finished_at, s.duration_ms, s.candidates, s.notified,
+                     s.emails_queued, s.emails_sent, s.emails_failed
+            ORDER BY s.started_at DESC
+        """, (limit,))
+        columns = [desc[0] for desc in cur.description]
+        return [dict(zip(columns, row)) for row in cur.fetchall()]
+
+
+def check_missing_clock_ins(force_test=False, slot=None):
     """
     Check for employees who haven't clocked in today and send reminders
     Runs after expected clock-in time plus grace period
     
     Parameters:
         force_test (bool): If True, bypasses time and day checks for testing
+        slot (str): Which scheduled run this is; each employee is reminded at most once per slot and day
     """
     if force_test:
         logging.info("[TEST MODE] Running forced missing clock-in check - bypassing all time restrictions")
@@ -44,92 +273,26 @@ def check_missing_clock_ins(force_test=False):
     else:
         logging.info("[TEST MODE] Time is now: " + now.strftime("%H:%M:%S") + " - Would normally only run after 09:30 AM UTC")
     
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
     try:
-        # Get all active employees who haven't clocked in today
-        query = """
-            SELECT e.employee_id, e.role_id, e.email, e.first_name, e.last_name, e.status
-            FROM employees e
-            WHERE e.account_status = 'Activated'
-            AND e.employee_id NOT IN (
-                -- Employees who have already clocked in today
-                SELECT employee_id FROM attendance_logs 
-                WHERE date = %s
-            )
-        """
-        
-        # Log the query being executed in test mode
-        if force_test:
-            logging.info(f"[TEST MODE] Executing query: {query.replace('%s', str(today))}")
-            
-        cursor.execute(query, (today,))
-        
-        missing_employees = cursor.fetchall()
-        
-        if force_test:
-            logging.info(f"[TEST MODE] Found {len(missing_employees)} employees who haven't clocked in today")
-            
-            # If no employees found for testing, log a clear message
-            if len(missing_employees) == 0:
-                logging.warning("[TEST MODE] No missing clock-ins found! This may be because all employees have clock-in records for today.")
-                logging.warning("[TEST MODE] To properly test, use the setup-test-data endpoint first to create test conditions.")
-                return
-        else:
-            logging.info(f"[REMINDER] Found {len(missing_employees)} employees who haven't clocked in today")
-        
-        reminders_sent = 0
-        for employee in missing_employees:
-            employee_id, role_id, email, first_name, last_name, status = employee
-            full_name = f"{first_name} {last_name}"
-            
-            # Skip employees on leave or with other valid status
-            if status and status.lower() in ('on leave', 'vacation', 'sick leave') and not force_test:
-                logging.info(f"[REMINDER] Skipping {full_name} due to status: {status}")
-                continue
-                
-            # Log the missing clock-in
-            if force_test:
-                logging.info(f"[TEST MODE] Sending reminder to {full_name} (ID: {employee_id}, Email: {email})")
-            else:
-                logging.info(f"[REMINDER] Employee {full_name} (ID: {employee_id}, Status: {status}) hasn't clocked in today")
-            
-            # Send notification to the employee
-            subject = "Missing Clock-In Reminder"
-            message = f"Hi {first_name}, our system shows you haven't clocked in today. Please clock in as soon as possible or contact HR if you're not working today."
-            
-            # Send through available channels
-            send_app_notification(employee_id, role_id, subject, message)
-            
-            # Also send via email if available
-            if email:
-                success = send_clock_reminder_email(email, subject, message)
-                if force_test:
-                    log_status = "SUCCESS" if success else "FAILED"
-                    logging.info(f"[TEST MODE] Email to {email}: {log_status}")
-            
-            reminders_sent += 1
-                
-        if force_test:
-            logging.info(f"[TEST MODE] Clock-in reminder test complete: {reminders_sent} reminders sent")
-            
+        metrics = run_reminder_sweep('clock_in', today, _sweep_slot(slot, now, force_test), force_test)
+        if force_test and metrics['candidates'] == 0:
+            logging.warning("[TEST MODE] No missing clock-ins found! This may be because all employees have clock-in records for today.")
+            logging.warning("[TEST MODE] To properly test, use the setup-test-data endpoint first to create test conditions.")
+        return metrics
     except Exception as e:
         logging.error(f"[{'TEST MODE' if force_test else 'REMINDER'}] Error checking for missing clock-ins: {e}")
         import traceback
         logging.error(traceback.format_exc())
         raise  # Re-raise in test mode to ensure errors are reported
-    finally:
-        cursor.close()
-        conn.close()
 
-def check_missing_clock_outs(force_test=False):
+def check_missing_clock_outs(force_test=False, slot=None):
     """
     Check for employees who clocked in but didn't clock out
     Runs after expected clock-out time plus grace period
     
     Parameters:
         force_test (bool): If True, bypasses time and day checks for testing
+        slot (str): Which scheduled run this is; each employee is reminded at most once per slot and day
     """
     if force_test:
         logging.info("[TEST MODE] Running forced missing clock-out check - bypassing all time restrictions")
@@ -156,150 +319,26 @@ def check_missing_clock_outs(force_test=False):
     else:
         logging.info("[TEST MODE] Time is now: " + now.strftime("%H:%M:%S") + " - Would normally only run after 17:30 PM UTC")
     
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
     try:
-        # Get all employees who clocked in today but haven't clocked out
-        query = """
-            SELECT a.employee_id, e.role_id, e.email, e.first_name, e.last_name, e.status, a.clock_in_time
-            FROM attendance_logs a
-            JOIN employees e ON a.employee_id = e.employee_id
-            WHERE a.date = %s
-            AND e.account_status = 'Activated'
-            AND a.clock_in_time IS NOT NULL
-            AND a.clock_out_time IS NULL
-        """
-        
-        # Log the query being executed in test mode
-        if force_test:
-            logging.info(f"[TEST MODE] Executing query: {query.replace('%s', str(today))}")
-        
-        cursor.execute(query, (today,))
-        
-        missing_clock_outs = cursor.fetchall()
-        
-        if force_test:
-            logging.info(f"[TEST MODE] Found {len(missing_clock_outs)} employees who haven't clocked out today")
-            
-            # If no employees found for testing, log a clear message
-            if len(missing_clock_outs) == 0:
-                logging.warning("[TEST MODE] No missing clock-outs found! This may be because all employees who clocked in have already clocked out.")
-                logging.warning("[TEST MODE] To properly test, use the setup-test-data endpoint first to create test conditions.")
-                return
-        else:
-            logging.info(f"[REMINDER] Found {len(missing_clock_outs)} employees who haven't clocked out today")
-        
-        reminders_sent = 0
-        for employee in missing_clock_outs:
-            employee_id, role_id, email, first_name, last_name, status, clock_in_time = employee
-            full_name = f"{first_name} {last_name}"
-            
-            # Format clock-in time for message
-            clock_in_str = clock_in_time.strftime("%I:%M %p") if clock_in_time else "earlier today"
-            
-            # Log the missing clock-out
-            if force_test:
-                logging.info(f"[TEST MODE] Sending reminder to {full_name} (ID: {employee_id}, Email: {email})")
-            else:
-                logging.info(f"[REMINDER] Employee {full_name} (ID: {employee_id}, Status: {status}) hasn't clocked out today")
-            
-            # Send notification to the employee
-            subject = "Missing Clock-Out Reminder"
-            message = f"Hi {first_name}, our system shows you clocked in at {clock_in_str} but haven't clocked out. Please remember to clock out before leaving."
-            
-            # Send through available channels
-            send_app_notification(employee_id, role_id, subject, message)
-            
-            # Also send via email if available
-            if email:
-                success = send_clock_reminder_email(email, subject, message)
-                if force_test:
-                    log_status = "SUCCESS" if success else "FAILED"
-                    logging.info(f"[TEST MODE] Email to {email}: {log_status}")
-            
-            reminders_sent += 1
-        
-        if force_test:
-            logging.info(f"[TEST MODE] Clock-out reminder test complete: {reminders_sent} reminders sent")
-                
+        metrics = run_reminder_sweep('clock_out', today, _sweep_slot(slot, now, force_test), force_test)
+        if force_test and metrics['candidates'] == 0:
+            logging.warning("[TEST MODE] No missing clock-outs found! This may be because all employees who clocked in have already clocked out.")
+            logging.warning("[TEST MODE] To properly test, use the setup-test-data endpoint first to create test conditions.")
+        return metrics
     except Exception as e:
         logging.error(f"[{'TEST MODE' if force_test else 'REMINDER'}] Error checking for missing clock-outs: {e}")
         import traceback
         logging.error(traceback.format_exc())
         if force_test:
             raise  # Re-raise in test mode to ensure errors are reported
-    finally:
-        cursor.close()
-        conn.close()
-          
-def send_app_notification(employee_id, role_id, subject, message):
-    """
-    Send in-app notification using the existing messages table
-    """
-    logging.info(f"[REMINDER] Sending app notification to employee {employee_id}")
-    
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    try:
-        # Insert notification into the messages table using the existing structure
-        query = """
-            INSERT INTO messages 
-            (sender_id, sender_role, receiver_id, receiver_role, subject, body)
-            VALUES (%s, %s, %s, %s, %s, %s)
-        """
-        values = (
-            SYSTEM_SENDER_ID,       # System sender ID
-            SYSTEM_SENDER_ROLE,     # System sender role
-            employee_id,            # Receiver ID
-            role_id,                # Receiver role
-            subject,                # Subject
-            message                 # Body
-        )
-        cursor.execute(query, values)
-        conn.commit()
-        logging.info(f"[REMINDER] Successfully sent app notification to employee {employee_id}")
-        return True
-    except Exception as e:
-        conn.rollback()
-        logging.error(f"[REMINDER] Failed to send app notification: {e}")
-        return False
-    finally:
-        cursor.close()
-        conn.close()
-
-def send_clock_reminder_email(email, subject, message):
-    """
-    Send email notification using the exact same logic as 2FA system
-    """
-    logging.debug(f"[REMINDER EMAIL] Sending email to {email}")
 
-    try:
-        from app import mail
-        sender_email = os.getenv("EMAIL_USER")
-        if not sender_email:
-            logging.error("❌ EMAIL_USER not set in .env")
-            return False
-
-        logging.debug(f"[REMINDER EMAIL] Preparing to send email: sender={sender_email}, recipient={email}")
-        msg = Message(
-            subject=subject,
-            sender=sender_email,
-            recipients=[email]
-        )
-        msg.body = message
-
-        mail.send(msg)
-        logging.info(f"✅ Reminder email sent successfully to {email}")
-        return True
 
-    except Exception as e:
-        logging.error(f"❌ Email error: {e}")
-        import traceback
-        logging.error(traceback.format_exc())
-        return False
-    
+# Test runs always send (their own slot per run); scheduled runs without a slot are keyed by the hour
+def _sweep_slot(slot, now, force_test):
+    if force_test:
+        return f"test-{now:%H%M%S}"
+    return slot or f"{now:%H}h"
+
 def init_attendance_scheduler(app):
     """Initialize the attendance reminder scheduler"""
     scheduler = BackgroundScheduler()
@@ -310,6 +349,7 @@ def init_attendance_scheduler(app):
         check_missing_clock_ins,
         CronTrigger(day_of_week='mon-fri', hour=9, minute=30),
         id='check_missing_clock_ins_morning',
+        kwargs={'slot': 'first'},
         max_instances=1,
         replace_existing=True
     )
@@ -319,6 +359,7 @@ def init_attendance_scheduler(app):
         check_missing_clock_ins,
         CronTrigger(day_of_week='mon-fri', hour=10, minute=30),
         id='check_missing_clock_ins_late_morning',
+        kwargs={'slot': 'second'},
         max_instances=1,
         replace_existing=True
     )
@@ -329,6 +370,7 @@ def init_attendance_scheduler(app):
         check_missing_clock_outs,
         CronTrigger(day_of_week='mon-fri', hour=17, minute=30),
         id='check_missing_clock_outs_evening',
+        kwargs={'slot': 'first'},
         max_instances=1,
         replace_existing=True
     )
@@ -338,6 +380,7 @@ def init_attendance_scheduler(app):
         check_missing_clock_outs,
         CronTrigger(day_of_week='mon-fri', hour=18, minute=30),
         id='check_missing_clock_outs_late_evening',
+        kwargs={'slot': 'second'},
         max_instances=1,
         replace_existing=True
     )
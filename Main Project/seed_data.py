@@ -0,0 +1,633 @@
+"""
+Fill a database created from "Database Setup/DatabaseSetup.sql" with synthetic data at production-like scale.
+- Generates teams, admins, employees, team members, shifts, attendance, payroll, messages, admin audit rows and
+  surveys with responses. Every foreign key points at a generated (or existing) row, and the distributions look
+  like a real company: weighted departments and salaries, hires spread over the years, ~8% terminated,
+  ~94% present on workdays with late arrivals and overtime, recent-heavy messages and audit activity.
+- Rows are streamed with COPY inside one transaction, with the user triggers of the loaded tables disabled;
+  afterwards the attendance rollups and unread counters are rebuilt and the report cache is dropped.
+- The data ends yesterday, so benchmarks/load_test.py still finds employees who have not clocked in today.
+- Every generated employee and admin signs in with SEED_PASSWORD.
+- Run with (after migrate.py and seeds/seed_roles.py):
+    python seed_data.py --scale small
+    python seed_data.py --scale large        # 50k employees, 3 years of attendance, 3M messages, 3M audit rows
+    python seed_data.py --scale medium --employees 20000 --messages 1000000 --seed 7
+"""
+
+import argparse
+from datetime import date, datetime, time, timedelta
+import io
+import logging
+import random
+import re
+import sys
+import tempfile
+import time as timer
+
+import routes.Login  # noqa: F401  (loads routes.Auth in the same order as the app)
+from routes.Auth.attendance_rollups import ensure_attendance_rollup_schema, rebuild_attendance_rollups
+from routes.Auth.inbox import ensure_inbox_schema, rebuild_unread_counters
+from routes.Auth.password_hashing import hash_password
+from routes.Auth.reports import ensure_report_schema, invalidate_report_cache
+from routes.Auth.utils import _connect
+
+SCALES = {
+    'small': {'employees': 1_000, 'years': 1, 'messages': 50_000, 'audit': 50_000, 'surveys': 5},
+    'medium': {'employees': 10_000, 'years': 2, 'messages': 500_000, 'audit': 500_000, 'surveys': 10},
+    'large': {'employees': 50_000, 'years': 3, 'messages': 3_000_000, 'audit': 3_000_000, 'surveys': 20},
+}
+SEED_PASSWORD = 'Seed@12345'
+TEAM_SIZE = 12
+COPY_CHUNK_ROWS = 100_000
+
+# Tables whose user triggers (rollups, unread counters, report cache) are off while loading
+LOADED_TABLES = [
+    'teams', 'admins', 'employees', 'team_members', 'shifts', 'employee_shifts', 'attendance_logs', 'payroll',
+    'messages', 'audit_trail_admin', 'surveys', 'survey_questions', 'survey_question_options',
+    'survey_assignments', 'survey_responses',
+]
+
+# (department, share of headcount, monthly salary range)
+DEPARTMENTS = [
+    ('Engineering', 30, (4500, 11000)),
+    ('Operations', 18, (2600, 5500)),
+    ('Sales', 15, (2800, 7500)),
+    ('Customer Support', 12, (2200, 4200)),
+    ('Finance', 7, (3500, 8500)),
+    ('Marketing', 7, (3000, 7000)),
+    ('Human Resources', 6, (3000, 6500)),
+    ('Legal', 3, (5000, 10000)),
+    ('IT', 2, (3500, 8000)),
+]
+FIRST_NAMES = {
+    'M': ['James', 'Daniel', 'Ahmad', 'Wei', 'Lucas', 'Omar', 'Ethan', 'Ravi', 'Marco', 'Noah', 'Adam', 'Hiroshi',
+          'Samuel', 'Ivan', 'Luis', 'Arjun', 'Jonas', 'Hassan', 'Kevin', 'Mateo'],
+    'F': ['Sarah', 'Aisha', 'Mei', 'Emma', 'Sofia', 'Priya', 'Hana', 'Olivia', 'Fatima', 'Chloe', 'Nur', 'Elena',
+          'Grace', 'Yuki', 'Laura', 'Amira', 'Julia', 'Mia', 'Zara', 'Ana'],
+}
+LAST_NAMES = ['Tan', 'Smith', 'Lim', 'Garcia', 'Rahman', 'Chen', 'Kumar', 'Lee', 'Müller', 'Rossi', 'Wong', 'Ali',
+              'Nguyen', 'Brown', 'Sato', 'Ibrahim', 'Silva', 'Novak', 'Patel', 'Khan', 'Martin', 'Ong', 'Lopez',
+              'Hassan', 'Walker', 'Yusof', 'Kim', 'Costa', 'Fischer', 'Teo']
+CITIES = [('Kuala Lumpur', 30), ('Petaling Jaya', 15), ('Shah Alam', 10), ('Penang', 10), ('Johor Bahru', 10),
+          ('Singapore', 10), ('Ipoh', 5), ('Kuching', 5), ('Kota Kinabalu', 5)]
+# (name, start, end, share of employees)
+SHIFTS = [
+    ('Morning Shift', time(9), time(17), 70),
+    ('Early Shift', time(7), time(15), 12),
+    ('Evening Shift', time(14), time(22), 12),
+    ('Night Shift', time(22), time(6), 6),
+]
+LEAVE_TYPES = [('Annual Leave', 60), ('Sick Leave', 30), ('Emergency Leave', 10)]
+MESSAGE_SUBJECTS = ['Weekly report', 'Meeting notes', 'Shift swap', 'Leave request', 'Project update',
+                    'Quick question', 'Timesheet reminder', 'Training session', 'Client follow-up', 'Team lunch']
+MESSAGE_BODIES = ['Please see the latest figures before Friday.', 'Can we move our sync to tomorrow morning?',
+                  'Thanks, that works for me.', 'I have updated the document with your comments.',
+                  'Could you approve this when you have a moment?', 'Reminder: the deadline is end of day.',
+                  'The client confirmed the schedule.', 'Let me know if you need anything else.']
+# (action, category, share)
+AUDIT_ACTIONS = [
+    ('Viewed employee list', 'Employee Management', 25), ('Updated employee profile', 'Employee Management', 10),
+    ('Viewed attendance records', 'Attendance', 20), ('Approved leave request', 'Attendance', 8),
+    ('Generated payroll', 'Payroll', 4), ('Viewed payslip', 'Payroll', 6), ('Created announcement', 'Communication', 3),
+    ('Viewed notifications and communication', 'Communication', 12), ('Exported report', 'Reports', 7),
+    ('Updated system settings', 'System Administration', 2), ('Assigned survey', 'Engagement', 3),
+]
+SURVEY_QUESTIONS = [
+    ('How satisfied are you with your work environment?', 'rating', None),
+    ('How would you rate communication within your team?', 'rating', None),
+    ('Which benefit matters most to you?', 'multiple_choice', ['Health insurance', 'Flexible hours', 'Training budget', 'Remote work']),
+    ('How often do you feel overloaded?', 'multiple_choice', ['Never', 'Sometimes', 'Often', 'Always']),
+    ('What should the company start doing?', 'text', None),
+    ('What is one thing your manager does well?', 'text', None),
+]
+RATING_WEIGHTS = (1, 2, 4, 6, 3)  # answers for ratings 1-5
+TEXT_ANSWERS = ['More team activities', 'Clearer goals each quarter', 'Better onboarding', 'Keep it up',
+                'More training opportunities', 'Flexible working hours', 'Nothing to add']
+
+
+# ======================== COPY helpers ========================
+
+NULL = '\\N'
+
+
+def _copy_value(value):
+    if value is None:
+        return NULL
+    if value is True:
+        return 't'
+    if value is False:
+        return 'f'
+    if isinstance(value, str):
+        return value.replace('\\', '\\\\').replace('\t', ' ').replace('\n', ' ')
+    return str(value)
+
+
+class CopyLoader:
+    """Streams generated rows into tables with COPY ... FROM STDIN, COPY_CHUNK_ROWS rows per round trip."""
+
+    def __init__(self, cur):
+        self.cur = cur
+        self.counts = {}
+
+    def _flush(self, table, columns, buffer):
+        buffer.seek(0)
+        self.cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buffer)
+
+    def load(self, table, columns, rows):
+        started = timer.monotonic()
+        buffer = io.StringIO()
+        pending = total = 0
+        for row in rows:
+            # hot generators yield ready COPY lines, the rest yield tuples
+            buffer.write(row if isinstance(row, str) else '\t'.join(map(_copy_value, row)) + '\n')
+            pending += 1
+            if pending == COPY_CHUNK_ROWS:
+                self._flush(table, columns, buffer)
+                total += pending
+                pending = 0
+                buffer = io.StringIO()
+        if pending:
+            self._flush(table, columns, buffer)
+            total += pending
+        self._done(table, total, started)
+        return total
+
+    def load_file(self, table, columns, file, total):
+        """COPY a file of already formatted lines (written alongside another table's rows)."""
+        started = timer.monotonic()
+        file.seek(0)
+        self.cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", file)
+        self._done(table, total, started)
+        return total
+
+    def _done(self, table, total, started):
+        self.counts[table] = self.counts.get(table, 0) + total
+        elapsed = timer.monotonic() - started
+        print(f"  {table}: {total:,} rows in {elapsed:.1f}s ({total / max(elapsed, 1e-6):,.0f} rows/s)")
+
+
+_NEXTVAL_RE = re.compile(r"nextval\('([^']+)'")
+
+
+def reserve_ids(cur, table, column, count):
+    """First of `count` consecutive ids taken from the column's sequence (or after MAX(column) without one)."""
+    cur.execute("""
+        SELECT column_default FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = %s AND column_name = %s
+    """, (table, column))
+    row = cur.fetchone()
+    match = _NEXTVAL_RE.search(row[0] or '') if row else None
+    if match is None:
+        cur.execute(f"LOCK TABLE {table} IN EXCLUSIVE MODE")
+        cur.execute(f"SELECT COALESCE(MAX({column}), 0) + 1 FROM {table}")
+        return cur.fetchone()[0]
+    sequence = match.group(1)
+    cur.execute("SELECT setval(%s, nextval(%s) + %s - 1)", (sequence, sequence, count))
+    return cur.fetchone()[0] - count + 1
+
+
+def _weighted(rng, choices):
+    """Picker for [(value, weight), ...] lists."""
+    values = [c[0] for c in choices]
+    cumulative = []
+    total = 0
+    for c in choices:
+        total += c[-1]
+        cumulative.append(total)
+    return lambda: rng.choices(values, cum_weights=cumulative)[0]
+
+
+def _recent_timestamp(rng, start, end):
+    """Office-hours timestamp between start and end, skewed towards end (activity grows with headcount)."""
+    days = (end.date() - start.date()).days
+    day = end.date() - timedelta(days=int(days * rng.random() ** 2))
+    return datetime.combine(day, time(8)) + timedelta(seconds=int(min(max(rng.gauss(5.5, 2.5), 0), 12) * 3600))
+
+
+# ======================== Generator ========================
+
+class SeedGenerator:
+    def __init__(self, cur, loader, options, roles):
+        self.cur = cur
+        self.loader = loader
+        self.rng = random.Random(options.seed)
+        self.options = options
+        self.roles = roles
+        self.end = date.today() - timedelta(days=1)
+        self.start = self.end - timedelta(days=365 * options.years - 1)
+        self.window_start = datetime.combine(self.start, time(8))
+        self.window_end = datetime.combine(self.end, time(20))
+        self.password = hash_password(SEED_PASSWORD)
+        self.tag = f"{options.seed}{self.rng.randrange(16 ** 4):04x}"  # keeps generated emails unique across runs
+
+    # ---- people ----
+
+    def teams(self):
+        count = max(1, -(-self.options.employees // TEAM_SIZE))
+        first = reserve_ids(self.cur, 'teams', 'team_id', count)
+        department_of = _weighted(self.rng, [(d, w) for d, w, _ in DEPARTMENTS])
+        self.team_ids = list(range(first, first + count))
+        self.team_department = {}
+        rows = []
+        for n, team_id in enumerate(self.team_ids, 1):
+            department = department_of()
+            self.team_department[team_id] = department
+            created = self.start + timedelta(days=self.rng.randrange(max(1, (self.end - self.start).days // 4)))
+            rows.append((team_id, f"{department} Team {n}", created))
+        self.loader.load('teams', ['team_id', 'team_name', 'created_at'], rows)
+
+    def admins(self):
+        count = self.options.admins
+        first = reserve_ids(self.cur, 'admins', 'admin_id', count)
+        self.admin_ids = list(range(first, first + count))
+        rows = []
+        for admin_id in self.admin_ids:
+            gender = self.rng.choice('MF')
+            rows.append((
+                admin_id, f"admin{admin_id}.{self.tag}@seed.example.com", self.password,
+                self.rng.choice(FIRST_NAMES[gender]), self.rng.choice(LAST_NAMES),
+                self.window_start, 'Active', True, self.roles['admin'], gender,
+                date(self.rng.randint(1970, 1992), self.rng.randint(1, 12), self.rng.randint(1, 28)),
+            ))
+        self.loader.load('admins', ['admin_id', 'email', 'password', 'first_name', 'last_name', 'created_at',
+                                    'status', 'is_verified', 'role_id', 'gender', 'date_of_birth'], rows)
+
+    def employees(self):
+        count = self.options.employees
+        first = reserve_ids(self.cur, 'employees', 'employee_id', count)
+        salaries = {d: r for d, _, r in DEPARTMENTS}
+        city_of = _weighted(self.rng, CITIES)
+        shift_of = _weighted(self.rng, [(shift_id, share) for shift_id, share in self.shift_shares])
+        span = (self.end - self.start).days
+        self.people = []  # (employee_id, team_id, hired, terminated, shift_id, salary)
+        rows = []
+        for n in range(count):
+            employee_id = first + n
+            team_id = self.team_ids[n % len(self.team_ids)]
+            department = self.team_department[team_id]
+            low, high = salaries[department]
+            salary = round(min(high * 1.5, max(low, self.rng.lognormvariate(0, 0.25) * (low + high) / 2)), -1)
+            # 60% were already on staff when the window starts, the rest are hired during it
+            if self.rng.random() < 0.6:
+                hired = self.start - timedelta(days=self.rng.randrange(30, 3650))
+            else:
+                hired = self.start + timedelta(days=self.rng.randrange(span))
+            terminated = None
+            if self.rng.random() < 0.08 and hired < self.end - timedelta(days=60):
+                earliest = max(hired, self.start) + timedelta(days=30)
+                terminated = earliest + timedelta(days=self.rng.randrange(max(1, (self.end - earliest).days)))
+            gender = self.rng.choice('MF')
+            first_name = self.rng.choice(FIRST_NAMES[gender])
+            last_name = self.rng.choice(LAST_NAMES)
+            age = max(20, min(64, int(self.rng.gauss(36, 9))))
+            shift_id = shift_of()
+            self.people.append((employee_id, team_id, hired, terminated, shift_id, salary))
+            rows.append((
+                employee_id, first_name, last_name,
+                f"{first_name}.{last_name}.{employee_id}.{self.tag}@seed.example.com".lower(),
+                f"01{self.rng.randrange(10 ** 8):08d}", department, salary,
+                'Inactive' if terminated else 'active', hired, terminated, hired,
+                'Terminated' if terminated else 'Activated', city_of(), self.password, team_id,
+                self.roles['employee'], gender,
+                date(self.end.year - age, self.rng.randint(1, 12), self.rng.randint(1, 28)),
+            ))
+        self.loader.load('employees', [
+            'employee_id', 'first_name', 'last_name', 'email', 'phone_number', 'department', 'salary', 'status',
+            'date_hired', 'date_terminated', 'created', 'account_status', 'city', 'password', 'team_id', 'role_id',
+            'gender', 'date_of_birth'], rows)
+
+    def team_members(self):
+        leads = {}
+        rows = []
+        for employee_id, team_id, hired, terminated, _, _ in self.people:
+            role = 'Member'
+            if team_id not in leads and terminated is None:
+                leads[team_id] = employee_id
+                role = 'Team Manager'
+            admin_id = self.admin_ids[team_id % len(self.admin_ids)]
+            rows.append((team_id, employee_id, datetime.combine(max(hired, self.start), time(9)), role, admin_id))
+        self.loader.load('team_members', ['team_id', 'employee_id', 'assigned_at', 'role', 'admin_id'], rows)
+        self.cur.execute("""
+            UPDATE teams t SET team_lead_employee_id = l.employee_id, team_lead_admin_id = l.admin_id
+            FROM unnest(%s::int[], %s::int[], %s::int[]) AS l(team_id, employee_id, admin_id)
+            WHERE t.team_id = l.team_id
+        """, (list(leads), list(leads.values()), [self.admin_ids[t % len(self.admin_ids)] for t in leads]))
+
+    def shifts(self):
+        """Reuse the shifts the schema already has, or create the standard four."""
+        self.cur.execute("SELECT shift_id, start_time, end_time FROM shifts ORDER BY shift_id")
+        existing = self.cur.fetchall()
+        if existing:
+            shares = [s[3] for s in SHIFTS]
+            self.shift_times = {shift_id: (start, end) for shift_id, start, end in existing}
+            self.shift_shares = [(row[0], shares[n] if n < len(shares) else 5) for n, row in enumerate(existing)]
+            print(f"  shifts: using the {len(existing)} existing shift(s)")
+            return
+        first = reserve_ids(self.cur, 'shifts', 'shift_id', len(SHIFTS))
+        rows = [(first + n, name, start, end) for n, (name, start, end, _) in enumerate(SHIFTS)]
+        self.loader.load('shifts', ['shift_id', 'shift_name', 'start_time', 'end_time'], rows)
+        self.shift_times = {shift_id: (start, end) for shift_id, _, start, end in rows}
+        self.shift_shares = [(first + n, share) for n, (_, _, _, share) in enumerate(SHIFTS)]
+
+    def employee_shifts(self):
+        locations = ['HQ', 'HQ', 'HQ', 'Branch Office', 'Warehouse', 'Remote']
+        rows = (
+            (employee_id, shift_id != self.shift_shares[0][0] and self.rng.random() < 0.3,
+             self.rng.choice(locations), max(hired, self.start), shift_id, 'seed_data')
+            for employee_id, _, hired, _, shift_id, _ in self.people
+        )
+        self.loader.load('employee_shifts',
+                         ['employee_id', 'is_rotating', 'location', 'shift_date', 'shift_id', 'assigned_by'], rows)
+
+    # ---- attendance and payroll ----
+
+    def attendance_and_payroll(self):
+        """
+        One attendance row per workday between hire and termination; payroll rows for every completed month are
+        written to a side file from the same pass (so hours and overtime match) and copied afterwards.
+        """
+        rng = self.rng
+        workdays = []
+        day = self.start
+        while day <= self.end:
+            if day.weekday() < 5:
+                workdays.append((day, day.isoformat(), day.replace(day=1)))
+            day += timedelta(days=1)
+        # Payroll covers completed months only
+        last_month = self.end.replace(day=1)
+        if (self.end + timedelta(days=1)).month == self.end.month:
+            last_month = (last_month - timedelta(days=1)).replace(day=1)
+        leave_of = _weighted(rng, LEAVE_TYPES)
+        role_id = self.roles['employee']
+        verified_until = self.end - timedelta(days=7)
+        payroll_rows = 0
+        payroll_file = tempfile.TemporaryFile('w+', encoding='utf-8')
+
+        def clock(minutes):
+            minutes %= 24 * 60
+            return f"{minutes // 60:02d}:{minutes % 60:02d}:{rng.randrange(60):02d}"
+
+        def rows():
+            nonlocal payroll_rows
+            for employee_id, _, hired, terminated, shift_id, salary in self.people:
+                start, _ = self.shift_times[shift_id]
+                shift_start = start.hour * 60 + start.minute
+                until = terminated or self.end
+                presence = min(0.985, max(0.85, rng.gauss(0.94, 0.03)))  # some people are absent more than others
+                month = None
+                hours = overtime = 0.0
+                leave_line = f"\t\\N\t\\N\tOn Leave\t0\t{shift_id}\t0\tNo\t\\N\t{{}}\tt\tf\t{role_id}\n"
+                absent_line = f"\t\\N\t\\N\tAbsent\t0\t{shift_id}\t0\tNo\t\\N\t\\N\tt\tf\t{role_id}\n"
+                for day, day_text, day_month in workdays:
+                    if day < hired or day > until:
+                        continue
+                    if day_month != month:
+                        if month is not None and month <= last_month:
+                            payroll_rows += self._write_payroll(payroll_file, employee_id, month, salary, hours, overtime)
+                        month, hours, overtime = day_month, 0.0, 0.0
+                    draw = rng.random()
+                    if draw < presence:
+                        late = rng.random() < 0.08
+                        arrival = shift_start + (rng.randint(16, 75) if late else int(rng.gauss(-6, 6)))
+                        extra = rng.choice((30, 60, 90, 120, 180)) if rng.random() < 0.15 else 0
+                        departure = shift_start + 8 * 60 + extra + int(rng.gauss(3, 4))
+                        worked = round((departure - arrival) / 60, 2)
+                        ot = round(extra / 60, 2)
+                        hours += worked
+                        overtime += ot
+                        yield (f"{employee_id}\t{day_text}\t{clock(arrival)}\t{clock(departure)}\tPresent\t{worked}\t"
+                               f"{shift_id}\t{ot}\t{'Yes' if ot else 'No'}\t{'Late' if late else NULL}\t{NULL}\t"
+                               f"{'t' if day < verified_until else 'f'}\t{'t' if ot and rng.random() < 0.8 else 'f'}\t"
+                               f"{role_id}\n")
+                    elif draw < presence + (1 - presence) * 0.65:
+                        yield f"{employee_id}\t{day_text}" + leave_line.format(leave_of())
+                    else:
+                        yield f"{employee_id}\t{day_text}" + absent_line
+                if month is not None and month <= last_month:
+                    payroll_rows += self._write_payroll(payroll_file, employee_id, month, salary, hours, overtime)
+
+        try:
+            self.loader.load('attendance_logs', [
+                'employee_id', 'date', 'clock_in_time', 'clock_out_time', 'status', 'hours_worked', 'shift_id',
+                'overtime_hours', 'is_overtime', 'remarks', 'leave_type', 'attendance_verified', 'is_overtime_approved',
+                'role_id'], rows())
+            self.loader.load_file('payroll', [
+                'employee_id', 'month', 'base_salary', 'hours_worked', 'overtime_hours', 'overtime_pay', 'bonuses',
+                'tax_rate', 'tax', 'net_salary', 'created_at', 'deductions', 'payment_status', 'payment_date'],
+                payroll_file, payroll_rows)
+        finally:
+            payroll_file.close()
+
+    def _write_payroll(self, file, employee_id, month, salary, hours, overtime):
+        """Same formula as routes/Auth/payroll_jobs.compute_payroll; paid on the last day of the month."""
+        rng = self.rng
+        bonuses = round(salary * rng.choice((0.05, 0.1, 0.2)), 2) if rng.random() < 0.1 else 0
+        tax_rate = 5 if salary < 3000 else 11 if salary < 5000 else 19 if salary < 8000 else 24
+        overtime_pay = round(overtime * (salary / 160) * 1.5, 2)
+        total = salary + overtime_pay + bonuses
+        tax = round(total * tax_rate / 100, 2)
+        paid = (month + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        created = datetime.combine(paid - timedelta(days=3), time(10))
+        status, payment_date = ('Paid', datetime.combine(paid, time(9))) if paid < self.end else ('Pending', NULL)
+        file.write(f"{employee_id}\t{month}\t{salary}\t{min(hours, 999.99):.2f}\t{min(overtime, 999.99):.2f}\t"
+                   f"{overtime_pay}\t{bonuses}\t{tax_rate}\t{tax}\t{round(total - tax, 2)}\t{created}\t0\t"
+                   f"{status}\t{payment_date}\n")
+        return 1
+
+    # ---- activity ----
+
+    def messages(self):
+        rng = self.rng
+        people = self.people
+        by_team = {}
+        for person in people:
+            by_team.setdefault(person[1], []).append(person[0])
+        recently_read = self.window_end - timedelta(days=14)
+
+        def rows():
+            for _ in range(self.options.messages):
+                sender = rng.choice(people)
+                kind = rng.random()
+                if kind < 0.6:  # colleagues in the same team
+                    sender_id, sender_role = sender[0], 'employee'
+                    receiver_id, receiver_role = rng.choice(by_team[sender[1]]), 'employee'
+                elif kind < 0.8:
+                    sender_id, sender_role = sender[0], 'employee'
+                    receiver_id, receiver_role = rng.choice(self.admin_ids), 'admin'
+                else:
+                    sender_id, sender_role = rng.choice(self.admin_ids), 'admin'
+                    receiver_id, receiver_role = sender[0], 'employee'
+                sent = _recent_timestamp(rng, self.window_start, self.window_end)
+                yield (sender_id, sender_role, receiver_id, receiver_role, rng.choice(MESSAGE_SUBJECTS),
+                       rng.choice(MESSAGE_BODIES), sent < recently_read or rng.random() < 0.5, sent)
+
+        self.loader.load('messages', ['sender_id', 'sender_role', 'receiver_id', 'receiver_role', 'subject', 'body',
+                                      'is_read', '"timestamp"'], rows())
+
+    def audit(self):
+        rng = self.rng
+        action_of = _weighted(rng, [((a, c), w) for a, c, w in AUDIT_ACTIONS])
+        super_admin = self.roles.get('super_admin', self.roles['admin'])
+
+        def rows():
+            for _ in range(self.options.audit):
+                action, category = action_of()
+                admin_id = rng.choice(self.admin_ids)
+                yield (action, f"Admin {admin_id}: {action.lower()}", _recent_timestamp(rng, self.window_start, self.window_end),
+                       category, 'Active', super_admin if rng.random() < 0.1 else self.roles['admin'])
+
+        self.loader.load('audit_trail_admin', ['action', 'details', '"timestamp"', 'category', 'compliance_status',
+                                               'role_id'], rows())
+
+    def surveys(self):
+        rng = self.rng
+        count = self.options.surveys
+        if not count:
+            return
+        survey_first = reserve_ids(self.cur, 'surveys', 'survey_id', count)
+        question_first = reserve_ids(self.cur, 'survey_questions', 'question_id', count * len(SURVEY_QUESTIONS))
+        option_count = count * sum(5 if t == 'rating' else len(o or []) for _, t, o in SURVEY_QUESTIONS)
+        option_first = reserve_ids(self.cur, 'survey_question_options', 'option_id', option_count)
+
+        surveys, questions, options = [], [], []
+        layout = []  # (survey_id, created, [(question_id, type, [(option_id, text)])])
+        question_id, option_id = question_first, option_first
+        for n in range(count):
+            survey_id = survey_first + n
+            created = _recent_timestamp(rng, self.window_start, self.window_end - timedelta(days=7))
+            admin_id = rng.choice(self.admin_ids)
+            surveys.append((survey_id, f"Employee Pulse Survey #{n + 1}", 'Quarterly engagement check-in', created,
+                            n >= count - 3, admin_id, 'admin'))
+            survey_questions = []
+            for text, kind, choices in SURVEY_QUESTIONS:
+                questions.append((question_id, survey_id, text, kind))
+                choices = [str(r) for r in range(1, 6)] if kind == 'rating' else choices or []
+                question_options = []
+                for choice in choices:
+                    options.append((option_id, question_id, choice, False))
+                    question_options.append((option_id, choice))
+                    option_id += 1
+                survey_questions.append((question_id, kind, question_options))
+                question_id += 1
+            layout.append((survey_id, created, survey_questions))
+
+        self.loader.load('surveys', ['survey_id', 'title', 'description', 'created_at', 'is_active', 'admin_id',
+                                     'created_by'], surveys)
+        self.loader.load('survey_questions', ['question_id', 'survey_id', 'question_text', 'question_type'], questions)
+        self.loader.load('survey_question_options', ['option_id', 'question_id', 'option_text', 'is_correct'], options)
+
+        # Each survey goes to a quarter of the teams; like the app, a team assignment is one row per member
+        members = {}
+        for employee_id, team_id, hired, terminated, _, _ in self.people:
+            members.setdefault(team_id, []).append((employee_id, hired, terminated))
+        assignments, responses = [], []
+        for survey_id, created, survey_questions in layout:
+            for team_id in rng.sample(self.team_ids, max(1, len(self.team_ids) // 4)):
+                for employee_id, hired, terminated in members[team_id]:
+                    if hired > created.date() or (terminated and terminated < created.date()):
+                        continue
+                    submitted = rng.random() < 0.6
+                    assignments.append((survey_id, employee_id, created, submitted, 1))
+                    if not submitted:
+                        continue
+                    at = created + timedelta(minutes=rng.randrange(10, 14 * 24 * 60))
+                    for question_id, kind, question_options in survey_questions:
+                        if kind == 'text':
+                            responses.append((survey_id, question_id, employee_id, None, rng.choice(TEXT_ANSWERS), 1, at))
+                        else:
+                            weights = RATING_WEIGHTS if kind == 'rating' else None
+                            option_id, text = rng.choices(question_options, weights=weights)[0]
+                            responses.append((survey_id, question_id, employee_id, option_id, text, 1, at))
+        self.loader.load('survey_assignments', ['survey_id', 'employee_id', 'assigned_at', 'has_submitted',
+                                                'attempt_number'], assignments)
+        self.loader.load('survey_responses', ['survey_id', 'question_id', 'employee_id', 'option_id', 'response_text',
+                                              'attempt_number', 'submitted_at'], responses)
+
+    def run(self):
+        self.teams()
+        self.admins()
+        self.shifts()
+        self.employees()
+        self.team_members()
+        self.employee_shifts()
+        self.attendance_and_payroll()
+        self.messages()
+        self.audit()
+        self.surveys()
+
+
+def _role_ids(cur):
+    cur.execute("SELECT role_id, role_name FROM roles")
+    names = {name.lower(): role_id for role_id, name in cur.fetchall()}
+    if 'admin' not in names or 'employee' not in names:
+        return None
+    return names
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic data generator")
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--employees', type=int, help="employees to create (default: from --scale)")
+    parser.add_argument('--years', type=int, help="years of attendance, payroll and activity, ending yesterday")
+    parser.add_argument('--messages', type=int, help="inbox messages")
+    parser.add_argument('--audit', type=int, help="admin audit trail rows")
+    parser.add_argument('--surveys', type=int, help="surveys, each assigned to a quarter of the teams")
+    parser.add_argument('--admins', type=int, help="admins (default: one per 250 employees)")
+    parser.add_argument('--seed', type=int, default=1, help="random seed; the same seed gives the same data")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    for name, value in SCALES[args.scale].items():
+        if getattr(args, name) is None:
+            setattr(args, name, value)
+    if args.admins is None:
+        args.admins = max(2, args.employees // 250)
+    if args.employees < 1 or args.years < 1 or args.admins < 1:
+        parser.error("--employees, --years and --admins must be at least 1")
+
+    # The rebuild steps below need their tables; create them before the load so the triggers exist to disable
+    ensure_attendance_rollup_schema()
+    ensure_inbox_schema()
+    ensure_report_schema()
+
+    started = timer.monotonic()
+    conn = _connect()
+    try:
+        with conn.cursor() as cur:
+            roles = _role_ids(cur)
+            if roles is None:
+                print("❌ The roles table has no 'admin'/'Employee' roles, run: python seeds/seed_roles.py")
+                return 1
+            print(f"🌱 Seeding {args.employees:,} employees, {args.years} year(s) of attendance, "
+                  f"{args.messages:,} messages, {args.audit:,} audit rows, {args.surveys} surveys (seed {args.seed})")
+            cur.execute("SET LOCAL synchronous_commit = off")
+            for table in LOADED_TABLES:
+                cur.execute(f"ALTER TABLE {table} DISABLE TRIGGER USER")
+            SeedGenerator(cur, CopyLoader(cur), args, roles).run()
+            for table in LOADED_TABLES:
+                cur.execute(f"ALTER TABLE {table} ENABLE TRIGGER USER")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    print(f"✅ Loaded in {timer.monotonic() - started:.0f}s, updating planner statistics and derived tables...")
+
+    conn = _connect()
+    try:
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            for table in LOADED_TABLES:
+                cur.execute(f"ANALYZE {table}")
+    finally:
+        conn.close()
+    days = rebuild_attendance_rollups()
+    rebuild_unread_counters()
+    invalidate_report_cache()
+    print(f"✅ Rebuilt attendance rollups for {days} day(s) and unread counters, dropped cached reports")
+    print(f"✅ Done in {timer.monotonic() - started:.0f}s; generated accounts sign in with password {SEED_PASSWORD!r}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,109 @@
+/*
+ * Push channel client (Server-Sent Events over fetch, so the Authorization header can be sent).
+ *
+ *   AppEvents.start('/events', 'adminToken');            // once per page
+ *   AppEvents.poll(checkSessionConflict, 30000, ['session_conflict']);
+ *
+ * poll() keeps the old polling function as a fallback: it only runs on its interval while the stream
+ * is down, runs right away when one of the listed events arrives, and once after every reconnect
+ * (or 'resync') so nothing published while disconnected is missed.
+ */
+(function (window) {
+  if (window.AppEvents) return;
+
+  const RECONNECT_MIN_MS = 2000;
+  const RECONNECT_MAX_MS = 60000;
+
+  const pollers = [];
+  const handlers = {};
+  let connected = false;
+  let started = false;
+  let stopped = false;
+  let reconnectDelay = RECONNECT_MIN_MS;
+
+  function dispatch(type, data) {
+    (handlers[type] || []).forEach(fn => {
+      try { fn(data); } catch (err) { console.error('[AppEvents] handler error:', err); }
+    });
+    pollers.forEach(poller => {
+      if (type === 'resync' || poller.types.includes(type)) poller.run();
+    });
+  }
+
+  function parseBlock(block) {
+    let type = 'message';
+    const data = [];
+    block.split('\n').forEach(line => {
+      if (line.startsWith('event:')) type = line.slice(6).trim();
+      else if (line.startsWith('data:')) data.push(line.slice(5).trim());
+      else if (line.startsWith('retry:')) reconnectDelay = parseInt(line.slice(6), 10) || reconnectDelay;
+    });
+    if (!data.length) return;
+    let payload = {};
+    try { payload = JSON.parse(data.join('\n')); } catch (err) { /* keep empty payload */ }
+    if (type === 'ready') {
+      const wasDisconnected = !connected;
+      connected = true;
+      reconnectDelay = RECONNECT_MIN_MS;
+      if (wasDisconnected) pollers.forEach(poller => poller.run());
+      return;
+    }
+    dispatch(type, payload);
+    if (type === 'session_conflict' || type === 'account_deactivated') stopped = true;
+  }
+
+  async function connect(url, tokenKey) {
+    const token = sessionStorage.getItem(tokenKey);
+    if (!token) {
+      connected = false;
+      return;
+    }
+    try {
+      const res = await fetch(url, {
+        headers: { 'Authorization': 'Bearer ' + token, 'Accept': 'text/event-stream' },
+        cache: 'no-store'
+      });
+      if (!res.ok || !res.body) throw new Error('stream status ' + res.status);
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        let index;
+        while ((index = buffer.indexOf('\n\n')) >= 0) {
+          parseBlock(buffer.slice(0, index));
+          buffer = buffer.slice(index + 2);
+        }
+      }
+    } catch (err) {
+      console.debug('[AppEvents] stream closed:', err.message);
+      connected = false;
+      reconnectDelay = Math.min(reconnectDelay * 2, RECONNECT_MAX_MS);
+    }
+    if (stopped) return;
+    // The server ends every stream after a while so the token is checked again
+    setTimeout(() => connect(url, tokenKey), connected ? 0 : reconnectDelay);
+    connected = false;
+  }
+
+  window.AppEvents = {
+    start(url, tokenKey) {
+      if (started || !window.fetch || !window.ReadableStream) return;
+      started = true;
+      connect(url, tokenKey);
+    },
+    on(type, fn) {
+      (handlers[type] = handlers[type] || []).push(fn);
+    },
+    poll(fn, intervalMs, types) {
+      const poller = { run: fn, types: types || [] };
+      pollers.push(poller);
+      return setInterval(() => { if (!connected) fn(); }, intervalMs);
+    },
+    isConnected() {
+      return connected;
+    }
+  };
+})(window);